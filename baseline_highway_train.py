@@ -47,7 +47,11 @@ def train(args, extra_args):
     #     # if using ICM use ppo2_icm submodule in ppo2
     #     learn = get_alg_module(args.alg, Config.icm_submodule).learn
     # else:
-    learn = get_learn_function(args.alg)
+    if args.alg == 'deepq' and env_type not in {'atari', 'retro'}:
+        # build_env returns a vectorized env for every other env type
+        learn = get_alg_module(args.alg, 'deepq_vec').learn
+    else:
+        learn = get_learn_function(args.alg)
     
     alg_kwargs = get_learn_function_defaults(args.alg, env_type)
     alg_kwargs.update(extra_args)
@@ -101,7 +105,8 @@ def build_env(args):
         get_session(config=config)
 
         flatten_dict_observations = alg not in {'her'}
-        env = make_vec_env(env_id, env_type, nenv, seed, reward_scale=args.reward_scale, flatten_dict_observations=flatten_dict_observations)
+        env = make_vec_env(env_id, env_type, nenv, seed, reward_scale=args.reward_scale, flatten_dict_observations=flatten_dict_observations,
+                           vec_monitor=Config.use_vec_monitor)
 
         if env_type == 'mujoco':
             env = VecNormalize(env)
@@ -238,10 +243,12 @@ def main(args):
     if MPI is None or MPI.COMM_WORLD.Get_rank() == 0:
         rank = 0
         # logger.configure()
-        logger.configure(dir=results_dir, format_strs=Config.baselines_log_format)
+        logger.configure(dir=results_dir, format_strs=Config.baselines_log_format,
+                         flush_interval=Config.baselines_log_flush_interval)
     else:
         # logger.configure(format_strs=[])
-        logger.configure(dir=results_dir, format_strs=Config.baselines_log_format)
+        logger.configure(dir=results_dir, format_strs=Config.baselines_log_format,
+                         flush_interval=Config.baselines_log_flush_interval)
         rank = MPI.COMM_WORLD.Get_rank()
 
     if args.play:
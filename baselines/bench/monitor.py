@@ -123,6 +123,18 @@ class ResultsWriter(object):
             self.logger.writerow(epinfo)
             self.f.flush()
 
+    def write_rows(self, epinfos):
+        """Write several episodes with a single flush"""
+        if self.logger and epinfos:
+            self.logger.writerows(epinfos)
+            self.f.flush()
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            self.f = None
+            self.logger = None
+
 
 
 def get_monitor_files(dir):
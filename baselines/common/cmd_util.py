@@ -18,6 +18,7 @@ from baselines.common.vec_env.subproc_vec_env import SubprocVecEnv
 from baselines.common.vec_env.dummy_vec_env import DummyVecEnv
 from baselines.common.vec_env.subproc_vec_ma_env import SubprocVecMAEnv
 from baselines.common.vec_env.dummy_vec_ma_env import DummyVecMAEnv
+from baselines.common.vec_env.vec_monitor import VecMonitor
 from baselines.common import retro_wrappers
 
 def make_vec_env(env_id, env_type, num_env, seed,
@@ -25,11 +26,17 @@ def make_vec_env(env_id, env_type, num_env, seed,
                  start_index=0,
                  reward_scale=1.0,
                  flatten_dict_observations=True,
-                 gamestate=None, isMultiAgent=False):
+                 gamestate=None, isMultiAgent=False, vec_monitor=False, log_dir=None):
     """
     Create a wrapped, monitored SubprocVecEnv for Atari and MuJoCo.
+
+    With vec_monitor the envs are not wrapped in a Monitor each, the VecEnv
+    is wrapped in a VecMonitor that writes all the episodes of this process
+    to one monitor file. The monitor files are written to log_dir, the
+    logger dir by default.
     """
     wrapper_kwargs = wrapper_kwargs or {}
+    log_dir = log_dir or logger.get_dir()
     mpi_rank = MPI.COMM_WORLD.Get_rank() if MPI else 0
     seed = seed + 10000 * mpi_rank if seed is not None else None
     def make_thunk(rank):
@@ -41,22 +48,31 @@ def make_vec_env(env_id, env_type, num_env, seed,
             reward_scale=reward_scale,
             gamestate=gamestate,
             flatten_dict_observations=flatten_dict_observations,
-            wrapper_kwargs=wrapper_kwargs
+            wrapper_kwargs=wrapper_kwargs,
+            monitor=not vec_monitor,
+            log_dir=log_dir
         )
 
     set_global_seeds(seed)
     if num_env > 1:
         if isMultiAgent:
-            return SubprocVecMAEnv([make_thunk(i + start_index) for i in range(num_env)])
-        return SubprocVecEnv([make_thunk(i + start_index) for i in range(num_env)])
+            venv = SubprocVecMAEnv([make_thunk(i + start_index) for i in range(num_env)])
+        else:
+            venv = SubprocVecEnv([make_thunk(i + start_index) for i in range(num_env)])
     else:
         if isMultiAgent:
-            return DummyVecMAEnv([make_thunk(start_index)])
-        return DummyVecEnv([make_thunk(start_index)])
+            venv = DummyVecMAEnv([make_thunk(start_index)])
+        else:
+            venv = DummyVecEnv([make_thunk(start_index)])
+
+    if vec_monitor:
+        venv = VecMonitor(venv, log_dir and os.path.join(log_dir, str(mpi_rank)))
+    return venv
 
 
-def make_env(env_id, env_type, subrank=0, seed=None, reward_scale=1.0, gamestate=None, flatten_dict_observations=True, wrapper_kwargs=None):
+def make_env(env_id, env_type, subrank=0, seed=None, reward_scale=1.0, gamestate=None, flatten_dict_observations=True, wrapper_kwargs=None, monitor=True, log_dir=None):
     mpi_rank = MPI.COMM_WORLD.Get_rank() if MPI else 0
+    log_dir = log_dir or logger.get_dir()
     wrapper_kwargs = wrapper_kwargs or {}
     if env_type == 'atari':
         env = make_atari(env_id)
@@ -72,9 +88,10 @@ def make_env(env_id, env_type, subrank=0, seed=None, reward_scale=1.0, gamestate
         env = gym.wrappers.FlattenDictWrapper(env, dict_keys=list(keys))
 
     env.seed(seed + subrank if seed is not None else None)
-    env = Monitor(env,
-                  logger.get_dir() and os.path.join(logger.get_dir(), str(mpi_rank) + '.' + str(subrank)),
-                  allow_early_resets=True)
+    if monitor:
+        env = Monitor(env,
+                      log_dir and os.path.join(log_dir, str(mpi_rank) + '.' + str(subrank)),
+                      allow_early_resets=True)
 
     if env_type == 'atari':
         env = wrap_deepmind(env, **wrapper_kwargs)
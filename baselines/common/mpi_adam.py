@@ -60,6 +60,48 @@ class MpiAdam(object):
             self.comm.Bcast(thetaroot, root=0)
             assert (thetaroot == thetalocal).all(), (thetaroot, thetalocal)
 
+
+class GraphAdam(object):
+    def __init__(self, var_list, *, beta1=0.9, beta2=0.999, epsilon=1e-08, name='adam'):
+        """The update of MpiAdam as graph ops, for a single process.
+
+        update_op returns an op applying the step for a flat gradient tensor,
+        so the gradients never leave the graph and the update runs in the
+        same session call as the gradient computation. The moments are local
+        variables, so checkpoints hold the same variables as with MpiAdam.
+        """
+        self.var_list = var_list
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+        size = sum(U.numel(v) for v in var_list)
+        with tf.variable_scope(None, default_name=name):
+            self.m = tf.get_variable('m', [size], tf.float32, tf.zeros_initializer(), trainable=False,
+                                     collections=[tf.GraphKeys.LOCAL_VARIABLES])
+            self.v = tf.get_variable('v', [size], tf.float32, tf.zeros_initializer(), trainable=False,
+                                     collections=[tf.GraphKeys.LOCAL_VARIABLES])
+            self.t = tf.get_variable('t', [], tf.float64, tf.zeros_initializer(), trainable=False,
+                                     collections=[tf.GraphKeys.LOCAL_VARIABLES])
+        self.initializer = tf.variables_initializer([self.m, self.v, self.t])
+
+    def update_op(self, flatg, stepsize):
+        t = tf.assign_add(self.t, 1.)
+        a = tf.cast(stepsize * tf.sqrt(1 - self.beta2**t)/(1 - self.beta1**t), tf.float32)
+        m = tf.assign(self.m, self.beta1 * self.m + (1 - self.beta1) * flatg)
+        v = tf.assign(self.v, self.beta2 * self.v + (1 - self.beta2) * (flatg * flatg))
+        step = (- a) * m / (tf.sqrt(v) + self.epsilon)
+        updates = []
+        start = 0
+        for var in self.var_list:
+            size = U.numel(var)
+            updates.append(tf.assign_add(var, tf.reshape(step[start:start + size], U.var_shape(var))))
+            start += size
+        return tf.group(*updates)
+
+    def sync(self):
+        """Nothing to broadcast in a single process, (re)initialize the moments"""
+        tf.get_default_session().run(self.initializer)
+
 @U.in_session
 def test_MpiAdam():
     np.random.seed(0)
@@ -98,6 +140,41 @@ def test_MpiAdam():
 
     np.testing.assert_allclose(np.array(losslist_ref), np.array(losslist_test), atol=1e-4)
 
+@U.in_session
+def test_GraphAdam():
+    np.random.seed(0)
+
+    a = tf.Variable(np.random.randn(3).astype('float32'))
+    b = tf.Variable(np.random.randn(2,5).astype('float32'))
+    loss = tf.reduce_sum(tf.square(a)) + tf.reduce_sum(tf.sin(b))
+
+    stepsize = 1e-2
+    var_list = [a,b]
+    flatgrad = U.flatgrad(loss, var_list)
+    lossandgrad = U.function([], [loss, flatgrad])
+    graph_adam = GraphAdam(var_list)
+    with tf.control_dependencies([loss]):
+        update_op = graph_adam.update_op(flatgrad, stepsize)
+    do_update = U.function([], loss, updates=[update_op])
+
+    sess = tf.get_default_session()
+    sess.run(tf.global_variables_initializer())
+    graph_adam.sync()
+    losslist_ref = [do_update() for _ in range(10)]
+    theta_ref = U.GetFlat(var_list)()
+
+    sess.run(tf.global_variables_initializer())
+    adam = MpiAdam(var_list)
+    losslist_test = []
+    for i in range(10):
+        l,g = lossandgrad()
+        adam.update(g, stepsize)
+        losslist_test.append(l)
+
+    np.testing.assert_allclose(np.array(losslist_ref), np.array(losslist_test), atol=1e-5)
+    np.testing.assert_allclose(theta_ref, adam.getflat(), atol=1e-5)
+
 
 if __name__ == '__main__':
     test_MpiAdam()
+    test_GraphAdam()
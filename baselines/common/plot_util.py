@@ -149,7 +149,115 @@ def symmetric_ema(xolds, yolds, low=None, high=None, n=512, decay_steps=1., low_
 Result = namedtuple('Result', 'monitor progress dirname metadata')
 Result.__new__.__defaults__ = (None,) * len(Result._fields)
 
-def load_results(root_dir_or_dirs, enable_progress=True, enable_monitor=True, verbose=False):
+RESULTS_CACHE = '.results_cache.npz'
+
+def _data_files(dirname, files):
+    '''
+    (name, size, mtime) of the files a result is loaded from, which is the key of the cached result
+    '''
+    names = sorted(f for f in files if f in ('metadata.json', 'progress.json', 'progress.csv') or
+                   f.endswith('monitor.csv') or f.endswith('monitor.json'))
+    signature = []
+    for f in names:
+        st = os.stat(osp.join(dirname, f))
+        signature.append([f, st.st_size, st.st_mtime_ns])
+    return signature
+
+def _save_frames(path, signature, parts, result):
+    '''
+    Write the dataframes of a result column by column to a .npz file. Columns of python objects
+    (strings logged with logkv) are kept in the json header with the rest of the result.
+    '''
+    header = {'signature': signature, 'parts': parts, 'metadata': result.get('metadata'), 'frames': {}}
+    arrays = {}
+    for part in ('monitor', 'progress'):
+        df = result.get(part)
+        if df is None:
+            continue
+        columns = []
+        for i, col in enumerate(df.columns):
+            values = df[col].values
+            if values.dtype.kind in 'biuf':
+                arrays['%s/%i' % (part, i)] = values
+                columns.append([col, None])
+            else:
+                columns.append([col, [None if pandas.isnull(v) else str(v) for v in values]])
+        header['frames'][part] = columns
+    arrays['header'] = np.array(json.dumps(header))
+    tmp = path + '.%i.tmp' % os.getpid()
+    with open(tmp, 'wb') as fh:
+        np.savez(fh, **arrays)
+    os.replace(tmp, path)
+
+def _load_frames(path, signature, parts):
+    '''
+    Result cached in path, or None if the data files changed since or parts were not loaded
+    '''
+    with np.load(path) as data:
+        header = json.loads(str(data['header']))
+        if header['signature'] != signature or not set(parts).issubset(header['parts']):
+            return None
+        result = {}
+        if header['metadata'] is not None:
+            result['metadata'] = header['metadata']
+        for part, columns in header['frames'].items():
+            if part in parts:
+                result[part] = pandas.DataFrame({col: data['%s/%i' % (part, i)] if values is None else np.array(values, dtype=object)
+                                                 for i, (col, values) in enumerate(columns)},
+                                                columns=[col for col, _ in columns])
+    return result
+
+def _load_run(dirname, files, enable_progress, enable_monitor, verbose, use_cache):
+    result = None
+    parts = [part for part, enabled in (('progress', enable_progress), ('monitor', enable_monitor)) if enabled]
+    cache_path = osp.join(dirname, RESULTS_CACHE)
+    signature = _data_files(dirname, files)
+    if use_cache and RESULTS_CACHE in files:
+        try:
+            result = _load_frames(cache_path, signature, parts)
+        except Exception as e:
+            print('exception loading results cache in %s: %s'%(dirname, e))
+    cached = result is not None
+
+    if not cached:
+        result = {}
+        if "metadata.json" in files:
+            with open(osp.join(dirname, "metadata.json"), "r") as fh:
+                result['metadata'] = json.load(fh)
+        progjson = osp.join(dirname, "progress.json")
+        progcsv = osp.join(dirname, "progress.csv")
+        if enable_progress:
+            if osp.exists(progjson):
+                result['progress'] = pandas.DataFrame(read_json(progjson))
+            elif osp.exists(progcsv):
+                try:
+                    result['progress'] = read_csv(progcsv)
+                except pandas.errors.EmptyDataError:
+                    print('skipping progress file in ', dirname, 'empty data')
+            else:
+                if verbose: print('skipping %s: no progress file'%dirname)
+
+        if enable_monitor:
+            try:
+                result['monitor'] = pandas.DataFrame(monitor.load_results(dirname))
+            except monitor.LoadMonitorResultsError:
+                print('skipping %s: no monitor files'%dirname)
+            except Exception as e:
+                print('exception loading monitor file in %s: %s'%(dirname, e))
+
+        if use_cache:
+            try:
+                _save_frames(cache_path, signature, parts, result)
+            except OSError as e:
+                if verbose: print('could not write results cache in %s: %s'%(dirname, e))
+
+    if result.get('monitor') is not None or result.get('progress') is not None:
+        if verbose:
+            print('successfully loaded %s%s'%(dirname, ' (cached)' if cached else ''))
+        return Result(dirname=dirname, **result)
+    return None
+
+def load_results(root_dir_or_dirs, enable_progress=True, enable_monitor=True, verbose=False, use_cache=True, n_jobs=8):
     '''
     load summaries of runs from a list of directories (including subdirectories)
     Arguments:
@@ -160,6 +268,12 @@ def load_results(root_dir_or_dirs, enable_progress=True, enable_monitor=True, ve
 
     verbose: bool - if True, will print out list of directories from which the data is loaded. Default: False
 
+    use_cache: bool - if True, the loaded dataframes of every run directory are saved to a .results_cache.npz file in it, which
+                      is used instead of the csv and json files for as long as their sizes and modification times do not change.
+                      Default: True
+
+    n_jobs: int - number of run directories loaded in parallel (by threads). Default: 8
+
 
     Returns:
     List of Result objects with the following fields:
@@ -169,11 +283,12 @@ def load_results(root_dir_or_dirs, enable_progress=True, enable_monitor=True, ve
          - progress - if enable_progress is True, this field contains pandas dataframe with loaded progress.csv file
     '''
     import re
+    from concurrent.futures import ThreadPoolExecutor
     if isinstance(root_dir_or_dirs, str):
         rootdirs = [osp.expanduser(root_dir_or_dirs)]
     else:
         rootdirs = [osp.expanduser(d) for d in root_dir_or_dirs]
-    allresults = []
+    rundirs = []
     for rootdir in rootdirs:
         assert osp.exists(rootdir), "%s doesn't exist"%rootdir
         for dirname, dirs, files in os.walk(rootdir):
@@ -186,35 +301,12 @@ def load_results(root_dir_or_dirs, enable_progress=True, enable_monitor=True, ve
                 # used to be uncommented, which means do not go deeper than current directory if any of the data files
                 # are found
                 # dirs[:] = []
-                result = {'dirname' : dirname}
-                if "metadata.json" in files:
-                    with open(osp.join(dirname, "metadata.json"), "r") as fh:
-                        result['metadata'] = json.load(fh)
-                progjson = osp.join(dirname, "progress.json")
-                progcsv = osp.join(dirname, "progress.csv")
-                if enable_progress:
-                    if osp.exists(progjson):
-                        result['progress'] = pandas.DataFrame(read_json(progjson))
-                    elif osp.exists(progcsv):
-                        try:
-                            result['progress'] = read_csv(progcsv)
-                        except pandas.errors.EmptyDataError:
-                            print('skipping progress file in ', dirname, 'empty data')
-                    else:
-                        if verbose: print('skipping %s: no progress file'%dirname)
-
-                if enable_monitor:
-                    try:
-                        result['monitor'] = pandas.DataFrame(monitor.load_results(dirname))
-                    except monitor.LoadMonitorResultsError:
-                        print('skipping %s: no monitor files'%dirname)
-                    except Exception as e:
-                        print('exception loading monitor file in %s: %s'%(dirname, e))
-
-                if result.get('monitor') is not None or result.get('progress') is not None:
-                    allresults.append(Result(**result))
-                    if verbose:
-                        print('successfully loaded %s'%dirname)
+                rundirs.append((dirname, files))
+
+    with ThreadPoolExecutor(max_workers=max(n_jobs, 1)) as executor:
+        allresults = list(executor.map(
+            lambda run: _load_run(run[0], run[1], enable_progress, enable_monitor, verbose, use_cache), rundirs))
+    allresults = [result for result in allresults if result is not None]
 
     if verbose: print('loaded %i results'%len(allresults))
     return allresults
@@ -253,6 +345,8 @@ def plot_results(
     '''
     Plot multiple Results objects
 
+    allresults: list of Result objects, or directories which are loaded with load_results (and its cache)
+
     xy_fn: function Result -> x,y           - function that converts results objects into tuple of x and y values.
                                               By default, x is cumsum of episode lengths, and y is episode rewards
 
@@ -292,6 +386,8 @@ def plot_results(
 
     '''
 
+    if isinstance(allresults, str) or all(isinstance(r, str) for r in allresults):
+        allresults = load_results(allresults)
     if split_fn is None: split_fn = lambda _ : ''
     if group_fn is None: group_fn = lambda _ : ''
     sk2r = defaultdict(list) # splitkey2results
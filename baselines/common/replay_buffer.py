@@ -0,0 +1,358 @@
+import numpy as np
+
+from baselines.common.segment_tree import SumSegmentTree, MinSegmentTree
+
+
+class ReplayBuffer(object):
+    def __init__(self, size):
+        """Create Replay buffer.
+
+        Transitions are stored column-wise in preallocated numpy arrays
+        (one array per field) that are created on the first call to `add`,
+        using the shape and dtype of the first transition. A column is
+        promoted (np.result_type) when a later transition does not fit its
+        dtype, e.g. float observations after an integer first one.
+
+        Parameters
+        ----------
+        size: int
+            Max number of transitions to store in the buffer. When the buffer
+            overflows the old memories are dropped.
+        """
+        self._storage = None
+        self._maxsize = int(size)
+        self._next_idx = 0
+        self._num_stored = 0
+
+    def __len__(self):
+        return self._num_stored
+
+    def clear(self):
+        self._next_idx = 0
+        self._num_stored = 0
+
+    def _allocate(self, obs_t, action, reward, obs_tp1, done):
+        def column(x, dtype=None):
+            x = np.asarray(x)
+            return np.zeros((self._maxsize,) + x.shape, dtype=dtype or x.dtype)
+
+        # rewards and done flags are always stored as floats so that an integer
+        # first transition does not truncate the ones that follow
+        self._storage = (column(obs_t), column(action), column(reward, np.float32),
+                         column(obs_tp1), column(done, np.float32))
+
+    def _promote(self, data):
+        """Widen the columns that cannot hold the kind (bool, int, float) of the values of data"""
+        if all(np.can_cast(values.dtype, column.dtype, casting='same_kind')
+               for column, values in zip(self._storage, data)):
+            return
+        self._storage = tuple(column if np.can_cast(values.dtype, column.dtype, casting='same_kind')
+                              else column.astype(np.result_type(column, values))
+                              for column, values in zip(self._storage, data))
+
+    def add(self, obs_t, action, reward, obs_tp1, done):
+        if self._storage is None:
+            self._allocate(obs_t, action, reward, obs_tp1, done)
+        self._promote([np.asarray(x) for x in (obs_t, action, reward, obs_tp1, done)])
+
+        obses_t, actions, rewards, obses_tp1, dones = self._storage
+        idx = self._next_idx
+        obses_t[idx] = obs_t
+        actions[idx] = action
+        rewards[idx] = reward
+        obses_tp1[idx] = obs_tp1
+        dones[idx] = done
+        self._next_idx = (self._next_idx + 1) % self._maxsize
+        self._num_stored = min(self._num_stored + 1, self._maxsize)
+
+    def add_batch(self, obs_t, action, reward, obs_tp1, done):
+        """Add a batch of transitions at once.
+
+        Each argument holds one entry per transition along its first axis.
+        If the batch is larger than the buffer only the last `size`
+        transitions are kept.
+
+        Returns
+        -------
+        idxes: np.array
+            indexes in buffer where the transitions were written
+        """
+        data = [np.asarray(x) for x in (obs_t, action, reward, obs_tp1, done)]
+        batch_size = len(data[0])
+        assert all(len(x) == batch_size for x in data), "all fields must have the same batch size"
+        if batch_size > self._maxsize:
+            data = [x[-self._maxsize:] for x in data]
+            self._next_idx = (self._next_idx + batch_size - self._maxsize) % self._maxsize
+            batch_size = self._maxsize
+        if self._storage is None:
+            self._allocate(*[x[0] for x in data])
+        self._promote(data)
+
+        idxes = (self._next_idx + np.arange(batch_size)) % self._maxsize
+        for column, values in zip(self._storage, data):
+            column[idxes] = values
+        self._next_idx = (self._next_idx + batch_size) % self._maxsize
+        self._num_stored = min(self._num_stored + batch_size, self._maxsize)
+        return idxes
+
+    def _encode_sample(self, idxes):
+        idxes = np.asarray(idxes, dtype=np.int64)
+        return tuple(column[idxes] for column in self._storage)
+
+    def make_index(self, batch_size):
+        return np.random.randint(0, len(self), size=batch_size)
+
+    def make_latest_index(self, batch_size):
+        idx = (self._next_idx - 1 - np.arange(batch_size)) % self._maxsize
+        np.random.shuffle(idx)
+        return idx
+
+    def sample_index(self, idxes):
+        return self._encode_sample(idxes)
+
+    def sample(self, batch_size):
+        """Sample a batch of experiences.
+
+        Parameters
+        ----------
+        batch_size: int
+            How many transitions to sample. If not positive, all the stored
+            transitions are returned.
+
+        Returns
+        -------
+        obs_batch: np.array
+            batch of observations
+        act_batch: np.array
+            batch of actions executed given obs_batch
+        rew_batch: np.array
+            rewards received as results of executing act_batch
+        next_obs_batch: np.array
+            next set of observations seen after executing act_batch
+        done_mask: np.array
+            done_mask[i] = 1 if executing act_batch[i] resulted in
+            the end of an episode and 0 otherwise.
+        """
+        if batch_size > 0:
+            idxes = self.make_index(batch_size)
+        else:
+            idxes = np.arange(len(self))
+        return self._encode_sample(idxes)
+
+    def collect(self):
+        return self.sample(-1)
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    def __init__(self, size, alpha):
+        """Create Prioritized Replay buffer.
+
+        Parameters
+        ----------
+        size: int
+            Max number of transitions to store in the buffer. When the buffer
+            overflows the old memories are dropped.
+        alpha: float
+            how much prioritization is used
+            (0 - no prioritization, 1 - full prioritization)
+
+        See Also
+        --------
+        ReplayBuffer.__init__
+        """
+        super(PrioritizedReplayBuffer, self).__init__(size)
+        assert alpha >= 0
+        self._alpha = alpha
+
+        it_capacity = 1
+        while it_capacity < size:
+            it_capacity *= 2
+
+        self._it_sum = SumSegmentTree(it_capacity)
+        self._it_min = MinSegmentTree(it_capacity)
+        self._max_priority = 1.0
+
+    def add(self, *args, **kwargs):
+        """See ReplayBuffer.store_effect"""
+        idx = self._next_idx
+        super().add(*args, **kwargs)
+        self._it_sum[idx] = self._max_priority ** self._alpha
+        self._it_min[idx] = self._max_priority ** self._alpha
+
+    def add_batch(self, *args, **kwargs):
+        """See ReplayBuffer.add_batch"""
+        idxes = super().add_batch(*args, **kwargs)
+        self._it_sum.update(idxes, self._max_priority ** self._alpha)
+        self._it_min.update(idxes, self._max_priority ** self._alpha)
+        return idxes
+
+    def _sample_proportional(self, batch_size):
+        # one stratified mass per range, all searched in a single tree descent
+        p_total = self._it_sum.sum(0, len(self))
+        every_range_len = p_total / batch_size
+        masses = (np.random.random(batch_size) + np.arange(batch_size)) * every_range_len
+        idxes = self._it_sum.find_prefixsum_idx(np.minimum(masses, p_total))
+        # guard against rounding pushing a mass past the last stored transition
+        return np.minimum(idxes, len(self) - 1)
+
+    def sample(self, batch_size, beta):
+        """Sample a batch of experiences.
+
+        compared to ReplayBuffer.sample
+        it also returns importance weights and idxes
+        of sampled experiences.
+
+
+        Parameters
+        ----------
+        batch_size: int
+            How many transitions to sample.
+        beta: float
+            To what degree to use importance weights
+            (0 - no corrections, 1 - full correction)
+
+        Returns
+        -------
+        obs_batch: np.array
+            batch of observations
+        act_batch: np.array
+            batch of actions executed given obs_batch
+        rew_batch: np.array
+            rewards received as results of executing act_batch
+        next_obs_batch: np.array
+            next set of observations seen after executing act_batch
+        done_mask: np.array
+            done_mask[i] = 1 if executing act_batch[i] resulted in
+            the end of an episode and 0 otherwise.
+        weights: np.array
+            Array of shape (batch_size,) and dtype np.float32
+            denoting importance weight of each sampled transition
+        idxes: np.array
+            Array of shape (batch_size,) and dtype np.int32
+            idexes in buffer of sampled experiences
+        """
+        assert beta > 0
+
+        idxes = self._sample_proportional(batch_size)
+
+        p_total = self._it_sum.sum()
+        p_min = self._it_min.min() / p_total
+        max_weight = (p_min * len(self)) ** (-beta)
+
+        p_sample = self._it_sum[idxes] / p_total
+        weights = (p_sample * len(self)) ** (-beta) / max_weight
+        encoded_sample = self._encode_sample(idxes)
+        return tuple(list(encoded_sample) + [weights, idxes])
+
+    def update_priorities(self, idxes, priorities):
+        """Update priorities of sampled transitions.
+
+        sets priority of transition at index idxes[i] in buffer
+        to priorities[i].
+
+        Parameters
+        ----------
+        idxes: [int] or np.array
+            List of idxes of sampled transitions
+        priorities: [float] or np.array
+            List of updated priorities corresponding to
+            transitions at the sampled idxes denoted by
+            variable `idxes`.
+        """
+        idxes = np.asarray(idxes, dtype=np.int64)
+        priorities = np.asarray(priorities, dtype=np.float64)
+        assert len(idxes) == len(priorities)
+        if len(idxes) == 0:
+            return
+        assert np.all(priorities > 0)
+        assert np.all((0 <= idxes) & (idxes < len(self)))
+        self._it_sum.update(idxes, priorities ** self._alpha)
+        self._it_min.update(idxes, priorities ** self._alpha)
+
+        self._max_priority = max(self._max_priority, priorities.max())
+
+
+class NStepTransitions(object):
+    def __init__(self, nenv, n_step, gamma):
+        """Turn the steps of a vectorized env into n-step transitions.
+
+        The last `n_step` steps of every env are kept in arrays of shape
+        (n_step, nenv, ...). A step becomes a transition once `n_step` steps
+        followed it, with the discounted sum of their rewards and the
+        observation `n_step` steps later, or when its episode ends, in which
+        case the transition is terminal and has fewer rewards.
+
+        Parameters
+        ----------
+        nenv: int
+            number of envs of the vectorized env
+        n_step: int
+            number of rewards summed in a transition
+        gamma: float
+            discount factor
+        """
+        self.nenv = nenv
+        self.n_step = n_step
+        self.gamma = gamma
+        self.obs = None
+        self.actions = None
+        self.rewards = np.zeros((n_step, nenv), dtype=np.float32)
+        # number of steps of each env waiting for their transition
+        self.count = np.zeros(nenv, dtype=np.int64)
+        self.t = 0
+
+    def append(self, obs, actions, rewards, new_obs, dones):
+        """Add one step of all envs.
+
+        Returns
+        -------
+        transitions: tuple
+            (obs_t, action, n-step return, obs_tpn, done) batches of the
+            transitions completed by this step, possibly empty
+        """
+        n = self.n_step
+        obs = np.asarray(obs)
+        actions = np.asarray(actions)
+        new_obs = np.asarray(new_obs)
+        dones = np.asarray(dones, dtype=bool)
+        if self.obs is None:
+            self.obs = np.zeros((n,) + obs.shape, dtype=obs.dtype)
+            self.actions = np.zeros((n,) + actions.shape, dtype=actions.dtype)
+
+        slot = self.t % n
+        self.obs[slot] = obs
+        self.actions[slot] = actions
+        self.rewards[slot] = rewards
+        self.count = np.minimum(self.count + 1, n)
+        transitions = []
+
+        # the oldest step of a full window bootstraps from new_obs
+        full = (self.count == n) & ~dones
+        if full.any():
+            oldest = (self.t + 1) % n
+            returns = np.zeros(full.sum(), dtype=np.float32)
+            for k in reversed(range(n)):
+                returns = self.rewards[(oldest + k) % n, full] + self.gamma * returns
+            transitions.append((self.obs[oldest, full], self.actions[oldest, full], returns,
+                                new_obs[full], np.zeros(len(returns), dtype=np.float32)))
+            self.count[full] -= 1
+
+        # an episode that ended flushes all its pending steps, without bootstrap
+        if dones.any():
+            count = self.count[dones]
+            returns = np.zeros(len(count), dtype=np.float32)
+            for k in range(n):
+                slot = (self.t - k) % n
+                returns = self.rewards[slot, dones] + self.gamma * returns
+                valid = k < count
+                if not valid.any():
+                    break
+                transitions.append((self.obs[slot, dones][valid], self.actions[slot, dones][valid], returns[valid],
+                                    new_obs[dones][valid], np.ones(valid.sum(), dtype=np.float32)))
+            self.count[dones] = 0
+
+        self.t += 1
+        if not transitions:
+            return tuple(np.zeros((0,) + x.shape[2:], dtype=x.dtype)
+                         for x in (self.obs, self.actions, self.rewards, self.obs, self.rewards))
+        return tuple(np.concatenate(column) for column in zip(*transitions))
@@ -1,4 +1,4 @@
-import operator
+import numpy as np
 
 
 class SegmentTree(object):
@@ -16,12 +16,16 @@ class SegmentTree(object):
                `reduce` operation which reduces `operation` over
                a contiguous subsequence of items in the array.
 
+        Nodes are stored in a flat numpy array (node i has children 2i and
+        2i + 1, leaves start at `capacity`), so a batch of items can be
+        updated with one vectorized pass per tree level.
+
         Paramters
         ---------
         capacity: int
             Total size of the array - must be a power of two.
-        operation: lambda obj, obj -> obj
-            and operation for combining elements (eg. sum, max)
+        operation: np.ufunc
+            and operation for combining elements (eg. np.add, np.minimum)
             must form a mathematical group together with the set of
             possible values for array elements (i.e. be associative)
         neutral_element: obj
@@ -30,23 +34,9 @@ class SegmentTree(object):
         """
         assert capacity > 0 and capacity & (capacity - 1) == 0, "capacity must be positive and a power of 2."
         self._capacity = capacity
-        self._value = [neutral_element for _ in range(2 * capacity)]
+        self._value = np.full(2 * capacity, neutral_element, dtype=np.float64)
         self._operation = operation
-
-    def _reduce_helper(self, start, end, node, node_start, node_end):
-        if start == node_start and end == node_end:
-            return self._value[node]
-        mid = (node_start + node_end) // 2
-        if end <= mid:
-            return self._reduce_helper(start, end, 2 * node, node_start, mid)
-        else:
-            if mid + 1 <= start:
-                return self._reduce_helper(start, end, 2 * node + 1, mid + 1, node_end)
-            else:
-                return self._operation(
-                    self._reduce_helper(start, mid, 2 * node, node_start, mid),
-                    self._reduce_helper(mid + 1, end, 2 * node + 1, mid + 1, node_end)
-                )
+        self._neutral_element = neutral_element
 
     def reduce(self, start=0, end=None):
         """Returns result of applying `self.operation`
@@ -70,23 +60,59 @@ class SegmentTree(object):
             end = self._capacity
         if end < 0:
             end += self._capacity
-        end -= 1
-        return self._reduce_helper(start, end, 1, 0, self._capacity - 1)
+        # walk up from both ends of [start, end) towards the root
+        result = self._neutral_element
+        start += self._capacity
+        end += self._capacity
+        while start < end:
+            if start & 1:
+                result = self._operation(result, self._value[start])
+                start += 1
+            if end & 1:
+                end -= 1
+                result = self._operation(result, self._value[end])
+            start //= 2
+            end //= 2
+        return result
+
+    def update(self, idxs, vals):
+        """Set arr[idxs[i]] = vals[i] for a batch of items.
+
+        Parents of the updated leaves are recomputed one tree level at a
+        time. If an index appears more than once the last value wins.
 
-    def __setitem__(self, idx, val):
-        # index of the leaf
-        idx += self._capacity
-        self._value[idx] = val
-        idx //= 2
-        while idx >= 1:
-            self._value[idx] = self._operation(
-                self._value[2 * idx],
-                self._value[2 * idx + 1]
+        Parameters
+        ----------
+        idxs: [int] or np.array
+            indexes of the items to set
+        vals: [float], np.array or float
+            new values, broadcast against `idxs`
+        """
+        idxs = np.asarray(idxs, dtype=np.int64).ravel()
+        if idxs.size == 0:
+            return
+        vals = np.broadcast_to(np.asarray(vals, dtype=np.float64), idxs.shape)
+        assert np.all((0 <= idxs) & (idxs < self._capacity))
+        # keep the last value written to every index
+        idxs, last = np.unique(idxs[::-1], return_index=True)
+        vals = vals[::-1][last]
+
+        nodes = idxs + self._capacity
+        self._value[nodes] = vals
+        nodes = np.unique(nodes // 2)
+        while nodes[0] >= 1:
+            self._value[nodes] = self._operation(
+                self._value[2 * nodes],
+                self._value[2 * nodes + 1]
             )
-            idx //= 2
+            nodes = np.unique(nodes // 2)
+
+    def __setitem__(self, idx, val):
+        self.update(idx, val)
 
     def __getitem__(self, idx):
-        assert 0 <= idx < self._capacity
+        idx = np.asarray(idx)
+        assert np.all((0 <= idx) & (idx < self._capacity))
         return self._value[self._capacity + idx]
 
 
@@ -94,7 +120,7 @@ class SumSegmentTree(SegmentTree):
     def __init__(self, capacity):
         super(SumSegmentTree, self).__init__(
             capacity=capacity,
-            operation=operator.add,
+            operation=np.add,
             neutral_element=0.0
         )
 
@@ -110,32 +136,39 @@ class SumSegmentTree(SegmentTree):
         allows to sample indexes according to the discrete
         probability efficiently.
 
+        All the queries of a batch descend the tree together,
+        one level per step.
+
         Parameters
         ----------
-        perfixsum: float
+        perfixsum: float or np.array
             upperbound on the sum of array prefix
 
         Returns
         -------
-        idx: int
-            highest index satisfying the prefixsum constraint
+        idx: int or np.array
+            highest index satisfying the prefixsum constraint,
+            with the same shape as `prefixsum`
         """
-        assert 0 <= prefixsum <= self.sum() + 1e-5
-        idx = 1
-        while idx < self._capacity:  # while non-leaf
-            if self._value[2 * idx] > prefixsum:
-                idx = 2 * idx
-            else:
-                prefixsum -= self._value[2 * idx]
-                idx = 2 * idx + 1
-        return idx - self._capacity
+        prefixsum = np.array(prefixsum, dtype=np.float64)
+        is_scalar = prefixsum.ndim == 0
+        prefixsum = prefixsum.reshape(-1)
+        assert np.all(0 <= prefixsum) and np.all(prefixsum <= self.sum() + 1e-5)
+        idx = np.ones(prefixsum.shape, dtype=np.int64)
+        while idx[0] < self._capacity:  # while non-leaf, all leaves are at the same depth
+            left = self._value[2 * idx]
+            go_right = left <= prefixsum
+            prefixsum -= np.where(go_right, left, 0.0)
+            idx = 2 * idx + go_right
+        idx -= self._capacity
+        return int(idx[0]) if is_scalar else idx
 
 
 class MinSegmentTree(SegmentTree):
     def __init__(self, capacity):
         super(MinSegmentTree, self).__init__(
             capacity=capacity,
-            operation=min,
+            operation=np.minimum,
             neutral_element=float('inf')
         )
 
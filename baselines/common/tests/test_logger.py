@@ -0,0 +1,53 @@
+import numpy as np
+
+from baselines import logger
+
+
+def write_rows(dir, format_strs, flush_interval):
+    with logger.scoped_configure(dir=dir, format_strs=format_strs, flush_interval=flush_interval):
+        for i in range(6):
+            logger.logkv('a', i)
+            if i >= 2:
+                logger.logkv_mean('b', 0.5 * i)
+            if i >= 4:
+                logger.logkv('c', -i)
+            logger.dumpkvs()
+            logger.log('row', i)
+
+
+def test_async_output_matches_sync(tmpdir):
+    sync_dir, async_dir = str(tmpdir.join('sync')), str(tmpdir.join('async'))
+    write_rows(sync_dir, ['log', 'csv', 'json'], None)
+    write_rows(async_dir, ['log', 'csv', 'json'], 60.)
+
+    with open(sync_dir + '/log.txt') as f_sync, open(async_dir + '/log.txt') as f_async:
+        assert f_async.read().replace(async_dir, sync_dir) == f_sync.read()
+    for read, name in [(logger.read_csv, 'progress.csv'), (logger.read_json, 'progress.json')]:
+        expected = read(sync_dir + '/' + name)
+        progress = read(async_dir + '/' + name)
+        assert list(progress.columns) == ['a', 'b', 'c']
+        assert np.array_equal(progress.values, expected.values, equal_nan=True)
+
+
+def test_append_only_csv(tmpdir):
+    path = str(tmpdir.join('progress.csv'))
+    fmt = logger.CSVOutputFormat(path, append_only=True)
+    fmt.writekvs({'a': 1})
+    with open(path) as f:
+        before = f.read()
+    fmt.writekvs({'a': 2, 'b': 3})
+    fmt.close()
+    with open(path) as f:
+        # the rows already written are left untouched
+        assert f.read().startswith(before)
+    progress = logger.read_csv(path)
+    assert list(progress.columns) == ['a', 'b']
+    assert progress['a'].tolist() == [1, 2]
+    assert np.isnan(progress['b'][0]) and progress['b'][1] == 3
+
+
+def test_stdout_stays_synchronous(tmpdir):
+    with logger.scoped_configure(dir=str(tmpdir), format_strs=['stdout', 'log'], flush_interval=60.):
+        stdout, log = logger.Logger.CURRENT.output_formats
+        assert isinstance(stdout, logger.HumanOutputFormat)
+        assert isinstance(log, logger.AsyncOutputFormat)
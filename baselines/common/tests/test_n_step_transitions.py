@@ -0,0 +1,53 @@
+import numpy as np
+
+from baselines.common.replay_buffer import NStepTransitions
+
+
+def reference_transitions(obs, actions, rewards, dones, n_step, gamma):
+    # n-step transitions computed env by env, episode by episode
+    nsteps, nenv = rewards.shape
+    transitions = []
+    for e in range(nenv):
+        for s in range(nsteps):
+            ret, done = 0., 0.
+            for k in range(n_step):
+                if s + k == nsteps:
+                    break
+                ret += gamma ** k * rewards[s + k, e]
+                if dones[s + k, e]:
+                    done = 1.
+                    break
+            else:
+                # bootstrap from the observation n_step steps later
+                transitions.append((s, e, ret, s + n_step, done))
+                continue
+            if done:
+                transitions.append((s, e, ret, None, done))
+    return transitions
+
+
+def test_nstep_transitions_match_reference():
+    np.random.seed(0)
+    nsteps, nenv, gamma = 50, 4, 0.9
+    obs = np.random.randn(nsteps + 1, nenv, 3).astype(np.float32)
+    actions = np.random.randint(4, size=(nsteps, nenv))
+    rewards = np.random.randn(nsteps, nenv).astype(np.float32)
+    dones = np.random.rand(nsteps, nenv) < 0.15
+
+    for n_step in (1, 3, 5):
+        transitions = NStepTransitions(nenv, n_step, gamma)
+        got = []
+        for t in range(nsteps):
+            batch = transitions.append(obs[t], actions[t], rewards[t], obs[t + 1], dones[t])
+            assert all(len(x) == len(batch[0]) for x in batch)
+            got.extend(zip(*batch))
+        expected = reference_transitions(obs, actions, rewards, dones, n_step, gamma)
+        assert len(got) == len(expected)
+
+        got = {(tuple(o), int(a)): (r, o2, d) for o, a, r, o2, d in got}
+        for s, e, ret, tp, done in expected:
+            r, o2, d = got[(tuple(obs[s, e]), int(actions[s, e]))]
+            assert np.isclose(r, ret, atol=1e-5)
+            assert d == done
+            if tp is not None:
+                assert np.array_equal(o2, obs[tp, e])
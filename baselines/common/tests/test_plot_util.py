@@ -0,0 +1,56 @@
+import os
+import os.path as osp
+
+import numpy as np
+
+from baselines.bench.monitor import ResultsWriter
+from baselines.common import plot_util
+
+
+def write_run(dirname, nepisodes, extra_key=False):
+    os.makedirs(dirname, exist_ok=True)
+    writer = ResultsWriter(osp.join(dirname, '0'), header={'t_start': 0.})
+    writer.write_rows([{'r': float(i), 'l': 10, 't': 0.1 * i} for i in range(nepisodes)])
+    writer.close()
+    with open(osp.join(dirname, 'progress.csv'), 'wt') as fh:
+        fh.write('steps,name\n' if extra_key else 'steps\n')
+        for i in range(nepisodes):
+            fh.write('%i,run%i\n' % (i, i) if extra_key else '%i\n' % i)
+
+
+def assert_results_equal(results, expected):
+    assert [r.dirname for r in results] == [r.dirname for r in expected]
+    for r, e in zip(results, expected):
+        for part in ('monitor', 'progress'):
+            if getattr(e, part) is None:
+                assert getattr(r, part) is None
+                continue
+            assert list(getattr(r, part).columns) == list(getattr(e, part).columns)
+            assert getattr(r, part).equals(getattr(e, part))
+
+
+def test_load_results_cache(tmpdir):
+    root = str(tmpdir)
+    for i in range(4):
+        write_run(osp.join(root, 'run-%i' % i), 5 + i, extra_key=i == 0)
+
+    expected = plot_util.load_results(root, use_cache=False)
+    assert not any(osp.exists(osp.join(r.dirname, plot_util.RESULTS_CACHE)) for r in expected)
+    results = plot_util.load_results(root)
+    assert_results_equal(results, expected)
+    assert all(osp.exists(osp.join(r.dirname, plot_util.RESULTS_CACHE)) for r in results)
+    assert_results_equal(plot_util.load_results(root), expected)
+
+    # a changed run is parsed again, the others come from the cache
+    write_run(osp.join(root, 'run-1'), 20)
+    os.remove(osp.join(root, 'run-2', 'progress.csv'))
+    write_run(osp.join(root, 'run-4'), 3)
+    cache_mtime = os.stat(osp.join(root, 'run-3', plot_util.RESULTS_CACHE)).st_mtime_ns
+    results = plot_util.load_results(root)
+    assert_results_equal(results, plot_util.load_results(root, use_cache=False))
+    results = {osp.basename(r.dirname): r for r in results}
+    assert len(results) == 5
+    assert len(results['run-1'].monitor) == 20
+    assert results['run-2'].progress is None
+    assert os.stat(osp.join(root, 'run-3', plot_util.RESULTS_CACHE)).st_mtime_ns == cache_mtime
+    assert np.array_equal(results['run-0'].progress['name'].values, ['run%i' % i for i in range(5)])
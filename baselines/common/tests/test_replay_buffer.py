@@ -0,0 +1,42 @@
+import numpy as np
+
+from baselines.common.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+
+
+def test_add_sample_wraparound():
+    buffer = ReplayBuffer(3)
+    for i in range(5):
+        buffer.add(np.full(2, i, dtype=np.float32), i % 2, float(i), np.full(2, i + 1, dtype=np.float32), i == 4)
+    assert len(buffer) == 3
+
+    obs, act, rew, obs_tp1, done = buffer.collect()
+    # transitions 3 and 4 overwrote 0 and 1
+    assert sorted(rew) == [2.0, 3.0, 4.0]
+    assert np.array_equal(obs[:, 0], rew) and np.array_equal(obs_tp1[:, 0], rew + 1)
+    assert np.array_equal(act, rew.astype(int) % 2) and np.array_equal(done, rew == 4.0)
+    assert rew.dtype == np.float32 and done.dtype == np.float32
+
+    idxes = buffer.add_batch(np.zeros((2, 2)), [0, 1], [5.0, 6.0], np.ones((2, 2)), [False, True])
+    assert list(idxes) == [2, 0]
+    assert len(buffer) == 3 and sorted(buffer.collect()[2]) == [4.0, 5.0, 6.0]
+
+
+def test_dtypes_are_promoted():
+    buffer = ReplayBuffer(4)
+    buffer.add(np.array([1, 2]), 0, 1, np.array([2, 3]), False)
+    buffer.add(np.array([0.5, 1.5]), 0.25, 0.5, np.array([1.5, 2.5]), True)
+    obs, act, rew, obs_tp1, done = buffer.collect()
+    assert np.array_equal(obs, [[1.0, 2.0], [0.5, 1.5]])
+    assert np.array_equal(act, [0.0, 0.25])
+    assert np.array_equal(obs_tp1[1], [1.5, 2.5])
+    # values of the same kind keep the column dtype
+    assert rew.dtype == np.float32 and done.dtype == np.float32
+
+
+def test_prioritized_sampling_follows_priorities():
+    np.random.seed(0)
+    buffer = PrioritizedReplayBuffer(4, alpha=1.0)
+    buffer.add_batch(np.arange(4)[:, None], np.zeros(4), np.arange(4.0), np.arange(4)[:, None], np.zeros(4))
+    buffer.update_priorities([0, 1, 2, 3], [1e-6, 1e-6, 1e-6, 1.0])
+    *_, weights, idxes = buffer.sample(16, beta=0.5)
+    assert np.all(idxes == 3) and np.allclose(weights, weights[0])
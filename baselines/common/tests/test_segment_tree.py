@@ -95,9 +95,62 @@ def test_max_interval_tree():
     assert np.isclose(tree.min(3, 4), 3.0)
 
 
+def test_batched_update():
+    tree = SumSegmentTree(8)
+    tree_min = MinSegmentTree(8)
+
+    tree.update([1, 3, 6], [2.0, 0.5, 1.5])
+    tree_min.update(np.array([1, 3, 6]), np.array([2.0, 0.5, 1.5]))
+
+    assert np.isclose(tree.sum(), 4.0)
+    assert np.isclose(tree.sum(2, 7), 2.0)
+    assert np.allclose(tree[[1, 3, 6]], [2.0, 0.5, 1.5])
+    assert np.isclose(tree_min.min(), 0.5)
+    assert np.isclose(tree_min.min(4, 8), 1.5)
+
+    # repeated indexes keep the last value, scalars are broadcast
+    tree.update([3, 3], [1.0, 3.0])
+    assert np.isclose(tree[3], 3.0)
+    assert np.isclose(tree.sum(), 6.5)
+    tree.update([0, 2], 0.25)
+    assert np.isclose(tree.sum(), 7.0)
+
+
+def test_batched_update_matches_setitem():
+    np.random.seed(0)
+    tree = SumSegmentTree(64)
+    ref = SumSegmentTree(64)
+    for _ in range(10):
+        idxs = np.random.randint(0, 50, size=20)
+        vals = np.random.uniform(size=20)
+        tree.update(idxs, vals)
+        for idx, val in zip(idxs, vals):
+            ref[idx] = val
+        assert np.allclose(tree._value, ref._value)
+
+
+def test_batched_prefixsum_idx():
+    tree = SumSegmentTree(4)
+
+    tree[0] = 0.5
+    tree[1] = 1.0
+    tree[2] = 1.0
+    tree[3] = 3.0
+
+    masses = np.array([0.0, 0.5, 0.99, 1.01, 3.00, 5.50])
+    idxs = tree.find_prefixsum_idx(masses)
+    assert idxs.shape == masses.shape
+    assert list(idxs) == [tree.find_prefixsum_idx(m) for m in masses]
+    assert list(idxs) == [0, 1, 1, 1, 3, 3]
+    assert isinstance(tree.find_prefixsum_idx(0.7), int)
+
+
 if __name__ == '__main__':
     test_tree_set()
     test_tree_set_overlap()
     test_prefixsum_idx()
     test_prefixsum_idx2()
     test_max_interval_tree()
+    test_batched_update()
+    test_batched_update_matches_setitem()
+    test_batched_prefixsum_idx()
@@ -0,0 +1,59 @@
+"""
+Tests for the vectorized monitor.
+"""
+
+import numpy as np
+from gym import spaces
+
+from . import VecEnv
+from .vec_monitor import VecMonitor
+from baselines.bench.monitor import load_results
+
+
+class EpisodeLengthEnv(VecEnv):
+    """
+    Env i ends its episodes every i + 2 steps with a reward of 1 per step,
+    optionally for two agents.
+    """
+    def __init__(self, num_envs, num_agents=None):
+        VecEnv.__init__(self, num_envs, spaces.Box(low=0., high=1., shape=(1,), dtype=np.float32), spaces.Discrete(2))
+        self.num_agents = num_agents
+        self.t = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self):
+        self.t[:] = 0
+        return np.zeros((self.num_envs, 1), dtype=np.float32)
+
+    def step_async(self, actions):
+        pass
+
+    def step_wait(self):
+        self.t += 1
+        dones = self.t % (np.arange(self.num_envs) + 2) == 0
+        rews = np.ones(self.num_envs)
+        if self.num_agents:
+            dones = np.stack([dones] + [np.zeros_like(dones)] * (self.num_agents - 1), axis=1)
+            rews = np.ones((self.num_envs, self.num_agents))
+        return np.zeros((self.num_envs, 1), dtype=np.float32), rews, dones, [{'id': i} for i in range(self.num_envs)]
+
+
+def test_vec_monitor(tmpdir):
+    for num_agents in (None, 2):
+        dir = tmpdir.mkdir('agents%s' % num_agents)
+        venv = VecMonitor(EpisodeLengthEnv(3, num_agents), str(dir.join('0')), info_keywords=('id',),
+                          flush_interval=1e3)
+        venv.reset()
+        episodes = []
+        for _ in range(12):
+            _, _, _, infos = venv.step(np.zeros(3))
+            episodes.extend(info['episode'] for info in infos if 'episode' in info)
+        # nothing written before the flush interval
+        assert len(load_results(str(dir))) == 0
+        venv.close()
+
+        results = load_results(str(dir))
+        assert len(results) == len(episodes) == 6 + 4 + 3
+        for i in range(3):
+            episode = results[results['id'] == i]
+            assert (episode['l'] == i + 2).all()
+            assert (episode['r'] == (i + 2) * (num_agents or 1)).all()
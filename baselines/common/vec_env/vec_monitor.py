@@ -5,33 +5,60 @@ import time
 
 
 class VecMonitor(VecEnvWrapper):
-    def __init__(self, venv, filename=None):
+    def __init__(self, venv, filename=None, info_keywords=(), flush_interval=10.):
+        """
+        Monitor of all the envs of venv, in place of a Monitor around every env.
+
+        Episode returns and lengths are kept in arrays of size num_envs, and
+        the finished episodes are written to one monitor file (readable by
+        baselines.bench.monitor.load_results) in batches, every
+        flush_interval seconds and on close. Like Monitor, the info of an env
+        gets an 'episode' entry at the end of its episode. With multi-agent
+        envs the rewards of all agents are summed, and an episode ends when
+        any agent is done.
+        """
         VecEnvWrapper.__init__(self, venv)
         self.eprets = None
         self.eplens = None
         self.tstart = time.time()
-        self.results_writer = ResultsWriter(filename, header={'t_start': self.tstart})
+        self.results_writer = ResultsWriter(filename, header={'t_start': self.tstart}, extra_keys=info_keywords)
+        self.info_keywords = info_keywords
+        self.flush_interval = flush_interval
+        self.last_flush = self.tstart
+        self.pending = []
 
     def reset(self):
         obs = self.venv.reset()
-        self.eprets = np.zeros(self.num_envs, 'f')
+        self.eprets = np.zeros(self.num_envs, 'd')
         self.eplens = np.zeros(self.num_envs, 'i')
         return obs
 
     def step_wait(self):
         obs, rews, dones, infos = self.venv.step_wait()
-        self.eprets += rews
+        self.eprets += np.reshape(rews, (self.num_envs, -1)).sum(axis=1)
         self.eplens += 1
-        newinfos = []
-        for (i, (done, ret, eplen, info)) in enumerate(zip(dones, self.eprets, self.eplens, infos)):
-            info = info.copy()
-            if done:
-                epinfo = {'r': ret, 'l': eplen, 't': round(time.time() - self.tstart, 6)}
-                info['episode'] = epinfo
-                self.eprets[i] = 0
-                self.eplens[i] = 0
-                self.results_writer.write_row(epinfo)
+        ended = np.flatnonzero(np.reshape(dones, (self.num_envs, -1)).any(axis=1))
+        if len(ended):
+            t = round(time.time() - self.tstart, 6)
+            for i in ended:
+                epinfo = {'r': round(float(self.eprets[i]), 6), 'l': int(self.eplens[i]), 't': t}
+                for k in self.info_keywords:
+                    epinfo[k] = infos[i][k]
+                if isinstance(infos[i], dict):
+                    infos[i]['episode'] = epinfo
+                self.pending.append(epinfo)
+            self.eprets[ended] = 0
+            self.eplens[ended] = 0
+        if self.pending and time.time() - self.last_flush >= self.flush_interval:
+            self.flush()
+        return obs, rews, dones, infos
 
-            newinfos.append(info)
+    def flush(self):
+        self.results_writer.write_rows(self.pending)
+        self.pending = []
+        self.last_flush = time.time()
 
-        return obs, rews, dones, newinfos
+    def close(self):
+        self.flush()
+        self.results_writer.close()
+        return VecEnvWrapper.close(self)
@@ -6,7 +6,7 @@ import pickle
 
 from baselines.ddpg.ddpg_learner import DDPG
 from baselines.ddpg.models import Actor, Critic
-from baselines.ddpg.memory import Memory
+from baselines.ddpg.memory import Memory, replay_path
 from baselines.ddpg.noise import AdaptiveParamNoiseSpec, NormalActionNoise, OrnsteinUhlenbeckActionNoise
 from baselines.common import set_global_seeds
 import baselines.common.tf_util as U
@@ -47,6 +47,8 @@ def learn(network, env,
           param_noise_adaption_interval=50,
           save_interval=100,
           load_path=None,
+          memmap_replay=False,
+          in_graph_optimizer=False,
           **network_kwargs):
 
     set_global_seeds(seed)
@@ -71,7 +73,14 @@ def learn(network, env,
     action_shape = env.action_space.shape if continuous_ctrl else (nb_actions, )
 
     # print(env.action_space.shape)
-    memory = Memory(limit=int(1e6), action_shape=action_shape, observation_shape=env.observation_space.shape)
+    if memmap_replay:
+        # keep the replay memory on disk next to the checkpoints; a resumed run starts from a copy of the loaded one
+        load_dir = osp.join(Config.results_dir, load_path) if load_path is not None else None
+        replay_dir = replay_path(logger.get_dir(), rank, load_dir)
+    else:
+        replay_dir = None
+    memory = Memory(limit=int(1e6), action_shape=action_shape, observation_shape=env.observation_space.shape,
+        path=replay_dir)
     critic = Critic(network=network, **network_kwargs)
     actor = Actor(nb_actions, network=network, **network_kwargs)
 
@@ -102,7 +111,7 @@ def learn(network, env,
         gamma=gamma, tau=tau, normalize_returns=normalize_returns, normalize_observations=normalize_observations,
         batch_size=batch_size, action_noise=action_noise, param_noise=param_noise, critic_l2_reg=critic_l2_reg,
         actor_lr=actor_lr, critic_lr=critic_lr, enable_popart=popart, clip_norm=clip_norm,
-        reward_scale=reward_scale)
+        reward_scale=reward_scale, in_graph_optimizer=in_graph_optimizer)
     logger.info('Using agent with the following configuration:')
     logger.info(str(agent.__dict__.items()))
 
@@ -299,5 +308,8 @@ def learn(network, env,
             savepath = osp.join(checkdir, '%.5i'%epoch)
             print('Saving to', savepath)
             agent.save(savepath)
+        if save_interval and epoch % save_interval == 0:
+            memory.flush()
 
+    memory.flush()
     return agent
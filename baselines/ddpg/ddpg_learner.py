@@ -8,7 +8,7 @@ import tensorflow.contrib as tc
 
 import baselines.common.tf_util as U
 from baselines import logger
-from baselines.common.mpi_adam import MpiAdam
+from baselines.common.mpi_adam import GraphAdam, MpiAdam
 from baselines.common.mpi_running_mean_std import RunningMeanStd
 from baselines.common.tf_util import (get_session, load_variables,
                                       save_variables)
@@ -72,7 +72,7 @@ class DDPG(object):
     def __init__(self, actor, critic, memory, observation_shape, action_shape, param_noise=None, action_noise=None,
         gamma=0.99, tau=0.001, normalize_returns=False, enable_popart=False, normalize_observations=True,
         batch_size=128, observation_range=(-5., 5.), action_range=(-1., 1.), return_range=(-np.inf, np.inf),
-        critic_l2_reg=0., actor_lr=1e-4, critic_lr=1e-3, clip_norm=None, reward_scale=1.):
+        critic_l2_reg=0., actor_lr=1e-4, critic_lr=1e-3, clip_norm=None, reward_scale=1., in_graph_optimizer=False):
         # Inputs.
         self.obs0 = tf.placeholder(tf.float32, shape=(None,) + observation_shape, name='obs0')
         self.obs1 = tf.placeholder(tf.float32, shape=(None,) + observation_shape, name='obs1')
@@ -112,6 +112,8 @@ class DDPG(object):
         self.batch_size = batch_size
         self.stats_sample = None
         self.critic_l2_reg = critic_l2_reg
+        # with a single process there is nothing to sync, apply the Adam updates in the graph
+        self.in_graph_optimizer = in_graph_optimizer and (MPI is None or MPI.COMM_WORLD.Get_size() == 1)
 
         # Observation normalization.
         if self.normalize_observations:
@@ -153,6 +155,8 @@ class DDPG(object):
             self.setup_param_noise(normalized_obs0)
         self.setup_actor_optimizer()
         self.setup_critic_optimizer()
+        if self.in_graph_optimizer:
+            self.setup_optimizer_updates()
         if self.normalize_returns and self.enable_popart:
             self.setup_popart()
         self.setup_stats()
@@ -191,7 +195,8 @@ class DDPG(object):
         logger.info('  actor shapes: {}'.format(actor_shapes))
         logger.info('  actor params: {}'.format(actor_nb_params))
         self.actor_grads = U.flatgrad(self.actor_loss, self.actor.trainable_vars, clip_norm=self.clip_norm)
-        self.actor_optimizer = MpiAdam(var_list=self.actor.trainable_vars,
+        adam = GraphAdam if self.in_graph_optimizer else MpiAdam
+        self.actor_optimizer = adam(var_list=self.actor.trainable_vars,
             beta1=0.9, beta2=0.999, epsilon=1e-08)
 
     def setup_critic_optimizer(self):
@@ -213,9 +218,16 @@ class DDPG(object):
         logger.info('  critic shapes: {}'.format(critic_shapes))
         logger.info('  critic params: {}'.format(critic_nb_params))
         self.critic_grads = U.flatgrad(self.critic_loss, self.critic.trainable_vars, clip_norm=self.clip_norm)
-        self.critic_optimizer = MpiAdam(var_list=self.critic.trainable_vars,
+        adam = GraphAdam if self.in_graph_optimizer else MpiAdam
+        self.critic_optimizer = adam(var_list=self.critic.trainable_vars,
             beta1=0.9, beta2=0.999, epsilon=1e-08)
 
+    def setup_optimizer_updates(self):
+        # update the weights only once everything fetched with the update has been computed
+        with tf.control_dependencies([self.actor_grads, self.actor_loss, self.critic_grads, self.critic_loss]):
+            self.actor_update = self.actor_optimizer.update_op(self.actor_grads, self.actor_lr)
+            self.critic_update = self.critic_optimizer.update_op(self.critic_grads, self.critic_lr)
+
     def setup_popart(self):
         # See https://arxiv.org/pdf/1602.07714.pdf for details.
         self.old_std = tf.placeholder(tf.float32, shape=[1], name='old_std')
@@ -334,13 +346,17 @@ class DDPG(object):
 
         # Get all gradients and perform a synced update.
         ops = [self.actor_grads, self.actor_loss, self.critic_grads, self.critic_loss]
+        if self.in_graph_optimizer:
+            # the updates run in the same call instead of fetching the gradients
+            ops = [self.actor_update, self.actor_loss, self.critic_update, self.critic_loss]
         actor_grads, actor_loss, critic_grads, critic_loss = self.sess.run(ops, feed_dict={
             self.obs0: batch['obs0'],
             self.actions: batch['actions'],
             self.critic_target: target_Q,
         })
-        self.actor_optimizer.update(actor_grads, stepsize=self.actor_lr)
-        self.critic_optimizer.update(critic_grads, stepsize=self.critic_lr)
+        if not self.in_graph_optimizer:
+            self.actor_optimizer.update(actor_grads, stepsize=self.actor_lr)
+            self.critic_optimizer.update(critic_grads, stepsize=self.critic_lr)
 
         return critic_loss, actor_loss
 
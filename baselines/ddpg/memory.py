@@ -1,3 +1,8 @@
+import json
+import os
+import os.path as osp
+import shutil
+
 import numpy as np
 
 
@@ -32,6 +37,76 @@ class RingBuffer(object):
         self.data[(self.start + self.length - 1) % self.maxlen] = v
 
 
+class MemmapRingBuffer(RingBuffer):
+    def __init__(self, maxlen, shape, filename, dtype='float32'):
+        """RingBuffer whose data lives in a np.memmap file.
+
+        An existing file is reopened in place (its ring position is restored
+        by the owning Memory), otherwise a new zero filled file is created.
+        Appends walk the file sequentially, which keeps writeback cheap.
+        """
+        self.maxlen = maxlen
+        self.start = 0
+        self.length = 0
+        shape = (maxlen,) + shape
+        if osp.exists(filename):
+            nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+            if osp.getsize(filename) != nbytes:
+                raise ValueError('{} does not hold a {} {} buffer'.format(filename, shape, dtype))
+            self.data = np.memmap(filename, dtype=dtype, mode='r+', shape=shape)
+        else:
+            self.data = np.memmap(filename, dtype=dtype, mode='w+', shape=shape)
+
+    def flush(self):
+        self.data.flush()
+
+
+def make_ring_buffer(maxlen, shape, path=None, name=None):
+    """RingBuffer in RAM, or backed by `path`/`name`.dat if a path is given"""
+    if path is None:
+        return RingBuffer(maxlen, shape=shape)
+    return MemmapRingBuffer(maxlen, shape=shape, filename=osp.join(path, name + '.dat'))
+
+
+RING_STATE_FILE = 'ring.json'
+
+
+def save_ring_state(path, state):
+    # write to a temporary file and rename it, so a crash never leaves a partial file
+    filename = osp.join(path, RING_STATE_FILE)
+    tmp_filename = filename + '.tmp'
+    with open(tmp_filename, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_filename, filename)
+
+
+def load_ring_state(path):
+    filename = osp.join(path, RING_STATE_FILE)
+    if not osp.exists(filename):
+        return None
+    with open(filename) as f:
+        return json.load(f)
+
+
+def replay_path(run_dir, rank, load_dir=None):
+    """
+    Directory of the memory-mapped replay of `rank` in run_dir. A resumed
+    run starts from a copy of the replay of the run it loads (load_dir),
+    so it never writes into that run's files. run_dir is the log directory
+    of the run, logger.get_dir().
+    """
+    if run_dir is None:
+        raise ValueError('memmap replay needs a log directory, configure the logger first (logger.configure)')
+    path = osp.join(osp.expanduser(run_dir), 'replay_%i' % rank)
+    if load_dir is not None and not osp.exists(path):
+        loaded = osp.join(osp.expanduser(load_dir), 'replay_%i' % rank)
+        if osp.isdir(loaded):
+            shutil.copytree(loaded, path)
+    return path
+
+
 def array_min2d(x):
     x = np.array(x)
     if x.ndim >= 2:
@@ -40,19 +115,50 @@ def array_min2d(x):
 
 
 class Memory(object):
-    def __init__(self, limit, action_shape, observation_shape):
+    def __init__(self, limit, action_shape, observation_shape, path=None):
+        """Replay memory of transitions.
+
+        If `path` is given every field is stored in a memory-mapped file in
+        that directory. A directory written by a previous run is reopened with
+        the ring position saved by its last `flush`; transitions appended
+        after that may have replaced some of the oldest ones.
+        """
         self.limit = limit
-
-        self.observations0 = RingBuffer(limit, shape=observation_shape)
-        self.actions = RingBuffer(limit, shape=action_shape)
-        self.rewards = RingBuffer(limit, shape=(1,))
-        self.terminals1 = RingBuffer(limit, shape=(1,))
-        self.observations1 = RingBuffer(limit, shape=observation_shape)
+        self.path = path
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+        self.observations0 = make_ring_buffer(limit, observation_shape, path, 'observations0')
+        self.actions = make_ring_buffer(limit, action_shape, path, 'actions')
+        self.rewards = make_ring_buffer(limit, (1,), path, 'rewards')
+        self.terminals1 = make_ring_buffer(limit, (1,), path, 'terminals1')
+        self.observations1 = make_ring_buffer(limit, observation_shape, path, 'observations1')
+        self.buffers = [self.observations0, self.actions, self.rewards, self.terminals1, self.observations1]
+
+        if path is not None:
+            state = load_ring_state(path)
+            if state is not None:
+                assert state['limit'] == limit, 'replay memory in {} has limit {}'.format(path, state['limit'])
+                for buf in self.buffers:
+                    buf.start, buf.length = state['start'], state['length']
+
+    def flush(self):
+        """Write the memory-mapped fields to disk, then record the valid part of the ring"""
+        if self.path is None:
+            return
+        for buf in self.buffers:
+            buf.flush()
+        save_ring_state(self.path, {'limit': self.limit,
+                                    'start': self.observations0.start,
+                                    'length': self.observations0.length})
 
     def sample(self, batch_size):
         # Draw such that we always have a proceeding element.
         batch_idxs = np.random.randint(self.nb_entries - 2, size=batch_size)
+        return self.get_batch(batch_idxs)
 
+    def get_batch(self, batch_idxs):
+        """Transitions at the indexes batch_idxs, relative to the oldest one"""
         obs0_batch = self.observations0.get_batch(batch_idxs)
         obs1_batch = self.observations1.get_batch(batch_idxs)
         action_batch = self.actions.get_batch(batch_idxs)
@@ -0,0 +1,180 @@
+"""
+DDPG and MADDPG actors evaluated with NumPy only.
+
+export_actor writes the actor weights and the observation statistics of a
+checkpoint (the dict written by baselines.common.tf_util.save_variables) to a
+.npz file, and NumpyActor loads that file and computes batched actions without
+importing tensorflow. Three layouts are recognized:
+
+    actor            one actor, observations of shape (..., obs_dim) (DDPG)
+    actor_0..actor_N one actor per agent, observations of shape (..., N, obs_dim) (MADDPG)
+    actor            one actor shared by all agents, which gets a one-hot agent
+                     id appended to its observation (MADDPG with shared parameters)
+"""
+import re
+
+import numpy as np
+
+
+def relu(x):
+    return np.maximum(x, 0.)
+
+
+def elu(x):
+    return np.where(x > 0., x, np.expm1(np.minimum(x, 0.)))
+
+
+def sigmoid(x):
+    return 1. / (1. + np.exp(-x))
+
+
+ACTIVATIONS = {'relu': relu, 'tanh': np.tanh, 'elu': elu, 'sigmoid': sigmoid}
+
+
+def activation_name(activation):
+    """Name of a tensorflow activation, given the function, its name or its str() as saved in configs.txt"""
+    if callable(activation):
+        activation = activation.__name__
+    match = re.match(r'<function (\w+)', activation)
+    name = match.group(1) if match else activation
+    name = name.lower()
+    if name not in ACTIVATIONS:
+        raise ValueError('unsupported activation {}'.format(activation))
+    return name
+
+
+def actor_layers(variables, scope):
+    """Weights of the actor in `scope`, one dict per dense layer"""
+    layers = []
+    i = 0
+    while '{}/mlp_fc{}/w:0'.format(scope, i) in variables:
+        layer = {'w': variables['{}/mlp_fc{}/w:0'.format(scope, i)],
+                 'b': variables['{}/mlp_fc{}/b:0'.format(scope, i)]}
+        # tf.contrib.layers.layer_norm scopes are LayerNorm, LayerNorm_1, ...
+        ln_scope = '{}/LayerNorm{}'.format(scope, '_{}'.format(i) if i > 0 else '')
+        if ln_scope + '/gamma:0' in variables:
+            layer['gamma'] = variables[ln_scope + '/gamma:0']
+            layer['beta'] = variables[ln_scope + '/beta:0']
+        layers.append(layer)
+        i += 1
+    layers.append({'w': variables['{}/dense/kernel:0'.format(scope)],
+                   'b': variables['{}/dense/bias:0'.format(scope)]})
+    return layers
+
+
+def export_actor(variables, path, activation, normalize_observations=True, observation_range=(-5., 5.)):
+    """Write the actor(s) found in a checkpoint to a .npz file.
+
+    Parameters
+    ----------
+    variables: dict
+        values of the checkpointed variables by name
+    path: str
+        .npz file to write
+    activation: str or function
+        activation of the mlp hidden layers
+    normalize_observations: bool
+        whether the actor was trained on observations normalized by obs_rms
+    observation_range: tuple
+        clipping range of the normalized observations
+    """
+    scopes = sorted({m.group(1) for m in (re.match(r'^(actor(?:_\d+)?)/dense/kernel:0$', k) for k in variables) if m},
+                    key=lambda s: int(s.split('_')[1]) if '_' in s else -1)
+    if not scopes:
+        raise ValueError('no actor in the checkpoint')
+    layers = [actor_layers(variables, scope) for scope in scopes]
+    input_dim = layers[0][0]['w'].shape[0]
+
+    if normalize_observations:
+        count = variables['obs_rms/count:0']
+        obs_mean = (variables['obs_rms/runningsum:0'] / count).astype(np.float32)
+        obs_var = (variables['obs_rms/runningsumsq:0'] / count).astype(np.float32) - np.square(obs_mean)
+        obs_std = np.sqrt(np.maximum(obs_var, 1e-2))
+    elif 'obs_rms/count:0' in variables:
+        # the multi-agent learners always keep obs_rms, it gives the number of agents
+        obs_mean = np.zeros(variables['obs_rms/runningsum:0'].shape, dtype=np.float32)
+        obs_std = np.ones_like(obs_mean)
+    else:
+        obs_mean = np.zeros(input_dim, dtype=np.float32)
+        obs_std = np.ones_like(obs_mean)
+
+    # a single actor reading more than one observation is shared by the agents
+    agent_ids = len(scopes) == 1 and obs_mean.ndim == 2 and input_dim == obs_mean.shape[1] + obs_mean.shape[0]
+    arrays = {'obs_mean': obs_mean, 'obs_std': obs_std,
+              'observation_range': np.asarray(observation_range, dtype=np.float32),
+              'activation': np.array(activation_name(activation)),
+              'agent_ids': np.array(agent_ids),
+              'multi_agent': np.array(scopes[0] != 'actor' or agent_ids)}
+    for k, actor in enumerate(layers):
+        for i, layer in enumerate(actor):
+            for name, value in layer.items():
+                arrays['actor{}/{}{}'.format(k, name, i)] = value
+    np.savez(path, **arrays)
+
+
+class NumpyActor(object):
+    def __init__(self, actors, obs_mean, obs_std, activation='relu', observation_range=(-5., 5.),
+                 agent_ids=False, multi_agent=False):
+        """Deterministic actions of the exported actors.
+
+        Parameters
+        ----------
+        actors: list
+            one list of layers per actor, each layer a dict with 'w', 'b' and
+            optionally the layer norm 'gamma' and 'beta'
+        obs_mean, obs_std: np.array
+            observation statistics, of shape (num_agents, obs_dim) for the
+            multi-agent layouts
+        agent_ids: bool
+            whether the (single) actor gets a one-hot agent id
+        multi_agent: bool
+            whether observations have an agent dimension before the last one
+        """
+        self.actors = actors
+        self.obs_mean = obs_mean
+        self.obs_std = obs_std
+        self.activation = ACTIVATIONS[activation_name(activation)]
+        self.observation_range = observation_range
+        self.agent_ids = agent_ids
+        self.multi_agent = multi_agent
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            actors = []
+            while 'actor{}/w0'.format(len(actors)) in data:
+                k = len(actors)
+                actor = []
+                while 'actor{}/w{}'.format(k, len(actor)) in data:
+                    i = len(actor)
+                    actor.append({name: data['actor{}/{}{}'.format(k, name, i)] for name in ('w', 'b', 'gamma', 'beta')
+                                  if 'actor{}/{}{}'.format(k, name, i) in data})
+                actors.append(actor)
+            return cls(actors, data['obs_mean'], data['obs_std'], activation=str(data['activation']),
+                       observation_range=tuple(data['observation_range']), agent_ids=bool(data['agent_ids']),
+                       multi_agent=bool(data['multi_agent']))
+
+    def forward(self, layers, x):
+        shape = x.shape
+        h = x.reshape(-1, shape[-1])
+        for layer in layers[:-1]:
+            h = h @ layer['w'] + layer['b']
+            if 'gamma' in layer:
+                mean = h.mean(axis=-1, keepdims=True)
+                var = h.var(axis=-1, keepdims=True)
+                h = (h - mean) / np.sqrt(var + 1e-12) * layer['gamma'] + layer['beta']
+            h = self.activation(h)
+        h = np.tanh(h @ layers[-1]['w'] + layers[-1]['b'])
+        return h.reshape(shape[:-1] + h.shape[-1:])
+
+    def __call__(self, obs):
+        """Actions for a batch of observations, of shape (..., obs_dim) or (..., num_agents, obs_dim)"""
+        obs = (np.asarray(obs, dtype=np.float32) - self.obs_mean) / self.obs_std
+        obs = np.clip(obs, self.observation_range[0], self.observation_range[1])
+        if self.agent_ids:
+            num_agents = obs.shape[-2]
+            ids = np.broadcast_to(np.eye(num_agents, dtype=np.float32), obs.shape[:-1] + (num_agents,))
+            return self.forward(self.actors[0], np.concatenate([obs, ids], axis=-1))
+        if self.multi_agent:
+            return np.stack([self.forward(actor, obs[..., i, :]) for i, actor in enumerate(self.actors)], axis=-2)
+        return self.forward(self.actors[0], obs)
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import os.path as osp
+
+from baselines.ddpg.memory import Memory, replay_path
+
+
+def fill(memory, start, n):
+    for t in range(start, start + n):
+        memory.append(np.full(3, t), np.full(2, -t), t, np.full(3, t + 1), t % 2)
+
+
+def test_memmap_memory_reopen(tmpdir):
+    path = str(tmpdir.join('replay'))
+    memory = Memory(limit=8, action_shape=(2,), observation_shape=(3,), path=path)
+    fill(memory, 0, 11)
+    memory.flush()
+
+    reopened = Memory(limit=8, action_shape=(2,), observation_shape=(3,), path=path)
+    assert reopened.nb_entries == 8
+    assert reopened.observations0.start == 3
+    rewards = reopened.rewards.get_batch(np.arange(6)).ravel()
+    obs1 = reopened.observations1.get_batch(np.arange(6))
+    assert np.allclose(rewards, [3, 4, 5, 6, 7, 8])
+    assert np.allclose(obs1[:, 0], rewards + 1)
+
+    fill(reopened, 11, 1)
+    assert reopened.nb_entries == 8
+    assert np.isclose(reopened.rewards.get_batch(np.array([7]))[0, 0], 11)
+
+
+def test_memory_in_ram():
+    memory = Memory(limit=8, action_shape=(2,), observation_shape=(3,))
+    fill(memory, 0, 5)
+    memory.flush()
+    batch = memory.sample(batch_size=4)
+    assert batch['obs0'].shape == (4, 3)
+    assert batch['actions'].shape == (4, 2)
+
+
+def test_resumed_replay_is_a_copy(tmpdir):
+    loaded_run, new_run = str(tmpdir.join('loaded')), str(tmpdir.join('new'))
+    memory = Memory(limit=8, action_shape=(2,), observation_shape=(3,), path=replay_path(loaded_run, 0))
+    fill(memory, 0, 5)
+    memory.flush()
+
+    path = replay_path(new_run, 0, load_dir=loaded_run)
+    assert path == osp.join(new_run, 'replay_0')
+    resumed = Memory(limit=8, action_shape=(2,), observation_shape=(3,), path=path)
+    assert resumed.nb_entries == 5
+    fill(resumed, 5, 3)
+    resumed.flush()
+    # the loaded run keeps its own replay, resuming the new run reopens the new one
+    assert Memory(limit=8, action_shape=(2,), observation_shape=(3,), path=replay_path(loaded_run, 0)).nb_entries == 5
+    assert replay_path(new_run, 0, load_dir=loaded_run) == path
+    assert Memory(limit=8, action_shape=(2,), observation_shape=(3,), path=path).nb_entries == 8
+
+
+def test_replay_path_needs_a_log_dir():
+    with pytest.raises(ValueError, match='log directory'):
+        replay_path(None, 0)
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from baselines.ddpg.numpy_actor import NumpyActor, export_actor
+
+
+def running_stats(x, epsilon=1e-2):
+    # variables of RunningMeanStd after one update with x
+    return {'obs_rms/runningsum:0': x.sum(axis=0).astype(np.float64),
+            'obs_rms/runningsumsq:0': np.square(x).sum(axis=0).astype(np.float64) + epsilon,
+            'obs_rms/count:0': np.float64(len(x) + epsilon)}
+
+
+def random_actor(scope, input_dim, nb_actions, num_hidden=8, num_layers=2, layer_norm=False):
+    variables = {}
+    nin = input_dim
+    for i in range(num_layers):
+        variables['{}/mlp_fc{}/w:0'.format(scope, i)] = np.random.randn(nin, num_hidden).astype(np.float32)
+        variables['{}/mlp_fc{}/b:0'.format(scope, i)] = np.random.randn(num_hidden).astype(np.float32)
+        if layer_norm:
+            ln_scope = '{}/LayerNorm{}'.format(scope, '_{}'.format(i) if i > 0 else '')
+            variables[ln_scope + '/gamma:0'] = np.random.randn(num_hidden).astype(np.float32)
+            variables[ln_scope + '/beta:0'] = np.random.randn(num_hidden).astype(np.float32)
+        nin = num_hidden
+    variables['{}/dense/kernel:0'.format(scope)] = np.random.randn(nin, nb_actions).astype(np.float32)
+    variables['{}/dense/bias:0'.format(scope)] = np.random.randn(nb_actions).astype(np.float32)
+    return variables
+
+
+def test_export_layouts(tmpdir):
+    np.random.seed(0)
+    num_agents, obs_dim, nb_actions = 3, 5, 2
+    obs = np.random.randn(7, num_agents, obs_dim).astype(np.float32)
+
+    variables = running_stats(obs, epsilon=0.)
+    for i in range(num_agents):
+        variables.update(random_actor('actor_%d' % i, obs_dim, nb_actions, layer_norm=True))
+        # other models of the checkpoint are ignored
+        variables.update(random_actor('target_actor_%d' % i, obs_dim, nb_actions))
+    path = str(tmpdir.join('maddpg.npz'))
+    export_actor(variables, path, 'relu')
+    actor = NumpyActor.load(path)
+    assert len(actor.actors) == num_agents
+    assert np.allclose(actor.obs_mean, obs.mean(axis=0), atol=1e-3)
+    assert np.allclose(actor.obs_std, np.maximum(obs.std(axis=0), 0.1), atol=1e-2)
+    actions = actor(obs)
+    assert actions.shape == (7, num_agents, nb_actions)
+    # each agent only sees its own observation
+    single = NumpyActor([actor.actors[1]], actor.obs_mean[1], actor.obs_std[1], activation='relu')
+    assert np.allclose(actions[:, 1], single(obs[:, 1]), atol=1e-6)
+
+    variables = running_stats(obs)
+    variables.update(random_actor('actor', obs_dim + num_agents, nb_actions))
+    path = str(tmpdir.join('shared.npz'))
+    export_actor(variables, path, '<function relu at 0x7f>')
+    actor = NumpyActor.load(path)
+    assert actor.agent_ids
+    assert actor(obs).shape == (7, num_agents, nb_actions)
+    assert actor(obs[0]).shape == (num_agents, nb_actions)
+
+    variables = random_actor('actor', obs_dim, nb_actions)
+    path = str(tmpdir.join('ddpg.npz'))
+    export_actor(variables, path, 'tanh', normalize_observations=False)
+    actor = NumpyActor.load(path)
+    assert not actor.multi_agent
+    actions = actor(obs[:, 0])
+    assert actions.shape == (7, nb_actions)
+    assert np.all(np.abs(actions) <= 1.)
+
+
+def test_parity_with_tf_actor(tmpdir):
+    tf = pytest.importorskip('tensorflow')
+    from baselines.common.mpi_running_mean_std import RunningMeanStd
+    from maddpg.trainer.ma_models import Actor
+
+    np.random.seed(0)
+    num_agents, obs_dim, nb_actions = 2, 6, 2
+    obs = 3. * np.random.randn(32, num_agents, obs_dim).astype(np.float32)
+
+    with tf.Graph().as_default(), tf.Session() as sess:
+        with tf.variable_scope('obs_rms'):
+            obs_rms = RunningMeanStd(shape=(num_agents, obs_dim))
+        obs_ph = tf.placeholder(tf.float32, shape=(None, num_agents, obs_dim))
+        normalized_obs = tf.clip_by_value((obs_ph - obs_rms.mean) / obs_rms.std, -5., 5.)
+        actors = [Actor(nb_actions, name='actor_%d' % i, network='mlp', num_layers=2, num_hidden=16,
+                        activation=tf.nn.elu, layer_norm=True) for i in range(num_agents)]
+        actions = tf.stack([actor(normalized_obs[:, i]) for i, actor in enumerate(actors)], axis=1)
+
+        sess.run(tf.global_variables_initializer())
+        obs_rms.update(obs[:16])
+        tf_actions = sess.run(actions, feed_dict={obs_ph: obs})
+        global_vars = tf.global_variables()
+        variables = dict(zip([v.name for v in global_vars], sess.run(global_vars)))
+
+    path = str(tmpdir.join('actor.npz'))
+    export_actor(variables, path, tf.nn.elu)
+    np_actions = NumpyActor.load(path)(obs)
+    np.testing.assert_allclose(np_actions, tf_actions, atol=1e-5)
+
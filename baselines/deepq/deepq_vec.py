@@ -0,0 +1,219 @@
+import os
+import tempfile
+from collections import deque
+
+import tensorflow as tf
+import numpy as np
+
+import baselines.common.tf_util as U
+from baselines.common.tf_util import load_variables, save_variables
+from baselines import logger
+from baselines.common.schedules import LinearSchedule
+from baselines.common import set_global_seeds
+
+from baselines import deepq
+from baselines.deepq.deepq import ActWrapper
+from baselines.deepq.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+from baselines.common.replay_buffer import NStepTransitions
+from baselines.deepq.utils import ObservationInput
+
+from baselines.common.tf_util import get_session
+from baselines.deepq.models import build_q_func
+
+
+def learn(env,
+          network,
+          seed=None,
+          lr=5e-4,
+          total_timesteps=100000,
+          buffer_size=50000,
+          exploration_fraction=0.1,
+          exploration_final_eps=0.02,
+          train_freq=1,
+          batch_size=32,
+          print_freq=100,
+          checkpoint_freq=10000,
+          checkpoint_path=None,
+          learning_starts=1000,
+          gamma=1.0,
+          n_step=1,
+          double_q=True,
+          target_network_update_freq=500,
+          prioritized_replay=False,
+          prioritized_replay_alpha=0.6,
+          prioritized_replay_beta0=0.4,
+          prioritized_replay_beta_iters=None,
+          prioritized_replay_eps=1e-6,
+          callback=None,
+          load_path=None,
+          **network_kwargs
+            ):
+    """Train a deepq model on a vectorized env.
+
+    Same as baselines.deepq.learn, except that all envs of `env` are stepped
+    together: the epsilon-greedy actions of all envs are computed in one
+    session call and their transitions are added to the replay buffer as one
+    batch. Timestep arguments count the steps of all envs, so `train_freq`
+    and `target_network_update_freq` keep the ratio of updates to collected
+    transitions of the single env learner.
+
+    Parameters
+    -------
+    env: VecEnv
+        vectorized environment to train on, e.g. a SubprocVecEnv of Highway-v0
+    network: string or a function
+        neural network to use as a q function approximator, see baselines.deepq.learn
+    n_step: int
+        number of rewards summed in the targets, the bootstrap value is
+        discounted by gamma ** n_step
+    double_q: bool
+        whether to use Double Q Learning (https://arxiv.org/abs/1509.06461)
+
+    The other arguments are the ones of baselines.deepq.learn. Parameter space
+    noise is not supported.
+
+    Returns
+    -------
+    act: ActWrapper
+        Wrapper over act function. Adds ability to save it and load it.
+    """
+    # Create all the functions necessary to train the model
+
+    sess = get_session()
+    set_global_seeds(seed)
+
+    q_func = build_q_func(network, **network_kwargs)
+    nenv = env.num_envs
+
+    # capture the shape outside the closure so that the env object is not serialized
+    # by cloudpickle when serializing make_obs_ph
+
+    observation_space = env.observation_space
+    def make_obs_ph(name):
+        return ObservationInput(observation_space, name=name)
+
+    act, train, update_target, debug = deepq.build_train(
+        make_obs_ph=make_obs_ph,
+        q_func=q_func,
+        num_actions=env.action_space.n,
+        optimizer=tf.train.AdamOptimizer(learning_rate=lr),
+        gamma=gamma ** n_step,
+        grad_norm_clipping=10,
+        double_q=double_q
+    )
+
+    act_params = {
+        'make_obs_ph': make_obs_ph,
+        'q_func': q_func,
+        'num_actions': env.action_space.n,
+    }
+
+    act = ActWrapper(act, act_params)
+
+    # Create the replay buffer
+    if prioritized_replay:
+        replay_buffer = PrioritizedReplayBuffer(buffer_size, alpha=prioritized_replay_alpha)
+        if prioritized_replay_beta_iters is None:
+            prioritized_replay_beta_iters = total_timesteps
+        beta_schedule = LinearSchedule(prioritized_replay_beta_iters,
+                                       initial_p=prioritized_replay_beta0,
+                                       final_p=1.0)
+    else:
+        replay_buffer = ReplayBuffer(buffer_size)
+        beta_schedule = None
+    transitions = NStepTransitions(nenv, n_step, gamma)
+    # Create the schedule for exploration starting from 1.
+    exploration = LinearSchedule(schedule_timesteps=int(exploration_fraction * total_timesteps),
+                                 initial_p=1.0,
+                                 final_p=exploration_final_eps)
+
+    # Initialize the parameters and copy them to the target network.
+    U.initialize()
+    update_target()
+
+    episode_rewards = deque(maxlen=100)
+    episode_lengths = deque(maxlen=100)
+    num_episodes = 0
+    saved_mean_reward = None
+    obs = env.reset()
+
+    with tempfile.TemporaryDirectory() as td:
+        td = checkpoint_path or td
+
+        model_file = os.path.join(td, "model")
+        model_saved = False
+
+        if tf.train.latest_checkpoint(td) is not None:
+            load_variables(model_file)
+            logger.log('Loaded model from {}'.format(model_file))
+            model_saved = True
+        elif load_path is not None:
+            load_variables(load_path)
+            logger.log('Loaded model from {}'.format(load_path))
+
+        for t in range(0, total_timesteps, nenv):
+            if callback is not None:
+                if callback(locals(), globals()):
+                    break
+            # Take actions for all envs and update exploration to the newest value
+            update_eps = exploration.value(t)
+            actions = act(obs, update_eps=update_eps)
+            new_obs, rews, dones, infos = env.step(actions)
+            # Store the completed n-step transitions in the replay buffer.
+            batch = transitions.append(obs, actions, rews, new_obs, dones)
+            if len(batch[0]):
+                replay_buffer.add_batch(*batch)
+            obs = new_obs
+
+            printed_episodes = num_episodes
+            for info in infos:
+                maybeepinfo = info.get('episode')
+                if maybeepinfo:
+                    episode_rewards.append(maybeepinfo['r'])
+                    episode_lengths.append(maybeepinfo['l'])
+                    num_episodes += 1
+
+            # Number of updates due for the nenv steps just taken
+            t_next = t + nenv
+            if t_next > learning_starts:
+                for _ in range(t_next // train_freq - t // train_freq):
+                    # Minimize the error in Bellman's equation on a batch sampled from replay buffer.
+                    if prioritized_replay:
+                        experience = replay_buffer.sample(batch_size, beta=beta_schedule.value(t))
+                        (obses_t, actions_t, rewards, obses_tp1, dones_t, weights, batch_idxes) = experience
+                    else:
+                        obses_t, actions_t, rewards, obses_tp1, dones_t = replay_buffer.sample(batch_size)
+                        weights, batch_idxes = np.ones_like(rewards), None
+                    td_errors = train(obses_t, actions_t, rewards, obses_tp1, dones_t, weights)
+                    if prioritized_replay:
+                        new_priorities = np.abs(td_errors) + prioritized_replay_eps
+                        replay_buffer.update_priorities(batch_idxes, new_priorities)
+
+                if t_next // target_network_update_freq > t // target_network_update_freq:
+                    # Update target network periodically.
+                    update_target()
+
+            mean_100ep_reward = round(np.mean(episode_rewards), 1) if episode_rewards else np.nan
+            if print_freq is not None and num_episodes // print_freq > printed_episodes // print_freq:
+                logger.record_tabular("steps", t_next)
+                logger.record_tabular("episodes", num_episodes)
+                logger.record_tabular("mean 100 episode reward", mean_100ep_reward)
+                logger.record_tabular("mean 100 episode length", np.mean(episode_lengths))
+                logger.record_tabular("% time spent exploring", int(100 * exploration.value(t)))
+                logger.dump_tabular()
+
+            if (checkpoint_freq is not None and t_next > learning_starts and num_episodes > 100 and
+                    t_next // checkpoint_freq > t // checkpoint_freq):
+                if saved_mean_reward is None or mean_100ep_reward > saved_mean_reward:
+                    if print_freq is not None:
+                        logger.log("Saving model due to mean reward increase: {} -> {}".format(
+                                   saved_mean_reward, mean_100ep_reward))
+                    save_variables(model_file)
+                    model_saved = True
+                    saved_mean_reward = mean_100ep_reward
+        if model_saved:
+            if print_freq is not None:
+                logger.log("Restored model with mean reward: {}".format(saved_mean_reward))
+            load_variables(model_file)
+
+    return act
@@ -2,6 +2,7 @@
 Reference: https://github.com/openai/imitation
 I follow the architecture from the official repository
 '''
+import gym
 import tensorflow as tf
 import numpy as np
 
@@ -21,9 +22,11 @@ class TransitionClassifier(object):
     def __init__(self, env, hidden_size, entcoeff=0.001, lr_rate=1e-3, scope="adversary"):
         self.scope = scope
         self.observation_shape = env.observation_space.shape
-        self.actions_shape = env.action_space.shape
+        # discrete actions are classified one-hot coded, see encode_actions
+        self.discrete = isinstance(env.action_space, gym.spaces.Discrete)
+        self.actions_shape = (env.action_space.n, ) if self.discrete else env.action_space.shape
         self.input_shape = tuple([o+a for o, a in zip(self.observation_shape, self.actions_shape)])
-        self.num_actions = env.action_space.shape[0]
+        self.num_actions = self.actions_shape[0]
         self.hidden_size = hidden_size
         self.build_ph()
         # Build grpah
@@ -76,8 +79,16 @@ class TransitionClassifier(object):
     def get_trainable_variables(self):
         return tf.get_collection(tf.GraphKeys.TRAINABLE_VARIABLES, self.scope)
 
+    def encode_actions(self, acs):
+        '''One-hot coding of the integer actions of a discrete action space, other actions are returned as they are'''
+        acs = np.asarray(acs)
+        if self.discrete and acs.dtype.kind in 'iu':
+            return np.eye(self.num_actions, dtype=np.float32)[acs]
+        return acs
+
     def get_reward(self, obs, acs):
         sess = tf.get_default_session()
+        acs = self.encode_actions(acs)
         if len(obs.shape) == 1:
             obs = np.expand_dims(obs, 0)
         if len(acs.shape) == 1:
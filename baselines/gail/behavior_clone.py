@@ -18,14 +18,14 @@ from baselines.common import set_global_seeds, tf_util as U
 from baselines.common.misc_util import boolean_flag
 from baselines.common.mpi_adam import MpiAdam
 from baselines.gail.run_mujoco import runner
-from baselines.gail.dataset.mujoco_dset import Mujoco_Dset
+from baselines.gail.dataset.shard_dset import load_dataset
 
 
 def argsparser():
     parser = argparse.ArgumentParser("Tensorflow Implementation of Behavior Cloning")
     parser.add_argument('--env_id', help='environment ID', default='Hopper-v1')
     parser.add_argument('--seed', help='RNG seed', type=int, default=0)
-    parser.add_argument('--expert_path', type=str, default='data/deterministic.trpo.Hopper.0.00.npz')
+    parser.add_argument('--expert_path', help='npz file or directory of expert shards', type=str, default='data/deterministic.trpo.Hopper.0.00.npz')
     parser.add_argument('--checkpoint_dir', help='the directory to save model', default='checkpoint')
     parser.add_argument('--log_dir', help='the directory to save log file', default='log')
     #  Mujoco Dataset Configuration
@@ -50,9 +50,14 @@ def learn(env, policy_func, dataset, optim_batch_size=128, max_iters=1e4,
     pi = policy_func("pi", ob_space, ac_space)  # Construct network for new policy
     # placeholder
     ob = U.get_placeholder_cached(name="ob")
-    ac = pi.pdtype.sample_placeholder([None])
     stochastic = U.get_placeholder_cached(name="stochastic")
-    loss = tf.reduce_mean(tf.square(ac-pi.ac))
+    if isinstance(ac_space, gym.spaces.Discrete):
+        # one-hot expert actions, cross-entropy of the action logits
+        ac = tf.placeholder(tf.float32, [None, ac_space.n], name="expert_ac")
+        loss = tf.reduce_mean(tf.nn.softmax_cross_entropy_with_logits(labels=ac, logits=pi.pd.logits))
+    else:
+        ac = pi.pdtype.sample_placeholder([None])
+        loss = tf.reduce_mean(tf.square(ac-pi.ac))
     var_list = pi.get_trainable_variables()
     adam = MpiAdam(var_list, epsilon=adam_epsilon)
     lossandgrad = U.function([ob, ac, stochastic], [loss]+[U.flatgrad(loss, var_list)])
@@ -100,7 +105,7 @@ def main(args):
     task_name = get_task_name(args)
     args.checkpoint_dir = osp.join(args.checkpoint_dir, task_name)
     args.log_dir = osp.join(args.log_dir, task_name)
-    dataset = Mujoco_Dset(expert_path=args.expert_path, traj_limitation=args.traj_limitation)
+    dataset = load_dataset(args.expert_path, traj_limitation=args.traj_limitation)
     savedir_fname = learn(env,
                           policy_fn,
                           dataset,
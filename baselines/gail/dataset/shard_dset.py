@@ -0,0 +1,174 @@
+'''
+Streaming expert dataset stored in shards, for datasets too large for Mujoco_Dset.
+
+A dataset is a directory of shards, every shard holding whole episodes:
+    shard_00000.obs.npy  observations, (transitions, ) + observation shape
+    shard_00000.acs.npy  actions, (transitions, ) + action shape
+    shard_00000.json     {'ep_rets': [...], 'ep_lens': [...]}
+The shards are memory-mapped, Shard_Dset only loads the chunks it shuffles.
+'''
+import json
+import os
+import os.path as osp
+import queue
+import threading
+
+import numpy as np
+
+from baselines.gail.dataset.mujoco_dset import Mujoco_Dset
+
+
+def shard_name(shard):
+    return 'shard_%05i' % shard
+
+
+def write_shard(expert_dir, shard, obs, acs, ep_rets, ep_lens):
+    '''Write a shard, its json last and every file renamed into place so that a listed shard is complete'''
+    assert len(obs) == len(acs) == sum(ep_lens) and len(ep_rets) == len(ep_lens)
+    os.makedirs(expert_dir, exist_ok=True)
+    prefix = osp.join(expert_dir, shard_name(shard))
+    for suffix, data in (('.obs.npy', obs), ('.acs.npy', acs)):
+        with open(prefix + suffix + '.tmp', 'wb') as f:
+            np.save(f, np.asarray(data))
+        os.replace(prefix + suffix + '.tmp', prefix + suffix)
+    with open(prefix + '.json.tmp', 'w') as f:
+        json.dump({'ep_rets': [float(r) for r in ep_rets], 'ep_lens': [int(l) for l in ep_lens]}, f)
+    os.replace(prefix + '.json.tmp', prefix + '.json')
+
+
+def list_shards(expert_dir):
+    '''(shard, episode info) of the complete shards of a dataset, in shard order'''
+    shards = []
+    for filename in sorted(os.listdir(expert_dir)):
+        if filename.startswith('shard_') and filename.endswith('.json'):
+            with open(osp.join(expert_dir, filename)) as f:
+                shards.append((int(filename[len('shard_'):-len('.json')]), json.load(f)))
+    return shards
+
+
+class ShardStream(object):
+    def __init__(self, segments, randomize, chunk_size, shuffle_chunks, prefetch, seed):
+        '''
+        Batches of the rows of segments, (obs memmap, acs memmap, start, stop).
+
+        With randomize, the segments are cut into chunks of chunk_size rows.
+        Every epoch, a background thread loads the chunks in random order,
+        shuffle_chunks at a time, and shuffles the rows of those chunks
+        together. At most prefetch shuffled blocks wait in memory.
+        '''
+        self.segments = segments
+        self.num_pairs = sum(stop - start for _, _, start, stop in segments)
+        self.randomize = randomize
+        self.chunk_size = chunk_size
+        self.shuffle_chunks = shuffle_chunks
+        self.rng = np.random.RandomState(seed)
+        self.inputs = self.labels = None
+        self.pointer = 0
+        self.queue = queue.Queue(maxsize=prefetch)
+        self.thread = None
+
+    def _blocks(self):
+        while True:
+            chunks = [(obs, acs, begin, min(begin + self.chunk_size, stop))
+                      for obs, acs, start, stop in self.segments for begin in range(start, stop, self.chunk_size)]
+            if self.randomize:
+                chunks = [chunks[i] for i in self.rng.permutation(len(chunks))]
+            for i in range(0, len(chunks), self.shuffle_chunks):
+                group = chunks[i:i + self.shuffle_chunks]
+                inputs = np.concatenate([obs[begin:end] for obs, _, begin, end in group])
+                labels = np.concatenate([acs[begin:end] for _, acs, begin, end in group])
+                if self.randomize:
+                    idx = self.rng.permutation(len(inputs))
+                    inputs, labels = inputs[idx], labels[idx]
+                yield inputs, labels
+
+    def _run(self):
+        for block in self._blocks():
+            self.queue.put(block)
+
+    def _next_block(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        return self.queue.get()
+
+    def all(self):
+        inputs = np.concatenate([obs[start:stop] for obs, _, start, stop in self.segments])
+        labels = np.concatenate([acs[start:stop] for _, acs, start, stop in self.segments])
+        return inputs, labels
+
+    def get_next_batch(self, batch_size):
+        # if batch_size is negative -> return all
+        if batch_size < 0:
+            return self.all()
+        if self.num_pairs == 0:
+            raise ValueError('no transitions to sample a batch from')
+        inputs, labels = [], []
+        while batch_size > 0:
+            if self.inputs is None or self.pointer >= len(self.inputs):
+                self.inputs, self.labels = self._next_block()
+                self.pointer = 0
+            end = min(self.pointer + batch_size, len(self.inputs))
+            inputs.append(self.inputs[self.pointer:end])
+            labels.append(self.labels[self.pointer:end])
+            batch_size -= end - self.pointer
+            self.pointer = end
+        return np.concatenate(inputs), np.concatenate(labels)
+
+
+class Shard_Dset(Mujoco_Dset):
+    def __init__(self, expert_dir, train_fraction=0.7, traj_limitation=-1, randomize=True,
+                 chunk_size=4096, shuffle_chunks=8, prefetch=2, seed=0):
+        '''
+        Same interface as Mujoco_Dset for a sharded dataset: the first
+        train_fraction of the transitions is the train split, the rest the
+        val split, and traj_limitation keeps the first episodes only.
+        '''
+        segments, self.rets = [], []
+        for shard, info in list_shards(expert_dir):
+            if 0 <= traj_limitation <= len(self.rets):
+                break
+            ep_lens = info['ep_lens']
+            if traj_limitation >= 0:
+                ep_lens = ep_lens[:traj_limitation - len(self.rets)]
+            self.rets.extend(info['ep_rets'][:len(ep_lens)])
+            prefix = osp.join(expert_dir, shard_name(shard))
+            obs = np.load(prefix + '.obs.npy', mmap_mode='r')
+            acs = np.load(prefix + '.acs.npy', mmap_mode='r')
+            segments.append((obs, acs, 0, int(sum(ep_lens))))
+        if not segments:
+            raise ValueError('{} holds no expert shards'.format(expert_dir))
+
+        self.avg_ret = sum(self.rets)/len(self.rets)
+        self.std_ret = np.std(np.array(self.rets))
+        self.num_traj = len(self.rets)
+        self.num_transition = sum(stop - start for _, _, start, stop in segments)
+        self.randomize = randomize
+        stream_args = dict(randomize=randomize, chunk_size=chunk_size, shuffle_chunks=shuffle_chunks,
+                           prefetch=prefetch)
+        self.dset = ShardStream(segments, seed=seed, **stream_args)
+        # for behavior cloning
+        train_segments, val_segments = split_segments(segments, int(self.num_transition*train_fraction))
+        self.train_set = ShardStream(train_segments, seed=seed + 1, **stream_args)
+        self.val_set = ShardStream(val_segments, seed=seed + 2, **stream_args)
+        self.log_info()
+
+
+def split_segments(segments, count):
+    '''segments of the first count rows and of the other rows'''
+    first, second = [], []
+    for obs, acs, start, stop in segments:
+        middle = min(max(start + count, start), stop)
+        if middle > start:
+            first.append((obs, acs, start, middle))
+        if stop > middle:
+            second.append((obs, acs, middle, stop))
+        count -= middle - start
+    return first, second
+
+
+def load_dataset(expert_path, traj_limitation=-1):
+    '''Shard_Dset of a directory of shards, Mujoco_Dset of a .npz file'''
+    if osp.isdir(expert_path):
+        return Shard_Dset(expert_path, traj_limitation=traj_limitation)
+    return Mujoco_Dset(expert_path=expert_path, traj_limitation=traj_limitation)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from baselines.gail.dataset.shard_dset import Shard_Dset, write_shard
+
+
+def write_dataset(expert_dir, ep_lens_per_shard):
+    start = 0
+    for shard, ep_lens in enumerate(ep_lens_per_shard):
+        n = sum(ep_lens)
+        # the observation of a transition holds its global index, the action twice that
+        obs = np.repeat(np.arange(start, start + n, dtype=np.float32)[:, None], 3, axis=1)
+        write_shard(expert_dir, shard, obs, 2 * np.arange(start, start + n), [float(l) for l in ep_lens], ep_lens)
+        start += n
+
+
+def test_shard_dset(tmpdir):
+    expert_dir = str(tmpdir.join('expert'))
+    write_dataset(expert_dir, [[10, 20], [5], [15, 10, 20]])
+    dset = Shard_Dset(expert_dir, train_fraction=0.5, chunk_size=7, shuffle_chunks=2, prefetch=1)
+    assert dset.num_traj == 6 and dset.num_transition == 80
+    assert dset.avg_ret == 80 / 6
+
+    # every epoch of the train split is a permutation of its 40 transitions
+    seen = []
+    for _ in range(8):
+        obs, acs = dset.get_next_batch(10, 'train')
+        assert obs.shape == (10, 3) and np.array_equal(acs, 2 * obs[:, 0])
+        seen.extend(obs[:, 0])
+    assert sorted(seen[:40]) == list(range(40)) and sorted(seen[40:]) == list(range(40))
+    assert seen[:40] != list(range(40))
+
+    obs, acs = dset.get_next_batch(-1, 'val')
+    assert np.array_equal(obs[:, 0], np.arange(40, 80)) and np.array_equal(acs, 2 * np.arange(40, 80))
+
+    # the first episodes only, cut inside the last shard
+    dset = Shard_Dset(expert_dir, traj_limitation=4, randomize=False)
+    assert dset.num_traj == 4 and dset.num_transition == 50
+    obs, _ = dset.get_next_batch(-1)
+    assert np.array_equal(obs[:, 0], np.arange(50))
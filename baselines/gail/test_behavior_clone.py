@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+pytest.importorskip('tqdm')
+
+from gym import spaces
+
+from baselines.common import tf_util as U
+from baselines.gail import behavior_clone, mlp_policy
+from baselines.gail.dataset.shard_dset import load_dataset, write_shard
+
+
+class DemoEnv(object):
+    # spaces of HighwayEnv, enough for learn
+    observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(6,), dtype=np.float32)
+    action_space = spaces.Discrete(4)
+
+
+def test_behavior_clone_discrete_shards(tmpdir):
+    expert_dir = str(tmpdir.join('expert'))
+    rng = np.random.RandomState(0)
+    for shard in range(2):
+        obs = rng.randn(40, 6).astype(np.float32)
+        # the expert picks the largest of the first 4 features, one-hot coded as in generate_expert_data
+        acs = np.eye(4, dtype=np.float32)[obs[:, :4].argmax(axis=1)]
+        write_shard(expert_dir, shard, obs, acs, [0.0, 0.0], [20, 20])
+
+    def policy_fn(name, ob_space, ac_space, reuse=False):
+        return mlp_policy.MlpPolicy(name=name, ob_space=ob_space, ac_space=ac_space, reuse=reuse,
+                                    hid_size=16, num_hid_layers=1)
+
+    with tf.Graph().as_default(), U.single_threaded_session():
+        savedir = behavior_clone.learn(DemoEnv(), policy_fn, load_dataset(expert_dir), optim_batch_size=16,
+                                       max_iters=20, ckpt_dir=str(tmpdir), task_name='bc')
+    assert tf.train.checkpoint_exists(savedir)
@@ -6,6 +6,9 @@ import json
 import time
 import datetime
 import tempfile
+import atexit
+import queue
+import threading
 from collections import defaultdict
 
 DEBUG = 10
@@ -15,14 +18,27 @@ ERROR = 40
 
 DISABLED = 50
 
+# prefix of the lines holding the extended list of columns of an append-only csv
+CSV_KEYS_PREFIX = '#keys:'
+
 class KVWriter(object):
+    autoflush = True  # flush after every write, turned off by AsyncOutputFormat
+
     def writekvs(self, kvs):
         raise NotImplementedError
 
+    def flush(self):
+        pass
+
 class SeqWriter(object):
+    autoflush = True
+
     def writeseq(self, seq):
         raise NotImplementedError
 
+    def flush(self):
+        pass
+
 class HumanOutputFormat(KVWriter, SeqWriter):
     def __init__(self, filename_or_file):
         if isinstance(filename_or_file, str):
@@ -65,7 +81,8 @@ class HumanOutputFormat(KVWriter, SeqWriter):
         self.file.write('\n'.join(lines) + '\n')
 
         # Flush the output to the file
-        self.file.flush()
+        if self.autoflush:
+            self.flush()
 
     def _truncate(self, s):
         return s[:20] + '...' if len(s) > 23 else s
@@ -77,6 +94,10 @@ class HumanOutputFormat(KVWriter, SeqWriter):
             if i < len(seq) - 1: # add space unless this is the last one
                 self.file.write(' ')
         self.file.write('\n')
+        if self.autoflush:
+            self.flush()
+
+    def flush(self):
         self.file.flush()
 
     def close(self):
@@ -93,22 +114,39 @@ class JSONOutputFormat(KVWriter):
                 v = v.tolist()
                 kvs[k] = float(v)
         self.file.write(json.dumps(kvs) + '\n')
+        if self.autoflush:
+            self.flush()
+
+    def flush(self):
         self.file.flush()
 
     def close(self):
         self.file.close()
 
 class CSVOutputFormat(KVWriter):
-    def __init__(self, filename):
+    def __init__(self, filename, append_only=False):
+        """
+        New keys are added as columns by rewriting the file with the extended
+        header. With append_only the file is never rewritten: the extended
+        header is appended as a CSV_KEYS_PREFIX line, and read_csv uses the
+        last one as the columns of all rows.
+        """
         self.file = open(filename, 'w+t')
         self.keys = []
         self.sep = ','
+        self.append_only = append_only
 
     def writekvs(self, kvs):
         # Add our current row to the history
         extra_keys = list(kvs.keys() - self.keys)
         extra_keys.sort()
-        if extra_keys:
+        if extra_keys and self.append_only:
+            # rows only get longer, the ones above keep their columns
+            if self.keys:
+                self.file.write(CSV_KEYS_PREFIX)
+            self.keys.extend(extra_keys)
+            self.file.write(self.sep.join(self.keys) + '\n')
+        elif extra_keys:
             self.keys.extend(extra_keys)
             self.file.seek(0)
             lines = self.file.readlines()
@@ -129,6 +167,10 @@ class CSVOutputFormat(KVWriter):
             if v is not None:
                 self.file.write(str(v))
         self.file.write('\n')
+        if self.autoflush:
+            self.flush()
+
+    def flush(self):
         self.file.flush()
 
     def close(self):
@@ -162,15 +204,84 @@ class TensorBoardOutputFormat(KVWriter):
         event = self.event_pb2.Event(wall_time=time.time(), summary=summary)
         event.step = self.step # is there any reason why you'd want to specify the step?
         self.writer.WriteEvent(event)
-        self.writer.Flush()
+        if self.autoflush:
+            self.flush()
         self.step += 1
 
+    def flush(self):
+        self.writer.Flush()
+
     def close(self):
         if self.writer:
             self.writer.Close()
             self.writer = None
 
-def make_output_format(format, ev_dir, log_suffix=''):
+class AsyncOutputFormat(KVWriter, SeqWriter):
+    """
+    Writes the records of another output format from a background thread, so
+    that dumpkvs and log only copy them to a queue. The wrapped format is
+    flushed every flush_interval seconds and when it is closed, at the latest
+    at exit. At most max_queue records wait to be written, after that the
+    caller blocks until the thread catches up.
+    """
+    def __init__(self, fmt, flush_interval=10., max_queue=1000):
+        self.fmt = fmt
+        self.fmt.autoflush = False
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def writekvs(self, kvs):
+        if isinstance(self.fmt, KVWriter):
+            # the logger clears its dict after dumpkvs
+            self._put('kvs', dict(kvs))
+
+    def writeseq(self, seq):
+        if isinstance(self.fmt, SeqWriter):
+            self._put('seq', list(seq))
+
+    def _put(self, kind, data):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        self.queue.put((kind, data))
+
+    def _run(self):
+        last_flush = time.time()
+        while True:
+            try:
+                kind, data = self.queue.get(timeout=max(last_flush + self.flush_interval - time.time(), 0.))
+            except queue.Empty:
+                kind, data = None, None
+            try:
+                if kind == 'kvs':
+                    self.fmt.writekvs(data)
+                elif kind == 'seq':
+                    self.fmt.writeseq(data)
+                if kind == 'close' or time.time() >= last_flush + self.flush_interval:
+                    self.fmt.flush()
+                    last_flush = time.time()
+            except Exception as e:
+                # raised in the caller on its next record
+                self.error = e
+            if kind == 'close':
+                return
+
+    def close(self):
+        if self.thread is None:
+            return
+        self.queue.put(('close', None))
+        self.thread.join()
+        self.thread = None
+        atexit.unregister(self.close)
+        self.fmt.close()
+        if self.error is not None:
+            raise self.error
+
+def make_output_format(format, ev_dir, log_suffix='', append_only=False):
     os.makedirs(ev_dir, exist_ok=True)
     if format == 'stdout':
         return HumanOutputFormat(sys.stdout)
@@ -179,7 +290,7 @@ def make_output_format(format, ev_dir, log_suffix=''):
     elif format == 'json':
         return JSONOutputFormat(osp.join(ev_dir, 'progress%s.json' % log_suffix))
     elif format == 'csv':
-        return CSVOutputFormat(osp.join(ev_dir, 'progress%s.csv' % log_suffix))
+        return CSVOutputFormat(osp.join(ev_dir, 'progress%s.csv' % log_suffix), append_only=append_only)
     elif format == 'tensorboard':
         return TensorBoardOutputFormat(osp.join(ev_dir, 'tb%s' % log_suffix))
     else:
@@ -345,7 +456,14 @@ class Logger(object):
             if isinstance(fmt, SeqWriter):
                 fmt.writeseq(map(str, args))
 
-def configure(dir=None, format_strs=None):
+def configure(dir=None, format_strs=None, flush_interval=None):
+    """
+    flush_interval: float or None
+        if set (or with the OPENAI_LOG_FLUSH_INTERVAL environment variable),
+        every output format but stdout writes from a background thread and is
+        flushed every flush_interval seconds instead of on every write, see
+        AsyncOutputFormat. The csv format is then append-only.
+    """
     if dir is None:
         dir = os.getenv('OPENAI_LOGDIR')
     if dir is None:
@@ -369,8 +487,14 @@ def configure(dir=None, format_strs=None):
             format_strs = os.getenv('OPENAI_LOG_FORMAT', 'stdout,log,csv').split(',')
         else:
             format_strs = os.getenv('OPENAI_LOG_FORMAT_MPI', 'log').split(',')
-    format_strs = filter(None, format_strs)
-    output_formats = [make_output_format(f, dir, log_suffix) for f in format_strs]
+    format_strs = list(filter(None, format_strs))
+    if flush_interval is None and os.getenv('OPENAI_LOG_FLUSH_INTERVAL'):
+        flush_interval = float(os.getenv('OPENAI_LOG_FLUSH_INTERVAL'))
+    output_formats = [make_output_format(f, dir, log_suffix, append_only=flush_interval is not None) for f in format_strs]
+    if flush_interval is not None:
+        # stdout stays synchronous, progress is shown as it is logged
+        output_formats = [fmt if f == 'stdout' else AsyncOutputFormat(fmt, flush_interval)
+                          for f, fmt in zip(format_strs, output_formats)]
 
     Logger.CURRENT = Logger(dir=dir, output_formats=output_formats)
     log('Logging to %s'%dir)
@@ -390,13 +514,14 @@ def reset():
         log('Reset logger')
 
 class scoped_configure(object):
-    def __init__(self, dir=None, format_strs=None):
+    def __init__(self, dir=None, format_strs=None, flush_interval=None):
         self.dir = dir
         self.format_strs = format_strs
+        self.flush_interval = flush_interval
         self.prevlogger = None
     def __enter__(self):
         self.prevlogger = Logger.CURRENT
-        configure(dir=self.dir, format_strs=self.format_strs)
+        configure(dir=self.dir, format_strs=self.format_strs, flush_interval=self.flush_interval)
     def __exit__(self, *args):
         Logger.CURRENT.close()
         Logger.CURRENT = self.prevlogger
@@ -446,7 +571,15 @@ def read_json(fname):
 
 def read_csv(fname):
     import pandas
-    return pandas.read_csv(fname, index_col=None, comment='#')
+    keys = None
+    with open(fname, 'rt') as fh:
+        for line in fh:
+            if line.startswith(CSV_KEYS_PREFIX):
+                keys = line[len(CSV_KEYS_PREFIX):].rstrip('\n').split(',')
+    if keys is None:
+        return pandas.read_csv(fname, index_col=None, comment='#')
+    # append-only csv, rows written before the last keys line are shorter
+    return pandas.read_csv(fname, index_col=None, comment='#', header=None, skiprows=1, names=keys)
 
 def read_tb(path):
     """
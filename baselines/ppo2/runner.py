@@ -16,55 +16,93 @@ class Runner(AbstractEnvRunner):
         self.lam = lam
         # Discount rate
         self.gamma = gamma
+        # Mini batch storage, reused by every rollout
+        self.mb_obs = np.zeros((nsteps,) + self.obs.shape, dtype=self.obs.dtype)
+        self.mb_rewards = np.zeros((nsteps, self.nenv), dtype=np.float32)
+        self.mb_values = np.zeros((nsteps, self.nenv), dtype=np.float32)
+        self.mb_neglogpacs = np.zeros((nsteps, self.nenv), dtype=np.float32)
+        self.mb_dones = np.zeros((nsteps, self.nenv), dtype=bool)
+        # shape and dtype of the actions are known after the first step
+        self.mb_actions = None
+        self.mb_advs = np.zeros((nsteps, self.nenv), dtype=np.float32)
 
     def run(self):
-        # Here, we init the lists that will contain the mb of experiences
-        mb_obs, mb_rewards, mb_actions, mb_values, mb_dones, mb_neglogpacs = [],[],[],[],[],[]
         mb_states = self.states
         epinfos = []
+        # (step, env, epinfo) of the episodes ending in this rollout
+        epends = []
         # For n in range number of steps
-        for _ in range(self.nsteps):
+        for t in range(self.nsteps):
             # Given observations, get action value and neglopacs
             # We already have self.obs because Runner superclass run self.obs[:] = env.reset() on init
             actions, values, self.states, neglogpacs = self.model.step(self.obs, S=self.states, M=self.dones)
-            mb_obs.append(self.obs.copy())
-            mb_actions.append(actions)
-            mb_values.append(values)
-            mb_neglogpacs.append(neglogpacs)
-            mb_dones.append(self.dones)
+            if self.mb_actions is None:
+                self.mb_actions = np.zeros((self.nsteps,) + np.shape(actions), dtype=np.asarray(actions).dtype)
+            self.mb_obs[t] = self.obs
+            self.mb_actions[t] = actions
+            self.mb_values[t] = values
+            self.mb_neglogpacs[t] = neglogpacs
+            self.mb_dones[t] = self.dones
 
             # Take actions in env and look the results
             # Infos contains a ton of useful informations
             self.obs[:], rewards, self.dones, infos = self.env.step(actions)
-            for info in infos:
+            self.mb_rewards[t] = rewards
+            for i, info in enumerate(infos):
                 maybeepinfo = info.get('episode')
-                if maybeepinfo: epinfos.append(maybeepinfo)
-            mb_rewards.append(rewards)
-        #batch of steps to batch of rollouts
-        mb_obs = np.asarray(mb_obs, dtype=self.obs.dtype)
-        mb_rewards = np.asarray(mb_rewards, dtype=np.float32)
-        mb_actions = np.asarray(mb_actions)
-        mb_values = np.asarray(mb_values, dtype=np.float32)
-        mb_neglogpacs = np.asarray(mb_neglogpacs, dtype=np.float32)
-        mb_dones = np.asarray(mb_dones, dtype=np.bool)
+                if maybeepinfo:
+                    epends.append((t, i, maybeepinfo))
+                    epinfos.append(maybeepinfo)
         last_values = self.model.value(self.obs, S=self.states, M=self.dones)
+        self.add_bonuses(epends)
 
         # discount/bootstrap off value fn
-        mb_returns = np.zeros_like(mb_rewards)
-        mb_advs = np.zeros_like(mb_rewards)
-        lastgaelam = 0
-        for t in reversed(range(self.nsteps)):
-            if t == self.nsteps - 1:
-                nextnonterminal = 1.0 - self.dones
-                nextvalues = last_values
-            else:
-                nextnonterminal = 1.0 - mb_dones[t+1]
-                nextvalues = mb_values[t+1]
-            delta = mb_rewards[t] + self.gamma * nextvalues * nextnonterminal - mb_values[t]
-            mb_advs[t] = lastgaelam = delta + self.gamma * self.lam * nextnonterminal * lastgaelam
-        mb_returns = mb_advs + mb_values
-        return (*map(sf01, (mb_obs, mb_returns, mb_dones, mb_actions, mb_values, mb_neglogpacs)),
+        compute_gae(self.mb_rewards, self.mb_values, self.mb_dones, last_values, self.dones,
+                    self.gamma, self.lam, out=self.mb_advs)
+        mb_returns = self.mb_advs + self.mb_values
+        return (*map(sf01_copy, (self.mb_obs, mb_returns, self.mb_dones, self.mb_actions, self.mb_values, self.mb_neglogpacs)),
             mb_states, epinfos)
+
+    def add_bonuses(self, epends):
+        """
+        Add exploration bonuses to self.mb_rewards once a rollout is collected,
+        epends holds the (step, env, epinfo) of the episodes that ended in it.
+        No bonuses by default.
+        """
+
+def compute_gae(rewards, values, dones, last_values, last_dones, gamma, lam, out=None):
+    """
+    Generalized advantage estimates of a rollout, all arrays have shape (nsteps, nenv)
+
+    Same results as the step by step computation: the TD errors of all steps
+    are computed at once, in float64, then the backward recursion
+    advs[t] = delta[t] + gamma*lam*nextnonterminal[t]*advs[t+1] is solved by
+    a scan of log2(nsteps) vectorized steps. dones[t] tells whether the
+    episode was reset before step t, last_dones whether it was reset after
+    the last step.
+    """
+    nsteps = len(rewards)
+    nextnonterminal = np.empty(np.shape(rewards), dtype=np.float64)
+    nextnonterminal[:-1] = 1.0 - dones[1:]
+    nextnonterminal[-1] = 1.0 - np.asarray(last_dones)
+    nextvalues = np.empty_like(values)
+    nextvalues[:-1] = values[1:]
+    nextvalues[-1] = last_values
+    delta = rewards + gamma * nextvalues * nextnonterminal - values
+    # discount of the next advantage, zero across episode ends
+    decay = gamma * lam * nextnonterminal
+    # after the step of offset k, delta[t] is the discounted sum of the TD
+    # errors of steps t to t+2k-1 and decay[t] the factor of advs[t+2k] in advs[t]
+    k = 1
+    while k < nsteps:
+        delta[:-k] += decay[:-k] * delta[k:]
+        decay[:-k] = decay[:-k] * decay[k:]
+        k *= 2
+    if out is None:
+        return delta.astype(np.asarray(rewards).dtype)
+    out[:] = delta
+    return out
+
 # obs, returns, masks, actions, values, neglogpacs, states = runner.run()
 def sf01(arr):
     """
@@ -73,4 +111,10 @@ def sf01(arr):
     s = arr.shape
     return arr.swapaxes(0, 1).reshape(s[0] * s[1], *s[2:])
 
-
+def sf01_copy(arr):
+    """
+    sf01 of a buffer reused by every rollout, as a new array: with a single
+    env sf01 is a view the next rollout would overwrite
+    """
+    out = sf01(arr)
+    return out.copy() if np.may_share_memory(out, arr) else out
@@ -0,0 +1,92 @@
+import numpy as np
+from gym import spaces
+
+from baselines.ppo2.runner import Runner, compute_gae
+
+
+def reference_gae(rewards, values, dones, last_values, last_dones, gamma, lam):
+    # step by step computation the runner used before
+    nsteps = len(rewards)
+    advs = np.zeros_like(rewards)
+    lastgaelam = 0
+    for t in reversed(range(nsteps)):
+        if t == nsteps - 1:
+            nextnonterminal = 1.0 - last_dones
+            nextvalues = last_values
+        else:
+            nextnonterminal = 1.0 - dones[t+1]
+            nextvalues = values[t+1]
+        delta = rewards[t] + gamma * nextvalues * nextnonterminal - values[t]
+        advs[t] = lastgaelam = delta + gamma * lam * nextnonterminal * lastgaelam
+    return advs
+
+
+def test_compute_gae_matches_reference():
+    np.random.seed(0)
+    nsteps, nenv = 64, 5
+    rewards = np.random.randn(nsteps, nenv).astype(np.float32)
+    values = np.random.randn(nsteps, nenv).astype(np.float32)
+    dones = np.random.rand(nsteps, nenv) < 0.1
+    last_values = np.random.randn(nenv).astype(np.float32)
+    last_dones = np.random.rand(nenv) < 0.5
+
+    expected = reference_gae(rewards, values, dones, last_values, last_dones, 0.99, 0.95)
+    advs = compute_gae(rewards, values, dones, last_values, last_dones, 0.99, 0.95)
+    assert advs.dtype == np.float32
+    assert np.array_equal(advs, expected)
+
+
+class CountingEnv(object):
+    # every env returns its step count, episodes last 3 steps
+    def __init__(self, nenv):
+        self.num_envs = nenv
+        self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(2,), dtype=np.float32)
+        self.t = np.arange(nenv)
+
+    def reset(self):
+        return np.stack([self.t, -self.t], axis=1).astype(np.float32)
+
+    def step(self, actions):
+        self.t += 1
+        dones = self.t % 3 == 0
+        return self.reset(), actions.astype(np.float32), dones, [{} for _ in range(self.num_envs)]
+
+
+class ConstantModel(object):
+    initial_state = None
+
+    def step(self, obs, S=None, M=None):
+        return obs[:, 0].astype(np.int64), 0.5 * obs[:, 0], None, np.zeros(len(obs))
+
+    def value(self, obs, S=None, M=None):
+        return 0.5 * obs[:, 0]
+
+
+def test_runner_reuses_storage():
+    nsteps, nenv = 4, 2
+    runner = Runner(env=CountingEnv(nenv), model=ConstantModel(), nsteps=nsteps, gamma=0.9, lam=0.8)
+    obs, returns, masks, actions, values, neglogpacs, states, epinfos = runner.run()
+    buffers = runner.mb_obs, runner.mb_actions
+    assert obs.shape == (nsteps * nenv, 2)
+    # env major order, as with sf01
+    assert np.array_equal(obs[:nsteps, 0], [0, 1, 2, 3])
+    assert np.array_equal(actions[nsteps:], [1, 2, 3, 4])
+
+    obs2, returns2, _, actions2, _, _, _, _ = runner.run()
+    assert runner.mb_obs is buffers[0] and runner.mb_actions is buffers[1]
+    assert np.array_equal(obs2[:nsteps, 0], [4, 5, 6, 7])
+    # results of the previous rollout are not overwritten
+    assert np.array_equal(obs[:nsteps, 0], [0, 1, 2, 3])
+    expected = reference_gae(runner.mb_rewards, runner.mb_values, runner.mb_dones,
+                             runner.model.value(runner.obs), runner.dones, 0.9, 0.8) + runner.mb_values
+    assert np.array_equal(returns2, expected.swapaxes(0, 1).reshape(-1))
+
+
+def test_single_env_rollouts_are_copies():
+    runner = Runner(env=CountingEnv(1), model=ConstantModel(), nsteps=3, gamma=0.9, lam=0.8)
+    obs, returns, masks, actions, values, neglogpacs, _, _ = runner.run()
+    batch = [a.copy() for a in (obs, returns, masks, actions, values, neglogpacs)]
+    runner.run()
+    # with a single env sf01 of the storage is a view, the next rollout must not change the batch
+    for a, b in zip((obs, returns, masks, actions, values, neglogpacs), batch):
+        assert np.array_equal(a, b)
@@ -0,0 +1,264 @@
+"""
+Throughput benchmark and golden trajectory regression check of the highway
+simulators, on fixed seeded scenarios:
+
+    highway            single agent Highway-v0, random discrete actions
+    highway_adaptive   the same with adaptive time steps
+    highway_accelerate the agent of Highway-v0 accelerating until it runs into an obstacle
+    highway_accelerate_adaptive  and with adaptive time steps
+    ma_5/10/20         HighwayMultiagent-v0 with 5, 10 and 20 agents, random discrete actions
+    ma_6_lanes         HighwayMultiagent-v0 on a generated 6 lane road, 12 agents and 48 obstacles
+    ma_6_lanes_idm     the same road with IDM/MOBIL background traffic
+    ma_6_lanes_idm_adaptive  and with adaptive time steps
+    planner_3/6        Stackelberg decisions of 3 and 6 cars driven by the controller
+
+Every scenario runs in a fresh process, which reports env steps/sec, simulator
+act calls/sec (one tick each, several with adaptive steps), simulated
+ticks/sec (comparable between fixed and adaptive steps), planner
+decisions/sec and its peak RSS, all over wall time. The vehicle states,
+observations and rewards of every step can be recorded as golden
+trajectories, and later runs compared against them bit for bit. No golden
+trajectories are kept in the repository, as they depend on the numpy and
+pygame versions: record them on the commit before an optimization and check
+the optimized one against them on the same machine.
+
+Usage:
+    git stash; python -m benchmarks.highway --steps 500 --record /tmp/golden
+    git stash pop; python -m benchmarks.highway --steps 500 --check /tmp/golden
+
+With --check, the first collision of every adaptive scenario also has to
+happen within COLLISION_TOLERANCE env steps of the one of its fixed step
+scenario. The highway_accelerate scenarios collide in flight, the other ones
+may not collide at all.
+benchmarks/test_highway.py checks that the scenarios are deterministic.
+"""
+
+import argparse
+import concurrent.futures
+import inspect
+import multiprocessing
+import os
+import os.path as osp
+import resource
+import sys
+import time
+
+import numpy as np
+
+SCENARIOS = ['highway', 'highway_adaptive', 'highway_accelerate', 'highway_accelerate_adaptive', 'ma_5', 'ma_10', 'ma_20', 'ma_6_lanes', 'ma_6_lanes_idm',
+             'ma_6_lanes_idm_adaptive', 'planner_3', 'planner_6']
+# agent count, gym_highway.scenarios.generate_scenario arguments, traffic model and stepping of the multi-agent envs
+ROAD_6_LANES = {'num_lanes': 6, 'road_length': 200.0, 'density': 0.04, 'seed': 0}
+MULTIAGENT = {'ma_5': (5, None, False, False), 'ma_10': (10, None, False, False), 'ma_20': (20, None, False, False),
+              'ma_6_lanes': (12, ROAD_6_LANES, False, False), 'ma_6_lanes_idm': (12, ROAD_6_LANES, True, False),
+              'ma_6_lanes_idm_adaptive': (12, ROAD_6_LANES, True, True)}
+# adaptive step scenario -> the same scenario with fixed steps
+ADAPTIVE = {'highway_adaptive': 'highway', 'highway_accelerate_adaptive': 'highway_accelerate',
+            'ma_6_lanes_idm_adaptive': 'ma_6_lanes_idm'}
+# env steps the first collision of an adaptive scenario can be away from the fixed step one
+COLLISION_TOLERANCE = 1
+
+
+class Counted(object):
+    """Calls of a function"""
+    def __init__(self, fn):
+        self.fn = fn
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+        return self.fn(*args, **kwargs)
+
+
+class CountedTicks(Counted):
+    """Calls of the act of a simulator and the ticks they simulated, its num_ticks argument"""
+    def __init__(self, fn):
+        super(CountedTicks, self).__init__(fn)
+        self.signature = inspect.signature(fn)
+        self.ticks = 0
+
+    def __call__(self, *args, **kwargs):
+        self.ticks += self.signature.bind(*args, **kwargs).arguments.get('num_ticks', 1)
+        return super(CountedTicks, self).__call__(*args, **kwargs)
+
+
+def vehicle_states(vehicles):
+    return np.array([[vehicle.id, vehicle.lane_id, vehicle.position.x, vehicle.position.y,
+                      vehicle.velocity.x, vehicle.velocity.y] for vehicle in vehicles], dtype=np.float64)
+
+
+class Trajectory(object):
+    """Per step arrays of varying size, saved flattened with their sizes"""
+    def __init__(self):
+        self.columns = {}
+
+    def append(self, **arrays):
+        for name, array in arrays.items():
+            self.columns.setdefault(name, []).append(np.asarray(array, dtype=np.float64).ravel())
+
+    def arrays(self):
+        arrays = {}
+        for name, steps in self.columns.items():
+            arrays[name] = np.concatenate(steps)
+            arrays[name + '_sizes'] = np.array([len(step) for step in steps])
+        return arrays
+
+
+def run_env(env, sim, sample_action, steps, seed):
+    act = sim.act = CountedTicks(sim.act)
+    rng = np.random.RandomState(seed)
+    trajectory = Trajectory()
+    env.seed(seed)
+    env.reset()
+    start = time.perf_counter()
+    for _ in range(steps):
+        obs, rew, done, _ = env.step(sample_action(rng))
+        trajectory.append(obs=obs, rew=rew, done=done, vehicles=vehicle_states(sim.all_obstacles),
+                          collisions=sim.num_obs_collisions + sim.num_agent_collisions)
+        if np.any(done):
+            env.reset()
+    seconds = time.perf_counter() - start
+    return {'steps_per_sec': steps / seconds, 'acts_per_sec': act.calls / seconds,
+            'ticks_per_sec': act.ticks / seconds}, trajectory
+
+
+def run_planner(num_players, steps, seed):
+    from gym_highway.envs.multi_lane_sim import Constants, HighwaySimulator
+    from gym_highway.envs.stackelbergPlayer import StackelbergPlayer
+
+    lanes = [Constants.LANE_1_C, Constants.LANE_2_C, Constants.LANE_3_C]
+    cars_list = [{'id':i, 'x':10 + 5*(i//3), 'y':lanes[i % 3], 'vel_x':10.0, 'vel_y':0.0, 'lane_id':i % 3 + 1}
+                 for i in range(num_players)]
+    obstacle_list = [{'id':100 + i, 'x':-20 - 5*i, 'y':lanes[i], 'vel_x':7.0 - i, 'lane_id':i + 1, 'color':Constants.YELLOW}
+                     for i in range(3)]
+    sim = HighwaySimulator(cars_list, obstacle_list, inf_obs=True)
+    sim.seed(seed)
+    controller = StackelbergPlayer(Constants.CAR_WIDTH)
+    select = controller.selectAction = Counted(controller.selectAction)
+    dt = 1.0/sim.ticks
+    ticks_per_decision = max(int(Constants.ACTION_RESET_TIME/dt), 1)
+
+    trajectory = Trajectory()
+    start = time.perf_counter()
+    for _ in range(steps):
+        selected = {}
+        sim.stackelbergControl(controller, sim.reference_car, sim.all_agents, sim.all_obstacles, dt, selected)
+        for _ in range(ticks_per_decision):
+            sim.all_agents.update(dt, sim.reference_car, sim.continuous_ctrl)
+            sim.all_coming_cars.update(dt, sim.reference_car)
+        sim.reference_car = max(sim.all_agents, key=lambda car: car.position.x)
+        trajectory.append(actions=[selected.get(car.id, -1) for car in sim.all_agents],
+                          vehicles=vehicle_states(sim.all_obstacles))
+    seconds = time.perf_counter() - start
+    return {'steps_per_sec': steps / seconds, 'decisions_per_sec': select.calls / seconds}, trajectory
+
+
+def run_scenario(name, steps, seed):
+    """Metrics and golden arrays of a scenario, run in a fresh process"""
+    # headless simulation, pygame does not need a display
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    if name.startswith('highway'):
+        from gym_highway.envs import HighwayEnv
+        from gym_highway.envs.highway_env import ACTION_LOOKUP
+        from gym_highway.envs.multi_lane_sim import Action
+        env = HighwayEnv(manual=False, inf_obs=True, save=False, render=False, real_time=False,
+                         adaptive_step=name.endswith('_adaptive'))
+        if name.startswith('highway_accelerate'):
+            accelerate = next(index for index, action in ACTION_LOOKUP.items() if action == Action.ACCELERATE)
+            sample_action = lambda rng: accelerate
+        else:
+            sample_action = lambda rng: rng.randint(len(ACTION_LOOKUP))
+        metrics, trajectory = run_env(env, env.env, sample_action, steps, seed)
+    elif name in MULTIAGENT:
+        from gym_highway.multiagent_envs import MultiAgentEnv
+        from gym_highway.multiagent_envs.actions import Action
+        num_agents, scenario_config, idm_traffic, adaptive_step = MULTIAGENT[name]
+        env = MultiAgentEnv(world_config={'manual': False, 'inf_obs': True, 'save': False, 'render': False,
+                                          'real_time': False, 'idm_traffic': idm_traffic},
+                            num_agents=num_agents, scenario_config=scenario_config, adaptive_step=adaptive_step)
+        def sample_action(rng):
+            return list(np.eye(len(Action))[rng.randint(len(Action), size=env.n)])
+        metrics, trajectory = run_env(env, env.world, sample_action, steps, seed)
+    elif name.startswith('planner_'):
+        metrics, trajectory = run_planner(int(name[len('planner_'):]), steps, seed)
+    else:
+        raise ValueError('Unknown scenario {}'.format(name))
+    # kilobytes on linux
+    metrics['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2 ** 10
+    return metrics, trajectory.arrays()
+
+
+def compare(golden, arrays):
+    """Names of the arrays that differ from the golden ones, bit for bit"""
+    names = set(golden) | set(arrays)
+    return sorted(name for name in names if name not in golden or name not in arrays
+                  or golden[name].shape != arrays[name].shape or golden[name].tobytes() != arrays[name].tobytes())
+
+
+def first_collision(arrays):
+    """Env step of the first collision of a run, None without collisions"""
+    steps = np.flatnonzero(arrays['collisions'])
+    return int(steps[0]) if len(steps) else None
+
+
+def same_collisions(fixed, adaptive, tolerance=COLLISION_TOLERANCE):
+    """Whether the runs of a scenario with fixed and adaptive steps first collide within tolerance steps"""
+    fixed, adaptive = first_collision(fixed), first_collision(adaptive)
+    if fixed is None or adaptive is None:
+        return fixed is adaptive
+    return abs(fixed - adaptive) <= tolerance
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--scenarios', nargs='*', default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument('--steps', type=int, default=500, help='env steps or planner decision rounds per scenario')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--record', type=str, default=None, help='directory to save the golden trajectories to')
+    parser.add_argument('--check', type=str, default=None, help='directory of golden trajectories to compare with')
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    failed = []
+    print('{:>10} {:>10} {:>10} {:>10} {:>12} {:>10} {:>8}'.format(
+        'scenario', 'steps/s', 'acts/s', 'ticks/s', 'decisions/s', 'rss(MB)', 'golden'))
+    runs = {}
+    for name in args.scenarios:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            metrics, arrays = executor.submit(run_scenario, name, args.steps, args.seed).result()
+        runs[name] = arrays
+
+        status = '-'
+        filename = '{}_{}_{}.npz'.format(name, args.steps, args.seed)
+        if args.record:
+            os.makedirs(args.record, exist_ok=True)
+            np.savez(osp.join(args.record, filename), **arrays)
+            status = 'saved'
+        if args.check and not osp.exists(osp.join(args.check, filename)):
+            status = 'missing'
+            failed.append((name, 'no golden trajectory in {}'.format(args.check)))
+        elif args.check:
+            with np.load(osp.join(args.check, filename)) as golden:
+                different = compare(dict(golden), arrays)
+            status = 'differs' if different else 'same'
+            if different:
+                failed.append((name, '{} differ from the golden trajectory'.format(', '.join(different))))
+        print('{:>10} {:>10.1f} {:>10} {:>10} {:>12} {:>10.1f} {:>8}'.format(
+            name, metrics['steps_per_sec'],
+            *['{:.1f}'.format(metrics[k]) if k in metrics else '-'
+              for k in ('acts_per_sec', 'ticks_per_sec', 'decisions_per_sec')],
+            metrics['peak_rss_mb'], status))
+
+    if args.check:
+        for adaptive, fixed in ADAPTIVE.items():
+            if adaptive in runs and fixed in runs and not same_collisions(runs[fixed], runs[adaptive]):
+                failed.append((adaptive, 'first collision at step {}, at step {} with fixed steps'.format(
+                    first_collision(runs[adaptive]), first_collision(runs[fixed]))))
+
+    for name, message in failed:
+        print('{}: {}'.format(name, message))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Micro-benchmark of the array-backed ReplayBuffer against the previous
+list-of-tuples implementation.
+
+Usage:
+    python -m benchmarks.replay_buffer --size 1000000 --batch_size 1440
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from baselines.common.replay_buffer import ReplayBuffer
+
+
+class ListReplayBuffer(object):
+    """The list-of-tuples buffer that ReplayBuffer replaced, kept as a reference."""
+    def __init__(self, size):
+        self._storage = []
+        self._maxsize = int(size)
+        self._next_idx = 0
+
+    def __len__(self):
+        return len(self._storage)
+
+    def add(self, obs_t, action, reward, obs_tp1, done):
+        data = (obs_t, action, reward, obs_tp1, done)
+
+        if self._next_idx >= len(self._storage):
+            self._storage.append(data)
+        else:
+            self._storage[self._next_idx] = data
+        self._next_idx = (self._next_idx + 1) % self._maxsize
+
+    def _encode_sample(self, idxes):
+        obses_t, actions, rewards, obses_tp1, dones = [], [], [], [], []
+        for i in idxes:
+            data = self._storage[i]
+            obs_t, action, reward, obs_tp1, done = data
+            obses_t.append(np.asarray(obs_t))
+            actions.append(np.asarray(action))
+            rewards.append(reward)
+            obses_tp1.append(np.asarray(obs_tp1))
+            dones.append(done)
+        return np.array(obses_t), np.array(actions), np.array(rewards), np.array(obses_tp1), np.array(dones)
+
+    def make_index(self, batch_size):
+        return [random.randint(0, len(self._storage) - 1) for _ in range(batch_size)]
+
+    def sample_index(self, idxes):
+        return self._encode_sample(idxes)
+
+    def sample(self, batch_size):
+        return self._encode_sample(self.make_index(batch_size))
+
+
+def make_transitions(n, obs_dim, act_dim):
+    obs = np.random.uniform(size=(n, obs_dim)).astype(np.float32)
+    obs_tp1 = np.random.uniform(size=(n, obs_dim)).astype(np.float32)
+    actions = np.random.uniform(-1, 1, size=(n, act_dim)).astype(np.float32)
+    rewards = np.random.uniform(-1, 0, size=n)
+    dones = (np.random.uniform(size=n) < 0.01).astype(np.float32)
+    return obs, actions, rewards, obs_tp1, dones
+
+
+def timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def fill(buffer, transitions):
+    for obs, act, rew, obs_tp1, done in zip(*transitions):
+        # copy so that every stored observation is its own object, as with a real env
+        buffer.add(obs.copy(), act.copy(), rew, obs_tp1.copy(), float(done))
+    return buffer
+
+
+def benchmark(buffer_cls, transitions, batch_size, repeat):
+    size = len(transitions[0])
+    add_time = timeit(lambda: fill(buffer_cls(size), transitions), 1) / size
+
+    gc.collect()
+    tracemalloc.start()
+    buffer = fill(buffer_cls(size), transitions)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    gc_time = timeit(gc.collect, 3)
+    sample_time = timeit(lambda: buffer.sample(batch_size), repeat)
+    return {'add_us': add_time * 1e6, 'sample_ms': sample_time * 1e3,
+            'gc_ms': gc_time * 1e3, 'peak_mb': peak / 2 ** 20}
+
+
+def check_parity(transitions, batch_size):
+    new_buffer = fill(ReplayBuffer(batch_size), [x[:batch_size] for x in transitions])
+    old_buffer = fill(ListReplayBuffer(batch_size), [x[:batch_size] for x in transitions])
+    idxes = new_buffer.make_index(batch_size)
+    for new, old in zip(new_buffer.sample_index(idxes), old_buffer.sample_index(idxes)):
+        assert np.allclose(new, old), "array-backed buffer returned different transitions"
+
+
+def main():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--size', type=int, default=int(1e5), help='number of transitions stored')
+    parser.add_argument('--batch_size', type=int, default=1440)
+    parser.add_argument('--obs_dim', type=int, default=34, help='5 agent highway observation size')
+    parser.add_argument('--act_dim', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=50, help='number of timed sample calls')
+    parser.add_argument('--batched_add', default=False, action='store_true',
+                        help='also time ReplayBuffer.add_batch in chunks of batch_size')
+    args = parser.parse_args()
+
+    np.random.seed(0)
+    random.seed(0)
+    transitions = make_transitions(args.size, args.obs_dim, args.act_dim)
+
+    check_parity(transitions, args.batch_size)
+
+    results = {}
+    results['list'] = benchmark(ListReplayBuffer, transitions, args.batch_size, args.repeat)
+    results['array'] = benchmark(ReplayBuffer, transitions, args.batch_size, args.repeat)
+
+    if args.batched_add:
+        buffer = ReplayBuffer(args.size)
+        start = time.perf_counter()
+        for i in range(0, args.size, args.batch_size):
+            buffer.add_batch(*[x[i:i + args.batch_size] for x in transitions])
+        results['array_batched'] = {'add_us': (time.perf_counter() - start) / args.size * 1e6}
+
+    print('{:>14} {:>10} {:>10} {:>10} {:>10}'.format('buffer', 'add(us)', 'sample(ms)', 'gc(ms)', 'peak(MB)'))
+    for name, res in results.items():
+        print('{:>14} {:>10.2f} {:>10} {:>10} {:>10}'.format(
+            name, res['add_us'],
+            *['{:.2f}'.format(res[k]) if k in res else '-' for k in ('sample_ms', 'gc_ms', 'peak_mb')]))
+
+
+if __name__ == '__main__':
+    main()
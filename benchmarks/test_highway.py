@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from benchmarks.highway import ADAPTIVE, COLLISION_TOLERANCE, compare, first_collision, run_scenario, same_collisions
+
+
+@pytest.mark.parametrize('name', ['highway', 'ma_5', 'ma_6_lanes_idm_adaptive', 'planner_3'])
+def test_seeded_runs_are_deterministic(name):
+    pytest.importorskip('pygame')
+    metrics, arrays = run_scenario(name, 20, seed=1)
+    _, again = run_scenario(name, 20, seed=1)
+    assert compare(arrays, again) == []
+    assert all(np.isfinite(value) for value in metrics.values())
+
+
+def test_same_collisions():
+    run = lambda *collisions: {'collisions': np.array(collisions)}
+    assert first_collision(run(0, 0, 1, 0)) == 2 and first_collision(run(0, 0)) is None
+    assert same_collisions(run(0, 0, 1), run(0, 1, 0)) and same_collisions(run(0, 0), run(0, 0))
+    assert not same_collisions(run(1, 0, 0), run(0, 0, 1)) and not same_collisions(run(0, 1), run(0, 0))
+
+
+@pytest.mark.parametrize('adaptive', sorted(ADAPTIVE))
+def test_adaptive_steps_collide_like_fixed_steps(adaptive):
+    pytest.importorskip('pygame')
+    metrics, arrays = run_scenario(adaptive, 200, seed=0)
+    fixed_metrics, fixed_arrays = run_scenario(ADAPTIVE[adaptive], 200, seed=0)
+    assert same_collisions(fixed_arrays, arrays)
+    # adaptive acts simulate one tick or more, fixed ones a single tick
+    assert metrics['acts_per_sec'] / metrics['ticks_per_sec'] <= 1.0
+    assert fixed_metrics['acts_per_sec'] == fixed_metrics['ticks_per_sec']
+
+
+def test_adaptive_steps_collide_in_flight_like_fixed_steps():
+    pytest.importorskip('pygame')
+    _, arrays = run_scenario('highway_accelerate_adaptive', 100, seed=0)
+    _, fixed_arrays = run_scenario('highway_accelerate', 100, seed=0)
+    # the agent starts clear of the obstacles and runs into one
+    collision, fixed_collision = first_collision(arrays), first_collision(fixed_arrays)
+    assert collision is not None and fixed_collision is not None
+    assert collision > 0 and fixed_collision > 0
+    assert abs(collision - fixed_collision) <= COLLISION_TOLERANCE
@@ -0,0 +1,64 @@
+'''
+Evaluate a policy on seeded episodes of the highway envs in parallel, and print
+the collision rate, mean speed, lane changes and episode length of every config.
+
+    python evaluate.py --policy stackelberg --agents 1 2 3 --seeds 100
+    python evaluate.py --policy actor --load_path <run dir>/actor.npz --agents 2
+    python evaluate.py --policy ppo2 --load_path <run dir>/checkpoints/00100 --seeds 50
+
+The episodes are appended to --results (by default evaluation.csv in
+Config.results_dir) with the policy and its load path, running the same
+command again only runs the missing episodes of that policy.
+'''
+import argparse
+import functools
+import os.path as osp
+
+import models.config as Config
+from models import evaluation
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--policy', help='policy to evaluate', choices=['stackelberg', 'actor', 'ppo2'], default='stackelberg')
+    parser.add_argument('--load_path', help='npz file of export_actor.py (actor) or ppo2 checkpoint (ppo2)', type=str, default=None)
+    parser.add_argument('--network', help='network of the ppo2 policy', type=str, default='mlp')
+    parser.add_argument('--agents', help='agent counts of the multi-agent env, the single agent env if not given', type=int, nargs='*', default=None)
+    parser.add_argument('--discrete', help='use the discrete multi-agent env', default=False, action='store_true')
+    parser.add_argument('--seeds', help='number of seeded episodes of every config', type=int, default=20)
+    parser.add_argument('--max_steps', help='limit on the steps of an episode', type=int, default=None)
+    parser.add_argument('--num_workers', help='worker processes, 0 to run in this process', type=int, default=Config.num_workers)
+    parser.add_argument('--results', help='csv file of the episodes', type=str, default=None)
+    return parser
+
+
+def main():
+    args = parse_args().parse_args()
+    if args.policy != 'stackelberg' and args.load_path is None:
+        raise ValueError("--load_path is required with --policy {}".format(args.policy))
+
+    if args.policy == 'actor':
+        policy_fn = functools.partial(evaluation.ActorPolicy, osp.expanduser(args.load_path))
+    elif args.policy == 'ppo2':
+        policy_fn = functools.partial(evaluation.PPOPolicy, osp.expanduser(args.load_path), network=args.network)
+    else:
+        policy_fn = evaluation.StackelbergPolicy
+
+    if args.agents:
+        env_fn = evaluation.make_ma_env
+        configs = evaluation.agent_count_configs(args.agents, continuous=not args.discrete)
+    else:
+        env_fn = evaluation.make_highway_env
+        configs = {'highway': {}}
+
+    results_path = args.results or osp.expanduser("{}/evaluation.csv".format(Config.results_dir))
+    results = evaluation.evaluate(env_fn, policy_fn, list(range(args.seeds)), configs=configs,
+                                  results_path=results_path, num_workers=args.num_workers,
+                                  max_steps=args.max_steps,
+                                  policy_name=evaluation.policy_id(args.policy, args.load_path))
+    print(evaluation.summarize(results[results['config'].isin(list(configs))]).to_string())
+    print("-----> Episodes saved to: {}".format(results_path))
+
+
+if __name__ == '__main__':
+    main()
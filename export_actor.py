@@ -0,0 +1,46 @@
+'''
+Export the actor of a DDPG or MADDPG run to a .npz file for inference with
+baselines.ddpg.numpy_actor.NumpyActor, which does not need tensorflow.
+
+    python export_actor.py --load_path <run dir in Config.results_dir> [--checkpoint 00100] [--output actor.npz]
+'''
+import argparse
+import json
+import os.path as osp
+
+import joblib
+
+import models.config as Config
+from baselines.ddpg.numpy_actor import export_actor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--load_path', help='run directory, relative to Config.results_dir', type=str, required=True)
+    parser.add_argument('--checkpoint', help='checkpoint in the run checkpoints directory', type=str, default='checkpoints-final')
+    parser.add_argument('--output', help='npz file, defaults to actor.npz in the run directory', type=str, default=None)
+    parser.add_argument('--activation', help='hidden activation, defaults to the one in the run configs.txt', type=str, default=None)
+    return parser
+
+
+def main():
+    args = parse_args().parse_args()
+    run_dir = osp.expanduser("{}/{}".format(Config.results_dir, args.load_path))
+    load_path = "{}/checkpoints/{}".format(run_dir, args.checkpoint)
+
+    # training arguments saved by models.utils.save_configs
+    train_args = Config.maddpg_train_args
+    config_path = "{}/configs.txt".format(run_dir)
+    if osp.exists(config_path):
+        with open(config_path, encoding='utf-8') as f:
+            train_args = json.load(f)[1]
+    activation = args.activation or train_args['activation']
+
+    output = args.output or osp.join(run_dir, 'actor.npz')
+    export_actor(joblib.load(load_path), output, activation,
+                 normalize_observations=train_args.get('normalize_observations', True))
+    print("-----> Actor exported to: {}".format(output))
+
+
+if __name__ == '__main__':
+    main()
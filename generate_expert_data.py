@@ -0,0 +1,89 @@
+'''
+Generate a planner demonstration dataset for behaviour cloning and GAIL: the
+Stackelberg controller drives seeded Highway episodes in parallel, and the
+(observation, action) pairs of HighwayEnv are written to shards readable by
+baselines.gail.dataset.shard_dset.Shard_Dset. The discrete actions are stored
+one-hot coded, as float32 vectors of the size of the action space, which the
+GAIL adversary takes with the observations and behavior_clone fits with a
+cross-entropy loss.
+
+    python generate_expert_data.py --output ~/gym_highway_results/expert --shards 100
+
+The directory is then given as --expert_path to baselines.gail.run_mujoco or
+baselines.gail.behavior_clone.
+
+A shard holds --episodes seeded episodes, and the shards already written are
+skipped, so an interrupted run continues where it stopped.
+'''
+import argparse
+import multiprocessing
+import os.path as osp
+
+import numpy as np
+
+import models.config as Config
+from baselines.gail.dataset.shard_dset import list_shards, write_shard
+from models import evaluation
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('--output', help='directory of the shards', type=str, required=True)
+    parser.add_argument('--shards', help='number of shards', type=int, default=10)
+    parser.add_argument('--episodes', help='episodes per shard', type=int, default=20)
+    parser.add_argument('--max_steps', help='limit on the steps of an episode', type=int, default=None)
+    parser.add_argument('--num_workers', help='worker processes, 0 to run in this process', type=int, default=Config.num_workers)
+    return parser
+
+
+def generate_shard(output, shard, episodes, max_steps=None):
+    env = evaluation.make_highway_env()
+    policy = evaluation.StackelbergPolicy()
+    obs, acs, ep_rets, ep_lens = [], [], [], []
+    for seed in range(shard*episodes, (shard+1)*episodes):
+        env.seed(seed)
+        np.random.seed(seed)
+        ob = env.reset()
+        policy.reset(env)
+        done, ep_ret, ep_len = False, 0.0, 0
+        while not done and (max_steps is None or ep_len < max_steps):
+            ac = policy(ob, env)
+            obs.append(ob)
+            acs.append(ac)
+            ob, rew, done, _ = env.step(ac)
+            ep_ret += rew
+            ep_len += 1
+        ep_rets.append(ep_ret)
+        ep_lens.append(ep_len)
+    env.close()
+    one_hot = np.eye(env.action_space.n, dtype=np.float32)
+    write_shard(output, shard, np.array(obs, dtype=np.float32), one_hot[np.array(acs, dtype=np.int64)], ep_rets, ep_lens)
+    return shard
+
+
+def _generate_shard(args):
+    return generate_shard(*args)
+
+
+def main():
+    args = parse_args().parse_args()
+    output = osp.expanduser(args.output)
+    done = {shard for shard, _ in list_shards(output)} if osp.isdir(output) else set()
+    tasks = [(output, shard, args.episodes, args.max_steps) for shard in range(args.shards) if shard not in done]
+
+    if args.num_workers == 0:
+        results = map(_generate_shard, tasks)
+    else:
+        # spawn, so that workers do not inherit pygame state
+        pool = multiprocessing.get_context('spawn').Pool(min(args.num_workers, max(len(tasks), 1)))
+        results = pool.imap_unordered(_generate_shard, tasks)
+    for i, shard in enumerate(results):
+        print("shard {} written ({}/{})".format(shard, i + 1, len(tasks)))
+    if args.num_workers != 0:
+        pool.close()
+        pool.join()
+    print("-----> Expert dataset saved to: {}".format(output))
+
+
+if __name__ == '__main__':
+    main()
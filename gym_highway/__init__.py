@@ -9,6 +9,13 @@ register(
     # kwargs={'manual': False, 'inf_obs': True, 'save': False, 'render': True}
 )
 
+# NGSIM replay traffic, from a store written by multi_lane_sim.preprocessNgsimData
+register(
+    id='HighwayNgsim-v0',
+    entry_point='gym_highway.envs:NgsimReplayEnv',
+    kwargs={'store_dir': 'ngsim_store'}
+)
+
 # Multiagent envs
 # ----------------------------------------
 register(
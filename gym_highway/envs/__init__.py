@@ -1,2 +1,3 @@
 from gym_highway.envs.highway_env import HighwayEnv
 from gym_highway.envs.highway_env_cont import HighwayEnvContinuous
+from gym_highway.envs.ngsim_env import NgsimReplayEnv
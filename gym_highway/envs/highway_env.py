@@ -8,6 +8,8 @@ import numpy as np
 
 # import multi_lane_sim as mls
 from gym_highway.envs.multi_lane_sim import HighwaySimulator, Action, Constants
+from gym_highway.scenarios import configure_lanes, generate_scenario
+from gym_highway.stepping import substeps
 import logging
 logger = logging.getLogger(__name__)
 
@@ -22,24 +24,44 @@ ACTION_LOOKUP = {
 class HighwayEnv(gym.Env, utils.EzPickle):
     metadata = {'render.modes': ['human']}
 
-    def __init__(self, manual=False, inf_obs=True, save=False, render=True, real_time=False):
+    def __init__(self, manual=False, inf_obs=True, save=False, render=True, real_time=False, scenario=None,
+                 idm_traffic=False, adaptive_step=False):
+        """
+        scenario : dict, optional
+            keyword arguments of gym_highway.scenarios.generate_scenario, except
+            num_agents, for a random road instead of the fixed 3 lane one
+        idm_traffic : bool
+            obstacles follow the IDM and change lanes with MOBIL
+            (gym_highway.traffic) instead of driving at constant velocity
+        adaptive_step : bool
+            advance the simulator by several frames at once while no
+            vehicles are close (gym_highway.stepping)
+        """
         self.__version__ = "0.0.1"
         logging.info("HighwayEnv - Version {}".format(self.__version__))
+        self.adaptive_step = adaptive_step
+        # Constants is shared by all the simulators of the process: every env sets the
+        # lanes of its road, also the default 3 lane one, and sets them again on reset
+        self.num_lanes = (scenario or {}).get('num_lanes', 3)
+        configure_lanes(Constants, self.num_lanes)
 
-        self.env = self._configure_environment(manual, inf_obs, save, render, real_time)
+        self.env = self._configure_environment(manual, inf_obs, save, render, real_time, scenario, idm_traffic)
 
         self.action_space = spaces.Discrete(len(Action))
 
-        num_vehicles = len(self.env.cars_list) + 3 # max 3 obstacles on road at any given time
+        # the lead obstacle of every lane is observed
+        num_vehicles = len(self.env.cars_list) + Constants.NUM_LANES
 
         control_low = np.array([-5.0, -30.0])
         control_high = np.array([5.0, 30.0])
+        # y bound of the 3 lane road, wider roads bound by their width
+        road_y = max(8.0, Constants.HEIGHT/Constants.ppu)
 
         # first bound is for raw min position
-        pos_low = np.array([0.0, 0.0]+[-60.0, -8.0]*(num_vehicles-1)).flatten()
+        pos_low = np.array([0.0, 0.0]+[-60.0, -road_y]*(num_vehicles-1)).flatten()
         vel_low = np.array([-20.0, -20.0]*num_vehicles).flatten()
         # first bound is for raw max position
-        pos_high = np.array([1200.0, 8.0]+[60.0, 8.0]*(num_vehicles-1)).flatten()
+        pos_high = np.array([1200.0, road_y]+[60.0, road_y]*(num_vehicles-1)).flatten()
         vel_high = np.array([20.0, 20.0]*num_vehicles).flatten()
         
         low = np.concatenate((control_low, pos_low, vel_low))
@@ -50,7 +72,12 @@ class HighwayEnv(gym.Env, utils.EzPickle):
 
         self.observation_space = spaces.Box(low, high, dtype=np.float32)
 
-    def _configure_environment(self, manual, inf_obs, save, render, real_time):
+    def _configure_environment(self, manual, inf_obs, save, render, real_time, scenario=None, idm_traffic=False):
+        if scenario is not None:
+            cars_list, obstacle_list = generate_scenario(num_agents=1, **scenario)
+            return HighwaySimulator(cars_list, obstacle_list, manual, inf_obs, save, render, real_time,
+                                    idm_traffic=idm_traffic)
+
         # initial positions of obstacles and agents
         obstacle_1 = {'id':1, 'x':-20, 'y':Constants.LANE_1_C, 'vel_x':7.0, 'lane_id':1, 'color':Constants.YELLOW}
         obstacle_2 = {'id':2, 'x':-25, 'y':Constants.LANE_2_C, 'vel_x':5.0, 'lane_id':2, 'color':Constants.YELLOW}
@@ -64,7 +91,8 @@ class HighwayEnv(gym.Env, utils.EzPickle):
         # car_5 = {'id':4, 'x':5, 'y':LANE_3_C, 'vel_x':10.0, 'vel_y':0.0, 'lane_id':3}
         cars_list = [car_1]
 
-        highwaySim = HighwaySimulator(cars_list, obstacle_list, manual, inf_obs, save, render, real_time)
+        highwaySim = HighwaySimulator(cars_list, obstacle_list, manual, inf_obs, save, render, real_time,
+                                      idm_traffic=idm_traffic)
         return highwaySim
 
     def step(self, action):
@@ -100,8 +128,8 @@ class HighwayEnv(gym.Env, utils.EzPickle):
 
         # allow for actions at 4Hz
         num_steps = int(self.env.ticks/4)
-        for _ in range(num_steps):
-            reward = self._take_action(action)
+        for num_ticks in substeps(self.env, num_steps, self.adaptive_step):
+            reward = self._take_action(action, num_ticks)
 
             # if action leads to crash, end the run
             if reward < -1.0:
@@ -113,10 +141,10 @@ class HighwayEnv(gym.Env, utils.EzPickle):
 
         return ob, reward, self.env.is_episode_over(), self.env.get_info()
 
-    def _take_action(self, action):
+    def _take_action(self, action, num_ticks=1):
         """ Converts the action space into an Enum action. """
         action_type = ACTION_LOOKUP[action]
-        return self.env.act(action_type)
+        return self.env.act(action_type, num_ticks)
 
     def reset(self):
         """
@@ -125,6 +153,7 @@ class HighwayEnv(gym.Env, utils.EzPickle):
         -------
         observation (object): the initial observation of the space.
         """
+        configure_lanes(Constants, self.num_lanes)
         self.env.reset()
         return self._get_state()
 
@@ -4,14 +4,18 @@ import numpy as np
 
 from gym import error, spaces
 from gym_highway.envs.highway_env import HighwayEnv
+from gym_highway.envs.multi_lane_sim import Constants
+from gym_highway.stepping import substeps
 
 logger = logging.getLogger(__name__)
 
 class HighwayEnvContinuous(HighwayEnv):
     metadata = {'render.modes': ['human']}
 
-    def __init__(self, manual=False, inf_obs=True, save=False, render=True, real_time=False):
-        HighwayEnv.__init__(self, manual=manual, inf_obs=inf_obs, save=save, render=render, real_time=real_time)
+    def __init__(self, manual=False, inf_obs=True, save=False, render=True, real_time=False, scenario=None,
+                 idm_traffic=False, adaptive_step=False):
+        HighwayEnv.__init__(self, manual=manual, inf_obs=inf_obs, save=save, render=render, real_time=real_time,
+                            scenario=scenario, idm_traffic=idm_traffic, adaptive_step=adaptive_step)
         logging.info("HighwayEnvContinuous - Version {}".format(self.__version__))
 
         # update env for continuous action space
@@ -20,15 +24,17 @@ class HighwayEnvContinuous(HighwayEnv):
         self.action_space = spaces.Box(np.array([-1.0, -1.0]), np.array([1.0, 1.0]), dtype=np.float32)
 
         # define observation space
-        num_vehicles = len(self.env.cars_list) + 3 # max 3 obstacles on road at any given time
+        num_vehicles = len(self.env.cars_list) + Constants.NUM_LANES # closest obstacle of every lane
         control_low = np.array([-5.0, -30.0])
         control_high = np.array([5.0, 30.0])
+        # y bound of the 3 lane road, wider roads bound by their width
+        road_y = max(8.0, Constants.HEIGHT/Constants.ppu)
 
         # first bound is for raw min position
-        pos_low = np.array([0.0, 0.0]+[-60.0, -8.0]*(num_vehicles-1)).flatten()
+        pos_low = np.array([0.0, 0.0]+[-60.0, -road_y]*(num_vehicles-1)).flatten()
         vel_low = np.array([-20.0, -20.0]*num_vehicles).flatten()
         # first bound is for raw max position
-        pos_high = np.array([1200.0, 8.0]+[60.0, 8.0]*(num_vehicles-1)).flatten()
+        pos_high = np.array([1200.0, road_y]+[60.0, road_y]*(num_vehicles-1)).flatten()
         vel_high = np.array([20.0, 20.0]*num_vehicles).flatten()
         
         low = np.concatenate((control_low, pos_low, vel_low))
@@ -43,8 +49,8 @@ class HighwayEnvContinuous(HighwayEnv):
         reward = 0.0
         # allow for actions at 4Hz
         num_steps = int(self.env.ticks/4)
-        for _ in range(num_steps):
-            reward = self.env.act(action)
+        for num_ticks in substeps(self.env, num_steps, self.adaptive_step):
+            reward = self.env.act(action, num_ticks)
             # if action leads to crash, end the run
             if reward < -1.0:
                 break
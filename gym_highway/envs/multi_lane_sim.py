@@ -1,6 +1,6 @@
 import math
+import multiprocessing
 import os
-import pickle
 import random
 from argparse import ArgumentParser
 from enum import Enum
@@ -14,6 +14,10 @@ from pygame.math import Vector2
 
 # import stackelbergPlayer as SCP
 from gym_highway.envs.stackelbergPlayer import StackelbergPlayer, Action
+from gym_highway.ngsim import NGSIM_OBSTACLES, loadNgsimData, loadNgsimStore, preprocessNgsimData, relativeToAbsolute
+from gym_highway.recorder import action_index, vehicle_states
+from gym_highway.stepping import safe_ticks
+from gym_highway.traffic import IDMTraffic
 # from stackelbergPlayer import Action, StackelbergPlayer
 
 
@@ -347,7 +351,7 @@ class Obstacle(pygame.sprite.Sprite):
         self.rect.y = self.position.y * Constants.ppu - self.rect.height / 2
 
 class HighwaySimulator:
-    def __init__(self, cars_list, obstacle_list, manual=False, inf_obs=False, saved=False, render=False, real_time=False, continuous=False):
+    def __init__(self, cars_list, obstacle_list, manual=False, inf_obs=False, saved=False, render=False, real_time=False, continuous=False, idm_traffic=False):
         pygame.init()
         width = Constants.WIDTH
         height = Constants.HEIGHT
@@ -368,6 +372,10 @@ class HighwaySimulator:
         self.render = render
         self.continuous_ctrl = continuous
         self.total_runs = 100
+        # obstacles are spawned from this generator, seeded by seed()
+        self.random = random.Random()
+        # obstacles drive at constant velocity unless IDM/MOBIL traffic is used
+        self.traffic = IDMTraffic(Constants.NEW_LANES, Constants.CAR_WIDTH/Constants.ppu) if idm_traffic else None
         self.run_duration = 60 # 60 seconds
 
         # log files
@@ -474,7 +482,7 @@ class HighwaySimulator:
             car.steering = 0
         car.steering = max(-car.max_steering, min(car.steering, car.max_steering))
 
-    def stackelbergControl(self, controller, reference_car, all_agents, all_obstacles):
+    def stackelbergControl(self, controller, reference_car, all_agents, all_obstacles, dt, selected_actions=None):
 
         # Step 1. select players to execute action at this instance
         players = controller.pickLeadersAndFollowers(all_agents, all_obstacles)
@@ -487,7 +495,9 @@ class HighwaySimulator:
             # select action using Stackelberg game
             # selected_action = controller.selectStackelbergAction(leader, all_obstacles, reference_car)
 
-            self.executeAction(selected_action, leader, all_obstacles)
+            self.executeAction(selected_action, leader, all_obstacles, dt)
+            if selected_actions is not None:
+                selected_actions[leader.id] = action_index(selected_action)
 
         # Note that every player acts as a leader when selecting their actions
         return selected_action
@@ -571,11 +581,211 @@ class HighwaySimulator:
         car.left_mode = True
         car.right_mode = False
 
-    def run(self, cars_list, obstacle_list, is_manual=False, inf_obstacles=False, is_data_saved=False):
+    def runOnce(self, cars_list, obstacle_list, is_manual=False, inf_obstacles=False, run_duration=60, track_positions=False, recorder=None, episode=0):
+        """
+        Simulate one run of run_duration seconds with the cars in cars_list
+        controlled by the Stackelberg controller (or the keyboard with
+        is_manual). Drawing and the pygame event queue are only used when the
+        simulator renders, so runs can be simulated headless.
+
+        Returns the [obs_collisions, agent_collisions, avg_velocity,
+        avg_distance] of the run and the [agent_id, time, pos_x, pos_y]
+        columns of the agent positions (empty unless track_positions), or
+        None when the window was closed. With a recorder
+        (gym_highway.recorder.TrajectoryWriter) the state of every vehicle
+        is appended to it at every tick, as episode `episode`.
+        """
+        # Stackelberg controller
+        s_controller = StackelbergPlayer(Constants.CAR_WIDTH, Constants.NUM_LANES) if not is_manual else None
 
-        bkgd = pygame.image.load('gym_highway/envs/roadImg.png').convert()
-        bkgd = pygame.transform.scale(bkgd, (Constants.WIDTH, Constants.HEIGHT))
-        bkgd_x = 0
+        all_agents = pygame.sprite.Group()
+        all_obstacles = pygame.sprite.Group()
+        all_coming_cars = pygame.sprite.Group()
+        lane_max_obs = [None for _ in range(Constants.NUM_LANES)]
+        position_tracker = [[] for x in range(4)]
+
+        reference_car = None
+        for data in cars_list:
+            new_car = Car(id=data['id'], x=data['x'], y=data['y'], vel_x=data['vel_x'], vel_y=data['vel_y'], lane_id=data['lane_id'])
+            all_agents.add(new_car)
+            all_obstacles.add(new_car)
+
+            if not reference_car:
+                reference_car = new_car
+
+        for data in obstacle_list:
+            new_obstacle = Obstacle(id=data['id'], x=data['x'], y=data['y'], vel_x=data['vel_x'], vel_y=0.0, lane_id=data['lane_id'], color=data['color'])
+            all_coming_cars.add(new_obstacle)
+            all_obstacles.add(new_obstacle)
+            # keep the obstacle furthest ahead of every lane
+            lane_obs = lane_max_obs[new_obstacle.lane_id-1]
+            if lane_obs is None or new_obstacle.position.x > lane_obs.position.x:
+                lane_max_obs[new_obstacle.lane_id-1] = new_obstacle
+
+        action_timer = 0.0
+        log_timer = 0.0
+        continuous_time = 0.0
+        current_action = Action.MAINTAIN.name
+        num_obs_collisions = 0
+        num_agent_collisions = 0
+
+        total_velocity_per_run = []
+        total_distance_per_run = []
+
+        collision_count_lock = True
+        run_time = 0.0
+
+        is_paused = False
+        step = 0
+        selected_actions = {}
+
+        while run_time <= run_duration and not self.exit:
+            # dt = self.clock.get_time() / 100
+            # dt = 50.0/1000.0
+            dt = 1.0/self.ticks
+
+            # pause game when needed
+            if self.render:
+                for e in pygame.event.get():
+                    if e.type == pygame.QUIT:
+                        self.exit = True
+                    if e.type == pygame.KEYDOWN:
+                        if e.key == pygame.K_p: is_paused = True
+                        if e.key == pygame.K_r: is_paused = False
+
+            if is_paused:
+                pygame.display.flip()
+                self.clock.tick(self.framerate)
+                continue
+
+            action_timer += dt
+            log_timer += dt
+            run_time += dt
+            continuous_time += dt
+
+            if is_manual:
+                self.manualControl(reference_car, all_obstacles, dt)
+            else:
+                if action_timer >= Constants.ACTION_RESET_TIME:
+                    selected_action = self.stackelbergControl(s_controller, reference_car, all_agents, all_obstacles, dt, selected_actions)
+                    current_action = selected_action.name
+                    action_timer = 0.0
+
+            # collision check
+            if not collision_count_lock:
+                for agent in all_agents:
+                    # get collisions with non reactive obstacles
+                    car_collision_list = pygame.sprite.spritecollide(agent,all_coming_cars,False)
+                    num_obs_collisions += len(car_collision_list)
+
+                    collision_group = all_agents.copy()
+                    collision_group.remove(agent)
+                    car_collision_list = pygame.sprite.spritecollide(agent,collision_group,False)
+                    num_agent_collisions += len(car_collision_list)
+
+            # update all sprites
+            all_agents.update(dt, reference_car, self.continuous_ctrl)
+            if self.traffic:
+                lane_max_obs = self.traffic.update(all_coming_cars, all_agents, dt, reference_car, Constants.ppu)
+            else:
+                all_coming_cars.update(dt, reference_car)
+
+            if recorder is not None:
+                recorder.append(episode, step, run_time, vehicle_states(all_obstacles, selected_actions))
+                step += 1
+
+            # log the velocity and distance travelled
+            if log_timer >= Constants.ACTION_RESET_TIME:
+                for agent in all_agents:
+                    # log current velocity for each agent
+                    total_velocity_per_run.append(agent.velocity.x)
+                    # log distance travelled in ACTION_RESET_TIME at current velocity
+                    total_distance_per_run.append(agent.velocity.x * Constants.ACTION_RESET_TIME)
+
+                    if track_positions:
+                        position_tracker[0].append(agent.id)
+                        position_tracker[1].append(continuous_time)
+                        position_tracker[2].append(agent.position.x)
+                        position_tracker[3].append(agent.position.y)
+
+                log_timer = 0.0
+
+            sorted_agents = sorted(all_agents, key=lambda x: x.position.x, reverse=True)
+            reference_car = sorted_agents[0]
+
+            # generate new obstacles
+            if inf_obstacles:
+                # spawn new obstacles when none ahead of lead agent
+                for lane in range(Constants.NUM_LANES):
+                    # check the relative position of lead obstacle
+                    obstacle = lane_max_obs[lane]
+                    if obstacle.position.x < -Constants.CAR_WIDTH/32:
+                        # remove old obstacle
+                        all_coming_cars.remove(obstacle)
+                        all_obstacles.remove(obstacle)
+
+                        # add new obstacle
+                        rand_pos_x = float(self.random.uniform(70, 100))
+                        rand_pos_y = Constants.NEW_LANES[lane]
+                        rand_vel_x = float(self.random.uniform(5, 7))
+                        rand_lane_id = lane+1
+
+                        # new obs raw position is lead agent raw pos + diff between relative pos
+                        new_raw_x = reference_car.raw_position.x + (rand_pos_x-reference_car.position.x)
+                        new_obstacle = Obstacle(id=self.random.randrange(100,1000), x=rand_pos_x, y=rand_pos_y, raw_x=new_raw_x, vel_x=rand_vel_x, vel_y=0.0, lane_id=rand_lane_id, color=Constants.YELLOW)
+                        all_coming_cars.add(new_obstacle)
+                        all_obstacles.add(new_obstacle)
+
+                        # slow down old obstacles to new obstacle speed
+                        adj_min_vel = min(rand_vel_x, obstacle.velocity.x)
+                        obstacle.velocity.x = adj_min_vel
+                        obstacle.init_velocity.x = adj_min_vel
+
+                        # update max obstacle
+                        lane_max_obs[lane] = new_obstacle
+
+            if self.render:
+                # Drawing
+                self.screen.fill((0, 0, 0))
+
+                #Draw The Scrolling Road
+                rel_x = self.bkgd_x % self.bkgd.get_rect().width
+                self.screen.blit(self.bkgd, (rel_x - self.bkgd.get_rect().width, 0))
+                if rel_x < Constants.WIDTH:
+                    self.screen.blit(self.bkgd, (rel_x, 0))
+                self.bkgd_x -= reference_car.velocity.x
+
+                # update the agent sprites
+                self.updateSprites(all_agents)
+                # update obstacle sprites
+                self.updateSprites(all_coming_cars)
+
+                # update collision display count
+                self.displayScore(num_obs_collisions, num_agent_collisions)
+
+                # display position of car
+                self.displayVel(reference_car.velocity.x)
+
+                # display position of car
+                self.displayPos(reference_car.position)
+
+                # display selected action
+                # self.displayAction(current_action)
+
+                pygame.display.flip()
+
+            collision_count_lock = False
+
+            self.clock.tick(self.framerate)
+
+        if self.exit:
+            return None
+        run_data = [num_obs_collisions, num_agent_collisions,
+                    sum(total_velocity_per_run) / float(len(total_velocity_per_run)),
+                    sum(total_distance_per_run) / float(len(total_distance_per_run))]
+        return run_data, position_tracker
+
+    def run(self, cars_list, obstacle_list, is_manual=False, inf_obstacles=False, is_data_saved=False):
 
         TOTAL_AGENTS = 5
         TOTAL_RUNS = 100
@@ -600,205 +810,23 @@ class HighwaySimulator:
             position_file_name = files_dir+'pos_IGA_0.05_%d_%d.csv'%(agent_count+1, RUN_DURATION)
 
             for run_count in range(TOTAL_RUNS):
-                # Stackelberg controller
-                s_controller = StackelbergPlayer(Constants.CAR_WIDTH) if not is_manual else None
-
-                all_agents = pygame.sprite.Group()
-                all_obstacles = pygame.sprite.Group()
-                all_coming_cars = pygame.sprite.Group()
-                lane_max_obs = [None for _ in range(Constants.NUM_LANES)]
-
-                reference_car = None
-                for data in cars_list[:agent_count+1]:
-                # for data in cars_list[:3]:
-                    new_car = Car(id=data['id'], x=data['x'], y=data['y'], vel_x=data['vel_x'], vel_y=data['vel_y'], lane_id=data['lane_id'])
-                    all_agents.add(new_car)
-                    all_obstacles.add(new_car)
-
-                    if not reference_car:
-                        reference_car = new_car
-
-                for data in obstacle_list:
-                    new_obstacle = Obstacle(id=data['id'], x=data['x'], y=data['y'], vel_x=data['vel_x'], vel_y=0.0, lane_id=data['lane_id'], color=data['color'])
-                    all_coming_cars.add(new_obstacle)
-                    all_obstacles.add(new_obstacle)
-                    lane_max_obs[new_obstacle.lane_id-1] = new_obstacle
-
-                action_timer = 0.0
-                log_timer = 0.0
-                continuous_time = 0.0
-                current_action = Action.MAINTAIN.name
-                num_obs_collisions = 0
-                num_agent_collisions = 0
-
-                total_velocity_per_run = []
-                total_distance_per_run = []
-
-                collision_count_lock = True
-                run_time = 0.0
-
-                is_paused = False
-
-                # while not self.exit:
-                while run_time <= RUN_DURATION and not self.exit:
-                    # dt = self.clock.get_time() / 100
-                    # dt = 50.0/1000.0
-                    dt = 1.0/self.ticks
-                    
-                    # pause game when needed
-                    for e in pygame.event.get():
-                        if e.type == pygame.QUIT:
-                            self.exit = True
-                        if e.type == pygame.KEYDOWN:
-                            if e.key == pygame.K_p: is_paused = True
-                            if e.key == pygame.K_r: is_paused = False
-
-                    if is_paused:
-                        pygame.display.flip()
-                        self.clock.tick(self.framerate)
-                        continue
-
-                    action_timer += dt
-                    log_timer += dt
-                    run_time += dt
-                    continuous_time += dt
-
-                    # Event queue
-                    for event in pygame.event.get():
-                        if event.type == pygame.QUIT:
-                            self.exit = True
-
-                    if is_manual:
-                        self.manualControl(reference_car, all_obstacles, dt)
-                    else:
-                        if action_timer >= Constants.ACTION_RESET_TIME:
-                            selected_action = self.stackelbergControl(s_controller, reference_car, all_agents, all_obstacles)
-                            current_action = selected_action.name
-                            action_timer = 0.0
-
-                    # collision check
-                    if not collision_count_lock:
-                        for agent in all_agents:
-                            # get collisions with non reactive obstacles
-                            car_collision_list = pygame.sprite.spritecollide(agent,all_coming_cars,False)
-                            num_obs_collisions += len(car_collision_list)
-
-                            collision_group = all_agents.copy()
-                            collision_group.remove(agent)
-                            car_collision_list = pygame.sprite.spritecollide(agent,collision_group,False)
-                            num_agent_collisions += len(car_collision_list)
-
-                            # print("Collisions: ",num_obs_collisions+num_agent_collisions)
-
-                    # update all sprites
-                    all_agents.update(dt, reference_car, self.continuous_ctrl)
-                    all_coming_cars.update(dt, reference_car)
-
-                    # log the velocity and distance travelled
-                    if log_timer >= Constants.ACTION_RESET_TIME:
-                        for agent in all_agents:
-                            # log current velocity for each agent
-                            total_velocity_per_run.append(agent.velocity.x)                    
-                            # log distance travelled in ACTION_RESET_TIME at current velocity
-                            total_distance_per_run.append(agent.velocity.x * Constants.ACTION_RESET_TIME)
-
-                            if run_count == TOTAL_RUNS-1:
-                                position_tracker[0].append(agent.id)
-                                position_tracker[1].append(continuous_time)
-                                position_tracker[2].append(agent.position.x)
-                                position_tracker[3].append(agent.position.y)
-
-                        log_timer = 0.0
-
-                    sorted_agents = sorted(all_agents, key=lambda x: x.position.x, reverse=True)
-                    reference_car = sorted_agents[0]
-
-                    # generate new obstacles
-                    if inf_obstacles:
-                        # spawn new obstacles when none ahead of lead agent
-                        for lane in range(Constants.NUM_LANES):
-                            # check the relative position of lead obstacle
-                            obstacle = lane_max_obs[lane]
-                            if obstacle.position.x < -Constants.CAR_WIDTH/32:
-                                # remove old obstacle
-                                all_coming_cars.remove(obstacle)
-                                all_obstacles.remove(obstacle)
-
-                                # add new obstacle
-                                rand_pos_x = float(random.uniform(70, 100))
-                                rand_pos_y = Constants.NEW_LANES[lane]
-                                rand_vel_x = float(random.uniform(5, 7))
-                                rand_lane_id = lane+1
-
-                                # new obs raw position is lead agent raw pos + diff between relative pos
-                                new_raw_x = reference_car.raw_position.x + (rand_pos_x-reference_car.position.x)
-                                new_obstacle = Obstacle(id=randrange(100,1000), x=rand_pos_x, y=rand_pos_y, raw_x=new_raw_x, vel_x=rand_vel_x, vel_y=0.0, lane_id=rand_lane_id, color=Constants.YELLOW)
-                                all_coming_cars.add(new_obstacle)
-                                all_obstacles.add(new_obstacle)
-                                
-                                # slow down old obstacles to new obstacle speed
-                                adj_min_vel = min(rand_vel_x, obstacle.velocity.x)
-                                obstacle.velocity.x = adj_min_vel
-                                obstacle.init_velocity.x = adj_min_vel
-                                
-                                # update max obstacle
-                                lane_max_obs[lane] = new_obstacle
-
-                    # Drawing
-                    self.screen.fill((0, 0, 0))
-                    
-                    #Draw The Scrolling Road
-                    rel_x = bkgd_x % bkgd.get_rect().width
-                    self.screen.blit(bkgd, (rel_x - bkgd.get_rect().width, 0))
-                    if rel_x < Constants.WIDTH:
-                        self.screen.blit(bkgd, (rel_x, 0))
-                    bkgd_x -= reference_car.velocity.x
-                    # bkgd_x -= 1
-                    # pygame.draw.line(self.screen, (255, 0, 0), (rel_x, 0), (rel_x, HEIGHT), 3)
-
-
-                    # update the agent sprites
-                    self.updateSprites(all_agents)
-                    # update obstacle sprites
-                    self.updateSprites(all_coming_cars)
-
-                    # update collision display count
-                    # new_lane_pos = (LANE_WIDTH * reference_car.lane_id - (LANE_WIDTH/2))/ppu
-                    self.displayScore(num_obs_collisions, num_agent_collisions)
-
-                    # display position of car
-                    self.displayVel(reference_car.velocity.x)
-
-                    # display position of car
-                    self.displayPos(reference_car.position)
-
-                    # display selected action
-                    # self.displayAction(current_action)
-
-                    pygame.display.flip()
-
-                    collision_count_lock = False
-
-                    self.clock.tick(self.framerate)
-
-                if not self.exit:
+                result = self.runOnce(cars_list[:agent_count+1], obstacle_list, is_manual, inf_obstacles,
+                                      RUN_DURATION, track_positions=run_count == TOTAL_RUNS-1)
+
+                if result is not None:
+                    run_data, position_tracker_per_run = result
                     # log the number of agents and the current run count
                     data_per_run[0].append(agent_count+1)
                     data_per_run[1].append(run_count)
-                    # total number of collisions for one run
-                    data_per_run[2].append(num_obs_collisions)
-                    data_per_run[3].append(num_agent_collisions)
-                    # average velocity and distance across one run
-                    data_per_run[4].append(sum(total_velocity_per_run) / float(len(total_velocity_per_run)))
-                    data_per_run[5].append(sum(total_distance_per_run) / float(len(total_distance_per_run)))
+                    # total number of collisions and average velocity and distance for one run
+                    for i, value in enumerate(run_data):
+                        data_per_run[i+2].append(value)
+                    if run_count == TOTAL_RUNS-1:
+                        position_tracker = position_tracker_per_run
 
             # log data across multiple runs and agents
-            all_data[0].extend(data_per_run[0])
-            all_data[1].extend(data_per_run[1])
-            all_data[2].extend(data_per_run[2])
-            all_data[3].extend(data_per_run[3])
-            all_data[4].extend(data_per_run[4])
-            all_data[5].extend(data_per_run[5])
+            for i in range(len(all_data)):
+                all_data[i].extend(data_per_run[i])
 
             # save backups for each agent count in case of unexpected termination
             if not self.exit and is_data_saved:
@@ -812,7 +840,7 @@ class HighwaySimulator:
                 np_pos_data = numpy.transpose(np_pos_data)
                 np_pos_data_df = pd.DataFrame(np_pos_data, columns = position_columns)
                 np_pos_data_df.to_csv(position_file_name, index=False)
-                
+
 
         if not self.exit and is_data_saved:
             np_data_per_run = numpy.array(all_data)
@@ -853,7 +881,10 @@ class HighwaySimulator:
             new_obstacle = Obstacle(id=data['id'], x=data['x'], y=data['y'], vel_x=data['vel_x'], vel_y=0.0, lane_id=data['lane_id'], color=data['color'])
             self.all_coming_cars.add(new_obstacle)
             self.all_obstacles.add(new_obstacle)
-            self.lane_max_obs[new_obstacle.lane_id-1] = new_obstacle
+            # keep the obstacle furthest ahead of every lane
+            lane_obs = self.lane_max_obs[new_obstacle.lane_id-1]
+            if lane_obs is None or new_obstacle.position.x > lane_obs.position.x:
+                self.lane_max_obs[new_obstacle.lane_id-1] = new_obstacle
 
         self.action_timer = 0.0
         self.log_timer = 0.0
@@ -876,16 +907,17 @@ class HighwaySimulator:
 
         return
 
-    def act(self, action):
+    def act(self, action, num_ticks=1):
         """
             Used by gym-highway to change simulation state only when this function is called
 
-            This needs to be called for 60fps * 0.25s = 15 frames
+            This needs to be called for 60fps * 0.25s = 15 frames,
+            or fewer times for num_ticks frames at once (see safeTicks)
         """
 
         # dt = 50.0/1000.0 (For faster simulation)
         # dt = self.clock.get_time() / 1000
-        dt = 1.0/self.ticks
+        dt = num_ticks/self.ticks
 
         # reset reward so that it corresponds to current action
         self.reward = 0.0
@@ -938,7 +970,10 @@ class HighwaySimulator:
 
         # update all sprites
         self.all_agents.update(dt, self.reference_car, self.continuous_ctrl)
-        self.all_coming_cars.update(dt, self.reference_car)
+        if self.traffic:
+            self.lane_max_obs = self.traffic.update(self.all_coming_cars, self.all_agents, dt, self.reference_car, Constants.ppu)
+        else:
+            self.all_coming_cars.update(dt, self.reference_car)
 
         # max reward per step is 1.0 for going at max velocity
         if self.reward == 0.0:
@@ -972,9 +1007,9 @@ class HighwaySimulator:
                     self.all_obstacles.remove(obstacle)
 
                     # add new obstacle
-                    rand_pos_x = float(random.uniform(70, 100))
+                    rand_pos_x = float(self.random.uniform(70, 100))
                     rand_pos_y = Constants.NEW_LANES[lane]
-                    rand_vel_x = float(random.uniform(5, 7))
+                    rand_vel_x = float(self.random.uniform(5, 7))
                     rand_lane_id = lane+1
 
                     # new obs raw position is lead agent raw pos + diff between relative pos
@@ -1075,16 +1110,11 @@ class HighwaySimulator:
 
         ref_car = self.reference_car
 
-        other_pos = [None]*(len(self.lane_max_obs)) # all agents except the one in focus
+        other_pos = [None]*(len(self.lane_max_obs)) # lead obstacle of every lane
         other_vel = [None]*(len(self.lane_max_obs))
-        for obj in self.lane_max_obs:
-            if obj != ref_car:
-                # find place for agent info in the array
-                placement_idx = obj.id
-                if obj.id > ref_car.id: placement_idx -= 1
-                
-                other_pos[placement_idx] = list(obj.raw_position - ref_car.raw_position)
-                other_vel[placement_idx] = list(obj.velocity - ref_car.velocity)
+        for lane, obj in enumerate(self.lane_max_obs):
+            other_pos[lane] = list(obj.raw_position - ref_car.raw_position)
+            other_vel[lane] = list(obj.velocity - ref_car.velocity)
 
         ob_list = [(ref_car.acceleration, ref_car.steering)] + [ref_car.raw_position] + other_pos + [ref_car.velocity] + other_vel
         assert len(ob_list) == len(other_pos)+len(other_vel)+3
@@ -1103,12 +1133,17 @@ class HighwaySimulator:
     def is_episode_over(self):
         return self.is_done
 
+    def safeTicks(self, max_ticks):
+        """Frames the next act can take at once without missing a collision, see gym_highway.stepping"""
+        return safe_ticks(self.all_agents, self.all_obstacles, 1.0/self.ticks, max_ticks, Constants.NEW_LANES,
+                          Constants.CAR_WIDTH/Constants.ppu, Constants.CAR_HEIGHT/Constants.ppu)
+
     def close(self):
         pygame.quit()
 
     def seed(self, seed):
-        random.seed(seed)
-        numpy.random.seed
+        self.random.seed(seed)
+        numpy.random.seed(seed)
 
     def initObjects(self, data_point):
 
@@ -1142,98 +1177,97 @@ class HighwaySimulator:
 
     def relativeToAbsolute(self, data):
         # convert data to a dataframe
-        data_df = pd.DataFrame(data)
-
-        relative_idx = numpy.concatenate([numpy.arange(5, 8), numpy.arange(9, 12), \
-            numpy.arange(13, 16), numpy.arange(17, 20), numpy.arange(21, 24), numpy.arange(25, 28), \
-            numpy.arange(29, 32), numpy.arange(33, 36), numpy.arange(37, 40)]).ravel()
-
-        for i in range(0, len(relative_idx), 3):
-            data_df.loc[:,relative_idx[i]] = data_df.loc[:,3]-data_df.loc[:,relative_idx[i]]
-            data_df.loc[:,relative_idx[i]+1] = data_df.loc[:,relative_idx[i]+1] + data_df.loc[:,0]
-            data_df.loc[:,relative_idx[i]+2] = data_df.loc[:,relative_idx[i]+2] + data_df.loc[:,1]
-        
-        return data_df
-
-    def runNgsim(self, ngsim_data):
-        random.seed(2018)
-        testing_sets = random.sample(range(len(ngsim_data)), 100)
-        print(testing_sets)
+        return pd.DataFrame(relativeToAbsolute(data))
 
+    def ngsimErrors(self, data):
+        """
+        Mean relative errors of x, y, vx and vy between the ego car driven by
+        the Stackelberg controller and the ego car of one NGSIM testing set,
+        given with absolute coordinates.
+        """
         # Stackelberg controller
         s_controller = StackelbergPlayer(Constants.CAR_WIDTH)
 
-        # holds average errors across each set of 100 samples
-        set_errors = [[] for x in range(4)]
+        # Step 2: init ego and obstacles using sample[0]
+        ego_car, all_coming_cars = self.initObjects(data[0])
+        all_obstacles = all_coming_cars.copy()
+        all_obstacles.add(ego_car)
 
-        for ts in testing_sets:
+        # errors for x, y, vx, vy
+        errors = [[] for x in range(4)]
 
-            # Step 1: load the 100 samples as a dataframe
-            data_df = self.relativeToAbsolute(ngsim_data[ts])
+        # for i in range(1, data.shape[0]):
+        for i in range(10, data.shape[0], 10):
 
-            # Step 2: init ego and obstacles using sample[0]
-            ego_car, all_coming_cars = self.initObjects(data_df.loc[0])
-            all_obstacles = all_coming_cars.copy()
-            all_obstacles.add(ego_car)
+            # Step 3: get action for ego and project it 0.1s into future
+            selected_action = s_controller.selectAction(ego_car, all_obstacles)
 
-            # errors for x, y, vx, vy
-            errors = [[] for x in range(4)]
+            # select action using Stackelberg game
+            # s_controller.playerSets[ego_car] = [ego_car]
+            # selected_action = s_controller.selectStackelbergAction(ego_car, all_obstacles, ego_car)
 
-            # for i in range(1, data_df.shape[0]):
-            for i in range(10, data_df.shape[0], 10):
-                
-                # Step 3: get action for ego and project it 0.1s into future
-                selected_action = s_controller.selectAction(ego_car, all_obstacles)
+            # TODO: test commenting this section out
+            self.executeAction(selected_action, ego_car, all_obstacles, 1.0)
+            # ego_car.updateNgsim(NGSIM_RESET_TIME)
+            ego_car.updateNgsim(1.0)
 
-                # select action using Stackelberg game
-                # s_controller.playerSets[ego_car] = [ego_car]
-                # selected_action = s_controller.selectStackelbergAction(ego_car, all_obstacles, ego_car)
+            # Step 4: check state of ego with current sample
+            new_ego_car, all_coming_cars = self.initObjects(data[i])
+            all_obstacles = all_coming_cars.copy()
+            all_obstacles.add(new_ego_car)
 
-                # TODO: test commenting this section out
-                self.executeAction(selected_action, ego_car, all_obstacles)
-                # ego_car.updateNgsim(NGSIM_RESET_TIME)
-                ego_car.updateNgsim(1.0)
+            # Step 5: save error for x, y, vx, vy
+            errors[0].append(abs(ego_car.position.x - new_ego_car.position.x)/abs(new_ego_car.position.x))
+            errors[1].append(abs(ego_car.position.y - new_ego_car.position.y)/abs(new_ego_car.position.y))
+            errors[2].append(abs(ego_car.velocity.x - new_ego_car.velocity.x)/max(abs(new_ego_car.velocity.x),1.0))
+            errors[3].append(abs(ego_car.angular_velocity - new_ego_car.velocity.y)/max(abs(new_ego_car.velocity.y),1.0))
 
-                # Step 4: check state of ego with current sample
-                new_ego_car, all_coming_cars = self.initObjects(data_df.loc[i])
-                all_obstacles = all_coming_cars.copy()
-                all_obstacles.add(new_ego_car)
+            # reset ego_car for next sample
+            ego_car = new_ego_car
 
-                # Step 5: save error for x, y, vx, vy
-                errors[0].append(abs(ego_car.position.x - new_ego_car.position.x)/abs(new_ego_car.position.x))
-                errors[1].append(abs(ego_car.position.y - new_ego_car.position.y)/abs(new_ego_car.position.y))
-                errors[2].append(abs(ego_car.velocity.x - new_ego_car.velocity.x)/max(abs(new_ego_car.velocity.x),1.0))
-                errors[3].append(abs(ego_car.angular_velocity - new_ego_car.velocity.y)/max(abs(new_ego_car.velocity.y),1.0))
+        # Step 6: average errors for each field at end
+        return [sum(field_errors) / float(len(field_errors)) for field_errors in errors]
 
-                # reset ego_car for next sample
-                ego_car = new_ego_car
+    def runNgsim(self, ngsim_data, num_workers=0, is_absolute=False):
+        """
+        Replay 100 randomly selected NGSIM testing sets and save the errors
+        of the Stackelberg controller. ngsim_data holds the testing sets
+        (loadNgsimData, or loadNgsimStore with is_absolute). With num_workers
+        the sets are replayed in a pool of processes, each receiving only
+        the sets it replays.
+        """
+        testing_sets = random.Random(2018).sample(range(len(ngsim_data)), 100)
+        print(testing_sets)
 
-            # Step 6: average errors for each field at end
-            set_errors[0].append(sum(errors[0]) / float(len(errors[0])))
-            set_errors[1].append(sum(errors[1]) / float(len(errors[1])))
-            set_errors[2].append(sum(errors[2]) / float(len(errors[2])))
-            set_errors[3].append(sum(errors[3]) / float(len(errors[3])))
+        # Step 1: load the samples of every set with absolute coordinates
+        def testing_data():
+            for ts in testing_sets:
+                data = numpy.array(ngsim_data[ts], dtype=numpy.float64)
+                yield data if is_absolute else relativeToAbsolute(data)
+
+        if num_workers:
+            with multiprocessing.get_context('spawn').Pool(num_workers, initializer=_initNgsimWorker,
+                    initargs=(self.cars_list, self.obstacle_list, self.continuous_ctrl)) as pool:
+                # holds average errors across each set of 100 samples
+                set_errors = list(pool.imap(_ngsimErrors, testing_data()))
+        else:
+            set_errors = [self.ngsimErrors(data) for data in testing_data()]
 
-        np_set_errors = numpy.array(set_errors)
-        np_set_errors = numpy.transpose(np_set_errors)
+        np_set_errors = numpy.array(set_errors).reshape(-1, 4)
 
         np_set_errors_df = pd.DataFrame(np_set_errors, columns = ['e_x','e_y','e_vx','e_vy'])
         np_set_errors_df.to_csv('ngsim_errors_GIA_AV_1.0.csv', index=False)
 
-# Load only the features required for evaluation
-def loadNgsimData():
-
-    features = None
-    with open('features_test_0.data', 'rb') as file:
-        features = pickle.load(file, encoding='latin1')
+# simulator of an NGSIM worker process, set by _initNgsimWorker
+_ngsim_worker = {}
 
-    # Indices of spatial data that needs to have its magnitude reduced.
-    indices = numpy.concatenate([numpy.arange(0, 4), numpy.arange(5, 9), numpy.arange(11, 15), \
-        numpy.arange(17, 21), numpy.arange(23, 27), numpy.arange(29, 33), numpy.arange(35, 39), \
-        numpy.arange(41, 45), numpy.arange(47, 51), numpy.arange(53, 57)]).ravel()
+def _initNgsimWorker(cars_list, obstacle_list, continuous):
+    # headless simulation, pygame does not need a display
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    _ngsim_worker['sim'] = HighwaySimulator(cars_list, obstacle_list, continuous=continuous)
 
-    filteredData = features[:, :, indices]
-    return filteredData
+def _ngsimErrors(data):
+    return _ngsim_worker['sim'].ngsimErrors(data)
 
 if __name__ == '__main__':
 
@@ -1244,6 +1278,8 @@ if __name__ == '__main__':
     parser.add_argument("--real_time", dest="real_time", action='store_true', help="Run simulation in real time")
     parser.add_argument("--cont_ctrl", dest="cont_ctrl", action='store_true', help="Run simulation with continuous control")
     parser.add_argument("--save", dest="save_data", action='store_true', help="save performance metrics")
+    parser.add_argument("--ngsim", dest="ngsim_store", default=None, help="replay the NGSIM testing sets of this store, created from features_test_0.data if missing")
+    parser.add_argument("--num_workers", dest="num_workers", type=int, default=0, help="processes replaying the NGSIM testing sets")
 
     args = parser.parse_args()
 
@@ -1261,6 +1297,12 @@ if __name__ == '__main__':
     # cars_list = [car_1, car_2, car_3, car_4, car_5]
     cars_list = [car_1]
 
-    game = HighwaySimulator(cars_list, obstacle_list, args.manual, args.inf_obs, args.save_data, True, args.real_time, args.cont_ctrl)
-    # run the simulation
-    game.run(cars_list, obstacle_list, args.manual, args.inf_obs, args.save_data)
+    if args.ngsim_store:
+        if not os.path.exists(os.path.join(args.ngsim_store, 'ngsim.json')):
+            preprocessNgsimData(args.ngsim_store)
+        game = HighwaySimulator(cars_list, obstacle_list, continuous=args.cont_ctrl)
+        game.runNgsim(loadNgsimStore(args.ngsim_store), args.num_workers, is_absolute=True)
+    else:
+        game = HighwaySimulator(cars_list, obstacle_list, args.manual, args.inf_obs, args.save_data, True, args.real_time, args.cont_ctrl)
+        # run the simulation
+        game.run(cars_list, obstacle_list, args.manual, args.inf_obs, args.save_data)
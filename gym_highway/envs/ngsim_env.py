@@ -0,0 +1,121 @@
+import logging
+
+import gym
+import numpy as np
+from gym import spaces
+from gym.utils import seeding
+
+from gym_highway.envs.multi_lane_sim import Action
+from gym_highway.ngsim import NGSIM_OBSTACLES, loadNgsimStore
+
+logger = logging.getLogger(__name__)
+
+# seconds between two NGSIM samples
+NGSIM_DT = 0.1
+
+class NgsimReplayEnv(gym.Env):
+    """
+    Highway env whose traffic is replayed from recorded NGSIM trajectories.
+
+    Every episode replays a random window of a random testing set of an NGSIM
+    store (gym_highway.ngsim.preprocessNgsimData). The learning agent starts in
+    the state of the recorded ego car and replaces it, the recorded
+    neighbours of the ego car follow their trajectories whatever the agent
+    does. The window is read from the memmapped store once per episode, and
+    every step only indexes it, so the cost of a step does not depend on the
+    number of replayed vehicles. Distances are in the units of the store.
+
+    Like HighwayEnv, actions follow multi_lane_sim.Action (0 LEFT, 1 RIGHT,
+    2 ACCELERATE, 3 MAINTAIN), the reward is v/max_velocity - 1 per step and
+    -250 per collision, which ends the episode.
+    """
+    metadata = {'render.modes': []}
+
+    def __init__(self, store_dir='ngsim_store', window=50, frame_skip=2, max_velocity=100.0, acceleration=5.0,
+                 lane_width=12.0, car_length=15.0, car_width=6.0):
+        self.__version__ = "0.0.1"
+        logging.info("NgsimReplayEnv - Version {}".format(self.__version__))
+
+        # (sets, samples, columns) with absolute coordinates, shared by all the envs reading the store
+        self.store = loadNgsimStore(store_dir)
+        self.window = window
+        self.frame_skip = frame_skip
+        if self.store.shape[1] <= window*frame_skip:
+            raise ValueError('NGSIM testing sets of {} samples are too short for windows of {} steps'.format(
+                self.store.shape[1], window))
+        self.dt = NGSIM_DT*frame_skip
+        self.max_velocity = max_velocity
+        self.acceleration = acceleration
+        self.lane_width = lane_width
+        self.car_size = np.array([car_length, car_width])
+
+        self.action_space = spaces.Discrete(len(Action))
+        # ego vx, vy and dx, dy, dvx, dvy, present for every replayed vehicle
+        self.observation_space = spaces.Box(-np.inf, np.inf, shape=(2 + 5*NGSIM_OBSTACLES,), dtype=np.float32)
+
+        self.seed()
+        self.traffic = None
+
+    def seed(self, seed=None):
+        self.np_random, seed = seeding.np_random(seed)
+        return [seed]
+
+    def reset(self):
+        # choice works with the RandomState of older gym versions and the Generator of newer ones
+        test_set = self.np_random.choice(len(self.store))
+        start = self.np_random.choice(self.store.shape[1] - self.window*self.frame_skip)
+        samples = np.array(self.store[test_set, start:start + (self.window+1)*self.frame_skip:self.frame_skip])
+        ego = samples[:, :4]
+        # vy, vx, y, x of every neighbour, (window+1, NGSIM_OBSTACLES, 4)
+        self.traffic = samples[:, 4:].reshape(len(samples), NGSIM_OBSTACLES, 4)
+        # missing neighbours are recorded at the position of the ego car
+        self.present = ~((self.traffic[..., 3] == ego[:, None, 1]) & (self.traffic[..., 2] == ego[:, None, 0]))
+
+        self.t = 0
+        self.position = np.array([ego[0, 1], ego[0, 0]])
+        self.velocity = np.array([ego[0, 3], ego[0, 2]])
+        self.target_y = self.position[1]
+        self.num_collisions = 0
+        self.run_time = 0.0
+        return self._get_state()
+
+    def step(self, action):
+        action = Action(int(action))
+        if action == Action.ACCELERATE:
+            self.velocity[0] += self.acceleration*self.dt
+        elif action in (Action.LEFT, Action.RIGHT) and self.target_y == self.position[1]:
+            self.target_y += -self.lane_width if action == Action.LEFT else self.lane_width
+        self.velocity[0] = np.clip(self.velocity[0], 0.0, self.max_velocity)
+
+        # change lanes at one lane width per second
+        max_dy = self.lane_width*self.dt
+        dy = np.clip(self.target_y - self.position[1], -max_dy, max_dy)
+        self.velocity[1] = dy/self.dt
+        self.position[0] += self.velocity[0]*self.dt
+        self.position[1] = self.target_y if abs(self.target_y - self.position[1]) <= max_dy else self.position[1] + dy
+        self.t += 1
+        self.run_time += self.dt
+
+        collisions = int(np.count_nonzero(self._overlap()))
+        self.num_collisions += collisions
+        if collisions:
+            reward = -250.0*collisions
+        else:
+            reward = self.velocity[0]/self.max_velocity - 1.0
+        done = bool(collisions) or self.t >= self.window
+        return self._get_state(), round(reward, 3), done, self.get_info()
+
+    def _overlap(self):
+        traffic = self.traffic[self.t]
+        distance = np.abs(traffic[:, [3, 2]] - self.position)
+        return self.present[self.t] & np.all(distance < self.car_size, axis=1)
+
+    def _get_state(self):
+        traffic = self.traffic[self.t]
+        present = self.present[self.t]
+        relative = np.concatenate([traffic[:, [3, 2]] - self.position, traffic[:, [1, 0]] - self.velocity], axis=1)
+        relative[~present] = 0.0
+        return np.concatenate([self.velocity, np.column_stack([relative, present]).ravel()]).astype(np.float32)
+
+    def get_info(self):
+        return {"run_time": self.run_time, "num_collisions": self.num_collisions}
@@ -21,8 +21,9 @@ class Action(Enum):
     DECELERATE = 4
 
 class StackelbergPlayer():
-    def __init__(self, car_width):
+    def __init__(self, car_width, num_lanes=NUM_LANES):
         self.car_width = car_width/64
+        self.num_lanes = num_lanes
         self.players = [set() for x in range(NUM_PLAYERS)]
         self.playerSets = {}
 
@@ -186,7 +187,7 @@ class StackelbergPlayer():
         # if in the left lane remove left action, same with right lane
         if current_lane == 1:
             del all_actions[Action.LEFT.value]
-        elif current_lane == 3:
+        elif current_lane == self.num_lanes:
             del all_actions[Action.RIGHT.value]
 
         best_utility = 0.0
@@ -224,7 +225,7 @@ class StackelbergPlayer():
         actions_subset = actions.copy()
         if ego.lane_id == 1:
             actions_subset.remove(Action.LEFT)
-        elif ego.lane_id == 3:
+        elif ego.lane_id == self.num_lanes:
             actions_subset.remove(Action.RIGHT)
         return actions_subset
 
@@ -279,11 +280,11 @@ class StackelbergPlayer():
     def pickPlayers(self, ego, all_agents, all_obstacles):
         players = [ego]
 
-        # by default it is the middle lane
-        adversary_lane = 2
+        # by default it is the lane next to the ego vehicle
+        adversary_lane = 2 if ego.lane_id == 1 else ego.lane_id - 1 if ego.lane_id == self.num_lanes else ego.lane_id
         
-        # need to update adversary lane if leader is already in the middle lane
-        if ego.lane_id == 2:
+        # need to update adversary lane if leader is in a middle lane
+        if 1 < ego.lane_id < self.num_lanes:
             action_util_set = self.getActionUtilSet(ego, all_obstacles)
             for action_tuple in action_util_set:
                 if action_tuple[0] == Action.LEFT:
@@ -473,7 +474,7 @@ class StackelbergPlayer():
         car.do_maintain = False
 
     def turn_right(self, car):
-        car.lane_id = min(car.lane_id + 1, NUM_LANES)
+        car.lane_id = min(car.lane_id + 1, self.num_lanes)
         car.right_mode = True
         car.left_mode = False
 
@@ -0,0 +1,229 @@
+"""
+Parallel sweep of HighwaySimulator runs.
+
+Every (agent count, run index, seed) of the study of HighwaySimulator.run is an
+independent task, simulated headless in a pool of processes. A task writes its
+result and the options it was simulated with to its own small npz file in the
+sweep directory, so tasks finished before an interruption are skipped when the
+sweep is started again with the same options (and simulated again otherwise),
+and merge_sweep() writes the csv files of HighwaySimulator.run from the task
+files.
+
+    python -m gym_highway.envs.sweep --out_dir sweeps/IGA --num_workers 8
+"""
+import json
+import multiprocessing
+import os
+import os.path as osp
+from argparse import ArgumentParser
+
+import numpy
+import pandas as pd
+
+DF_COLUMNS = ['agent_count','run_count','obs_collisions','agent_collisions', 'avg_velocity', 'avg_distance']
+POSITION_COLUMNS = ['agent_id','time','pos_x','pos_y']
+# simulation steps per second of HighwaySimulator without real_time
+DEFAULT_TICKS = 36.0
+
+
+def sweep_tasks(agent_counts, total_runs, seed=0):
+    """(agent_count, run_count, seed) of every run, each run with its own seed"""
+    return [(agent_count, run_count, seed + (agent_count-1)*total_runs + run_count)
+            for agent_count in agent_counts for run_count in range(total_runs)]
+
+
+def task_file(out_dir, agent_count, run_count):
+    return osp.join(out_dir, 'task_%d_%d.npz'%(agent_count, run_count))
+
+
+def dt_label(ticks=None):
+    """time step of the simulation in the csv file names, e.g. 0.05 for 20 ticks per second"""
+    return '%.3g'%(1.0/(ticks or DEFAULT_TICKS))
+
+
+def task_options(options, seed):
+    """options a task is simulated with, saved in its task file"""
+    return dict(options, seed=seed)
+
+
+def task_done(out_dir, task, options):
+    """whether the task file of task exists and was simulated with the same options"""
+    path = task_file(out_dir, task[0], task[1])
+    if not osp.exists(path):
+        return False
+    with numpy.load(path) as saved:
+        # task files of older sweeps have no options
+        saved_options = json.loads(str(saved['options'])) if 'options' in saved else None
+    return saved_options == task_options(options, task[2])
+
+
+# simulator of a worker process, set by _init_worker
+_worker = {}
+
+def _init_worker(cars_list, obstacle_list, out_dir, options):
+    # headless simulation, pygame does not need a display
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    from gym_highway.envs.multi_lane_sim import HighwaySimulator
+    sim = HighwaySimulator(cars_list, obstacle_list, inf_obs=options['inf_obstacles'],
+                           continuous=options['continuous'])
+    # e.g. the time step of a real time simulation, without waiting for the clock
+    sim.ticks = options['ticks']
+    _worker.update(sim=sim, cars_list=cars_list, obstacle_list=obstacle_list, out_dir=out_dir, options=options)
+
+def _run_task(task):
+    agent_count, run_count, seed = task
+    options = _worker['options']
+    _worker['sim'].seed(seed)
+    run_data, position_tracker = _worker['sim'].runOnce(
+        _worker['cars_list'][:agent_count], _worker['obstacle_list'], inf_obstacles=options['inf_obstacles'],
+        run_duration=options['run_duration'], track_positions=run_count == options['total_runs']-1)
+
+    path = task_file(_worker['out_dir'], agent_count, run_count)
+    # written to a temporary file first, so that a task file is always complete
+    with open(path + '.tmp', 'wb') as f:
+        numpy.savez(f, run=numpy.array([agent_count, run_count] + run_data, dtype=numpy.float64),
+                    positions=numpy.array(position_tracker, dtype=numpy.float64).reshape(4, -1).T,
+                    seed=seed, options=json.dumps(task_options(options, seed)))
+    os.replace(path + '.tmp', path)
+    return task
+
+
+def run_sweep(cars_list, obstacle_list, out_dir, agent_counts=range(1, 6), total_runs=100, run_duration=60,
+              inf_obstacles=False, continuous=False, ticks=None, seed=0, num_workers=None, merge=True):
+    """
+    Run the tasks of the sweep that have no task file in out_dir yet, or a
+    task file simulated with other options (which is overwritten).
+
+    Parameters
+    ----------
+    cars_list, obstacle_list: list
+        initial agents and obstacles, as for HighwaySimulator. The runs with
+        agent_count agents use cars_list[:agent_count].
+    out_dir: str
+        directory of the task files and of the merged csv files
+    agent_counts: iterable
+        numbers of agents of the sweep
+    total_runs: int
+        runs of every agent count
+    run_duration: float
+        simulated seconds of a run
+    ticks: float or None
+        simulation steps per second, by default the ones of HighwaySimulator without real_time
+    seed: int
+        seed of the first run, the runs are seeded with consecutive seeds
+    num_workers: int or None
+        processes of the pool, by default os.cpu_count(). With 0 the runs are
+        simulated in this process.
+    merge: bool
+        call merge_sweep when all the tasks are done
+
+    Returns
+    -------
+    list of the tasks run by this call
+    """
+    agent_counts = list(agent_counts)
+    os.makedirs(out_dir, exist_ok=True)
+    options = {'inf_obstacles': inf_obstacles, 'continuous': continuous, 'ticks': ticks or DEFAULT_TICKS,
+               'run_duration': run_duration, 'total_runs': total_runs}
+    tasks = [task for task in sweep_tasks(agent_counts, total_runs, seed) if not task_done(out_dir, task, options)]
+    stale = sum(osp.exists(task_file(out_dir, task[0], task[1])) for task in tasks)
+    if stale:
+        print("%d task files in %s were simulated with other options, running them again"%(stale, out_dir))
+    initargs = (cars_list, obstacle_list, out_dir, options)
+
+    done = []
+    if tasks and num_workers == 0:
+        _init_worker(*initargs)
+        done = [_run_task(task) for task in tasks]
+    elif tasks:
+        num_workers = min(num_workers or os.cpu_count(), len(tasks))
+        with multiprocessing.get_context('spawn').Pool(num_workers, initializer=_init_worker, initargs=initargs) as pool:
+            for task in pool.imap_unordered(_run_task, tasks):
+                done.append(task)
+                print("run %d of %d agents done (%d/%d)"%(task[1], task[0], len(done), len(tasks)))
+
+    if merge:
+        merge_sweep(out_dir, agent_counts, total_runs, run_duration, ticks=ticks)
+    return done
+
+
+def merge_sweep(out_dir, agent_counts=range(1, 6), total_runs=100, run_duration=60, files_dir=None, ticks=None,
+                partial=False):
+    """
+    Write the csv files of HighwaySimulator.run from the task files in out_dir:
+    backup_IGA_* (runs of an agent count), pos_IGA_* (positions of the last run
+    of an agent count) and model_IGA_* (all runs), named after the time step of
+    ticks as in run_sweep. Raises a ValueError when task files are missing,
+    with partial the missing tasks are printed and left out.
+    """
+    agent_counts = list(agent_counts)
+    dt = dt_label(ticks)
+    files_dir = files_dir or out_dir
+    missing = [(agent_count, run_count) for agent_count in agent_counts for run_count in range(total_runs)
+               if not osp.exists(task_file(out_dir, agent_count, run_count))]
+    if missing and not partial:
+        raise ValueError("%d of %d tasks have no task file in %s, e.g. run %d of %d agents"%(
+            len(missing), len(agent_counts)*total_runs, out_dir, missing[0][1], missing[0][0]))
+    for agent_count, run_count in missing:
+        print("run %d of %d agents is missing, left out of the merge"%(run_count, agent_count))
+    os.makedirs(files_dir, exist_ok=True)
+
+    all_data = []
+    for agent_count in agent_counts:
+        data_per_run = []
+        for run_count in range(total_runs):
+            path = task_file(out_dir, agent_count, run_count)
+            if not osp.exists(path):
+                continue
+            with numpy.load(path) as task:
+                data_per_run.append(task['run'])
+                if run_count == total_runs-1:
+                    position_file_name = osp.join(files_dir, 'pos_IGA_%s_%d_%d.csv'%(dt, agent_count, run_duration))
+                    pd.DataFrame(task['positions'], columns=POSITION_COLUMNS).to_csv(position_file_name, index=False)
+
+        backup_file_name = osp.join(files_dir, 'backup_IGA_%s_%d_%d_%d.csv'%(dt, agent_count, total_runs, run_duration))
+        data_per_run = numpy.array(data_per_run).reshape(-1, len(DF_COLUMNS))
+        pd.DataFrame(data_per_run, columns=DF_COLUMNS).to_csv(backup_file_name, index=False)
+        all_data.append(data_per_run)
+
+    file_name = osp.join(files_dir, 'model_IGA_%s_%d_%d_%d.csv'%(dt, max(agent_counts), total_runs, run_duration))
+    pd.DataFrame(numpy.concatenate(all_data), columns=DF_COLUMNS).to_csv(file_name, index=False)
+    return file_name
+
+
+if __name__ == '__main__':
+    from gym_highway.envs.multi_lane_sim import Constants
+
+    parser = ArgumentParser()
+    parser.add_argument("--out_dir", default=None, help="directory of the task and csv files, by default datafiles/NoDelay/dt_<time step>/")
+    parser.add_argument("--agents", type=int, default=5, help="sweep over 1 to this number of agents")
+    parser.add_argument("--runs", type=int, default=100, help="runs per agent count")
+    parser.add_argument("--duration", type=float, default=60, help="simulated seconds per run")
+    parser.add_argument("--inf_obs", dest="inf_obs", action='store_true', help="produce new obstacle on a lane when current obstacle is out of window")
+    parser.add_argument("--cont_ctrl", dest="cont_ctrl", action='store_true', help="Run simulation with continuous control")
+    parser.add_argument("--real_time", dest="real_time", action='store_true', help="use the time step of the real time simulation")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run")
+    parser.add_argument("--num_workers", type=int, default=None, help="worker processes, defaults to the number of cpus")
+    parser.add_argument("--merge_only", dest="merge_only", action='store_true', help="merge the task files done so far, without running the sweep")
+    args = parser.parse_args()
+
+    # initial positions of obstacles and agents, as in multi_lane_sim
+    obstacle_list = [
+        {'id':100, 'x':-20, 'y':Constants.LANE_1_C, 'vel_x':7.0, 'lane_id':1, 'color':Constants.YELLOW},
+        {'id':101, 'x':-25, 'y':Constants.LANE_2_C, 'vel_x':5.0, 'lane_id':2, 'color':Constants.YELLOW},
+        {'id':102, 'x':-40, 'y':Constants.LANE_3_C, 'vel_x':6.0, 'lane_id':3, 'color':Constants.YELLOW}]
+    cars_list = [
+        {'id':0, 'x':10, 'y':Constants.LANE_2_C, 'vel_x':10.0, 'vel_y':0.0, 'lane_id':2},
+        {'id':1, 'x':5, 'y':Constants.LANE_1_C, 'vel_x':10.0, 'vel_y':0.0, 'lane_id':1},
+        {'id':2, 'x':5, 'y':Constants.LANE_2_C, 'vel_x':10.0, 'vel_y':0.0, 'lane_id':2},
+        {'id':3, 'x':10, 'y':Constants.LANE_3_C, 'vel_x':10.0, 'vel_y':0.0, 'lane_id':3},
+        {'id':4, 'x':5, 'y':Constants.LANE_3_C, 'vel_x':10.0, 'vel_y':0.0, 'lane_id':3}]
+
+    agent_counts = range(1, args.agents+1)
+    ticks = 60.0 if args.real_time else None
+    out_dir = args.out_dir or 'datafiles/NoDelay/dt_%s/'%dt_label(ticks)
+    if not args.merge_only:
+        run_sweep(cars_list, obstacle_list, out_dir, agent_counts, args.runs, args.duration, args.inf_obs,
+                  args.cont_ctrl, ticks, args.seed, args.num_workers, merge=False)
+    print("-----> Sweep merged into: {}".format(merge_sweep(out_dir, agent_counts, args.runs, args.duration,
+                                                            ticks=ticks, partial=args.merge_only)))
@@ -9,11 +9,14 @@ import pygame
 from pygame.math import Vector2
 
 from gym_highway.multiagent_envs import actions
+from gym_highway.multiagent_envs.actions import Action
 from gym_highway.multiagent_envs import highway_constants as Constants
 from gym_highway.multiagent_envs.agent import Car, Obstacle
+from gym_highway.stepping import safe_ticks
+from gym_highway.traffic import IDMTraffic
 
 class HighwaySimulator:
-    def __init__(self, manual=False, inf_obs=False, save=False, render=False, real_time=False, continuous=False):
+    def __init__(self, manual=False, inf_obs=False, save=False, render=False, real_time=False, continuous=False, idm_traffic=False):
         pygame.init()
         width = Constants.WIDTH
         height = Constants.HEIGHT
@@ -34,6 +37,10 @@ class HighwaySimulator:
         self.render = render
         self.run_duration = 60 # 60 seconds
         self.continuous_ctrl = continuous
+        # obstacles are spawned from this generator, seeded by seed()
+        self.random = random.Random()
+        # obstacles drive at constant velocity unless IDM/MOBIL traffic is used
+        self.traffic = IDMTraffic(Constants.NEW_LANES, Constants.CAR_WIDTH/Constants.ppu) if idm_traffic else None
 
         # list of agents and entities (can change at execution-time!)
         self.agents = None
@@ -219,7 +226,10 @@ class HighwaySimulator:
             new_obstacle = Obstacle(id=data['id'], x=data['x'], y=data['y'], vel_x=data['vel_x'], vel_y=0.0, lane_id=data['lane_id'], color=data['color'])
             self.scripted_agents.add(new_obstacle)
             self.all_obstacles.add(new_obstacle)
-            self.lane_max_obs[new_obstacle.lane_id-1] = new_obstacle
+            # keep the obstacle furthest ahead of every lane
+            lane_obs = self.lane_max_obs[new_obstacle.lane_id-1]
+            if lane_obs is None or new_obstacle.position.x > lane_obs.position.x:
+                self.lane_max_obs[new_obstacle.lane_id-1] = new_obstacle
 
         self.action_timer = 0.0
         self.log_timer = 0.0
@@ -242,16 +252,17 @@ class HighwaySimulator:
 
         return
 
-    def act(self):
+    def act(self, num_ticks=1):
         """
             Used by gym-highway to change simulation state only when this function is called
 
-            This needs to be called for 60fps * 0.25s = 15 frames
+            This needs to be called for 60fps * 0.25s = 15 frames,
+            or fewer times for num_ticks frames at once (see safeTicks)
         """
 
         # dt = 50.0/1000.0 (For faster simulation)
         # dt = self.clock.get_time() / 1000
-        dt = 1.0/self.ticks
+        dt = num_ticks/self.ticks
 
         # reset reward so that it corresponds to current action
         self.reward = [0.0]*len(self.policy_agents_data)
@@ -283,7 +294,10 @@ class HighwaySimulator:
         # update all sprites
         # this will update all the agents and obstacles based on the actions selected
         self.agents.update(dt, self.reference_car, self.continuous_ctrl)
-        self.scripted_agents.update(dt, self.reference_car, self.agents)
+        if self.traffic:
+            self.lane_max_obs = self.traffic.update(self.scripted_agents, self.agents, dt, self.reference_car, Constants.ppu)
+        else:
+            self.scripted_agents.update(dt, self.reference_car, self.agents)
 
         # keep track of agent velocity at end of every action
         if self.log_timer >= Constants.ACTION_RESET_TIME:
@@ -304,9 +318,9 @@ class HighwaySimulator:
                 # check the relative position of lead obstacle
                 if obstacle.position.x < -Constants.CAR_WIDTH/32:
                     # add new obstacle
-                    rand_pos_x = float(random.uniform(70, 100))
+                    rand_pos_x = float(self.random.uniform(70, 100))
                     rand_pos_y = Constants.NEW_LANES[lane]
-                    rand_vel_x = float(random.uniform(5, 7))
+                    rand_vel_x = float(self.random.uniform(5, 7))
                     rand_lane_id = lane+1
 
                     # new obs raw position is lead agent raw pos + diff between relative pos
@@ -337,7 +351,7 @@ class HighwaySimulator:
                     rem_count += 1
             # TODO: check if only appropriate obs are being removed
             # TEST: see if we are removing more than we should
-            assert len(self.scripted_agents) >= 3
+            assert len(self.scripted_agents) >= Constants.NUM_LANES
             # TEST: check if remove() deletes more than it should
             assert len(self.scripted_agents) == obs_pre_count-rem_count
 
@@ -462,9 +476,14 @@ class HighwaySimulator:
     def get_done(self):
         return self.is_done
 
+    def safeTicks(self, max_ticks):
+        """Frames the next act can take at once without missing a collision, see gym_highway.stepping"""
+        return safe_ticks(self.agents, self.all_obstacles, 1.0/self.ticks, max_ticks, Constants.NEW_LANES,
+                          Constants.CAR_WIDTH/Constants.ppu, Constants.CAR_HEIGHT/Constants.ppu)
+
     def close(self):
         pygame.quit()
 
     def seed(self, seed):
-        random.seed(seed)
-        numpy.random.seed
+        self.random.seed(seed)
+        numpy.random.seed(seed)
@@ -4,7 +4,10 @@ from gym import spaces
 from gym.envs.registration import EnvSpec
 
 from gym_highway.multiagent_envs import actions
+from gym_highway.multiagent_envs import highway_constants as Constants
 from gym_highway.multiagent_envs.simple_base import Scenario
+from gym_highway.scenarios import configure_lanes
+from gym_highway.stepping import substeps
 
 
 # environment for all agents in the multiagent world
@@ -15,11 +18,20 @@ class MultiAgentEnv(gym.Env):
 
     def __init__(self, world_config, num_agents=1, reset_callback=None, reward_callback=None,
                  observation_callback=None, info_callback=None,
-                 done_callback=None, shared_reward=False):
+                 done_callback=None, shared_reward=False, scenario_config=None, adaptive_step=False):
+        # scenario_config: keyword arguments of gym_highway.scenarios.generate_scenario,
+        # except num_agents, for a random road instead of the fixed 3 lane one
+        # adaptive_step: advance the world by several frames at once while no
+        # vehicles are close (gym_highway.stepping)
+        self.adaptive_step = adaptive_step
+        # Constants is shared by all the worlds of the process: every env sets the
+        # lanes of its road, also the default 3 lane one, and sets them again on reset
+        self.num_lanes = (scenario_config or {}).get('num_lanes', 3)
+        configure_lanes(Constants, self.num_lanes)
 
         scenario = Scenario()
         # create world
-        self.world = scenario.make_world(num_agents, world_config)
+        self.world = scenario.make_world(num_agents, world_config, scenario_config)
         self.agents = self.world.agents
         # set required vectorized gym env property
         self.n = len(self.world.agents)
@@ -31,17 +43,20 @@ class MultiAgentEnv(gym.Env):
         self.done_callback = scenario.dones
         self.shared_reward = shared_reward
 
-        num_entities = len(self.world.entities)
+        # the agents and the closest obstacle of every lane are observed
+        num_entities = len(self.world.agents) + Constants.NUM_LANES
         # observations contain (accel, steering), all positions (x,y), followed by all velocities (vx,vy)
         # using relative positions and velocities for bounding
         control_low = np.array([-5.0, -30.0])
         control_high = np.array([5.0, 30.0])
+        # y bound of the 3 lane road, wider roads bound by their width
+        road_y = max(8.0, Constants.HEIGHT/Constants.ppu)
 
         # first bound is for raw min position
-        pos_low = np.array([0.0, 0.0]+[-60.0, -8.0]*(num_entities-1)).flatten()
+        pos_low = np.array([0.0, 0.0]+[-60.0, -road_y]*(num_entities-1)).flatten()
         vel_low = np.array([-20.0, -20.0]*num_entities).flatten()
         # first bound is for raw max position
-        pos_high = np.array([1200.0, 8.0]+[60.0, 8.0]*(num_entities-1)).flatten()
+        pos_high = np.array([1200.0, road_y]+[60.0, road_y]*(num_entities-1)).flatten()
         vel_high = np.array([20.0, 20.0]*num_entities).flatten()
         
         self.low = np.concatenate((control_low, pos_low, vel_low))
@@ -78,8 +93,8 @@ class MultiAgentEnv(gym.Env):
             agent.action = actions.Action(np.argmax(action_n[agent.id]))
         
         # perform num_steps in world
-        for _ in range(num_steps):
-            reward_n, done_n = self._act(action_n)
+        for num_ticks in substeps(self.world, num_steps, self.adaptive_step):
+            reward_n, done_n = self._act(action_n, num_ticks)
 
             # if any agent is done, break
             if any(done_n):
@@ -98,13 +113,14 @@ class MultiAgentEnv(gym.Env):
         # reward = round(reward, 3)
         return obs_n, reward_n, done_n, info_n
 
-    def _act(self, action_n):
+    def _act(self, action_n, num_ticks=1):
         """ Take one step in the world and return rewards and done signals """
         # advance world state by performing an action
-        self.world.act()
+        self.world.act(num_ticks)
         return self._get_reward(), self._get_done()
 
     def reset(self):
+        configure_lanes(Constants, self.num_lanes)
         # reset world
         self.reset_callback(self.world)
 
@@ -4,7 +4,9 @@ import gym
 import numpy as np
 from gym import error, spaces
 
+from gym_highway.multiagent_envs import highway_constants as Constants
 from gym_highway.multiagent_envs.highway_env import MultiAgentEnv
+from gym_highway.stepping import substeps
 from gym_highway.multiagent_envs.simple_base import Scenario
 
 logger = logging.getLogger(__name__)
@@ -16,25 +18,29 @@ class MultiAgentEnvContinuous(MultiAgentEnv):
 
     def __init__(self, world_config, num_agents=1, reset_callback=None, reward_callback=None,
                  observation_callback=None, info_callback=None,
-                 done_callback=None, shared_reward=False):
+                 done_callback=None, shared_reward=False, scenario_config=None, adaptive_step=False):
 
         super(MultiAgentEnvContinuous, self).__init__(world_config, num_agents, reset_callback, 
-                reward_callback, observation_callback, info_callback, done_callback, shared_reward)
+                reward_callback, observation_callback, info_callback, done_callback, shared_reward, scenario_config,
+                adaptive_step)
 
         # update world for continuous action space
         self.world.continuous_ctrl = True
 
-        num_entities = len(self.world.entities)
+        # the agents and the closest obstacle of every lane are observed
+        num_entities = len(self.world.agents) + Constants.NUM_LANES
         # observations contain (accel, steering), all positions (x,y), followed by all velocities (vx,vy)
         # using relative positions and velocities for bounding
         control_low = np.array([-5.0, -30.0])
         control_high = np.array([5.0, 30.0])
+        # y bound of the 3 lane road, wider roads bound by their width
+        road_y = max(8.0, Constants.HEIGHT/Constants.ppu)
 
         # first bound is for raw min position
-        pos_low = np.array([0.0, 0.0]+[-60.0, -8.0]*(num_entities-1)).flatten()
+        pos_low = np.array([0.0, 0.0]+[-60.0, -road_y]*(num_entities-1)).flatten()
         vel_low = np.array([-20.0, -20.0]*num_entities).flatten()
         # first bound is for raw max position
-        pos_high = np.array([1200.0, 8.0]+[60.0, 8.0]*(num_entities-1)).flatten()
+        pos_high = np.array([1200.0, road_y]+[60.0, road_y]*(num_entities-1)).flatten()
         vel_high = np.array([20.0, 20.0]*num_entities).flatten()
         
         self.low = np.concatenate((control_low, pos_low, vel_low))
@@ -64,8 +70,8 @@ class MultiAgentEnvContinuous(MultiAgentEnv):
             agent.action = action_n[agent.id]
         
         # perform num_steps in world
-        for _ in range(num_steps):
-            reward_n, done_n = self._act(action_n)
+        for num_ticks in substeps(self.world, num_steps, self.adaptive_step):
+            reward_n, done_n = self._act(action_n, num_ticks)
 
             # if any agent is done, break
             if any(done_n):
@@ -6,10 +6,11 @@ from gym_highway.multiagent_envs.agent import Car, Obstacle
 from gym_highway.multiagent_envs.highway_core import HighwaySimulator
 # from gym_highway.multiagent_envs.highway_world import HighwayWorld
 from gym_highway.multiagent_envs.multiagent.scenario import BaseScenario
+from gym_highway.scenarios import generate_scenario
 
 
 class Scenario(BaseScenario):
-    def make_world(self, num_agents, world_kw_args):
+    def make_world(self, num_agents, world_kw_args, scenario_config=None):
         world = HighwaySimulator(**world_kw_args)
         # set any world properties first
         world.dim_c = 2
@@ -18,7 +19,13 @@ class Scenario(BaseScenario):
         # world.collaborative = True
 
         # initialize all agents in this world
-        self.configure_world(world, num_agents, num_obstacles)
+        if scenario_config is not None:
+            # random road, the lanes of Constants are configured by the env
+            cars_list, obstacle_list = generate_scenario(num_agents=num_agents, **scenario_config)
+            world.policy_agents_data = cars_list
+            world.scripted_agents_data = obstacle_list
+        else:
+            self.configure_world(world, num_agents, num_obstacles)
         # make initial conditions
         self.reset_world(world)
         # track rewards for info benchmark_data
@@ -36,6 +43,11 @@ class Scenario(BaseScenario):
             {'id':3, 'x':5, 'y':Constants.LANE_1_C, 'vel_x':0.0, 'vel_y':0.0, 'lane_id':1},
             {'id':4, 'x':5, 'y':Constants.LANE_3_C, 'vel_x':0.0, 'vel_y':0.0, 'lane_id':3}
         ]
+        # more agents start in rows of one car per lane ahead of the formation
+        lanes = [Constants.LANE_1_C, Constants.LANE_2_C, Constants.LANE_3_C]
+        for i in range(len(policy_agents_data), n_agents):
+            row, lane = divmod(i - 5, 3)
+            policy_agents_data.append({'id':i, 'x':15 + 5*row, 'y':lanes[lane], 'vel_x':0.0, 'vel_y':0.0, 'lane_id':lane+1})
         scripted_agents_data = [
             {'id':n_agents, 'x':-20, 'y':Constants.LANE_1_C, 'vel_x':7.0, 'lane_id':1, 'color':Constants.YELLOW}, 
             {'id':n_agents+1, 'x':-25, 'y':Constants.LANE_2_C, 'vel_x':5.0, 'lane_id':2, 'color':Constants.YELLOW},
@@ -93,16 +105,15 @@ class Scenario(BaseScenario):
         """
         observations = [None]*len(world.policy_agents_data)
         for agent in world.agents:
-            # all agents except the one in focus and max 3 obstacles
-            # 3 obs - 1 ego agent = 2 extra
-            other_pos = [None]*(len(world.agents)+2)
-            other_vel = [None]*(len(world.agents)+2)
+            # all agents except the one in focus and the closest obstacle of every lane
+            other_pos = [None]*(len(world.agents)-1+Constants.NUM_LANES)
+            other_vel = [None]*(len(world.agents)-1+Constants.NUM_LANES)
 
             lane_obs_near = [None for _ in range(Constants.NUM_LANES)]
             # get closest obstacle
 
             # TEST: make sure we have sufficient obstacles
-            assert len(world.scripted_agents) >= 3
+            assert len(world.scripted_agents) >= Constants.NUM_LANES
             for obj in world.scripted_agents:
                 if obj is agent: continue
                 
@@ -125,9 +136,8 @@ class Scenario(BaseScenario):
                     raise Exception("Obstacle object should not equal reference agent")
                 if obj is None:
                     raise Exception("Obj is None, lane_obs_near: {}".format(lane_obs_near))
-                # find place for agent info in the array
-                placement_idx = obj.id
-                if obj.id > agent.id: placement_idx -= 1
+                # obstacles follow the other agents, in lane order
+                placement_idx = len(world.agents)-1 + lane
                 
                 other_pos[placement_idx] = list(obj.raw_position - agent.raw_position)
                 other_vel[placement_idx] = list(obj.velocity - agent.velocity)
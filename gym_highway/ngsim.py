@@ -0,0 +1,68 @@
+"""
+NGSIM features of the evaluation of the Stackelberg controller, with NumPy only.
+
+The filtered features of features_test_0.data have shape (sets, samples,
+NGSIM_COLUMNS), with the coordinates of the obstacles relative to the ego car.
+preprocessNgsimData converts them once to absolute coordinates into a
+memory-mapped store, which HighwaySimulator.runNgsim and NgsimReplayEnv read
+with loadNgsimStore.
+"""
+import json
+import os
+import pickle
+
+import numpy
+
+# ego columns of the filtered NGSIM features: y, x, vy, vx, followed by NGSIM_OBSTACLES
+# obstacles with vy, vx, y, x relative to the ego
+NGSIM_COLUMNS = 40
+NGSIM_OBSTACLES = 9
+
+def relativeToAbsolute(data):
+    """Absolute coordinates of filtered NGSIM features (..., NGSIM_COLUMNS), as a new array"""
+    data = numpy.array(data, dtype=numpy.float64)
+    obstacles = data[..., 4:].reshape(data.shape[:-1] + (NGSIM_OBSTACLES, 4))
+    obstacles[..., 1] = data[..., 3:4] - obstacles[..., 1]
+    obstacles[..., 2] += data[..., 0:1]
+    obstacles[..., 3] += data[..., 1:2]
+    data[..., 4:] = obstacles.reshape(data.shape[:-1] + (-1,))
+    return data
+
+def preprocessNgsimData(store_dir='ngsim_store', features=None):
+    """
+    Convert the NGSIM features once into a memory-mapped store of shape
+    (sets, samples, NGSIM_COLUMNS) with absolute coordinates, read with
+    loadNgsimStore. The processes reading the store share its pages instead
+    of holding a copy of the unpickled features each.
+    """
+    features = loadNgsimData() if features is None else features
+    os.makedirs(store_dir, exist_ok=True)
+    store = numpy.memmap(os.path.join(store_dir, 'ngsim.dat'), dtype=numpy.float64, mode='w+', shape=features.shape)
+    # convert a block of testing sets at a time
+    for start in range(0, len(features), 1024):
+        store[start:start+1024] = relativeToAbsolute(features[start:start+1024])
+    store.flush()
+    with open(os.path.join(store_dir, 'ngsim.json'), 'w') as f:
+        json.dump({'shape': list(features.shape), 'dtype': 'float64'}, f)
+    return store_dir
+
+def loadNgsimStore(store_dir='ngsim_store'):
+    """Read-only memmap of a store written by preprocessNgsimData, with absolute coordinates"""
+    with open(os.path.join(store_dir, 'ngsim.json')) as f:
+        meta = json.load(f)
+    return numpy.memmap(os.path.join(store_dir, 'ngsim.dat'), dtype=meta['dtype'], mode='r', shape=tuple(meta['shape']))
+
+# Load only the features required for evaluation
+def loadNgsimData():
+
+    features = None
+    with open('features_test_0.data', 'rb') as file:
+        features = pickle.load(file, encoding='latin1')
+
+    # Indices of spatial data that needs to have its magnitude reduced.
+    indices = numpy.concatenate([numpy.arange(0, 4), numpy.arange(5, 9), numpy.arange(11, 15), \
+        numpy.arange(17, 21), numpy.arange(23, 27), numpy.arange(29, 33), numpy.arange(35, 39), \
+        numpy.arange(41, 45), numpy.arange(47, 51), numpy.arange(53, 57)]).ravel()
+
+    filteredData = features[:, :, indices]
+    return filteredData
@@ -0,0 +1,294 @@
+"""
+Streaming trajectory recorder for the highway simulators and envs.
+
+Vehicle states are appended per tick to a directory of fixed-size chunks.
+Every chunk holds one np.memmap file per column, and index.json lists the
+chunks with their number of rows and their episode and time ranges:
+
+    <path>/index.json
+    <path>/chunk_000000/episode.dat, step.dat, time.dat, id.dat, ...
+
+TrajectoryWriter copies the rows to a bounded queue and writes them from a
+background thread, so memory stays bounded however long the rollout is.
+Chunks are never rewritten: a writer opened on an existing recording starts a
+new chunk. TrajectoryReader maps the chunks read-only and slices rows by
+episode and time, skipping the chunks whose ranges do not overlap.
+"""
+import atexit
+import json
+import os
+import os.path as osp
+import queue
+import threading
+from enum import Enum
+
+import gym
+import numpy as np
+
+FIELDS = [('episode', 'int64'), ('step', 'int64'), ('time', 'float64'), ('id', 'int32'), ('lane', 'int16'),
+          ('pos_x', 'float32'), ('pos_y', 'float32'), ('vel_x', 'float32'), ('vel_y', 'float32'),
+          ('action', 'int16'), ('collision', 'bool')]
+INDEX_FILE = 'index.json'
+NO_ACTION = -1
+# recorded action indices, those of the HighwayEnv actions (highway_env.ACTION_LOOKUP) and the
+# decelerate action of the Stackelberg controller after them
+ACTIONS = ['LEFT', 'RIGHT', 'ACCELERATE', 'MAINTAIN', 'DECELERATE']
+
+
+def chunk_dir(path, name):
+    return osp.join(path, name)
+
+
+def load_index(path):
+    filename = osp.join(path, INDEX_FILE)
+    if not osp.exists(filename):
+        return None
+    with open(filename) as f:
+        return json.load(f)
+
+
+def save_index(path, index):
+    # write to a temporary file and rename it, so readers never see a partial index
+    filename = osp.join(path, INDEX_FILE)
+    with open(filename + '.tmp', 'w') as f:
+        json.dump(index, f)
+    os.replace(filename + '.tmp', filename)
+
+
+def action_index(action):
+    """Recorded index of an Action of the envs or of the Stackelberg controller, by name as their values differ"""
+    return ACTIONS.index(action.name)
+
+
+def vehicle_states(vehicles, actions=None):
+    """
+    Columns of the state of vehicles (sprites of the simulators) for one tick.
+
+    actions maps vehicle ids to the index of their action (action_index), the other vehicles
+    get NO_ACTION. A vehicle is flagged when it overlaps another vehicle.
+    """
+    import pygame
+    vehicles = list(vehicles)
+    actions = actions or {}
+    group = pygame.sprite.Group(vehicles)
+    collision = []
+    for vehicle in vehicles:
+        group.remove(vehicle)
+        collision.append(pygame.sprite.spritecollideany(vehicle, group) is not None)
+        group.add(vehicle)
+    return {'id': [vehicle.id for vehicle in vehicles],
+            'lane': [vehicle.lane_id for vehicle in vehicles],
+            'pos_x': [vehicle.position.x for vehicle in vehicles],
+            'pos_y': [vehicle.position.y for vehicle in vehicles],
+            'vel_x': [vehicle.velocity.x for vehicle in vehicles],
+            'vel_y': [vehicle.velocity.y for vehicle in vehicles],
+            'action': [actions.get(vehicle.id, NO_ACTION) for vehicle in vehicles],
+            'collision': collision}
+
+
+class TrajectoryWriter(object):
+    def __init__(self, path, chunk_size=65536, max_queue=256):
+        """
+        Append rows to the recording in path, in chunks of chunk_size rows.
+
+        At most max_queue ticks wait for the background thread, after that
+        append blocks until the thread catches up. The index is written when
+        a chunk is full, on flush and on close (at the latest at exit).
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.index = load_index(path) or {'fields': FIELDS, 'chunk_size': chunk_size, 'chunks': []}
+        if [tuple(field) for field in self.index['fields']] != FIELDS:
+            raise ValueError('{} holds a recording with other fields'.format(path))
+        self.chunk_size = self.index['chunk_size']
+        episodes = [chunk['episodes'][1] for chunk in self.index['chunks'] if chunk['rows']]
+        # episode of the next rollout appended to this recording
+        self.next_episode = max(episodes) + 1 if episodes else 0
+        self.chunk = None
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def append(self, episode, step, time, states):
+        """Append the states of one tick, a dict of columns as returned by vehicle_states"""
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        rows = {name: np.asarray(states[name], dtype=dtype) for name, dtype in FIELDS if name in states}
+        n = len(rows['id'])
+        rows['episode'] = np.full(n, episode, dtype=np.int64)
+        rows['step'] = np.full(n, step, dtype=np.int64)
+        rows['time'] = np.full(n, time, dtype=np.float64)
+        self.queue.put(('rows', rows))
+
+    def flush(self):
+        """Wait for the queued rows to be written and update the index"""
+        done = threading.Event()
+        self.queue.put(('flush', done))
+        done.wait()
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _new_chunk(self):
+        name = 'chunk_%06i' % len(self.index['chunks'])
+        os.makedirs(chunk_dir(self.path, name), exist_ok=True)
+        columns = {field: np.memmap(osp.join(chunk_dir(self.path, name), field + '.dat'), dtype=dtype,
+                                    mode='w+', shape=(self.chunk_size,))
+                   for field, dtype in FIELDS}
+        entry = {'name': name, 'rows': 0, 'episodes': [0, 0], 'time': [0., 0.]}
+        self.index['chunks'].append(entry)
+        return entry, columns
+
+    def _write(self, rows):
+        n, written = len(rows['id']), 0
+        while written < n:
+            if self.chunk is None:
+                self.chunk = self._new_chunk()
+            entry, columns = self.chunk
+            count = min(n - written, self.chunk_size - entry['rows'])
+            for field, _ in FIELDS:
+                columns[field][entry['rows']:entry['rows'] + count] = rows[field][written:written + count]
+            episodes, times = rows['episode'][written:written + count], rows['time'][written:written + count]
+            if entry['rows'] == 0:
+                entry['episodes'] = [int(episodes.min()), int(episodes.max())]
+                entry['time'] = [float(times.min()), float(times.max())]
+            else:
+                entry['episodes'] = [min(entry['episodes'][0], int(episodes.min())),
+                                     max(entry['episodes'][1], int(episodes.max()))]
+                entry['time'] = [min(entry['time'][0], float(times.min())), max(entry['time'][1], float(times.max()))]
+            entry['rows'] += count
+            written += count
+            if entry['rows'] == self.chunk_size:
+                self._flush()
+                self.chunk = None
+
+    def _flush(self):
+        if self.chunk is not None:
+            for column in self.chunk[1].values():
+                column.flush()
+        save_index(self.path, self.index)
+
+    def _run(self):
+        while True:
+            kind, data = self.queue.get()
+            try:
+                if kind == 'rows':
+                    self._write(data)
+                elif kind in ('flush', 'close'):
+                    self._flush()
+            except Exception as e:
+                # raised in the caller on its next append
+                self.error = e
+            if kind == 'flush':
+                data.set()
+            elif kind == 'close':
+                return
+
+    def close(self):
+        if self.thread is None:
+            return
+        self.queue.put(('close', None))
+        self.thread.join()
+        self.thread = None
+        self.chunk = None
+        atexit.unregister(self.close)
+        if self.error is not None:
+            raise self.error
+
+
+class TrajectoryReader(object):
+    def __init__(self, path):
+        """Read-only view of the rows recorded in path when it is opened"""
+        self.path = path
+        self.index = load_index(path)
+        if self.index is None:
+            raise ValueError('{} holds no recording'.format(path))
+        self.chunks = [chunk for chunk in self.index['chunks'] if chunk['rows']]
+
+    def __len__(self):
+        return sum(chunk['rows'] for chunk in self.chunks)
+
+    def episodes(self):
+        return np.unique(self.read(fields=['episode'])['episode'])
+
+    def _column(self, chunk, field):
+        dtype = dict(FIELDS)[field]
+        data = np.memmap(osp.join(chunk_dir(self.path, chunk['name']), field + '.dat'), dtype=dtype,
+                         mode='r', shape=(self.index['chunk_size'],))
+        return data[:chunk['rows']]
+
+    def read(self, episode=None, start=None, end=None, fields=None):
+        """
+        Columns of the rows of an episode (or of all episodes) with start <= time < end.
+
+        Returns
+        -------
+        dict of field name -> np.ndarray, in the order the rows were recorded
+        """
+        fields = fields or [field for field, _ in FIELDS]
+        selected = {field: [] for field in fields}
+        for chunk in self.chunks:
+            if episode is not None and not chunk['episodes'][0] <= episode <= chunk['episodes'][1]:
+                continue
+            if (start is not None and chunk['time'][1] < start) or (end is not None and chunk['time'][0] >= end):
+                continue
+            mask = np.ones(chunk['rows'], dtype=bool)
+            if episode is not None:
+                mask &= self._column(chunk, 'episode') == episode
+            if start is not None or end is not None:
+                times = self._column(chunk, 'time')
+                if start is not None:
+                    mask &= times >= start
+                if end is not None:
+                    mask &= times < end
+            for field in fields:
+                selected[field].append(np.asarray(self._column(chunk, field)[mask]))
+        return {field: np.concatenate(columns) if columns else np.zeros(0, dtype=dict(FIELDS)[field])
+                for field, columns in selected.items()}
+
+
+class RecordTrajectory(gym.Wrapper):
+    """
+    Records the vehicles of a HighwayEnv or multi-agent env after every step,
+    one episode per reset. The action of the agents is their discrete action
+    index (ACTIONS), continuous actions are recorded as NO_ACTION.
+    """
+    def __init__(self, env, path, **writer_kwargs):
+        gym.Wrapper.__init__(self, env)
+        self.writer = TrajectoryWriter(path, **writer_kwargs)
+        self.episode = self.writer.next_episode - 1
+        self.t = 0
+
+    def _simulator(self):
+        env = self.env.unwrapped
+        return env.world if hasattr(env, 'world') else env.env
+
+    def _record(self, actions):
+        sim = self._simulator()
+        self.writer.append(self.episode, self.t, sim.run_time, vehicle_states(sim.all_obstacles, actions))
+
+    def reset(self, **kwargs):
+        obs = self.env.reset(**kwargs)
+        self.episode += 1
+        self.t = 0
+        self._record(None)
+        return obs
+
+    def step(self, action):
+        obs, rew, done, info = self.env.step(action)
+        self.t += 1
+        sim = self._simulator()
+        if hasattr(sim, 'agents'):
+            # the multi-agent envs keep the action of every agent, an Action or a continuous vector
+            actions = {agent.id: action_index(agent.action) for agent in sim.agents if isinstance(agent.action, Enum)}
+        else:
+            actions = {car.id: int(action) for car in sim.all_agents} if np.ndim(action) == 0 else None
+        self._record(actions)
+        return obs, rew, done, info
+
+    def close(self):
+        self.writer.close()
+        return self.env.close()
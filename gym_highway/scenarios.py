@@ -0,0 +1,126 @@
+"""
+Traffic scenarios of any number of lanes and vehicles for the highway simulators.
+
+generate_scenario places the policy agents and the background obstacles of
+a road of num_lanes lanes and returns them as the cars_list / obstacle_list
+dicts HighwaySimulator (and the multi-agent Scenario) already take. The
+vehicles of every lane are spread over the road with at least min_gap
+between them, all lanes are placed at once with numpy.
+
+The lane geometry lives in the Constants of the simulators, so
+configure_lanes has to be called on them before a simulator is created.
+It is process-wide: all the simulators of a process share one lane count,
+vectorized envs with different lane counts need their own processes.
+
+Observations hold the policy agents and the closest obstacle of every lane,
+observation_size gives their length for num_agents agents and num_lanes lanes.
+"""
+import numpy as np
+
+# geometry of the default 3 lane road, in pixels
+LANE_WIDTH = 80
+PPU = 32
+YELLOW = (255, 255, 0)
+# x the simulators keep their lead agent at (Car.update)
+LEAD_X = 10.0
+
+
+def lane_centers(num_lanes, lane_width=LANE_WIDTH, ppu=PPU):
+    """y of the center of every lane, lane 1 first"""
+    return (np.arange(num_lanes) + 0.5)*lane_width/ppu
+
+
+def configure_lanes(constants, num_lanes):
+    """Resize the road of a Constants class or module to num_lanes lanes of the same width"""
+    if num_lanes < 2:
+        raise ValueError('a highway needs at least 2 lanes, got {}'.format(num_lanes))
+    constants.NUM_LANES = num_lanes
+    constants.HEIGHT = constants.LANE_WIDTH*num_lanes
+    constants.NEW_LANES = [float(y) for y in lane_centers(num_lanes, constants.LANE_WIDTH, constants.ppu)]
+
+
+def observation_size(num_agents, num_lanes):
+    """
+    Length of an observation: (accel, steering), then the positions and the
+    velocities of the agent, the other agents and the closest obstacle of every lane
+    """
+    return 2 + 4*(num_agents + num_lanes)
+
+
+def place_vehicles(rng, counts, x_min, road_length, min_gap):
+    """
+    Non-overlapping x of counts[lane] vehicles in every lane of [x_min, x_min + road_length].
+
+    Returns (lanes, xs), grouped by lane and sorted by x within a lane. The
+    gaps of a lane are uniform: its free length, road_length less the
+    min_gap of every vehicle after the first, is split at sorted uniform points.
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    free = road_length - (counts - 1)*min_gap
+    if np.any((counts > 0) & (free < 0)):
+        raise ValueError('{} vehicles do not fit in a lane of length {} with gaps of {}'.format(
+            counts.max(), road_length, min_gap))
+    lanes = np.repeat(np.arange(len(counts)), counts)
+    # rank of every vehicle within its lane
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(len(lanes)) - starts[lanes]
+
+    offsets = rng.uniform(0.0, 1.0, size=len(lanes))*free[lanes]
+    offsets = offsets[np.lexsort((offsets, lanes))]
+    return lanes, x_min + offsets + rank*min_gap
+
+
+def generate_scenario(num_lanes=3, num_agents=1, road_length=140.0, density=0.01, speed=(5.0, 7.0),
+                      agent_speed=0.0, min_gap=4.0, x_min=-40.0, first_obstacle_id=None, seed=None):
+    """
+    cars_list and obstacle_list of a random road.
+
+    num_lanes      lanes of the road, configure_lanes the simulator to match
+    num_agents     policy agents with ids 0..num_agents-1, agent i drives in lane i % num_lanes
+    road_length    length of the road the vehicles start on, from x_min
+    density        obstacles per unit of road length and lane, every lane gets at least one
+    speed          (low, high) of the uniform speeds of the obstacles
+    agent_speed    starting speed of the agents
+    min_gap        smallest distance between the x of two vehicles of a lane
+    first_obstacle_id  id of the first obstacle, num_agents by default so ids are contiguous
+
+    Agents start at the front of their lane with the traffic behind them, like
+    the fixed scenarios, and the simulators spawn new obstacles ahead. The
+    simulators pin their lead agent at x=LEAD_X without moving the other
+    vehicles, so every lane is shifted for its front agent to start there, or
+    its front obstacle min_gap behind it in the lanes without agents: no agent
+    is ahead of agent 0 and the lead agent is not moved on the first tick.
+    """
+    rng = np.random.RandomState(seed)
+    if first_obstacle_id is None:
+        first_obstacle_id = num_agents
+    centers = lane_centers(num_lanes)
+
+    agent_counts = np.bincount(np.arange(num_agents) % num_lanes, minlength=num_lanes)
+    obstacle_counts = np.full(num_lanes, max(1, int(round(density*road_length))))
+    lanes, xs = place_vehicles(rng, agent_counts + obstacle_counts, x_min, road_length, min_gap)
+
+    # the last agent_counts[lane] vehicles of a lane are its agents
+    rank_from_front = np.cumsum(agent_counts + obstacle_counts)[lanes] - 1 - np.arange(len(lanes))
+    is_agent = rank_from_front < agent_counts[lanes]
+    # the front agent of every lane starts at LEAD_X, the front obstacle of a lane without agents min_gap behind
+    front = rank_from_front == 0
+    shifts = np.zeros(num_lanes)
+    shifts[lanes[front]] = LEAD_X - np.where(is_agent[front], 0.0, min_gap) - xs[front]
+    xs = xs + shifts[lanes]
+
+    cars_list = [None]*num_agents
+    agent_lanes, agent_xs = lanes[is_agent], xs[is_agent]
+    for i in range(num_agents):
+        lane = i % num_lanes
+        # agents of a lane in order of id from the front
+        x = agent_xs[agent_lanes == lane][::-1][i // num_lanes]
+        cars_list[i] = {'id':i, 'x':float(x), 'y':float(centers[lane]), 'vel_x':float(agent_speed),
+                        'vel_y':0.0, 'lane_id':lane+1}
+
+    obstacle_lanes, obstacle_xs = lanes[~is_agent], xs[~is_agent]
+    obstacle_speeds = rng.uniform(speed[0], speed[1], size=len(obstacle_lanes))
+    obstacle_list = [{'id':first_obstacle_id + i, 'x':float(x), 'y':float(centers[lane]), 'vel_x':float(v),
+                      'lane_id':int(lane)+1, 'color':YELLOW}
+                     for i, (lane, x, v) in enumerate(zip(obstacle_lanes, obstacle_xs, obstacle_speeds))]
+    return cars_list, obstacle_list
@@ -0,0 +1,100 @@
+"""
+Adaptive time stepping of the highway simulators.
+
+The envs advance the simulators by int(ticks/4) ticks of 1/ticks seconds per
+decision. With adaptive stepping an act can take several ticks at once,
+as many as no two vehicles can touch in: for every pair of vehicles which
+overlap laterally, the gap between their bumpers cannot close faster than
+their closing speed plus max_relative_acceleration, which bounds the time to
+collision. Steps stay on the tick grid and end on the decision boundary, so
+decisions, timers and episode ends happen at the same ticks as with fixed
+steps. The steps fall back to single ticks:
+
+    - while an agent changes lanes or steers, as the lateral dynamics of
+      the agents depend on the step size
+    - when vehicles get close, so a collision is detected at the tick its
+      boxes overlap, as with fixed steps
+    - while an agent accelerates or decelerates, as its acceleration ramps
+      up every tick and the lead agent moves the frame of all the vehicles
+    - before an agent maintaining its speed reaches its cruise velocity
+
+Longer steps only advance the agents at constant speed, the obstacles
+following the traffic model by the Euler error of their accelerations, so
+collisions are detected within a few ticks of the fixed step ones, in the same
+decision (benchmarks.highway checks the first collision of its adaptive
+scenarios).
+"""
+import numpy as np
+
+# 2 vehicles braking and accelerating as hard as they can, Car.brake_deceleration
+MAX_RELATIVE_ACCELERATION = 20.0
+
+
+def time_to_collision(x, y, v, lateral, length, width, lateral_margin,
+                      max_relative_acceleration=MAX_RELATIVE_ACCELERATION):
+    """
+    Shortest time before two of the vehicles can touch.
+
+    x, y, v     positions and longitudinal speeds of the vehicles
+    lateral     vehicles moving between lanes, their width is widened by lateral_margin
+    """
+    x, y, v = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64), np.asarray(v, dtype=np.float64)
+    half_width = width/2 + np.where(lateral, lateral_margin, 0.0)
+    i, j = np.triu_indices(len(x), k=1)
+    near = np.abs(y[i] - y[j]) < half_width[i] + half_width[j]
+    i, j = i[near], j[near]
+    if not len(i):
+        return np.inf
+    dx = x[j] - x[i]
+    gap = np.maximum(np.abs(dx) - length, 0.0)
+    closing = np.where(dx >= 0, v[i] - v[j], v[j] - v[i])
+    # smallest t with gap - closing*t - a*t^2/2 = 0
+    a = max_relative_acceleration
+    return float(np.min((np.sqrt(closing**2 + 2*a*gap) - closing)/a))
+
+
+def speed_changes(car):
+    """Whether the speed of the agent changes over its next tick, up to the clipping at 0 and max_velocity"""
+    if car.do_accelerate or car.acceleration > 0.0:
+        return car.velocity.x < car.max_velocity
+    if car.do_decelerate or car.acceleration < 0.0:
+        return car.velocity.x > 0.0
+    return False
+
+
+def safe_ticks(agents, vehicles, dt, max_ticks, lane_centers, length, width):
+    """
+    Ticks of dt seconds the next act can take at once, from 1 up to max_ticks.
+    vehicles are all the vehicles, agents included.
+    """
+    agents = list(agents)
+    if max_ticks <= 1 or any(car.left_mode or car.right_mode or car.steering for car in agents):
+        return 1
+    if any(speed_changes(car) for car in agents if not car.do_maintain):
+        return 1
+    vehicles = list(vehicles)
+    lane_centers = np.asarray(lane_centers)
+    # screen positions, which the collision rects are placed at
+    x = [car.position.x for car in vehicles]
+    y = np.array([car.position.y for car in vehicles])
+    v = [car.velocity.x for car in vehicles]
+    lanes = np.array([car.lane_id for car in vehicles])
+    # the obstacles between lanes are changing lanes, the agents do not move sideways while they do not steer
+    agent_ids = set(id(car) for car in agents)
+    is_agent = np.array([id(car) in agent_ids for car in vehicles])
+    lateral = (np.abs(y - lane_centers[lanes - 1]) > 1e-6) & ~is_agent
+    lane_width = abs(lane_centers[1] - lane_centers[0]) if len(lane_centers) > 1 else 0.0
+    t = time_to_collision(x, y, v, lateral, length, width, lane_width)
+    for car in agents:
+        if car.do_maintain:
+            t = min(t, abs(car.cruise_vel - car.velocity.x)/car.max_acceleration)
+    return int(min(max(t/dt, 1), max_ticks))
+
+
+def substeps(sim, num_ticks, adaptive=True):
+    """Tick counts of the acts of one decision of num_ticks ticks, each computed after the previous act"""
+    done = 0
+    while done < num_ticks:
+        step = sim.safeTicks(num_ticks - done) if adaptive else 1
+        yield step
+        done += step
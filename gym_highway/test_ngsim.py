@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gym_highway.ngsim import NGSIM_COLUMNS, loadNgsimStore, preprocessNgsimData, relativeToAbsolute
+
+
+def reference_relative_to_absolute(data):
+    # per column pandas conversion HighwaySimulator.relativeToAbsolute used before
+    data_df = pd.DataFrame(data)
+    relative_idx = np.concatenate([np.arange(5, 8), np.arange(9, 12), np.arange(13, 16), np.arange(17, 20),
+                                   np.arange(21, 24), np.arange(25, 28), np.arange(29, 32), np.arange(33, 36),
+                                   np.arange(37, 40)]).ravel()
+    for i in range(0, len(relative_idx), 3):
+        data_df.loc[:, relative_idx[i]] = data_df.loc[:, 3] - data_df.loc[:, relative_idx[i]]
+        data_df.loc[:, relative_idx[i]+1] = data_df.loc[:, relative_idx[i]+1] + data_df.loc[:, 0]
+        data_df.loc[:, relative_idx[i]+2] = data_df.loc[:, relative_idx[i]+2] + data_df.loc[:, 1]
+    return data_df.values
+
+
+def test_relative_to_absolute_matches_reference():
+    rng = np.random.RandomState(0)
+    features = rng.randn(3, 20, NGSIM_COLUMNS) * 100
+    absolute = relativeToAbsolute(features)
+    for data, expected in zip(absolute, features):
+        assert np.array_equal(data, reference_relative_to_absolute(expected))
+    # the features are left untouched
+    assert not np.shares_memory(absolute, features)
+
+
+def test_store_round_trip(tmpdir):
+    features = np.random.RandomState(1).randn(2, 5, NGSIM_COLUMNS)
+    store = loadNgsimStore(preprocessNgsimData(str(tmpdir), features))
+    assert store.shape == features.shape
+    assert np.array_equal(store, relativeToAbsolute(features))
+
+
+def synthetic_features(samples=11):
+    # the ego car drives at 10 in lane y=24 at one unit per sample, a stopped neighbour waits 20 ahead of
+    # its first position, the other neighbours are missing (recorded at the ego position)
+    features = np.zeros((1, samples, NGSIM_COLUMNS))
+    t = np.arange(samples)
+    features[0, :, 0], features[0, :, 1], features[0, :, 3] = 24.0, t, 10.0
+    # vy, vx, y, x of the neighbour relative to the ego
+    features[0, :, 5], features[0, :, 7] = 10.0, 20.0 - t
+    return features
+
+
+def test_ngsim_replay_env(tmpdir):
+    pytest.importorskip('pygame')
+    from gym_highway.envs.multi_lane_sim import Action
+    from gym_highway.envs.ngsim_env import NgsimReplayEnv
+
+    env = NgsimReplayEnv(preprocessNgsimData(str(tmpdir), synthetic_features()), window=5, frame_skip=2)
+    env.seed(0)
+    obs = env.reset()
+    assert obs.shape == env.observation_space.shape
+    # ego vx, vy, then dx, dy, dvx, dvy, present of the neighbour, the missing ones are zeros
+    assert np.array_equal(obs[:7], [10.0, 0.0, 20.0, 0.0, -10.0, 0.0, 1.0]) and not obs[7:].any()
+
+    # following the recorded ego car, the gap to the stopped neighbour closes by 2 per step
+    for gap in [18.0, 16.0]:
+        obs, rew, done, info = env.step(Action.MAINTAIN.value)
+        assert obs[2] == gap and rew == -0.9 and not done
+    obs, rew, done, info = env.step(Action.MAINTAIN.value)
+    assert done and rew == -250.0 and info['num_collisions'] == 1
+
+    env.reset()
+    obs, _, _, _ = env.step(Action.ACCELERATE.value)
+    assert obs[0] == 11.0
@@ -0,0 +1,103 @@
+import numpy as np
+import pytest
+
+from gym_highway.recorder import ACTIONS, NO_ACTION, RecordTrajectory, TrajectoryReader, TrajectoryWriter
+
+
+def tick_states(n, t):
+    return {'id': np.arange(n), 'lane': np.arange(n) % 3 + 1, 'pos_x': np.full(n, t), 'pos_y': np.zeros(n),
+            'vel_x': np.ones(n), 'vel_y': np.zeros(n), 'action': np.full(n, NO_ACTION), 'collision': np.arange(n) == t % n}
+
+
+def test_chunked_recording(tmpdir):
+    path = str(tmpdir.join('trajectories'))
+    writer = TrajectoryWriter(path, chunk_size=7, max_queue=2)
+    for episode in range(2):
+        for t in range(5):
+            writer.append(episode, t, 0.1 * t, tick_states(3, t))
+    writer.flush()
+    assert len(TrajectoryReader(path)) == 30
+    writer.close()
+
+    # a reopened recording keeps its chunks and continues with the next episode
+    writer = TrajectoryWriter(path)
+    assert writer.next_episode == 2 and writer.chunk_size == 7
+    for t in range(4):
+        writer.append(writer.next_episode, t, 0.1 * t, tick_states(2, t))
+    writer.close()
+
+    reader = TrajectoryReader(path)
+    assert len(reader) == 38
+    assert list(reader.episodes()) == [0, 1, 2]
+    episode = reader.read(episode=1)
+    assert len(episode['id']) == 15
+    assert np.array_equal(episode['step'], np.repeat(np.arange(5), 3))
+    assert np.array_equal(episode['pos_x'], np.repeat(np.arange(5), 3).astype(np.float32))
+    assert np.array_equal(episode['collision'], np.tile(np.arange(3), 5) == np.repeat(np.arange(5), 3) % 3)
+    window = reader.read(episode=2, start=0.1, end=0.25, fields=['step', 'id'])
+    assert list(window) == ['step', 'id']
+    assert np.array_equal(window['step'], [1, 1, 2, 2])
+    assert len(reader.read(episode=5)['id']) == 0
+
+
+def agent_actions(rows, agent_ids):
+    """Recorded actions of the agents, per step"""
+    is_agent = np.isin(rows['id'], agent_ids)
+    assert np.all(rows['action'][~is_agent] == NO_ACTION)
+    return [set(rows['action'][is_agent & (rows['step'] == step)]) for step in np.unique(rows['step'])]
+
+
+def test_record_trajectory(tmpdir):
+    pytest.importorskip('pygame')
+    from gym_highway.envs import HighwayEnv
+    from gym_highway.multiagent_envs import MultiAgentEnv
+    from gym_highway.multiagent_envs.actions import Action
+
+    path = str(tmpdir.join('highway'))
+    env = RecordTrajectory(HighwayEnv(render=False), path)
+    env.reset()
+    # accelerate, then maintain the speed
+    env.step(2)
+    env.step(3)
+    env.close()
+    reader = TrajectoryReader(path)
+    assert list(reader.episodes()) == [0]
+    agent_ids = [car.id for car in env.unwrapped.env.all_agents]
+    assert agent_actions(reader.read(), agent_ids) == [{NO_ACTION}, {ACTIONS.index('ACCELERATE')},
+                                                       {ACTIONS.index('MAINTAIN')}]
+
+    path = str(tmpdir.join('multiagent'))
+    world_config = {'manual': False, 'inf_obs': True, 'save': False, 'render': False, 'real_time': False}
+    env = RecordTrajectory(MultiAgentEnv(world_config=world_config, num_agents=2), path)
+    env.reset()
+    env.step([np.eye(len(Action))[Action.ACCELERATE.value], np.eye(len(Action))[Action.MAINTAIN.value]])
+    env.close()
+    rows = TrajectoryReader(path).read()
+    agents = list(env.unwrapped.world.agents)
+    assert agent_actions(rows, [agent.id for agent in agents]) == [{NO_ACTION}, set(
+        ACTIONS.index(name) for name in ('ACCELERATE', 'MAINTAIN'))]
+    last = rows['step'] == 1
+    assert rows['action'][last & (rows['id'] == agents[0].id)] == [ACTIONS.index('ACCELERATE')]
+
+
+def test_run_once_records_the_planner_actions(tmpdir, monkeypatch):
+    pytest.importorskip('pygame')
+    from gym_highway.envs.multi_lane_sim import Constants, HighwaySimulator
+    from gym_highway.envs.stackelbergPlayer import Action, StackelbergPlayer
+
+    # the values of the planner actions differ from the env action indices
+    monkeypatch.setattr(StackelbergPlayer, 'selectAction', lambda self, leader, obstacles: Action.ACCELERATE)
+    cars_list = [{'id': 0, 'x': 10, 'y': Constants.LANE_2_C, 'vel_x': 10.0, 'vel_y': 0.0, 'lane_id': 2}]
+    obstacle_list = [{'id': 100, 'x': -20, 'y': Constants.LANE_1_C, 'vel_x': 7.0, 'lane_id': 1,
+                      'color': Constants.YELLOW}]
+    sim = HighwaySimulator(cars_list, obstacle_list)
+    path = str(tmpdir.join('run'))
+    writer = TrajectoryWriter(path)
+    sim.runOnce(cars_list, obstacle_list, run_duration=1, recorder=writer, episode=3)
+    writer.close()
+
+    rows = TrajectoryReader(path).read()
+    assert set(rows['episode']) == {3} and set(rows['id']) == {0, 100}
+    # no action before the first decision
+    assert agent_actions(rows, [0])[0] == {NO_ACTION}
+    assert agent_actions(rows, [0])[-1] == {ACTIONS.index('ACCELERATE')}
@@ -0,0 +1,89 @@
+import types
+
+import numpy as np
+import pytest
+
+from gym_highway.scenarios import configure_lanes, generate_scenario, lane_centers, place_vehicles
+
+
+def test_lane_geometry():
+    # the centers of the fixed 3 lane road
+    assert np.allclose(lane_centers(3), [40/32, 120/32, 200/32])
+    constants = types.SimpleNamespace(NUM_LANES=3, HEIGHT=240, LANE_WIDTH=80, ppu=32)
+    configure_lanes(constants, 6)
+    assert constants.NUM_LANES == 6 and constants.HEIGHT == 480
+    assert np.allclose(constants.NEW_LANES, lane_centers(6))
+
+
+def test_placements_do_not_overlap():
+    rng = np.random.RandomState(0)
+    lanes, xs = place_vehicles(rng, [3, 0, 10, 1], x_min=-10.0, road_length=50.0, min_gap=4.0)
+    assert np.array_equal(lanes, [0]*3 + [2]*10 + [3])
+    for lane in range(4):
+        lane_xs = xs[lanes == lane]
+        assert np.all(np.diff(lane_xs) >= 4.0 - 1e-9)
+        assert np.all((lane_xs >= -10.0) & (lane_xs <= 40.0))
+    with pytest.raises(ValueError):
+        place_vehicles(rng, [20], x_min=0.0, road_length=50.0, min_gap=4.0)
+
+
+def test_generate_scenario():
+    cars, obstacles = generate_scenario(num_lanes=6, num_agents=10, road_length=200.0, density=0.04, seed=3)
+    assert [car['id'] for car in cars] == list(range(10))
+    assert [obstacle['id'] for obstacle in obstacles] == list(range(10, 10 + 6*8))
+    assert [car['lane_id'] for car in cars] == [i % 6 + 1 for i in range(10)]
+    assert all(5.0 <= obstacle['vel_x'] <= 7.0 for obstacle in obstacles)
+
+    centers = lane_centers(6)
+    for lane in range(1, 7):
+        agents = [car['x'] for car in cars if car['lane_id'] == lane]
+        traffic = [obstacle['x'] for obstacle in obstacles if obstacle['lane_id'] == lane]
+        # agents of a lane lead its traffic, in order of id
+        assert agents == sorted(agents, reverse=True)
+        assert min(agents) > max(traffic)
+        # the front agent of every lane starts where the simulators keep the lead agent
+        assert agents[0] == 10.0
+        assert all(vehicle['y'] == centers[lane-1] for vehicle in cars + obstacles if vehicle['lane_id'] == lane)
+
+    # seeded placements are reproducible, every lane has an obstacle
+    assert generate_scenario(num_lanes=6, num_agents=10, road_length=200.0, density=0.04, seed=3) == (cars, obstacles)
+    _, obstacles = generate_scenario(num_lanes=5, num_agents=2, density=0.0)
+    assert sorted(obstacle['lane_id'] for obstacle in obstacles) == [1, 2, 3, 4, 5]
+    # the lanes without agents have their traffic behind the agents too
+    assert max(obstacle['x'] for obstacle in obstacles) == 10.0 - 4.0
+
+
+def test_envs_set_their_lanes():
+    pytest.importorskip('pygame')
+    from gym_highway.envs import HighwayEnv
+    from gym_highway.envs.multi_lane_sim import Constants
+
+    wide = HighwayEnv(render=False, scenario={'num_lanes': 5})
+    assert Constants.NUM_LANES == 5
+    # a default env after a scenario one drives on the 3 lane road again
+    HighwayEnv(render=False)
+    assert Constants.NUM_LANES == 3 and np.allclose(Constants.NEW_LANES, lane_centers(3))
+    wide.reset()
+    assert Constants.NUM_LANES == 5
+
+
+def test_generated_roads_start_without_collisions():
+    pytest.importorskip('pygame')
+    from gym_highway.envs import HighwayEnv
+    from gym_highway.multiagent_envs import MultiAgentEnv
+    from gym_highway.multiagent_envs.actions import Action
+
+    env = HighwayEnv(render=False, scenario={'num_lanes': 5, 'density': 0.05, 'seed': 1})
+    env.reset()
+    # maintain the speed
+    _, _, done, info = env.step(3)
+    assert not done and info['num_obs_collisions'] == 0 and info['num_agent_collisions'] == 0
+
+    world_config = {'manual': False, 'inf_obs': True, 'save': False, 'render': False, 'real_time': False}
+    env = MultiAgentEnv(world_config=world_config, num_agents=12,
+                        scenario_config={'num_lanes': 6, 'road_length': 200.0, 'density': 0.04, 'seed': 0})
+    env.reset()
+    maintain = np.eye(len(Action))[Action.MAINTAIN.value]
+    _, _, done, _ = env.step([maintain]*env.n)
+    assert not any(done)
+    assert env.world.num_obs_collisions == 0 and env.world.num_agent_collisions == 0
@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from gym_highway.scenarios import lane_centers
+from gym_highway.stepping import safe_ticks, substeps, time_to_collision
+
+
+def test_time_to_collision():
+    # a vehicle 10 behind another, closing at 2: the gap of 8 closes before 4 seconds
+    t = time_to_collision([0.0, 10.0], [1.0, 1.0], [6.0, 4.0], [False, False], length=2.0, width=1.0,
+                          lateral_margin=2.5)
+    assert 0 < t < 4.0
+    assert np.isclose(t, (np.sqrt(4 + 2*20*8) - 2)/20)
+    # touching vehicles, and vehicles of other lanes which only count while changing lanes
+    assert time_to_collision([0.0, 2.0], [1.0, 1.0], [5.0, 5.0], [False, False], 2.0, 1.0, 2.5) == 0.0
+    assert time_to_collision([0.0, 2.0], [1.0, 3.5], [5.0, 5.0], [False, False], 2.0, 1.0, 2.5) == np.inf
+    assert time_to_collision([0.0, 2.0], [1.0, 3.5], [5.0, 5.0], [False, True], 2.0, 1.0, 2.5) == 0.0
+
+
+def car(x, lane, v, **controls):
+    centers = lane_centers(3)
+    vector = lambda x, y: SimpleNamespace(x=x, y=y)
+    state = dict(left_mode=False, right_mode=False, steering=0.0, do_accelerate=False, do_decelerate=False,
+                 do_maintain=False, cruise_vel=v, acceleration=0.0, max_acceleration=5.0, max_velocity=20.0)
+    state.update(controls)
+    return SimpleNamespace(position=vector(x, centers[lane-1]), velocity=vector(v, 0.0), lane_id=lane, **state)
+
+
+def test_safe_ticks():
+    centers, dt = lane_centers(3), 1/36
+    agent = car(0.0, 2, 6.0)
+    obstacles = [car(30.0, 1, 6.0), car(-30.0, 3, 6.0)]
+    assert safe_ticks([agent], [agent] + obstacles, dt, 9, centers, 2.4, 1.2) == 9
+    # a slow obstacle right ahead, or an agent moving sideways, take single ticks
+    assert safe_ticks([agent], [agent, car(2.5, 2, 0.0)], dt, 9, centers, 2.4, 1.2) == 1
+    steering = car(0.0, 2, 6.0, left_mode=True)
+    assert safe_ticks([steering], [steering] + obstacles, dt, 9, centers, 2.4, 1.2) == 1
+    # an agent maintaining its speed 0.1 below its cruise velocity reaches it in 0.02 seconds
+    maintaining = car(0.0, 2, 6.0, do_maintain=True, cruise_vel=6.1)
+    assert safe_ticks([maintaining], [maintaining] + obstacles, dt, 9, centers, 2.4, 1.2) == 1
+    # an accelerating agent takes single ticks until it reaches its max velocity
+    accelerating = car(0.0, 2, 6.0, do_accelerate=True, acceleration=0.5)
+    assert safe_ticks([accelerating], [accelerating] + obstacles, dt, 9, centers, 2.4, 1.2) == 1
+    at_max = car(0.0, 2, 20.0, do_accelerate=True, acceleration=0.5)
+    assert safe_ticks([at_max], [at_max, car(30.0, 1, 20.0), car(-30.0, 3, 20.0)], dt, 9, centers, 2.4, 1.2) == 9
+
+
+def test_substeps_end_on_the_decision():
+    sim = SimpleNamespace(safeTicks=lambda max_ticks: min(max_ticks, 4))
+    assert list(substeps(sim, 9)) == [4, 4, 1]
+    assert list(substeps(sim, 9, adaptive=False)) == [1]*9
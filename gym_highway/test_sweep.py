@@ -0,0 +1,62 @@
+import json
+import os
+import os.path as osp
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pygame')
+
+from gym_highway.envs.sweep import (DF_COLUMNS, dt_label, merge_sweep, run_sweep, sweep_tasks, task_done, task_file,
+                                    task_options)
+
+
+def test_tasks_of_other_options_are_not_done(tmpdir):
+    out_dir = str(tmpdir)
+    options = {'inf_obstacles': False, 'continuous': False, 'ticks': 36.0, 'run_duration': 60, 'total_runs': 2}
+    task, other = sweep_tasks([1], 2, seed=3)
+    assert not task_done(out_dir, task, options)
+
+    np.savez(task_file(out_dir, *task[:2]), options=json.dumps(task_options(options, task[2])))
+    assert task_done(out_dir, task, options)
+    assert not task_done(out_dir, task, dict(options, run_duration=30))
+    assert not task_done(out_dir, task, dict(options, ticks=60.0))
+    # a task file of another seed, or without options, is simulated again
+    np.savez(task_file(out_dir, *other[:2]), options=json.dumps(task_options(options, other[2] + 1)))
+    assert not task_done(out_dir, other, options)
+    np.savez(task_file(out_dir, *other[:2]), run=np.zeros(6))
+    assert not task_done(out_dir, other, options)
+
+
+def test_dt_label():
+    assert dt_label(20.0) == '0.05'
+    assert dt_label() == dt_label(36.0) == '0.0278'
+
+
+def test_run_and_merge_sweep(tmpdir):
+    from gym_highway.envs.multi_lane_sim import Constants
+    out_dir = str(tmpdir.join('sweep'))
+    cars_list = [{'id':0, 'x':10, 'y':Constants.LANE_2_C, 'vel_x':10.0, 'vel_y':0.0, 'lane_id':2},
+                 {'id':1, 'x':5, 'y':Constants.LANE_1_C, 'vel_x':10.0, 'vel_y':0.0, 'lane_id':1}]
+    obstacle_list = [{'id':100, 'x':-20, 'y':Constants.LANE_1_C, 'vel_x':7.0, 'lane_id':1, 'color':Constants.YELLOW}]
+    done = run_sweep(cars_list, obstacle_list, out_dir, agent_counts=[1, 2], total_runs=2, run_duration=1,
+                     num_workers=0)
+    assert sorted(done) == sweep_tasks([1, 2], 2)
+
+    merged = pd.read_csv(osp.join(out_dir, 'model_IGA_%s_2_2_1.csv'%dt_label()))
+    assert list(merged.columns) == DF_COLUMNS
+    assert merged[['agent_count', 'run_count']].values.tolist() == [[1, 0], [1, 1], [2, 0], [2, 1]]
+    for agent_count in (1, 2):
+        assert len(pd.read_csv(osp.join(out_dir, 'backup_IGA_%s_%d_2_1.csv'%(dt_label(), agent_count)))) == 2
+        assert osp.exists(osp.join(out_dir, 'pos_IGA_%s_%d_1.csv'%(dt_label(), agent_count)))
+    # the tasks are done
+    assert run_sweep(cars_list, obstacle_list, out_dir, agent_counts=[1, 2], total_runs=2, run_duration=1,
+                     num_workers=0) == []
+
+    # a merge with missing tasks has to be asked for
+    os.remove(task_file(out_dir, 2, 1))
+    with pytest.raises(ValueError):
+        merge_sweep(out_dir, [1, 2], 2, 1)
+    merged = pd.read_csv(merge_sweep(out_dir, [1, 2], 2, 1, partial=True))
+    assert merged[['agent_count', 'run_count']].values.tolist() == [[1, 0], [1, 1], [2, 0]]
@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from gym_highway.scenarios import generate_scenario, lane_centers
+from gym_highway.traffic import IDMTraffic, idm_acceleration
+
+
+def test_idm_acceleration():
+    params = dict(a_max=1.5, b=2.0, s0=1.0, T=1.0, delta=4)
+    # free road: full acceleration from standstill, none at the desired speed
+    assert np.allclose(idm_acceleration(np.array([0.0, 6.0]), 6.0, np.inf, 0.0, **params), [1.5, 0.0])
+    # closing in on a stopped leader brakes, harder when closer
+    near, far = idm_acceleration(5.0, 6.0, np.array([3.0, 10.0]), 5.0, **params)
+    assert near < far < 0
+
+
+def test_step_follows_leaders_and_changes_lanes():
+    traffic = IDMTraffic(lane_centers(3), car_length=2.0)
+    # lane 1: a slow leader ahead of 0 and 1; lanes 2 and 3 hold one slow vehicle far behind
+    x = np.array([0.0, 6.0, 10.0, -40.0, -40.0])
+    v = np.array([6.0, 6.0, 1.0, 1.0, 1.0])
+    v0 = np.full(5, 6.0)
+    lanes = np.array([1, 1, 1, 2, 3])
+    acc, new_lanes = traffic.step(x, v, v0, lanes, controlled=np.zeros(5, dtype=bool))
+    # 1 brakes behind the slow leader 2 and overtakes in the free lane 2, 0 waits for the next tick
+    assert acc[1] < -1.0 and acc[2] > 0
+    assert list(new_lanes) == [1, 2, 1, 2, 3]
+
+    # controlled vehicles never change lanes, and no lane is left without an obstacle
+    acc, new_lanes = traffic.step(x, v, v0, lanes, controlled=np.array([False, True, False, False, False]))
+    assert new_lanes[1] == 1
+    lanes = np.array([1, 1, 2, 3, 3])
+    x = np.array([0.0, 10.0, -40.0, 0.0, 30.0])
+    _, new_lanes = traffic.step(x, v, v0, lanes, controlled=np.zeros(5, dtype=bool))
+    assert set(new_lanes) == {1, 2, 3}
+
+
+def sprite(data):
+    vector = lambda x, y: SimpleNamespace(x=x, y=y)
+    return SimpleNamespace(raw_position=vector(data['x'], data['y']), position=vector(data['x'], data['y']),
+                           velocity=vector(data['vel_x'], 0.0), init_velocity=vector(data['vel_x'], 0.0),
+                           max_velocity=20.0, lane_id=data['lane_id'], acceleration=0.0,
+                           rect=SimpleNamespace(x=0, y=0, width=76, height=38))
+
+
+def test_dense_traffic_does_not_collide():
+    cars, obstacles = generate_scenario(num_lanes=5, num_agents=5, road_length=150.0, density=0.05,
+                                        speed=(3.0, 9.0), seed=1)
+    agents, obstacles = [sprite(car) for car in cars], [sprite(obstacle) for obstacle in obstacles]
+    for agent in agents:
+        agent.velocity.x = 2.0
+    centers = lane_centers(5)
+    traffic = IDMTraffic(centers, car_length=76/32)
+    for _ in range(500):
+        lane_max_obs = traffic.update(obstacles, agents, 1/36, agents[0], 32)
+        for agent in agents:
+            agent.raw_position.x += agent.velocity.x/36
+
+    for lane in range(1, 6):
+        in_lane = [car for car in obstacles + agents if car.lane_id == lane]
+        xs = np.sort([car.raw_position.x for car in in_lane if abs(car.position.y - centers[lane-1]) < 1e-6])
+        assert np.all(np.diff(xs) > 76/32)
+        assert lane_max_obs[lane-1].raw_position.x == max(car.raw_position.x for car in obstacles if car.lane_id == lane)
+    assert all(obstacle.velocity.x >= 0 for obstacle in obstacles)
@@ -0,0 +1,194 @@
+"""
+Reactive background traffic for the highway simulators.
+
+IDMTraffic drives the obstacles with the Intelligent Driver Model and lets
+them change lanes with MOBIL. Every tick, the state of all the vehicles is
+read into numpy arrays, the leader of every vehicle is found from one sort
+of the vehicles by (lane, x), and the accelerations and lane changes of the
+whole fleet are computed at once. The agents are part of the traffic the
+obstacles react to, but they keep their own controls.
+
+    traffic = IDMTraffic(Constants.NEW_LANES, Constants.CAR_WIDTH/Constants.ppu)
+    lane_max_obs = traffic.update(obstacles, agents, dt, reference_car, Constants.ppu)
+
+Positions are the raw (world frame) x of the sprites, the lanes their lane_id.
+"""
+import numpy as np
+
+NO_VEHICLE = -1
+
+
+def idm_acceleration(v, v0, gap, dv, a_max, b, s0, T, delta):
+    """IDM acceleration of vehicles at speed v, v0 desired, gap to their leader closing at dv (inf gap when free)"""
+    free = 1.0 - (v/np.maximum(v0, 1e-6))**delta
+    desired_gap = s0 + np.maximum(0.0, v*T + v*dv/(2.0*np.sqrt(a_max*b)))
+    return a_max*(free - (desired_gap/np.maximum(gap, 1e-3))**2)
+
+
+def sort_by_lane(lanes, x):
+    """(order, keys): vehicles sorted by lane then x, and the sorted keys to searchsorted (lane, x) pairs in"""
+    x_min = x.min() if len(x) else 0.0
+    span = (x.max() - x_min if len(x) else 0.0) + 1.0
+    keys = lanes*span + (x - x_min)
+    order = np.argsort(keys, kind='stable')
+    return order, keys[order], x_min, span
+
+
+def neighbours(lanes, x, order, sorted_keys, x_min, span, query_lanes, query_x):
+    """Leader (first ahead) and follower (last not ahead) in query_lanes of the points query_x, NO_VEHICLE if none"""
+    idx = np.searchsorted(sorted_keys, query_lanes*span + (query_x - x_min), side='right')
+    n = len(order)
+    leader = np.where(idx < n, order[np.minimum(idx, n - 1)], NO_VEHICLE)
+    follower = np.where(idx > 0, order[np.maximum(idx - 1, 0)], NO_VEHICLE)
+    # neighbours of another lane are no neighbours
+    leader = np.where((leader >= 0) & (lanes[leader] == query_lanes), leader, NO_VEHICLE)
+    follower = np.where((follower >= 0) & (lanes[follower] == query_lanes), follower, NO_VEHICLE)
+    return leader, follower
+
+
+class IDMTraffic(object):
+    def __init__(self, lane_centers, car_length, a_max=1.5, b=2.0, s0=1.0, T=1.0, delta=4, max_brake=10.0,
+                 politeness=0.3, a_threshold=0.2, b_safe=3.0, lane_change_time=1.0, lane_change=True):
+        """
+        lane_centers   y of the center of every lane, Constants.NEW_LANES
+        car_length     length of a vehicle, gaps are measured between bumpers
+        a_max, b       IDM maximum acceleration and comfortable deceleration
+        s0, T, delta   IDM minimum gap, time headway and acceleration exponent
+        max_brake      largest deceleration, IDM brakes harder when cut in on
+        politeness     MOBIL weight of the acceleration the followers gain or lose
+        a_threshold    MOBIL acceleration gain needed to change lanes
+        b_safe         MOBIL largest deceleration a lane change may force on the new follower
+        lane_change_time  seconds it takes to move to the center of the next lane
+        """
+        self.lane_centers = np.asarray(lane_centers, dtype=np.float64)
+        self.car_length = car_length
+        self.idm = dict(a_max=a_max, b=b, s0=s0, T=T, delta=delta)
+        self.max_brake = max_brake
+        self.politeness = politeness
+        self.a_threshold = a_threshold
+        self.b_safe = b_safe
+        self.lateral_velocity = abs(np.diff(self.lane_centers[:2])[0])/lane_change_time if len(lane_centers) > 1 else 0.0
+        self.lane_change = lane_change
+
+    def _acceleration(self, x, v, v0, leader, i=None):
+        """IDM acceleration of vehicles i (all by default) behind the vehicles leader"""
+        i = np.arange(len(x)) if i is None else i
+        has_leader = leader >= 0
+        gap = np.where(has_leader, x[leader] - x[i] - self.car_length, np.inf)
+        dv = np.where(has_leader, v[i] - v[leader], 0.0)
+        return idm_acceleration(v[i], v0[i], gap, dv, **self.idm)
+
+    def step(self, x, v, v0, lanes, controlled, changing=None):
+        """
+        Accelerations and lanes of every vehicle for this tick.
+
+        x, v, v0, lanes  position, speed, desired speed and lane (1 based) of every vehicle
+        controlled       vehicles which keep their lane, the agents
+        changing         vehicles still moving to the center of their lane, which do not change again
+
+        Returns (accelerations, new lanes). Vehicles only leave a lane if an
+        obstacle stays in it, and at most one vehicle enters a lane per tick.
+        """
+        lanes = np.asarray(lanes, dtype=np.int64)
+        n = len(x)
+        order, sorted_keys, x_min, span = sort_by_lane(lanes, x)
+        # the next vehicle of the sorted order is the leader when it is in the same lane
+        leader = np.full(n, NO_VEHICLE)
+        follower = np.full(n, NO_VEHICLE)
+        same_lane = lanes[order[1:]] == lanes[order[:-1]]
+        leader[order[:-1][same_lane]] = order[1:][same_lane]
+        follower[order[1:][same_lane]] = order[:-1][same_lane]
+        acc = self._acceleration(x, v, v0, leader)
+
+        new_lanes = lanes.copy()
+        controlled = np.asarray(controlled, dtype=bool)
+        candidates = ~controlled
+        if changing is not None:
+            candidates &= ~np.asarray(changing, dtype=bool)
+        if self.lane_change and np.any(candidates):
+            best_gain = np.full(n, self.a_threshold)
+            for direction in (-1, 1):
+                target = lanes + direction
+                i = np.flatnonzero(candidates & (target >= 1) & (target <= len(self.lane_centers)))
+                if not len(i):
+                    continue
+                new_leader, new_follower = neighbours(lanes, x, order, sorted_keys, x_min, span, target[i], x[i])
+                acc_i = self._acceleration(x, v, v0, new_leader, i)
+
+                # the new follower would follow i, the old follower the old leader of i
+                has_new, has_old = new_follower >= 0, follower[i] >= 0
+                nf, of = np.maximum(new_follower, 0), np.maximum(follower[i], 0)
+                nf_acc = np.where(has_new, self._acceleration(x, v, v0, i, nf), 0.0)
+                of_acc = np.where(has_old, self._acceleration(x, v, v0, leader[i], of), 0.0)
+                gain = acc_i - acc[i] + self.politeness*(np.where(has_new, nf_acc - acc[nf], 0.0) +
+                                                          np.where(has_old, of_acc - acc[of], 0.0))
+
+                front_gap = np.where(new_leader >= 0, x[new_leader] - x[i], np.inf)
+                back_gap = np.where(has_new, x[i] - x[nf], np.inf)
+                safe = (front_gap > self.car_length) & (back_gap > self.car_length) & (nf_acc >= -self.b_safe)
+                better = safe & (gain > best_gain[i])
+                best_gain[i[better]] = gain[better]
+                new_lanes[i[better]] = target[i[better]]
+
+            moving = np.flatnonzero(new_lanes != lanes)
+            if len(moving):
+                # the vehicles that gain most go first
+                moving = moving[np.lexsort((-best_gain[moving], lanes[moving]))]
+                # keep an obstacle in every lane, a lane of k obstacles loses at most k-1
+                obstacles_per_lane = np.bincount(lanes[~controlled], minlength=len(self.lane_centers) + 1)
+                first = np.searchsorted(lanes[moving], lanes[moving])
+                leaves = np.arange(len(moving)) - first < obstacles_per_lane[lanes[moving]] - 1
+                # and one vehicle enters a lane per tick
+                leaving = moving[leaves]
+                leaving = leaving[np.argsort(-best_gain[leaving], kind='stable')]
+                _, entering = np.unique(new_lanes[leaving], return_index=True)
+                stays = np.setdiff1d(moving, leaving[entering])
+                new_lanes[stays] = lanes[stays]
+        return np.clip(acc, -self.max_brake, self.idm['a_max']), new_lanes
+
+    def update(self, obstacles, agents, dt, s_leader, ppu):
+        """
+        Move the obstacle sprites one tick, reacting to each other and to the
+        agents, which have already been updated.
+
+        Returns the obstacle furthest ahead of every lane (lane_max_obs).
+        """
+        obstacles, agents = list(obstacles), list(agents)
+        vehicles = obstacles + agents
+        num_obstacles = len(obstacles)
+        x = np.array([car.raw_position.x for car in vehicles])
+        v = np.array([car.velocity.x for car in vehicles])
+        v0 = np.array([car.init_velocity.x for car in obstacles] + [car.max_velocity for car in agents])
+        lanes = np.array([car.lane_id for car in vehicles])
+        y = np.array([car.position.y for car in obstacles])
+        controlled = np.arange(len(vehicles)) >= num_obstacles
+        changing = np.zeros(len(vehicles), dtype=bool)
+        changing[:num_obstacles] = np.abs(y - self.lane_centers[lanes[:num_obstacles] - 1]) > 1e-6
+
+        acc, new_lanes = self.step(x, v, v0, lanes, controlled, changing)
+        acc, new_lanes = acc[:num_obstacles], new_lanes[:num_obstacles]
+        new_v = np.maximum(v[:num_obstacles] + acc*dt, 0.0)
+        dx = new_v*dt
+        target_y = self.lane_centers[new_lanes - 1]
+        new_y = y + np.clip(target_y - y, -self.lateral_velocity*dt, self.lateral_velocity*dt)
+        screen_dx = dx - s_leader.velocity.x*dt
+
+        for k, obstacle in enumerate(obstacles):
+            obstacle.acceleration = acc[k]
+            obstacle.velocity.x = new_v[k]
+            obstacle.lane_id = int(new_lanes[k])
+            obstacle.position.x += screen_dx[k]
+            obstacle.position.y = new_y[k]
+            obstacle.raw_position.x += dx[k]
+            obstacle.raw_position.y = new_y[k]
+            # update rect for collision detection
+            obstacle.rect.x = obstacle.position.x * ppu - obstacle.rect.width / 2
+            obstacle.rect.y = obstacle.position.y * ppu - obstacle.rect.height / 2
+
+        # lead obstacle of every lane, the last of its lane in (lane, x) order
+        order = np.lexsort((x[:num_obstacles] + dx, new_lanes))
+        last = order[np.append(new_lanes[order][1:] != new_lanes[order][:-1], True)]
+        lane_max_obs = [None]*len(self.lane_centers)
+        for k in last:
+            lane_max_obs[new_lanes[k] - 1] = obstacles[k]
+        return lane_max_obs
@@ -1,4 +1,5 @@
 import argparse
+import functools
 import multiprocessing
 import os
 import os.path as osp
@@ -22,6 +23,7 @@ from baselines.common.tf_util import get_session
 from maddpg.trainer.maddpg import MADDPGAgentTrainer
 # from maddpg.trainer.maddpg_learner import learn
 from maddpg.trainer.ma_ddpg import learn
+from maddpg.trainer.ma_ddpg_async import learn as learn_async
 from models.utils import (activation_str_function, create_results_dir,
                           parse_cmdline_kwargs, save_configs)
 
@@ -96,8 +98,6 @@ def train(args, extra_args):
     # alg_kwargs = get_learn_function_defaults(args.alg, env_type)
     alg_kwargs.update(extra_args)
 
-    env = build_env(args)
-
     if args.network:
         alg_kwargs['network'] = args.network
     else:
@@ -106,6 +106,27 @@ def train(args, extra_args):
 
     print('Training {} on {}:{} with arguments \n{}'.format(args.alg, env_type, env_id, alg_kwargs))
 
+    nb_rollout_workers = alg_kwargs.pop('nb_rollout_workers', 0)
+    publish_interval = alg_kwargs.pop('publish_interval', 50)
+    if nb_rollout_workers > 0:
+        # rollouts run in separate processes, each building its own envs, the learner only needs the spaces of one env
+        configure_session()
+        env = make_env(env_id, env_type, seed=seed, flatten_dict_observations=args.alg not in {'her', 'maddpg'},
+                       monitor=False)
+        model = learn_async(
+            env=env,
+            env_fn=functools.partial(build_rollout_env, args),
+            nenvs=num_envs(args),
+            total_timesteps=total_timesteps,
+            num_agents=args.num_agents,
+            seed=seed,
+            nb_rollout_workers=nb_rollout_workers,
+            publish_interval=publish_interval,
+            **alg_kwargs
+        )
+        return model, env
+
+    env = build_env(args)
     model = learn(
         env=env,
         total_timesteps=total_timesteps,
@@ -115,18 +136,15 @@ def train(args, extra_args):
     )
     return model, env
 
-def build_env(args):
+def num_envs(args):
     '''
-    Build a vector of n environments
+    Number of environments of a vector
     '''
     ncpu = multiprocessing.cpu_count()
     if sys.platform == 'darwin': ncpu //= 2
-    nenv = args.num_env or ncpu
-    alg = args.alg
-    seed = args.seed
-
-    env_type, env_id = get_env_type(args.env)
+    return args.num_env or ncpu
 
+def configure_session():
     config = tf.ConfigProto(allow_soft_placement=True,
                             intra_op_parallelism_threads=1,
                             inter_op_parallelism_threads=1)
@@ -134,11 +152,34 @@ def build_env(args):
     config.gpu_options.allow_growth = True
     get_session(config=config)
 
+def build_env(args, seed=None, log_dir=None):
+    '''
+    Build a vector of n environments, monitored in log_dir (the logger dir by default)
+    '''
+    nenv = num_envs(args)
+    alg = args.alg
+    seed = args.seed if seed is None else seed
+
+    env_type, env_id = get_env_type(args.env)
+
+    configure_session()
+
     flatten_dict_observations = alg not in {'her', 'maddpg'}
-    env = make_vec_env(env_id, env_type, nenv, seed, reward_scale=args.reward_scale, flatten_dict_observations=flatten_dict_observations, isMultiAgent=True)
+    env = make_vec_env(env_id, env_type, nenv, seed, reward_scale=args.reward_scale, flatten_dict_observations=flatten_dict_observations, isMultiAgent=True,
+                       vec_monitor=Config.use_vec_monitor, log_dir=log_dir)
 
     return env
 
+def build_rollout_env(args, seed, log_dir):
+    '''
+    Build the environments of a rollout worker process, which has to register the env again
+    '''
+    if args.continuous:
+        register_env(Config.ma_c_env_id, Config.ma_c_env_entry_point, make_env_config(args))
+    else:
+        register_env(Config.ma_env_id, Config.ma_env_entry_point, make_env_config(args))
+    return build_env(args, seed, log_dir)
+
 def get_env_type(env_id):
     # Re-parse the gym registry, since we could have new envs since last time.
     for env in gym.envs.registry.all():
@@ -352,9 +393,11 @@ if __name__ == '__main__':
     # configure logger
     if MPI is None or MPI.COMM_WORLD.Get_rank() == 0:
         rank = 0
-        logger.configure(dir=results_dir, format_strs=Config.baselines_log_format)
+        logger.configure(dir=results_dir, format_strs=Config.baselines_log_format,
+                         flush_interval=Config.baselines_log_flush_interval)
     else:
-        logger.configure(dir=results_dir, format_strs=Config.baselines_log_format)
+        logger.configure(dir=results_dir, format_strs=Config.baselines_log_format,
+                         flush_interval=Config.baselines_log_flush_interval)
         rank = MPI.COMM_WORLD.Get_rank()
 
     # register the multi-agent env using the proper world and scenario settings
@@ -1,7 +1,9 @@
 import collections
 import numpy as np
 import os
+import weakref
 import tensorflow as tf
+from tensorflow.core.protobuf import config_pb2
 
 def sum(x, axis=None, keepdims=False):
     return tf.reduce_sum(x, axis=None if axis is None else [axis], keep_dims = keepdims)
@@ -252,6 +254,8 @@ def function(inputs, outputs, updates=None, givens=None):
 
     Input values can be passed in the same order as inputs or can be provided as kwargs based
     on placeholder name (passed to constructor or accessible via placeholder.op.name).
+    Positional calls skip the feed_dict: the inputs are fed in order to a callable compiled
+    once per session.
 
     Example:
         x = tf.placeholder(tf.int32, (), name="x")
@@ -296,6 +300,33 @@ class _Function(object):
         self.outputs_update = list(outputs) + [self.update_group]
         self.givens = {} if givens is None else givens
         self.check_nan = check_nan
+        # placeholders fed by the positional fast path, in input order (None if an input needs make_feed_dict)
+        self.feed_list = []
+        for inpt in inputs:
+            if is_placeholder(inpt):
+                self.feed_list.append(inpt)
+            elif type(inpt) in (PlacholderTfInput, BatchInput, Uint8Input):
+                self.feed_list.append(inpt._placeholder)
+            else:
+                self.feed_list = None
+                break
+        if any(all(inpt is not given for inpt in inputs) for given in self.givens):
+            self.feed_list = None
+        # compiled callables, built once per session
+        self._callables = weakref.WeakKeyDictionary()
+
+    def _make_callable(self, sess):
+        if not hasattr(sess, '_make_callable_from_options'):
+            # the private API is not available in this TF version, feed the placeholders in order to Session.run
+            return lambda *args: sess.run(self.outputs_update, feed_dict=dict(zip(self.feed_list, args)))
+        # same as Session.make_callable, but without going through Session.run and its feed_dict on every call
+        callable_opts = config_pb2.CallableOptions()
+        callable_opts.feed.extend(ph.name for ph in self.feed_list)
+        callable_opts.fetch.extend(output.name for output in self.outputs_update[:-1])
+        callable_opts.target.append(self.update_group.name)
+        run = sess._make_callable_from_options(callable_opts)
+        dtypes = [ph.dtype.as_numpy_dtype for ph in self.feed_list]
+        return lambda *args: run(*[np.asarray(arg, dtype=dtype) for arg, dtype in zip(args, dtypes)]) + [None]
 
     def _feed_input(self, feed_dict, inpt, value):
         if issubclass(type(inpt), TfInput):
@@ -303,8 +334,26 @@ class _Function(object):
         elif is_placeholder(inpt):
             feed_dict[inpt] = value
 
+    def call_ordered(self, *args):
+        """Fast path: values for the inputs in order, the trailing ones may be
+        left to their givens. Feeds and fetches are resolved only once."""
+        sess = get_session()
+        if len(args) < len(self.inputs):
+            args = args + tuple(self.givens[inpt] for inpt in self.inputs[len(args):])
+        try:
+            run = self._callables[sess]
+        except KeyError:
+            run = self._callables[sess] = self._make_callable(sess)
+        results = run(*args)[:-1]
+        if self.check_nan:
+            if any(np.isnan(r).any() for r in results):
+                raise RuntimeError("Nan detected")
+        return results
+
     def __call__(self, *args, **kwargs):
         assert len(args) <= len(self.inputs), "Too many arguments provided"
+        if not kwargs and self.feed_list is not None and all(inpt in self.givens for inpt in self.inputs[len(args):]):
+            return self.call_ordered(*args)
         feed_dict = {}
         # Update the args
         for inpt, value in zip(self.inputs, args):
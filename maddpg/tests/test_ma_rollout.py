@@ -0,0 +1,70 @@
+import multiprocessing
+
+import numpy as np
+
+from maddpg.trainer.ma_rollout import RateBound, SharedRing, SharedWeights
+
+
+def test_shared_ring():
+    ctx = multiprocessing.get_context('spawn')
+    stop = ctx.Event()
+    ring = SharedRing(ctx, 2, {'obs': (2, 3), 'rewards': (2,)})
+    assert ring.get() is None
+    for t in range(2):
+        assert ring.put({'obs': np.full((2, 3), t), 'rewards': [t, -t]}, stop)
+    # a full ring waits for the consumer, until stopped
+    stop.set()
+    assert not ring.put({'obs': np.zeros((2, 3)), 'rewards': [0, 0]}, stop)
+    stop.clear()
+
+    record = ring.get()
+    assert np.array_equal(record['obs'], np.zeros((2, 3))) and np.array_equal(record['rewards'], [0, 0])
+    # records wrap around the ring in order
+    assert ring.put({'obs': np.full((2, 3), 2), 'rewards': [2, -2]}, stop)
+    assert [ring.get()['rewards'][1] for _ in range(2)] == [-1, -2]
+    assert ring.get() is None
+
+
+def test_shared_weights():
+    ctx = multiprocessing.get_context('spawn')
+    weights = SharedWeights(ctx, nb_params=4, obs_size=3, nb_actors=2)
+    assert weights.fetch(-1) is None
+    weights.publish(np.arange(4), np.ones(3), np.full(3, 2.), [0.1, 0.2])
+    version, params, obs_mean, obs_std, param_noise_stddev = weights.fetch(-1)
+    assert version == 0
+    assert np.array_equal(params, np.arange(4)) and params.dtype == np.float32
+    assert np.array_equal(obs_mean, np.ones(3)) and np.array_equal(obs_std, np.full(3, 2.))
+    assert np.allclose(param_noise_stddev, [0.1, 0.2])
+    # only newer weights are fetched, and the copies are not changed by later publications
+    assert weights.fetch(version) is None
+    weights.publish(np.zeros(4), np.ones(3), np.ones(3), [0., 0.])
+    assert weights.fetch(version)[0] == 1 and np.array_equal(params, np.arange(4))
+
+
+def run(rate, worker_speed, learner_speed, steps):
+    """Interleave a worker sampling `worker_speed` and a learner training `learner_speed` times per step"""
+    sampled = updates = 0
+    ratios = []
+    for _ in range(steps):
+        for _ in range(worker_speed):
+            if sampled < rate.max_transitions(updates):
+                sampled += 1
+        for _ in range(learner_speed):
+            if sampled >= rate.min_transitions(updates):
+                updates += 1
+        if updates:
+            ratios.append((sampled - rate.warmup) / updates)
+    return sampled, updates, ratios
+
+
+def test_rate_bound():
+    rate = RateBound(warmup=10, transitions_per_update=4, slack=2)
+    assert rate.max_transitions(0) == 18 and rate.min_transitions(0) == 6
+
+    # a fast worker waits for the learner, a fast learner waits for the worker
+    for worker_speed, learner_speed in [(100, 1), (1, 100), (4, 1)]:
+        sampled, updates, ratios = run(rate, worker_speed, learner_speed, 200)
+        assert updates > 0
+        assert rate.min_transitions(updates - 1) <= sampled <= rate.max_transitions(updates)
+        # the transitions per train step stay within slack train steps of the target ratio
+        assert all(abs(sampled_per_update - 4) <= 4 * 2 for sampled_per_update in ratios[-50:])
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from maddpg.common.tf_util import function, initialize, single_threaded_session  # noqa: E402
+
+
+class RunOnlySession(object):
+    """A session without the private callable API"""
+    def __init__(self, sess):
+        self.sess = sess
+
+    def run(self, *args, **kwargs):
+        return self.sess.run(*args, **kwargs)
+
+
+def test_call_ordered_matches_session_run():
+    with tf.Graph().as_default():
+        x = tf.placeholder(tf.float32, (None, 2), name="x")
+        y = tf.placeholder(tf.float32, (), name="y")
+        counter = tf.Variable(0., name="counter")
+        z = tf.reduce_sum(3. * x, axis=1) + 2. * y
+        f = function([x, y], [z, tf.reduce_max(x)], updates=[tf.assign_add(counter, 1.)], givens={y: 1.})
+
+        with single_threaded_session() as sess:
+            initialize()
+            data = np.random.RandomState(0).randn(5, 2)
+            # keyword calls take the Session.run path, positional ones the compiled callable
+            expected = f(x=data, y=2.)
+            assert np.allclose(f.call_ordered(data, 2.)[0], expected[0])
+            assert np.allclose(f(data, 2.)[1], expected[1])
+            # trailing inputs are left to their givens, updates run on every call
+            assert np.allclose(f(data)[0], f(x=data)[0])
+            assert sess.run(counter) == 5.
+
+            fallback = f._make_callable(RunOnlySession(sess))
+            assert np.allclose(fallback(data, 2.)[0], expected[0])
+            assert sess.run(counter) == 6.
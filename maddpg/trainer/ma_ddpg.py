@@ -10,12 +10,15 @@ from collections import deque
 import pickle
 
 from maddpg.trainer.ma_ddpg_learner import MADDPG
+from maddpg.trainer.ma_ddpg_shared_learner import SharedMADDPG
 # from baselines.ddpg.models import Actor, Critic
 # from baselines.ddpg.memory import Memory
 from maddpg.trainer.ma_models import Actor, Critic
-from maddpg.trainer.ma_memory import Memory
+from baselines.ddpg.memory import replay_path
+from maddpg.trainer.ma_memory import Memory, JointPriorities
 from baselines.ddpg.noise import AdaptiveParamNoiseSpec, NormalActionNoise, OrnsteinUhlenbeckActionNoise
 from baselines.common import set_global_seeds
+from baselines.common.schedules import LinearSchedule
 import baselines.common.tf_util as U
 from models import config as Config
 from gym import spaces
@@ -51,6 +54,64 @@ def get_noise(noise_type, nb_actions):
                 raise RuntimeError('unknown noise type "{}"'.format(current_noise_type))
     return action_noise, param_noise
 
+def make_memories(env, num_agents, limit, replay_dir=None):
+    """One replay memory per agent, kept in replay_dir/agent_<i> if a directory is given"""
+    continuous_ctrl = not isinstance(env.action_space[0], spaces.Discrete)
+    nb_actions = env.action_space[0].shape[-1] if continuous_ctrl else env.action_space[0].n
+    memories = []
+    for i in range(num_agents):
+        # get action shape for an agent
+        action_shape = env.action_space[i].shape if continuous_ctrl else (nb_actions, )
+        memories.append(Memory(limit=limit, action_shape=action_shape, observation_shape=env.observation_space[i].shape,
+            path=osp.join(replay_dir, 'agent_%d' % i) if replay_dir is not None else None))
+    return memories
+
+def build_trainers(network, env, num_agents, memories, noise_type='adaptive-param_0.2', share_parameters=False,
+                   learner_kwargs=None, **network_kwargs):
+    """Create the learners of all agents, or a single one when they share their parameters.
+
+    Returns the learners and the observation statistics used by all of them.
+    """
+    learner_kwargs = learner_kwargs or {}
+    nb_actions = env.action_space[0].shape[-1]
+    sess = U.get_session()
+    # create one obs_rms used by all agents
+    obs_shape = (num_agents,)+env.observation_space[0].shape
+    with tf.variable_scope('obs_rms'):
+        obs_rms = RunningMeanStd(shape=obs_shape)
+
+    trainers = []
+    if share_parameters:
+        # one actor and one critic for all agents, told apart by their agent id
+        critic = Critic(name="critic", network=network, **network_kwargs)
+        actor = Actor(nb_actions, name="actor", network=network, **network_kwargs)
+        action_noise, param_noise = get_noise(noise_type, nb_actions)
+        agent = SharedMADDPG("agents", actor, critic, memories, env.observation_space, env.action_space, obs_rms,
+            action_noise=action_noise, param_noise=param_noise, **learner_kwargs)
+        agent.initialize(sess)
+        trainers.append(agent)
+    else:
+        for i in range(num_agents):
+            memory = memories[i]
+            critic = Critic(name="critic_%d" % i, network=network, **network_kwargs)
+            actor = Actor(nb_actions, name="actor_%d" % i, network=network, **network_kwargs)
+
+            # get action and parameter noise type
+            action_noise, param_noise = get_noise(noise_type, nb_actions)
+
+            # TODO: remove after testing
+            assert param_noise is not None
+
+            # TODO: need to update the placeholders in MADDPG based off of ddpg_learner
+            # replay buffer, actor and critic are defined for each agent in trainers
+            agent = MADDPG("agent_%d" % i, actor, critic, memory, env.observation_space, env.action_space, i, obs_rms,
+                action_noise=action_noise, param_noise=param_noise, **learner_kwargs)
+        
+            # Prepare agent
+            agent.initialize(sess)
+            trainers.append(agent)
+    return trainers, obs_rms
+
 def learn(network, env,
           seed=None,
           total_timesteps=None,
@@ -81,6 +142,14 @@ def learn(network, env,
           num_adversaries=0,
           adv_policy='maddpg',
           good_policy='maddpg',
+          prioritized_replay=False,
+          prioritized_replay_alpha=0.6,
+          prioritized_replay_beta0=0.4,
+          prioritized_replay_beta_iters=None,
+          prioritized_replay_eps=1e-6,
+          memmap_replay=False,
+          share_parameters=False,
+          in_graph_optimizer=False,
           **network_kwargs):
 
     set_global_seeds(seed)
@@ -106,38 +175,37 @@ def learn(network, env,
     print("Num of observations: {}".format(len(obs_shape_n)))
     print('Observation shapes {}'.format(obs_shape_n))
 
+    # one joint replay index is sampled for all agents, so they share its priorities
+    memory_limit = int(1e6)
+    if memmap_replay:
+        # keep the replay memories on disk next to the checkpoints; a resumed run starts from a copy of the loaded ones
+        load_dir = osp.join(Config.results_dir, load_path) if load_path is not None else None
+        replay_dir = replay_path(logger.get_dir(), rank, load_dir)
+    else:
+        replay_dir = None
+    if prioritized_replay:
+        replay_priorities = JointPriorities(memory_limit, num_agents, alpha=prioritized_replay_alpha,
+            eps=prioritized_replay_eps)
+        if prioritized_replay_beta_iters is None:
+            prioritized_replay_beta_iters = nb_epochs * nb_epoch_cycles * nb_train_steps
+        beta_schedule = LinearSchedule(prioritized_replay_beta_iters,
+                                       initial_p=prioritized_replay_beta0,
+                                       final_p=1.0)
+    else:
+        replay_priorities = None
+        beta_schedule = None
+
+    memories = make_memories(env, num_agents, memory_limit, replay_dir)
+    learner_kwargs = dict(gamma=gamma, tau=tau, normalize_returns=normalize_returns, normalize_observations=normalize_observations,
+        batch_size=batch_size, critic_l2_reg=critic_l2_reg, actor_lr=actor_lr, critic_lr=critic_lr, enable_popart=popart,
+        clip_norm=clip_norm, reward_scale=reward_scale, replay_priorities=replay_priorities,
+        in_graph_optimizer=in_graph_optimizer)
+    trainers, obs_rms = build_trainers(network, env, num_agents, memories, noise_type=noise_type,
+        share_parameters=share_parameters, learner_kwargs=learner_kwargs, **network_kwargs)
     sess = U.get_session()
-    # create one obs_rms used by all agents
-    obs_shape = (num_agents,)+env.observation_space[0].shape
-    with tf.variable_scope('obs_rms'):
-        obs_rms = RunningMeanStd(shape=obs_shape)
-    trainers = []
-    for i in range(num_agents):
-        # get action shape for an agent
-        action_shape = env.action_space[i].shape if continuous_ctrl else (nb_actions, )
-
-        # TODO: will have to modify the critic and actor to work with batches for multiple agents
-        memory = Memory(limit=int(1e6), action_shape=action_shape, observation_shape=env.observation_space[i].shape)
-        critic = Critic(name="critic_%d" % i, network=network, **network_kwargs)
-        actor = Actor(nb_actions, name="actor_%d" % i, network=network, **network_kwargs)
-
-        # get action and parameter noise type
-        action_noise, param_noise = get_noise(noise_type, nb_actions)
-
-        # TODO: remove after testing
-        assert param_noise is not None
-
-        # TODO: need to update the placeholders in MADDPG based off of ddpg_learner
-        # replay buffer, actor and critic are defined for each agent in trainers
-        agent = MADDPG("agent_%d" % i, actor, critic, memory, env.observation_space, env.action_space, i, obs_rms,
-            gamma=gamma, tau=tau, normalize_returns=normalize_returns, normalize_observations=normalize_observations,
-            batch_size=batch_size, action_noise=action_noise, param_noise=param_noise, critic_l2_reg=critic_l2_reg,
-            actor_lr=actor_lr, critic_lr=critic_lr, enable_popart=popart, clip_norm=clip_norm,
-            reward_scale=reward_scale)
-        
-        # Prepare agent
-        agent.initialize(sess)
-        trainers.append(agent)
+    if replay_priorities is not None:
+        # experience reopened from disk starts with the max priority
+        replay_priorities.restore(trainers[0].memory)
     
     # TODO: test if this actually works
     # Test by running the trained models (num_agents>=2)
@@ -171,23 +239,24 @@ def learn(network, env,
     nenvs = obs_n.shape[0]
 
     # initialize metric tracking parameters
-    episode_reward = np.zeros((nenvs, len(trainers)), dtype = np.float32) #vector
+    episode_reward = np.zeros((nenvs, num_agents), dtype = np.float32) #vector
     episode_step = np.zeros(nenvs, dtype = int) # vector
     episodes = 0 #scalar
     t = 0 # scalar
     epoch = 0
 
     start_time = time.time()
-    epoch_episode_rewards = np.zeros(len(trainers), dtype = np.float32)
+    epoch_episode_rewards = np.zeros(num_agents, dtype = np.float32)
     epoch_episode_steps = np.zeros(nenvs, dtype = int)
     # TODO: update epoch_actions to find std between actions over time
     epoch_actions = 0.0
-    epoch_qs = np.zeros(len(trainers), dtype = np.float32)
+    epoch_qs = np.zeros(num_agents, dtype = np.float32)
     epoch_episodes = 0
+    train_step = 0
 
     episode_rewards_history = deque(maxlen=100)
     episode_steps_history = deque(maxlen=100)
-    episode_agent_rewards_history = [deque(maxlen=100) for _ in range(len(trainers))]
+    episode_agent_rewards_history = [deque(maxlen=100) for _ in range(num_agents)]
 
     print('Starting iterations...')
     for epoch in range(nb_epochs):
@@ -201,18 +270,22 @@ def learn(network, env,
             for t_rollout in range(nb_rollout_steps):
                 actions_n = []
                 q_n = np.zeros(len(trainers), dtype = np.float32)
-                for i in range(nenvs):
-                    # create n copies of full obs where n = num agents; memory is not an issue for this simulation
-                    rep_obs = np.stack([obs_n[i] for _ in range(len(trainers))])
-                    # Predict next actions and q vals for all agents in current env
-                    # call step() with each agent and full observation; only get action "[0]" from this call
-                    action_q_list = [agent.step(obs, apply_noise=True, compute_Q=False)[0] for agent, obs in zip(trainers, rep_obs)]
-                    # store actions and q vals in respective lists
-                    actions_n.append(action_q_list)
-                    # we care about the overall q value for each agent
-                    # print("action_q_list: ", action_q_list)
-                    # print("q_n: ", np.array(action_q_list)[:,1])
-                    # q_n += np.array(action_q_list)[:,1]
+                if share_parameters:
+                    # one forward pass of the shared actor for all agents in all envs
+                    actions_n = trainers[0].step(obs_n, apply_noise=True, compute_Q=False)[0]
+                else:
+                    for i in range(nenvs):
+                        # create n copies of full obs where n = num agents; memory is not an issue for this simulation
+                        rep_obs = np.stack([obs_n[i] for _ in range(len(trainers))])
+                        # Predict next actions and q vals for all agents in current env
+                        # call step() with each agent and full observation; only get action "[0]" from this call
+                        action_q_list = [agent.step(obs, apply_noise=True, compute_Q=False)[0] for agent, obs in zip(trainers, rep_obs)]
+                        # store actions and q vals in respective lists
+                        actions_n.append(action_q_list)
+                        # we care about the overall q value for each agent
+                        # print("action_q_list: ", action_q_list)
+                        # print("q_n: ", np.array(action_q_list)[:,1])
+                        # q_n += np.array(action_q_list)[:,1]
                 
                 # confirm actions_n is nenvs x num_agents x len(Action)
                 # print("actions_n: ", actions_n)
@@ -235,6 +308,8 @@ def learn(network, env,
                     #     # save experience from all envs for each agent
                     #     agent.store_transition(obs_n[b][i], actions_n[b][i], rew_n[b][i], new_obs_n[b][i], done_n[b][i], None)
                     agent.store_transition(obs_n, actions_n, rew_n, new_obs_n, done_n)
+                if replay_priorities is not None:
+                    replay_priorities.append(nenvs)
                 obs_n = new_obs_n
 
                 # looping over nenvs
@@ -252,7 +327,7 @@ def learn(network, env,
                         # episode steps for last 100 runs
                         episode_steps_history.append(episode_step[d])
                         # reset env specific list for next run
-                        episode_reward[d] = np.zeros(len(trainers), dtype = np.float32)
+                        episode_reward[d] = np.zeros(num_agents, dtype = np.float32)
                         episode_step[d] = 0
                         # increment counters
                         epoch_episodes += 1
@@ -270,13 +345,15 @@ def learn(network, env,
             epoch_adaptive_distances = [[] for _ in range(len(trainers))]
 
             for t_train in range(nb_train_steps):
+                beta = beta_schedule.value(train_step) if beta_schedule is not None else None
+                train_step += 1
                 for i, agent in enumerate(trainers):
                     # Adapt param noise, if necessary.
                     if agent.memory.nb_entries >= batch_size and t_train % param_noise_adaption_interval == 0:
                         distance = agent.adapt_param_noise(trainers)
                         epoch_adaptive_distances[i].append(distance)
 
-                    cl, al = agent.train(trainers)
+                    cl, al = agent.train(trainers, beta=beta)
                     epoch_critic_losses[i].append(cl)
                     epoch_actor_losses[i].append(al)
                     agent.update_target_net()
@@ -317,15 +394,16 @@ def learn(network, env,
             for k,v in stats.items():
                 combined_stats["{}st/ag{}_{}".format(Config.tensorboard_rootdir,i,k)] = v
 
+            # agent specific training metrics (a single trainer when sharing parameters)
+            combined_stats["{}tr/ag{}_loss_actor".format(Config.tensorboard_rootdir,i)] = np.mean(epoch_actor_losses[i])
+            combined_stats["{}tr/ag{}_loss_critic".format(Config.tensorboard_rootdir,i)] = np.mean(epoch_critic_losses[i])
+            combined_stats["{}tr/ag{}_param_noise_distance".format(Config.tensorboard_rootdir,i)] = np.mean(epoch_adaptive_distances[i])
+
+        for i in range(num_agents):
             # agent specific rollout metrics
             combined_stats["{}ro/ag{}_return".format(Config.tensorboard_rootdir,i)] = epoch_episode_rewards[i] / float(episodes)
             combined_stats["{}ro/ag{}_return_history".format(Config.tensorboard_rootdir,i)] = np.mean(episode_agent_rewards_history[i])
             # combined_stats["{}ro/ag{}_Q_mean".format(Config.tensorboard_rootdir,i)] = epoch_qs[i] / float(t)
-
-            # agent specific training metrics
-            combined_stats["{}tr/ag{}_loss_actor".format(Config.tensorboard_rootdir,i)] = np.mean(epoch_actor_losses[i])
-            combined_stats["{}tr/ag{}_loss_critic".format(Config.tensorboard_rootdir,i)] = np.mean(epoch_critic_losses[i])
-            combined_stats["{}tr/ag{}_param_noise_distance".format(Config.tensorboard_rootdir,i)] = np.mean(epoch_adaptive_distances[i])
         
         combined_stats[Config.tensorboard_rootdir+'ro/return'] = np.mean(epoch_episode_rewards) / float(episodes)
         combined_stats[Config.tensorboard_rootdir+'ro/return_history'] = np.mean(episode_rewards_history)
@@ -374,5 +452,10 @@ def learn(network, env,
             # TODO: test if this actually saves all the agents
             # i assume it does because save() has access to global variables
             trainers[0].save(savepath)
+        if save_interval and epoch % save_interval == 0:
+            for memory in memories:
+                memory.flush()
 
+    for memory in memories:
+        memory.flush()
     return trainers
@@ -0,0 +1,428 @@
+"""
+Multi-agent DDPG with decoupled rollouts and training
+built using ma_ddpg: rollout worker processes run the latest published actor
+weights on their own vec env and write the transitions into shared memory
+rings, while the learner (the calling process) stores them in the replay
+memories, trains continuously and publishes the actor weights back every
+`publish_interval` train steps.
+
+The number of env transitions per train step is bounded on both sides (the
+workers wait for the learner and the learner waits for the workers), so a run
+does not depend on which side happens to be faster.
+"""
+
+import multiprocessing
+import os
+import os.path as osp
+import queue
+import time
+from collections import deque
+
+import numpy as np
+import tensorflow as tf
+
+import baselines.common.tf_util as U
+from baselines import logger
+from baselines.common import set_global_seeds
+from baselines.common.schedules import LinearSchedule
+from baselines.common.vec_env import CloudpickleWrapper
+from baselines.ddpg.memory import replay_path
+from maddpg.trainer.ma_ddpg import build_trainers, get_noise, make_memories
+from maddpg.trainer.ma_memory import JointPriorities
+from maddpg.trainer.ma_models import Actor
+from maddpg.trainer.ma_rollout import RateBound, SharedRing, SharedWeights
+from models import config as Config
+
+try:
+    from mpi4py import MPI
+except ImportError:
+    MPI = None
+
+
+class RolloutPolicy(object):
+    def __init__(self, network, nb_actions, num_agents, obs_shape, share_parameters=False, normalize_observations=True,
+                 observation_range=(-5., 5.), action_range=(-1., 1.), noise_type='adaptive-param_0.2', **network_kwargs):
+        """The actors of all agents, evaluated in a rollout worker with the published weights.
+
+        The actors are built with the same scopes as in the learner so that
+        their variables line up with the published flat parameter vector.
+        """
+        self.num_agents = num_agents
+        self.normalize_observations = normalize_observations
+        self.observation_range = observation_range
+        self.action_range = action_range
+        self.obs_mean, self.obs_std = 0., 1.
+
+        # normalized observations, first dimension is the agent
+        self.obs = tf.placeholder(tf.float32, shape=(num_agents, None) + obs_shape, name='obs')
+        if share_parameters:
+            actors = [Actor(nb_actions, name="actor", network=network, **network_kwargs)]
+            agent_ids = tf.tile(tf.eye(num_agents)[:, None, :], tf.stack([1, tf.shape(self.obs)[1], 1]))
+            x = tf.reshape(tf.concat([self.obs, agent_ids], axis=-1), [-1, obs_shape[-1] + num_agents])
+            self.actions = tf.reshape(actors[0](x), [num_agents, -1, nb_actions])
+        else:
+            actors = [Actor(nb_actions, name="actor_%d" % i, network=network, **network_kwargs) for i in range(num_agents)]
+            self.actions = tf.stack([actor(self.obs[i]) for i, actor in enumerate(actors)])
+
+        var_list = [var for actor in actors for var in actor.vars]
+        self.set_from_flat = U.SetFromFlat(var_list)
+        # which actor each parameter belongs to and whether param noise applies to it
+        self.actor_index = np.concatenate([np.full(U.numel(var), i) for i, actor in enumerate(actors) for var in actor.vars])
+        self.perturbable = np.concatenate([np.full(U.numel(var), var in actor.perturbable_vars)
+                                           for actor in actors for var in actor.vars])
+        self.action_noise, self.param_noise = get_noise(noise_type, nb_actions)
+
+    def load(self, params, obs_mean, obs_std, param_noise_stddev):
+        if self.param_noise is not None:
+            # every worker explores with its own perturbation of the published weights
+            stddev = param_noise_stddev[self.actor_index]
+            params = params + self.perturbable * np.random.normal(size=params.shape) * stddev
+        self.set_from_flat(params)
+        self.obs_mean = obs_mean.reshape((self.num_agents, -1))
+        self.obs_std = obs_std.reshape((self.num_agents, -1))
+
+    def step(self, obs):
+        """Actions of all agents in all envs, obs has shape (nenvs, num_agents, obs)"""
+        if self.normalize_observations:
+            obs = (obs - self.obs_mean) / self.obs_std
+        obs = np.clip(obs, self.observation_range[0], self.observation_range[1])
+        action = np.swapaxes(U.get_session().run(self.actions, feed_dict={self.obs: np.swapaxes(obs, 0, 1)}), 0, 1)
+        if self.action_noise is not None:
+            noise = np.array([self.action_noise() for _ in range(action.shape[0] * action.shape[1])])
+            action += noise.reshape(action.shape)
+        return np.clip(action, self.action_range[0], self.action_range[1])
+
+
+def rollout_worker(worker_id, env_fn_wrapper, seed, log_dir, ring, weights, counters, episode_queue, stop, policy_kwargs, rate):
+    if seed is not None:
+        seed += 1000 * (worker_id + 1)
+    set_global_seeds(seed)
+    if log_dir is not None:
+        os.makedirs(log_dir, exist_ok=True)
+    env = env_fn_wrapper.x(seed, log_dir)
+    sess = U.get_session()
+    policy = RolloutPolicy(**policy_kwargs)
+    sess.run(tf.global_variables_initializer())
+    sess.graph.finalize()
+
+    obs = env.reset()
+    nenvs = obs.shape[0]
+    episode_reward = np.zeros((nenvs, policy.num_agents), dtype=np.float32)
+    episode_step = np.zeros(nenvs, dtype=int)
+    version = -1
+    try:
+        while not stop.is_set():
+            latest = weights.fetch(version)
+            if latest is not None:
+                version, params, obs_mean, obs_std, param_noise_stddev = latest
+                policy.load(params, obs_mean, obs_std, param_noise_stddev)
+            # bound the sampling rate by the number of train steps done so far
+            if version < 0 or counters['transitions'].value >= rate.max_transitions(counters['updates'].value):
+                time.sleep(1e-3)
+                continue
+
+            actions = policy.step(obs)
+            new_obs, rew, done, info = env.step(actions)
+            record = {'obs0': obs, 'actions': actions, 'rewards': rew, 'obs1': new_obs, 'terminals1': done}
+            if not ring.put(record, stop):
+                break
+            with counters['transitions'].get_lock():
+                counters['transitions'].value += nenvs
+            obs = new_obs
+
+            episode_reward += rew
+            episode_step += 1
+            for d in range(nenvs):
+                if np.any(done[d]):
+                    episode_queue.put((episode_reward[d].copy(), episode_step[d]))
+                    episode_reward[d] = 0.
+                    episode_step[d] = 0
+    finally:
+        env.close()
+
+
+def learn(network, env, env_fn, nenvs,
+          seed=None,
+          total_timesteps=None,
+          num_agents=1,
+          nb_epochs=None, # with default settings, perform 1M steps total
+          nb_epoch_cycles=20,
+          nb_rollout_steps=100,
+          reward_scale=1.0,
+          noise_type='adaptive-param_0.2',
+          normalize_returns=False,
+          normalize_observations=True,
+          critic_l2_reg=1e-2,
+          actor_lr=1e-4,
+          critic_lr=1e-3,
+          popart=False,
+          gamma=0.99,
+          clip_norm=None,
+          nb_train_steps=50, # per epoch cycle and MPI worker,
+          batch_size=64, # per MPI worker
+          tau=0.01,
+          param_noise_adaption_interval=50,
+          save_interval=100,
+          load_path=None,
+          prioritized_replay=False,
+          prioritized_replay_alpha=0.6,
+          prioritized_replay_beta0=0.4,
+          prioritized_replay_beta_iters=None,
+          prioritized_replay_eps=1e-6,
+          memmap_replay=False,
+          share_parameters=False,
+          in_graph_optimizer=False,
+          nb_rollout_workers=1,
+          publish_interval=50,
+          transitions_per_update=None,
+          rate_slack=None,
+          ring_capacity=64,
+          **network_kwargs):
+    """Train MADDPG with `nb_rollout_workers` rollout processes feeding one learner.
+
+    The arguments are those of ma_ddpg.learn (the epoch settings only define
+    the total number of train steps and how often to log), plus
+
+    Parameters
+    ----------
+    env: gym.Env
+        a single env, only used for its spaces
+    env_fn: function
+        env_fn(seed, log_dir) builds the vec env of a rollout worker, with
+        its monitor files in log_dir (None to not write any). It must be
+        picklable and give vec envs of nenvs envs with the spaces of `env`
+    nenvs: int
+        number of envs of the vec env of a rollout worker
+    nb_rollout_workers: int
+        number of rollout processes
+    publish_interval: int
+        train steps between two publications of the actor weights
+    transitions_per_update: int
+        env transitions per train step, defaults to the ratio of the
+        synchronous loop (nb_rollout_steps * nenvs / nb_train_steps)
+    rate_slack: int
+        how many train steps the workers and the learner may be ahead of that
+        ratio, defaults to nb_train_steps
+    ring_capacity: int
+        vec env steps buffered per worker
+    """
+    set_global_seeds(seed)
+
+    nb_actions = env.action_space[0].shape[-1]
+    obs_shape = env.observation_space[0].shape
+
+    if total_timesteps is not None:
+        assert nb_epochs is None
+        nb_epochs = int(total_timesteps) // (nb_epoch_cycles * nb_rollout_steps)
+    else:
+        nb_epochs = 500
+    updates_per_epoch = nb_epoch_cycles * nb_train_steps
+    total_updates = nb_epochs * updates_per_epoch
+    if transitions_per_update is None:
+        transitions_per_update = nb_rollout_steps * nenvs // nb_train_steps
+    if rate_slack is None:
+        rate_slack = nb_train_steps
+
+    if MPI is not None:
+        rank = MPI.COMM_WORLD.Get_rank()
+    else:
+        rank = 0
+
+    memory_limit = int(1e6)
+    if memmap_replay:
+        # keep the replay memories on disk next to the checkpoints; a resumed run starts from a copy of the loaded ones
+        load_dir = osp.join(Config.results_dir, load_path) if load_path is not None else None
+        replay_dir = replay_path(logger.get_dir(), rank, load_dir)
+    else:
+        replay_dir = None
+    if prioritized_replay:
+        replay_priorities = JointPriorities(memory_limit, num_agents, alpha=prioritized_replay_alpha,
+            eps=prioritized_replay_eps)
+        if prioritized_replay_beta_iters is None:
+            prioritized_replay_beta_iters = total_updates
+        beta_schedule = LinearSchedule(prioritized_replay_beta_iters,
+                                       initial_p=prioritized_replay_beta0,
+                                       final_p=1.0)
+    else:
+        replay_priorities = None
+        beta_schedule = None
+
+    memories = make_memories(env, num_agents, memory_limit, replay_dir)
+    learner_kwargs = dict(gamma=gamma, tau=tau, normalize_returns=normalize_returns, normalize_observations=normalize_observations,
+        batch_size=batch_size, critic_l2_reg=critic_l2_reg, actor_lr=actor_lr, critic_lr=critic_lr, enable_popart=popart,
+        clip_norm=clip_norm, reward_scale=reward_scale, replay_priorities=replay_priorities,
+        in_graph_optimizer=in_graph_optimizer)
+    trainers, obs_rms = build_trainers(network, env, num_agents, memories, noise_type=noise_type,
+        share_parameters=share_parameters, learner_kwargs=learner_kwargs, **network_kwargs)
+    sess = U.get_session()
+    if replay_priorities is not None:
+        # experience reopened from disk starts with the max priority
+        replay_priorities.restore(memories[0])
+
+    # weights sent to the rollout workers
+    get_flat = U.GetFlat([var for agent in trainers for var in agent.actor.vars])
+
+    sess.run(tf.global_variables_initializer())
+    for agent in trainers:
+        agent.agent_initialize(sess)
+
+    if load_path is not None:
+        load_path = "{}/{}/checkpoints/checkpoints-final".format(Config.results_dir, load_path)
+        load_path = osp.expanduser(load_path)
+        trainers[0].load(load_path)
+
+    sess.graph.finalize()
+
+    ctx = multiprocessing.get_context('spawn')
+    weights = SharedWeights(ctx, get_flat().size,
+                            num_agents * int(np.prod(obs_shape)), len(trainers))
+
+    def publish():
+        if normalize_observations:
+            obs_mean, obs_std = sess.run([obs_rms.mean, obs_rms.std])
+        else:
+            obs_mean, obs_std = np.zeros((num_agents,) + obs_shape), np.ones((num_agents,) + obs_shape)
+        param_noise_stddev = [agent.param_noise.current_stddev if agent.param_noise is not None else 0.
+                              for agent in trainers]
+        weights.publish(get_flat(), np.ravel(obs_mean), np.ravel(obs_std), param_noise_stddev)
+
+    publish()
+
+    act_shape = env.action_space[0].shape
+    record_shapes = {'obs0': (nenvs, num_agents) + obs_shape, 'actions': (nenvs, num_agents) + act_shape,
+                     'rewards': (nenvs, num_agents), 'obs1': (nenvs, num_agents) + obs_shape,
+                     'terminals1': (nenvs, num_agents)}
+    counters = {'updates': ctx.Value('l', 0), 'transitions': ctx.Value('l', 0)}
+    rate = RateBound(batch_size, transitions_per_update, rate_slack)
+    policy_kwargs = dict(network=network, nb_actions=nb_actions, num_agents=num_agents, obs_shape=obs_shape,
+        share_parameters=share_parameters, normalize_observations=normalize_observations,
+        noise_type=noise_type, **network_kwargs)
+    episode_queue = ctx.Queue()
+    stop = ctx.Event()
+    rings = [SharedRing(ctx, ring_capacity, record_shapes) for _ in range(nb_rollout_workers)]
+    # the spawned workers have no logger dir, each one monitors its envs in its own directory of the run
+    log_dirs = [logger.get_dir() and osp.join(logger.get_dir(), 'rollout_%d' % i) for i in range(nb_rollout_workers)]
+    workers = [ctx.Process(target=rollout_worker, args=(i, CloudpickleWrapper(env_fn), seed, log_dirs[i], rings[i], weights,
+                                                         counters, episode_queue, stop, policy_kwargs, rate))
+               for i in range(nb_rollout_workers)]
+    for worker in workers:
+        worker.start()
+
+    episode_rewards_history = deque(maxlen=100)
+    episode_steps_history = deque(maxlen=100)
+    episode_agent_rewards_history = [deque(maxlen=100) for _ in range(num_agents)]
+    episodes = 0
+    consumed = 0
+    update = 0
+    epoch = 0
+    start_time = time.time()
+    epoch_actor_losses = [[] for _ in range(len(trainers))]
+    epoch_critic_losses = [[] for _ in range(len(trainers))]
+    epoch_adaptive_distances = [[] for _ in range(len(trainers))]
+
+    print('Starting iterations...')
+    try:
+        while update < total_updates:
+            # move everything the workers produced into the replay memories
+            for ring in rings:
+                record = ring.get()
+                while record is not None:
+                    for agent in trainers:
+                        agent.store_transition(record['obs0'], record['actions'], record['rewards'],
+                                               record['obs1'], record['terminals1'])
+                    if replay_priorities is not None:
+                        replay_priorities.append(nenvs)
+                    consumed += nenvs
+                    record = ring.get()
+
+            # bound the update rate by the number of transitions received
+            if consumed < rate.min_transitions(update) or memories[0].nb_entries < batch_size:
+                if not any(worker.is_alive() for worker in workers):
+                    raise RuntimeError('all rollout workers exited')
+                time.sleep(1e-3)
+                continue
+
+            beta = beta_schedule.value(update) if beta_schedule is not None else None
+            for i, agent in enumerate(trainers):
+                # Adapt param noise, if necessary.
+                if update % param_noise_adaption_interval == 0:
+                    distance = agent.adapt_param_noise(trainers)
+                    epoch_adaptive_distances[i].append(distance)
+
+                cl, al = agent.train(trainers, beta=beta)
+                epoch_critic_losses[i].append(cl)
+                epoch_actor_losses[i].append(al)
+                agent.update_target_net()
+            update += 1
+            counters['updates'].value = update
+            if update % publish_interval == 0:
+                publish()
+
+            while True:
+                try:
+                    episode_reward, episode_step = episode_queue.get_nowait()
+                except queue.Empty:
+                    break
+                for i in range(num_agents):
+                    episode_agent_rewards_history[i].append(episode_reward[i])
+                episode_rewards_history.append(sum(episode_reward))
+                episode_steps_history.append(episode_step)
+                episodes += 1
+
+            if update % updates_per_epoch != 0:
+                continue
+
+            # Log stats.
+            duration = time.time() - start_time
+            combined_stats = {}
+            for i, agent in enumerate(trainers):
+                stats = agent.get_stats(trainers)
+                for k,v in stats.items():
+                    combined_stats["{}st/ag{}_{}".format(Config.tensorboard_rootdir,i,k)] = v
+                combined_stats["{}tr/ag{}_loss_actor".format(Config.tensorboard_rootdir,i)] = np.mean(epoch_actor_losses[i])
+                combined_stats["{}tr/ag{}_loss_critic".format(Config.tensorboard_rootdir,i)] = np.mean(epoch_critic_losses[i])
+                combined_stats["{}tr/ag{}_param_noise_distance".format(Config.tensorboard_rootdir,i)] = np.mean(epoch_adaptive_distances[i])
+            for i in range(num_agents):
+                combined_stats["{}ro/ag{}_return_history".format(Config.tensorboard_rootdir,i)] = np.mean(episode_agent_rewards_history[i])
+            combined_stats[Config.tensorboard_rootdir+'ro/return_history'] = np.mean(episode_rewards_history)
+            combined_stats[Config.tensorboard_rootdir+'ro/episode_steps_history'] = np.mean(episode_steps_history)
+            combined_stats[Config.tensorboard_rootdir+'tr/loss_actor'] = np.mean(epoch_actor_losses)
+            combined_stats[Config.tensorboard_rootdir+'tr/loss_critic'] = np.mean(epoch_critic_losses)
+            combined_stats[Config.tensorboard_rootdir+'to/duration'] = duration
+            combined_stats[Config.tensorboard_rootdir+'to/steps_per_second'] = float(consumed) / float(duration)
+            combined_stats[Config.tensorboard_rootdir+'to/train_steps_per_second'] = float(update) / float(duration)
+            combined_stats[Config.tensorboard_rootdir+'to/episodes'] = episodes
+            combined_stats[Config.tensorboard_rootdir+'to/epochs'] = epoch + 1
+            combined_stats[Config.tensorboard_rootdir+'to/steps'] = consumed
+            combined_stats[Config.tensorboard_rootdir+'to/train_steps'] = update
+
+            for key in sorted(combined_stats.keys()):
+                logger.record_tabular(key, combined_stats[key])
+            if rank == 0:
+                logger.dump_tabular()
+            logger.info('')
+
+            if save_interval and (epoch % save_interval == 0) and logger.get_dir() and rank == 0:
+                checkdir = osp.join(logger.get_dir(), 'checkpoints')
+                os.makedirs(checkdir, exist_ok=True)
+                savepath = osp.join(checkdir, '%.5i'%epoch)
+                print('Saving to', savepath)
+                trainers[0].save(savepath)
+            if save_interval and epoch % save_interval == 0:
+                for memory in memories:
+                    memory.flush()
+
+            epoch += 1
+            epoch_actor_losses = [[] for _ in range(len(trainers))]
+            epoch_critic_losses = [[] for _ in range(len(trainers))]
+            epoch_adaptive_distances = [[] for _ in range(len(trainers))]
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=10)
+            if worker.is_alive():
+                worker.terminate()
+
+    for memory in memories:
+        memory.flush()
+    return trainers
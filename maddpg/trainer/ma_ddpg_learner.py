@@ -13,7 +13,7 @@ import tensorflow.contrib as tc
 
 import baselines.common.tf_util as U
 from baselines import logger
-from baselines.common.mpi_adam import MpiAdam
+from baselines.common.mpi_adam import GraphAdam, MpiAdam
 from baselines.common.mpi_running_mean_std import RunningMeanStd
 from baselines.common.tf_util import (get_session, load_variables,
                                       save_variables)
@@ -77,7 +77,8 @@ class MADDPG(object):
     def __init__(self, name, actor, critic, memory, obs_space_n, act_space_n, agent_index, obs_rms, param_noise=None, action_noise=None,
         gamma=0.99, tau=0.001, normalize_returns=False, enable_popart=False, normalize_observations=True,
         batch_size=128, observation_range=(-5., 5.), action_range=(-1., 1.), return_range=(-np.inf, np.inf),
-        critic_l2_reg=0., actor_lr=1e-4, critic_lr=1e-3, clip_norm=None, reward_scale=1.):
+        critic_l2_reg=0., actor_lr=1e-4, critic_lr=1e-3, clip_norm=None, reward_scale=1., replay_priorities=None,
+        in_graph_optimizer=False):
         self.name = name
         self.num_agents = len(obs_space_n)
         self.agent_index = agent_index
@@ -88,54 +89,16 @@ class MADDPG(object):
         assert continuous_ctrl
 
         # Multi-agent inputs
-        # self.obs0 = []
-        # self.obs1 = []
-        self.actions = []
-        # self.norm_obs0_ph = []
-        # self.norm_obs1_ph = []
-
-        self.obs0 = tf.placeholder(tf.float32, shape=(self.num_agents, None,) + obs_space_n[self.agent_index].shape, name="obs0")
-        self.obs1 = tf.placeholder(tf.float32, shape=(self.num_agents, None,) + obs_space_n[self.agent_index].shape, name="obs1")
-        
-        # if continuous_ctrl:
-        #     self.actions = tf.placeholder(tf.float32, shape=(self.num_agents, None,) + act_space_n[self.agent_index].shape, name="action")
-        # else:
-        #     act_pdtype_n = [make_pdtype(act_space) for act_space in act_space_n]
-        #     self.actions = [act_pdtype_n[i].sample_placeholder([None], name="action"+str(i)) for i in range(len(act_space_n))]
-
-        # this is required to reshape obs and actions for concatenation
-        obs_shape_list = [self.num_agents] + list(obs_space_n[self.agent_index].shape)
-        act_shape_list = [self.num_agents] + list(act_space_n[self.agent_index].shape)
-        self.obs_shape_prod = np.prod(obs_shape_list)
-        self.act_shape_prod = np.prod(act_shape_list)
-
-        for i in range(self.num_agents):
-            # each obs in obs0,obs1 contains info about ego agent and relative pos/vel of other agents
-            # self.obs0.append(tf.placeholder(tf.float32, shape=[None] + list(obs_space_n[i].shape), name="obs0_"+str(i)))
-            # self.obs1.append(tf.placeholder(tf.float32, shape=[None] + list(obs_space_n[i].shape), name="obs1_"+str(i)))
-
-            if continuous_ctrl:
-                self.actions.append(tf.placeholder(tf.float32, shape=[None] + list(act_space_n[i].shape), name="action"+str(i)))
-            else:
-                self.actions.append(make_pdtype(act_space_n[i]).sample_placeholder([None], name="action"+str(i)))
-            
-            # self.norm_obs0_ph.append(tf.placeholder(tf.float32, shape=[None] + list(obs_space_n[i].shape), name="norm_obs0_"+str(i)))
-            # self.norm_obs1_ph.append(tf.placeholder(tf.float32, shape=[None] + list(obs_space_n[i].shape), name="norm_obs1_"+str(i)))
-        
-        # self.norm_obs0_ph = tf.placeholder(tf.float32, shape=[self.num_agents, None] + list(obs_space_n[self.agent_index].shape), name="norm_obs0")
-        # self.norm_obs1_ph = tf.placeholder(tf.float32, shape=[self.num_agents, None] + list(obs_space_n[self.agent_index].shape), name="norm_obs1")
-
-        # we only provide single agent inputs for these placeholders
-        self.terminals1 = tf.placeholder(tf.float32, shape=(None, 1), name='terminals1')
-        self.rewards = tf.placeholder(tf.float32, shape=(None, 1), name='rewards')
-
-        self.critic_target = tf.placeholder(tf.float32, shape=(None, 1), name='critic_target')
+        self.setup_placeholders(obs_space_n, act_space_n, continuous_ctrl)
+        self.importance_weights = tf.placeholder(tf.float32, shape=(None, 1), name='importance_weights')
         self.param_noise_stddev = tf.placeholder(tf.float32, shape=(), name='param_noise_stddev')
 
         # Parameters.
         self.gamma = gamma
         self.tau = tau
         self.memory = memory
+        # JointPriorities shared by all agents when using prioritized replay
+        self.replay_priorities = replay_priorities
         self.normalize_observations = normalize_observations
         self.normalize_returns = normalize_returns
         self.action_noise = action_noise
@@ -153,6 +116,8 @@ class MADDPG(object):
         self.batch_size = batch_size
         self.stats_sample = None
         self.critic_l2_reg = critic_l2_reg
+        # with a single process there is nothing to sync, apply the Adam updates in the graph
+        self.in_graph_optimizer = in_graph_optimizer and (MPI is None or MPI.COMM_WORLD.Get_size() == 1)
 
         # Observation normalization.
         # TODO: need to update the replay buffer storage function to account for multiple agents
@@ -160,7 +125,67 @@ class MADDPG(object):
             self.obs_rms = obs_rms
         else:
             self.obs_rms = None
-        
+
+        # Return normalization.
+        # TODO: update this to handle multiple agents if required
+        if self.normalize_returns:
+            with tf.variable_scope('ret_rms'):
+                self.ret_rms = RunningMeanStd()
+        else:
+            self.ret_rms = None
+
+        # Create target networks.
+        target_actor = copy(actor)
+        target_actor.name = 'target_actor'
+        self.target_actor = target_actor
+        target_critic = copy(critic)
+        target_critic.name = 'target_critic'
+        self.target_critic = target_critic
+
+        # Create networks and core TF parts that are shared across setup parts.
+        actor_obs0 = self.setup_networks()
+
+        # Set up parts.
+        if self.param_noise is not None:
+            # param noise is added to actor; hence obs for current agent is required
+            self.setup_param_noise(actor_obs0)
+        self.setup_actor_optimizer()
+        self.setup_critic_optimizer()
+        if self.in_graph_optimizer:
+            self.setup_optimizer_updates()
+        if self.normalize_returns and self.enable_popart:
+            self.setup_popart()
+        self.setup_stats()
+        self.setup_target_network_updates()
+
+        self.initial_state = None # recurrent architectures not supported yet
+
+    def setup_placeholders(self, obs_space_n, act_space_n, continuous_ctrl):
+        self.actions = []
+
+        self.obs0 = tf.placeholder(tf.float32, shape=(self.num_agents, None,) + obs_space_n[self.agent_index].shape, name="obs0")
+        self.obs1 = tf.placeholder(tf.float32, shape=(self.num_agents, None,) + obs_space_n[self.agent_index].shape, name="obs1")
+
+        # this is required to reshape obs and actions for concatenation
+        obs_shape_list = [self.num_agents] + list(obs_space_n[self.agent_index].shape)
+        act_shape_list = [self.num_agents] + list(act_space_n[self.agent_index].shape)
+        self.obs_shape_prod = np.prod(obs_shape_list)
+        self.act_shape_prod = np.prod(act_shape_list)
+
+        for i in range(self.num_agents):
+            # each obs in obs0,obs1 contains info about ego agent and relative pos/vel of other agents
+            if continuous_ctrl:
+                self.actions.append(tf.placeholder(tf.float32, shape=[None] + list(act_space_n[i].shape), name="action"+str(i)))
+            else:
+                self.actions.append(make_pdtype(act_space_n[i]).sample_placeholder([None], name="action"+str(i)))
+
+        # we only provide single agent inputs for these placeholders
+        self.terminals1 = tf.placeholder(tf.float32, shape=(None, 1), name='terminals1')
+        self.rewards = tf.placeholder(tf.float32, shape=(None, 1), name='rewards')
+        self.critic_target = tf.placeholder(tf.float32, shape=(None, 1), name='critic_target')
+
+    def setup_networks(self):
+        """Build the actor, critic and target tensors, returns the actor input of the param noise actors"""
         # Need to transpose observations so we can normalize them
         # converts tensor to shape (batch_size, num_agents, space_size)
         # transose on dim 0 and 1, leave dim 2 unchanged
@@ -173,7 +198,7 @@ class MADDPG(object):
             self.observation_range[0], self.observation_range[1])
         normalized_obs1 = tf.clip_by_value(normalize(obs1_t, self.obs_rms),
             self.observation_range[0], self.observation_range[1])
-        
+
         # convert the obs to original shape after normalization for convenience
         normalized_act_obs0 = tf.transpose(normalized_obs0, perm=[1, 0, 2])
         normalized_act_obs1 = tf.transpose(normalized_obs1, perm=[1, 0, 2])
@@ -183,29 +208,12 @@ class MADDPG(object):
         normalized_obs1_flat = tf.reshape(normalized_obs1, [-1, self.obs_shape_prod])
         actions_t_flat = tf.reshape(actions_t, [-1, self.act_shape_prod])
 
-        # Return normalization.
-        # TODO: update this to handle multiple agents if required
-        if self.normalize_returns:
-            with tf.variable_scope('ret_rms'):
-                self.ret_rms = RunningMeanStd()
-        else:
-            self.ret_rms = None
-
-        # Create target networks.
-        target_actor = copy(actor)
-        target_actor.name = 'target_actor'
-        self.target_actor = target_actor
-        target_critic = copy(critic)
-        target_critic.name = 'target_critic'
-        self.target_critic = target_critic
-
-        # Create networks and core TF parts that are shared across setup parts.
         # Each agents gets its own observation
-        self.actor_tf = actor(normalized_act_obs0[self.agent_index])
-        self.target_actor_tf = target_actor(normalized_act_obs1[self.agent_index])
+        self.actor_tf = self.actor(normalized_act_obs0[self.agent_index])
+        self.target_actor_tf = self.target_actor(normalized_act_obs1[self.agent_index])
 
         # Critic gets all observations
-        self.normalized_critic_tf = critic(normalized_obs0_flat, actions_t_flat)
+        self.normalized_critic_tf = self.critic(normalized_obs0_flat, actions_t_flat)
         self.critic_tf = denormalize(tf.clip_by_value(self.normalized_critic_tf, self.return_range[0], self.return_range[1]), self.ret_rms)
 
         # need to provide critic() with all actions
@@ -213,7 +221,7 @@ class MADDPG(object):
         act_input_n[self.agent_index] = self.actor_tf # update current agent action using its actor
         act_input_n_t = tf.transpose(act_input_n, perm=[1, 0, 2])
         act_input_n_t_flat = tf.reshape(act_input_n_t, [-1, self.act_shape_prod])
-        self.normalized_critic_with_actor_tf = critic(normalized_obs0_flat, act_input_n_t_flat, reuse=True)
+        self.normalized_critic_with_actor_tf = self.critic(normalized_obs0_flat, act_input_n_t_flat, reuse=True)
         self.critic_with_actor_tf = denormalize(tf.clip_by_value(self.normalized_critic_with_actor_tf, self.return_range[0], self.return_range[1]), self.ret_rms)
 
         # we need to use actions for all agents
@@ -221,21 +229,12 @@ class MADDPG(object):
         target_act_input_n[self.agent_index] = self.target_actor_tf # update current agent action using its target actor
         target_act_input_n_t = tf.transpose(target_act_input_n, perm=[1, 0, 2])
         target_act_input_n_t_flat = tf.reshape(target_act_input_n_t, [-1, self.act_shape_prod])
-        Q_obs1 = denormalize(target_critic(normalized_obs1_flat, target_act_input_n_t_flat), self.ret_rms)
-        self.target_Q = self.rewards + (1. - self.terminals1) * gamma * Q_obs1
+        Q_obs1 = denormalize(self.target_critic(normalized_obs1_flat, target_act_input_n_t_flat), self.ret_rms)
+        self.target_Q = self.rewards + (1. - self.terminals1) * self.gamma * Q_obs1
+        return normalized_act_obs0[self.agent_index]
 
-        # Set up parts.
-        if self.param_noise is not None:
-            # param noise is added to actor; hence obs for current agent is required
-            self.setup_param_noise(normalized_act_obs0[self.agent_index])
-        self.setup_actor_optimizer()
-        self.setup_critic_optimizer()
-        if self.normalize_returns and self.enable_popart:
-            self.setup_popart()
-        self.setup_stats()
-        self.setup_target_network_updates()
-
-        self.initial_state = None # recurrent architectures not supported yet
+    def run_actor(self, actor, actor_obs):
+        return actor(actor_obs)
 
     def setup_target_network_updates(self):
         actor_init_updates, actor_soft_updates = get_target_updates(self.actor.vars, self.target_actor.vars, self.tau)
@@ -249,14 +248,14 @@ class MADDPG(object):
         # Configure perturbed actor.
         param_noise_actor = copy(self.actor)
         param_noise_actor.name = 'param_noise_actor'
-        self.perturbed_actor_tf = param_noise_actor(normalized_obs0)
+        self.perturbed_actor_tf = self.run_actor(param_noise_actor, normalized_obs0)
         logger.info('setting up param noise')
         self.perturb_policy_ops = get_perturbed_actor_updates(self.actor, param_noise_actor, self.param_noise_stddev)
 
         # Configure separate copy for stddev adoption.
         adaptive_param_noise_actor = copy(self.actor)
         adaptive_param_noise_actor.name = 'adaptive_param_noise_actor'
-        adaptive_actor_tf = adaptive_param_noise_actor(normalized_obs0)
+        adaptive_actor_tf = self.run_actor(adaptive_param_noise_actor, normalized_obs0)
         self.perturb_adaptive_policy_ops = get_perturbed_actor_updates(self.actor, adaptive_param_noise_actor, self.param_noise_stddev)
         self.adaptive_policy_distance = tf.sqrt(tf.reduce_mean(tf.square(self.actor_tf - adaptive_actor_tf)))
 
@@ -268,13 +267,19 @@ class MADDPG(object):
         logger.info('  actor shapes: {}'.format(actor_shapes))
         logger.info('  actor params: {}'.format(actor_nb_params))
         self.actor_grads = U.flatgrad(self.actor_loss, self.actor.trainable_vars, clip_norm=self.clip_norm)
-        self.actor_optimizer = MpiAdam(var_list=self.actor.trainable_vars,
+        adam = GraphAdam if self.in_graph_optimizer else MpiAdam
+        self.actor_optimizer = adam(var_list=self.actor.trainable_vars,
             beta1=0.9, beta2=0.999, epsilon=1e-08)
 
     def setup_critic_optimizer(self):
         logger.info('setting up critic optimizer')
         normalized_critic_target_tf = tf.clip_by_value(normalize(self.critic_target, self.ret_rms), self.return_range[0], self.return_range[1])
-        self.critic_loss = tf.reduce_mean(tf.square(self.normalized_critic_tf - normalized_critic_target_tf))
+        self.critic_td_error = self.normalized_critic_tf - normalized_critic_target_tf
+        if self.replay_priorities is not None:
+            # correct for the bias of prioritized sampling, the weights broadcast over any leading agent axis
+            self.critic_loss = tf.reduce_mean(self.importance_weights * tf.square(self.critic_td_error))
+        else:
+            self.critic_loss = tf.reduce_mean(tf.square(self.critic_td_error))
         if self.critic_l2_reg > 0.:
             critic_reg_vars = [var for var in self.critic.trainable_vars if var.name.endswith('/w:0') and 'output' not in var.name]
             for var in critic_reg_vars:
@@ -290,9 +295,16 @@ class MADDPG(object):
         logger.info('  critic shapes: {}'.format(critic_shapes))
         logger.info('  critic params: {}'.format(critic_nb_params))
         self.critic_grads = U.flatgrad(self.critic_loss, self.critic.trainable_vars, clip_norm=self.clip_norm)
-        self.critic_optimizer = MpiAdam(var_list=self.critic.trainable_vars,
+        adam = GraphAdam if self.in_graph_optimizer else MpiAdam
+        self.critic_optimizer = adam(var_list=self.critic.trainable_vars,
             beta1=0.9, beta2=0.999, epsilon=1e-08)
 
+    def setup_optimizer_updates(self):
+        # update the weights only once everything fetched with the update has been computed
+        with tf.control_dependencies([self.actor_grads, self.actor_loss, self.critic_grads, self.critic_loss, self.critic_td_error]):
+            self.actor_update = self.actor_optimizer.update_op(self.actor_grads, self.actor_lr)
+            self.critic_update = self.critic_optimizer.update_op(self.critic_grads, self.critic_lr)
+
     def setup_popart(self):
         # See https://arxiv.org/pdf/1602.07714.pdf for details.
         self.old_std = tf.placeholder(tf.float32, shape=[1], name='old_std')
@@ -413,51 +425,46 @@ class MADDPG(object):
             self.obs_rms.update(np.array([obs0[b]]))
         return
 
-    def train(self, agents):
-        # generate indices to access batches from all agents
-        replay_sample_index = self.memory.generate_index(self.batch_size)
-
+    def feeds(self, replay_sample_index, agents):
+        """
+        Feed dicts of the joint sample at replay_sample_index: the inputs of
+        target_Q, and those of the actor and critic updates but critic_target
+        """
         # collect replay sample from all agents
         obs0_n = []
         obs1_n = []
-        rewards_n = []
         act_n = []
-        terminals1_n = []
         for i in range(self.num_agents):
             # Get a batch.
             batch = agents[i].memory.sample(batch_size=self.batch_size, index=replay_sample_index)
             obs0_n.append(batch['obs0'])
             obs1_n.append(batch['obs1'])
             act_n.append(batch['actions'])
-            # rewards_n.append(batch['rewards'])
-            # terminals1_n.append(batch['terminals1'])
         batch = self.memory.sample(batch_size=self.batch_size, index=replay_sample_index)
 
-        # fill placeholders in obs1 with corresponding obs from each agent's replay buffer
-        # self.obs1 and obs1_n are lists of size num_agents
-        # feed_dict={ph: data for ph, data in zip(self.obs1, obs1_n)}
-        feed_dict = {self.obs1: obs1_n}
-
-        # TODO: find a better way to do this 
-        # Get the normalized obs first
-        # norm_obs1 = self.sess.run(self.norm_obs1, feed_dict=feed_dict)
-        # use the normalized obs for training
-        # feed_dict = {self.norm_obs1_ph: norm_obs1}
-        # feed_dict = {ph: data for ph, data in zip(self.norm_obs1_ph, norm_obs1)}
-
         # actions required for critic
-        act_dict={ph: data for ph, data in zip(self.actions, act_n)}
-        feed_dict.update(act_dict)
-        feed_dict.update({self.rewards: batch['rewards']})
-        feed_dict.update({self.terminals1: batch['terminals1'].astype('float32')})
+        act_dict = {ph: data for ph, data in zip(self.actions, act_n)}
+        target_feed = {self.obs1: obs1_n, self.rewards: batch['rewards'],
+                       self.terminals1: batch['terminals1'].astype('float32')}
+        target_feed.update(act_dict)
+        train_feed = {self.obs0: obs0_n}
+        train_feed.update(act_dict)
+        return target_feed, train_feed
+
+    def update_priorities(self, replay_sample_index, td_error):
+        # one batched priority update for the whole sample
+        self.replay_priorities.update(self.agent_index, replay_sample_index, td_error, self.memory)
+
+    def train(self, agents, beta=None):
+        # generate indices to access batches from all agents
+        if self.replay_priorities is not None:
+            replay_sample_index, weights = self.replay_priorities.sample(self.batch_size, beta, self.memory)
+        else:
+            replay_sample_index = self.memory.generate_index(self.batch_size)
+        target_feed, feed_dict = self.feeds(replay_sample_index, agents)
 
         if self.normalize_returns and self.enable_popart:
-            old_mean, old_std, target_Q = self.sess.run([self.ret_rms.mean, self.ret_rms.std, self.target_Q], feed_dict=feed_dict)
-            # old_mean, old_std, target_Q = self.sess.run([self.ret_rms.mean, self.ret_rms.std, self.target_Q], feed_dict={
-            #     self.obs1: batch['obs1'],
-            #     self.rewards: batch['rewards'],
-            #     self.terminals1: batch['terminals1'].astype('float32'),
-            # })
+            old_mean, old_std, target_Q = self.sess.run([self.ret_rms.mean, self.ret_rms.std, self.target_Q], feed_dict=target_feed)
 
             self.ret_rms.update(target_Q.flatten())
             self.sess.run(self.renormalize_Q_outputs_op, feed_dict={
@@ -467,46 +474,29 @@ class MADDPG(object):
 
             # Run sanity check. Disabled by default since it slows down things considerably.
             # print('running sanity check')
-            # target_Q_new, new_mean, new_std = self.sess.run([self.target_Q, self.ret_rms.mean, self.ret_rms.std], feed_dict={
-            #     self.obs1: batch['obs1'],
-            #     self.rewards: batch['rewards'],
-            #     self.terminals1: batch['terminals1'].astype('float32'),
-            # })
+            # target_Q_new, new_mean, new_std = self.sess.run([self.target_Q, self.ret_rms.mean, self.ret_rms.std], feed_dict=target_feed)
             # print(target_Q_new, target_Q, new_mean, new_std)
             # assert (np.abs(target_Q - target_Q_new) < 1e-3).all()
         else:
-            target_Q = self.sess.run(self.target_Q, feed_dict=feed_dict)
-            # target_Q = self.sess.run(self.target_Q, feed_dict={
-            #     self.obs1: batch['obs1'],
-            #     self.rewards: batch['rewards'],
-            #     self.terminals1: batch['terminals1'].astype('float32'),
-            # })
+            target_Q = self.sess.run(self.target_Q, feed_dict=target_feed)
 
         # Get all gradients and perform a synced update.
         ops = [self.actor_grads, self.actor_loss, self.critic_grads, self.critic_loss]
-
-        # generate feed_dict for multiple observations and actions
-        # feed_dict={ph: data for ph, data in zip(self.obs0, obs0_n)}
-        feed_dict = {self.obs0: obs0_n}
-
-        # Get the normalized obs first
-        # norm_obs0 = self.sess.run(self.norm_obs0, feed_dict=feed_dict)
-        # use the normalized obs for training
-        # feed_dict = {self.norm_obs0_ph: norm_obs0}
-        # feed_dict = {ph: data for ph, data in zip(self.norm_obs0_ph, norm_obs0)}
-
-        # act_dict={ph: data for ph, data in zip(self.actions, act_n)}
-        feed_dict.update(act_dict)
+        if self.in_graph_optimizer:
+            # the updates run in the same call instead of fetching the gradients
+            ops = [self.actor_update, self.actor_loss, self.critic_update, self.critic_loss]
         feed_dict.update({self.critic_target: target_Q})
 
-        actor_grads, actor_loss, critic_grads, critic_loss = self.sess.run(ops, feed_dict=feed_dict)
-        # actor_grads, actor_loss, critic_grads, critic_loss = self.sess.run(ops, feed_dict={
-        #     self.obs0: batch['obs0'],
-        #     self.actions: batch['actions'],
-        #     self.critic_target: target_Q,
-        # })
-        self.actor_optimizer.update(actor_grads, stepsize=self.actor_lr)
-        self.critic_optimizer.update(critic_grads, stepsize=self.critic_lr)
+        if self.replay_priorities is not None:
+            ops += [self.critic_td_error]
+            feed_dict.update({self.importance_weights: weights})
+            actor_grads, actor_loss, critic_grads, critic_loss, td_error = self.sess.run(ops, feed_dict=feed_dict)
+            self.update_priorities(replay_sample_index, td_error)
+        else:
+            actor_grads, actor_loss, critic_grads, critic_loss = self.sess.run(ops, feed_dict=feed_dict)
+        if not self.in_graph_optimizer:
+            self.actor_optimizer.update(actor_grads, stepsize=self.actor_lr)
+            self.critic_optimizer.update(critic_grads, stepsize=self.critic_lr)
 
         return critic_loss, actor_loss
 
@@ -526,29 +516,9 @@ class MADDPG(object):
 
     def get_stats(self, agents):
         if self.stats_sample is None:
-            replay_sample_index = self.memory.generate_index(self.batch_size)
-            # collect replay sample from all agents
-            obs0_n, act_n = [], []
-            for i in range(self.num_agents):
-                batch = agents[i].memory.sample(batch_size=self.batch_size, index=replay_sample_index)
-                obs0_n.append(batch['obs0'])
-                act_n.append(batch['actions'])
-            # generate feed_dict for multiple observations and actions
-            # feed_dict={ph: data for ph, data in zip(self.obs0, obs0_n)}
-            feed_dict = {self.obs0: obs0_n}
-
-            # Get the normalized obs first
-            # norm_obs0 = self.sess.run(self.norm_obs0, feed_dict=feed_dict)
-            # use the normalized obs for training
-            # feed_dict = {self.norm_obs0_ph: norm_obs0}
-            # feed_dict = {ph: data for ph, data in zip(self.norm_obs0_ph, norm_obs0)}
-
-            actions_dict={ph: data for ph, data in zip(self.actions, act_n)}
-            feed_dict.update(actions_dict)
-
             # Get a sample and keep that fixed for all further computations.
             # This allows us to estimate the change in value for the same set of inputs.
-            self.stats_sample = feed_dict
+            _, self.stats_sample = self.feeds(self.memory.generate_index(self.batch_size), agents)
         values = self.sess.run(self.stats_ops, feed_dict=self.stats_sample)
 
         names = self.stats_names[:]
@@ -561,44 +531,17 @@ class MADDPG(object):
         return stats
 
     def adapt_param_noise(self, agents):
-        try:
-            from mpi4py import MPI
-        except ImportError:
-            MPI = None
-
         if self.param_noise is None:
             return 0.
 
         # Perturb a separate copy of the policy to adjust the scale for the next "real" perturbation.
-        replay_sample_index = self.memory.generate_index(self.batch_size)
-        obs0_n = []
-        for i in range(self.num_agents):
-            batch = agents[i].memory.sample(batch_size=self.batch_size, index=replay_sample_index)
-            obs0_n.append(batch['obs0'])
-        # feed_dict={ph: data for ph, data in zip(self.obs0, obs0_n)}
-        feed_dict = {self.obs0: obs0_n}
-        
-        # Get the normalized obs first
-        # norm_obs0 = self.sess.run(self.norm_obs0, feed_dict=feed_dict)
-        # use the normalized obs for training
-        # feed_dict = {self.norm_obs0_ph: norm_obs0}
-        # feed_dict = {ph: data for ph, data in zip(self.norm_obs0_ph, norm_obs0)}
-
+        _, feed_dict = self.feeds(self.memory.generate_index(self.batch_size), agents)
         feed_dict.update({self.param_noise_stddev: self.param_noise.current_stddev})
 
         self.sess.run(self.perturb_adaptive_policy_ops, feed_dict={
             self.param_noise_stddev: self.param_noise.current_stddev,
         })
         distance = self.sess.run(self.adaptive_policy_distance, feed_dict=feed_dict)
-        # distance = self.sess.run(self.adaptive_policy_distance, feed_dict={
-        #     self.obs0: batch['obs0'],
-        #     self.param_noise_stddev: self.param_noise.current_stddev,
-        # })
-
-        if MPI is not None:
-            mean_distance = MPI.COMM_WORLD.allreduce(distance, op=MPI.SUM) / MPI.COMM_WORLD.Get_size()
-        else:
-            mean_distance = distance
 
         if MPI is not None:
             mean_distance = MPI.COMM_WORLD.allreduce(distance, op=MPI.SUM) / MPI.COMM_WORLD.Get_size()
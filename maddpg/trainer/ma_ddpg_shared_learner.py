@@ -0,0 +1,146 @@
+"""
+DDPG learner for multiple homogeneous agents sharing their parameters
+built using ma_ddpg_learner: one actor and one centralised critic are used
+by all agents, the agent id is given to both as a one-hot input feature
+"""
+
+import numpy as np
+import tensorflow as tf
+
+from maddpg.trainer.ma_ddpg_learner import MADDPG, denormalize, normalize
+
+
+class SharedMADDPG(MADDPG):
+    def __init__(self, name, actor, critic, memories, obs_space_n, act_space_n, obs_rms, **kwargs):
+        """MADDPG whose actor and critic are used by all agents, memories holds the memory of every agent"""
+        # one memory per agent, sampled with a joint index
+        self.memories = memories
+        super(SharedMADDPG, self).__init__(name, actor, critic, memories[0], obs_space_n, act_space_n, 0, obs_rms,
+                                           **kwargs)
+
+    def setup_placeholders(self, obs_space_n, act_space_n, continuous_ctrl):
+        # parameters can only be shared by interchangeable agents
+        obs_shape = obs_space_n[0].shape
+        act_shape = act_space_n[0].shape
+        assert all(space.shape == obs_shape for space in obs_space_n)
+        assert all(space.shape == act_shape for space in act_space_n)
+        self.obs_dim = obs_shape[-1]
+        self.act_dim = act_shape[-1]
+
+        # Joint inputs, first dimension is the agent
+        self.obs0 = tf.placeholder(tf.float32, shape=(self.num_agents, None,) + obs_shape, name="obs0")
+        self.obs1 = tf.placeholder(tf.float32, shape=(self.num_agents, None,) + obs_shape, name="obs1")
+        self.actions = tf.placeholder(tf.float32, shape=(self.num_agents, None,) + act_shape, name="actions")
+        self.terminals1 = tf.placeholder(tf.float32, shape=(self.num_agents, None, 1), name='terminals1')
+        self.rewards = tf.placeholder(tf.float32, shape=(self.num_agents, None, 1), name='rewards')
+        self.critic_target = tf.placeholder(tf.float32, shape=(self.num_agents, None, 1), name='critic_target')
+
+    def setup_networks(self):
+        # normalize with shape (batch_size, num_agents, space_size) so that
+        # each agent slot uses its own statistics
+        normalized_obs0 = tf.clip_by_value(normalize(tf.transpose(self.obs0, perm=[1, 0, 2]), self.obs_rms),
+            self.observation_range[0], self.observation_range[1])
+        normalized_obs1 = tf.clip_by_value(normalize(tf.transpose(self.obs1, perm=[1, 0, 2]), self.obs_rms),
+            self.observation_range[0], self.observation_range[1])
+
+        # actor inputs (num_agents, batch_size, obs + id)
+        actor_obs0 = self.with_agent_ids(tf.transpose(normalized_obs0, perm=[1, 0, 2]))
+        actor_obs1 = self.with_agent_ids(tf.transpose(normalized_obs1, perm=[1, 0, 2]))
+
+        # critic inputs, the joint observation is the same for every agent
+        normalized_obs0_flat = self.tile_agents(tf.reshape(normalized_obs0, [-1, self.num_agents * self.obs_dim]))
+        normalized_obs1_flat = self.tile_agents(tf.reshape(normalized_obs1, [-1, self.num_agents * self.obs_dim]))
+        actions_flat = self.tile_agents(self.joint_actions(self.actions))
+
+        # A single forward pass of the actor gives the actions of all agents
+        self.actor_tf = self.run_actor(self.actor, actor_obs0)
+        self.target_actor_tf = self.run_actor(self.target_actor, actor_obs1)
+
+        # Q values of all agents, shape (num_agents, batch_size, 1)
+        self.normalized_critic_tf = self.run_critic(self.critic, normalized_obs0_flat, actions_flat)
+        self.critic_tf = denormalize(tf.clip_by_value(self.normalized_critic_tf, self.return_range[0], self.return_range[1]), self.ret_rms)
+
+        # agent i is evaluated with its own action from the actor and the
+        # sampled actions of the other agents
+        own_action = tf.eye(self.num_agents)[:, :, None, None]
+        act_input_n = own_action * self.actor_tf[None] + (1. - own_action) * self.actions[None]
+        act_input_n_flat = tf.reshape(tf.transpose(act_input_n, perm=[0, 2, 1, 3]),
+            [self.num_agents, -1, self.num_agents * self.act_dim])
+        self.normalized_critic_with_actor_tf = self.run_critic(self.critic, normalized_obs0_flat, act_input_n_flat)
+        self.critic_with_actor_tf = denormalize(tf.clip_by_value(self.normalized_critic_with_actor_tf, self.return_range[0], self.return_range[1]), self.ret_rms)
+
+        # the target actor gives the next actions of all agents at once
+        target_act_input_n_flat = self.tile_agents(self.joint_actions(self.target_actor_tf))
+        Q_obs1 = denormalize(self.run_critic(self.target_critic, normalized_obs1_flat, target_act_input_n_flat), self.ret_rms)
+        self.target_Q = self.rewards + (1. - self.terminals1) * self.gamma * Q_obs1
+        return actor_obs0
+
+    def with_agent_ids(self, x):
+        # append the one-hot agent id to every (agent, batch) row of x
+        agent_ids = tf.tile(tf.eye(self.num_agents)[:, None, :], tf.stack([1, tf.shape(x)[1], 1]))
+        return tf.concat([x, agent_ids], axis=-1)
+
+    def tile_agents(self, x):
+        # repeat a (batch_size, dim) tensor for every agent
+        return tf.tile(x[None], [self.num_agents, 1, 1])
+
+    def joint_actions(self, actions):
+        # (num_agents, batch_size, act) -> (batch_size, num_agents * act)
+        return tf.reshape(tf.transpose(actions, perm=[1, 0, 2]), [-1, self.num_agents * self.act_dim])
+
+    def run_actor(self, actor, actor_obs):
+        x = actor(tf.reshape(actor_obs, [-1, self.obs_dim + self.num_agents]))
+        return tf.reshape(x, [self.num_agents, -1, self.act_dim])
+
+    def run_critic(self, critic, obs_flat, actions_flat):
+        obs_in = tf.reshape(self.with_agent_ids(obs_flat), [-1, self.num_agents * self.obs_dim + self.num_agents])
+        act_in = tf.reshape(actions_flat, [-1, self.num_agents * self.act_dim])
+        x = critic(obs_in, act_in)
+        return tf.reshape(x, [self.num_agents, -1, 1])
+
+    def step(self, obs, apply_noise=True, compute_Q=True):
+        """Actions of all agents in all envs, obs has shape (nenvs, num_agents, obs)"""
+        if self.param_noise is not None and apply_noise:
+            actor_tf = self.perturbed_actor_tf
+        else:
+            actor_tf = self.actor_tf
+        feed_dict = {self.obs0: np.swapaxes(obs, 0, 1)}
+
+        action = self.sess.run(actor_tf, feed_dict=feed_dict)
+        if compute_Q:
+            feed_dict.update({self.actions: action})
+            q = np.swapaxes(self.sess.run(self.critic_tf, feed_dict=feed_dict), 0, 1)
+        else:
+            q = None
+
+        if self.action_noise is not None and apply_noise:
+            noise = np.array([self.action_noise() for _ in range(action.shape[0] * action.shape[1])])
+            action += noise.reshape(action.shape)
+        action = np.clip(action, self.action_range[0], self.action_range[1])
+
+        return np.swapaxes(action, 0, 1), q, None, None
+
+    def store_transition(self, obs0, action, reward, obs1, terminal1):
+        reward = np.asarray(reward) * self.reward_scale
+        B = obs0.shape[0]
+        for b in range(B):
+            for i, memory in enumerate(self.memories):
+                memory.append(obs0[b][i], action[b][i], reward[b][i], obs1[b][i], terminal1[b][i])
+            if self.normalize_observations:
+                # the full obs updates the stats of every agent slot at once
+                self.obs_rms.update(np.array([obs0[b]]))
+
+    def feeds(self, replay_sample_index, agents=None):
+        batches = [memory.sample(batch_size=self.batch_size, index=replay_sample_index) for memory in self.memories]
+        batch = {k: np.array([b[k] for b in batches]) for k in batches[0]}
+        target_feed = {
+            self.obs1: batch['obs1'],
+            self.rewards: batch['rewards'],
+            self.terminals1: batch['terminals1'].astype('float32'),
+        }
+        train_feed = {self.obs0: batch['obs0'], self.actions: batch['actions']}
+        return target_feed, train_feed
+
+    def update_priorities(self, replay_sample_index, td_error):
+        # TD errors of all agents, (batch_size, num_agents)
+        self.replay_priorities.update(slice(None), replay_sample_index, td_error[..., 0].T, self.memory)
@@ -1,87 +1,104 @@
 import numpy as np
 
+from baselines.common.segment_tree import SumSegmentTree, MinSegmentTree
+from baselines.ddpg.memory import Memory as BaseMemory
 
-class RingBuffer(object):
-    def __init__(self, maxlen, shape, dtype='float32'):
-        self.maxlen = maxlen
-        self.start = 0
-        self.length = 0
-        self.data = np.zeros((maxlen,) + shape).astype(dtype)
-
-    def __len__(self):
-        return self.length
-
-    def __getitem__(self, idx):
-        if idx < 0 or idx >= self.length:
-            raise KeyError()
-        return self.data[(self.start + idx) % self.maxlen]
-
-    def get_batch(self, idxs):
-        return self.data[(self.start + idxs) % self.maxlen]
-
-    def append(self, v):
-        if self.length < self.maxlen:
-            # We have space, simply increase the length.
-            self.length += 1
-        elif self.length == self.maxlen:
-            # No space, "remove" the first item.
-            self.start = (self.start + 1) % self.maxlen
-        else:
-            # This should never happen.
-            raise RuntimeError()
-        self.data[(self.start + self.length - 1) % self.maxlen] = v
-
-
-def array_min2d(x):
-    x = np.array(x)
-    if x.ndim >= 2:
-        return x
-    return x.reshape(-1, 1)
-
-
-class Memory(object):
-    def __init__(self, limit, action_shape, observation_shape):
-        self.limit = limit
-
-        self.observations0 = RingBuffer(limit, shape=observation_shape)
-        self.actions = RingBuffer(limit, shape=action_shape)
-        self.rewards = RingBuffer(limit, shape=(1,))
-        self.terminals1 = RingBuffer(limit, shape=(1,))
-        self.observations1 = RingBuffer(limit, shape=observation_shape)
 
+class Memory(BaseMemory):
+    """Replay memory of one agent, whose batches can be drawn at a joint index shared by all agents"""
     def sample(self, batch_size, index=None):
-        # Draw such that we always have a proceeding element.
-        batch_idxs = index if index is not None else self.generate_index(batch_size)
-
-        obs0_batch = self.observations0.get_batch(batch_idxs)
-        obs1_batch = self.observations1.get_batch(batch_idxs)
-        action_batch = self.actions.get_batch(batch_idxs)
-        reward_batch = self.rewards.get_batch(batch_idxs)
-        terminal1_batch = self.terminals1.get_batch(batch_idxs)
-
-        result = {
-            'obs0': array_min2d(obs0_batch),
-            'obs1': array_min2d(obs1_batch),
-            'rewards': array_min2d(reward_batch),
-            'actions': array_min2d(action_batch),
-            'terminals1': array_min2d(terminal1_batch),
-        }
-        return result
-    
+        return self.get_batch(index if index is not None else self.generate_index(batch_size))
+
     def generate_index(self, batch_size):
         # Draw such that we always have a proceeding element.
         return np.random.randint(self.nb_entries - 2, size=batch_size)
 
-    def append(self, obs0, action, reward, obs1, terminal1, training=True):
-        if not training:
-            return
-
-        self.observations0.append(obs0)
-        self.actions.append(action)
-        self.rewards.append(reward)
-        self.observations1.append(obs1)
-        self.terminals1.append(terminal1)
 
-    @property
-    def nb_entries(self):
-        return len(self.observations0)
+class JointPriorities(object):
+    def __init__(self, limit, num_agents, alpha, eps=1e-6):
+        """Prioritized sampling of the joint replay index shared by all agents.
+
+        Every agent appends the same transitions to its own Memory in the same
+        order, so a ring slot refers to the same joint transition in all of
+        them and one priority per slot is kept for the whole team. Each agent
+        reports the TD errors of its own critic; the priority of a slot is the
+        largest one reported for it by any agent.
+
+        Parameters
+        ----------
+        limit: int
+            capacity of the agent memories
+        num_agents: int
+            number of agents reporting TD errors
+        alpha: float
+            how much prioritization is used
+            (0 - no prioritization, 1 - full prioritization)
+        eps: float
+            added to the absolute TD errors so no transition gets zero priority
+        """
+        assert alpha >= 0
+        self.limit = limit
+        self.alpha = alpha
+        self.eps = eps
+        self.next_idx = 0
+        self.agent_priorities = np.zeros((limit, num_agents), dtype=np.float32)
+
+        it_capacity = 1
+        while it_capacity < limit:
+            it_capacity *= 2
+
+        self.it_sum = SumSegmentTree(it_capacity)
+        self.it_min = MinSegmentTree(it_capacity)
+        self.max_priority = 1.0
+
+    def append(self, n=1):
+        """Give the next `n` transitions written to the memories the max priority"""
+        slots = (self.next_idx + np.arange(n)) % self.limit
+        self.agent_priorities[slots] = self.max_priority
+        self.it_sum.update(slots, self.max_priority ** self.alpha)
+        self.it_min.update(slots, self.max_priority ** self.alpha)
+        self.next_idx = (self.next_idx + n) % self.limit
+
+    def restore(self, memory):
+        """Give the transitions already held by `memory` the max priority"""
+        self.next_idx = 0
+        self.append(memory.nb_entries)
+        self.next_idx = (memory.observations0.start + memory.nb_entries) % self.limit
+
+    def sample(self, batch_size, beta, memory):
+        """Draw a joint index proportionally to the priorities.
+
+        Returns
+        -------
+        index: np.array
+            indexes to pass to Memory.sample of every agent
+        weights: np.array
+            importance weights of shape (batch_size, 1)
+        """
+        assert beta > 0
+        nb_entries = memory.nb_entries
+        p_total = self.it_sum.sum()
+        masses = (np.random.random(batch_size) + np.arange(batch_size)) * (p_total / batch_size)
+        slots = self.it_sum.find_prefixsum_idx(np.minimum(masses, p_total))
+        # slots are filled from 0, guard against rounding past the last one
+        slots = np.minimum(slots, nb_entries - 1)
+
+        p_min = self.it_min.min() / p_total
+        max_weight = (p_min * nb_entries) ** (-beta)
+        p_sample = self.it_sum[slots] / p_total
+        weights = (p_sample * nb_entries) ** (-beta) / max_weight
+
+        # Memory indexes are relative to the start of its ring
+        index = (slots - memory.observations0.start) % self.limit
+        return index, weights.reshape(-1, 1).astype(np.float32)
+
+    def update(self, agent_index, index, td_errors, memory):
+        """Set the priorities of the sampled transitions from the TD errors of
+        one agent, or of several agents when `agent_index` is a slice"""
+        slots = (np.asarray(index) + memory.observations0.start) % self.limit
+        shape = self.agent_priorities[slots, agent_index].shape
+        self.agent_priorities[slots, agent_index] = np.abs(np.reshape(td_errors, shape)) + self.eps
+        priorities = self.agent_priorities[slots].max(axis=1)
+        self.it_sum.update(slots, priorities ** self.alpha)
+        self.it_min.update(slots, priorities ** self.alpha)
+        self.max_priority = max(self.max_priority, float(priorities.max()))
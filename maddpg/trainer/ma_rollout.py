@@ -0,0 +1,115 @@
+"""
+Shared memory between the rollout workers and the learner of ma_ddpg_async,
+and the bound on the rate at which the workers sample.
+"""
+
+import time
+
+import numpy as np
+
+
+class SharedRing(object):
+    def __init__(self, ctx, capacity, shapes):
+        """Single producer, single consumer ring of records in shared memory.
+
+        Parameters
+        ----------
+        ctx: multiprocessing context
+        capacity: int
+            number of records the ring can hold before the producer blocks
+        shapes: dict
+            shape of every float field of a record
+        """
+        self.capacity = capacity
+        self.shapes = shapes
+        self.raw = {k: ctx.RawArray('f', capacity * int(np.prod(shape))) for k, shape in shapes.items()}
+        self.written = ctx.Value('l', 0)
+        self.read = ctx.Value('l', 0)
+        self._arrays = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_arrays'] = None
+        return state
+
+    def arrays(self):
+        if self._arrays is None:
+            self._arrays = {k: np.frombuffer(self.raw[k], dtype=np.float32).reshape((self.capacity,) + shape)
+                            for k, shape in self.shapes.items()}
+        return self._arrays
+
+    def put(self, record, stop):
+        """Write a record, waiting for space. Returns False if stopped while waiting"""
+        while self.written.value - self.read.value >= self.capacity:
+            if stop.is_set():
+                return False
+            time.sleep(1e-3)
+        idx = self.written.value % self.capacity
+        for k, arr in self.arrays().items():
+            arr[idx] = record[k]
+        with self.written.get_lock():
+            self.written.value += 1
+        return True
+
+    def get(self):
+        """Next record, or None if the ring is empty"""
+        if self.read.value == self.written.value:
+            return None
+        idx = self.read.value % self.capacity
+        record = {k: arr[idx].copy() for k, arr in self.arrays().items()}
+        with self.read.get_lock():
+            self.read.value += 1
+        return record
+
+
+class SharedWeights(object):
+    def __init__(self, ctx, nb_params, obs_size, nb_actors):
+        """Actor weights and observation statistics published by the learner"""
+        self.params = ctx.RawArray('f', nb_params)
+        self.obs_mean = ctx.RawArray('f', obs_size)
+        self.obs_std = ctx.RawArray('f', obs_size)
+        self.param_noise_stddev = ctx.RawArray('d', nb_actors)
+        self.version = ctx.Value('l', -1)
+        self.lock = ctx.Lock()
+
+    def publish(self, params, obs_mean, obs_std, param_noise_stddev):
+        with self.lock:
+            np.frombuffer(self.params, dtype=np.float32)[:] = params
+            np.frombuffer(self.obs_mean, dtype=np.float32)[:] = obs_mean
+            np.frombuffer(self.obs_std, dtype=np.float32)[:] = obs_std
+            np.frombuffer(self.param_noise_stddev, dtype=np.float64)[:] = param_noise_stddev
+            self.version.value += 1
+
+    def fetch(self, version):
+        """Latest weights as (version, params, obs_mean, obs_std, param_noise_stddev), None if unchanged"""
+        with self.lock:
+            if self.version.value == version:
+                return None
+            return (self.version.value,
+                    np.frombuffer(self.params, dtype=np.float32).copy(),
+                    np.frombuffer(self.obs_mean, dtype=np.float32).copy(),
+                    np.frombuffer(self.obs_std, dtype=np.float32).copy(),
+                    np.frombuffer(self.param_noise_stddev, dtype=np.float64).copy())
+
+
+class RateBound(object):
+    def __init__(self, warmup, transitions_per_update, slack):
+        """Number of env transitions per train step, bounded on both sides.
+
+        After `warmup` transitions, the learner runs a train step for every
+        `transitions_per_update` transitions. The workers may sample up to
+        `slack` train steps ahead of the learner, and the learner may train
+        up to `slack` train steps ahead of the workers.
+        """
+        assert slack >= 1
+        self.warmup = warmup
+        self.transitions_per_update = transitions_per_update
+        self.slack = slack
+
+    def max_transitions(self, updates):
+        """Transitions the workers may have sampled once `updates` train steps are done"""
+        return self.warmup + (updates + self.slack) * self.transitions_per_update
+
+    def min_transitions(self, update):
+        """Transitions the learner needs to have received to run train step `update`"""
+        return self.warmup + (update + 1 - self.slack) * self.transitions_per_update
@@ -58,6 +58,8 @@ ddpg_train_args = {'nb_epochs':None, # with default settings, perform 1M steps t
 				   'param_noise_adaption_interval':50,
 				   'save_interval':100,
 				   'load_path':None,
+				   'memmap_replay':False, # keep the replay memory on disk in the results dir
+				   'in_graph_optimizer':False, # single process: Adam updates in the graph instead of MpiAdam
 				   # policy network_kwargs
 				   'num_layers':4, 
 				   'num_hidden':256, 
@@ -88,6 +90,17 @@ maddpg_train_args = {'nb_epochs':None, # with default settings, perform 1M steps
 				   'load_path':None,
 				   'save_interval':100,
 				   'num_adversaries':0,
+				   # prioritized joint replay (collisions are rare)
+				   'prioritized_replay':False,
+				   'prioritized_replay_alpha':0.6,
+				   'prioritized_replay_beta0':0.4,
+				   'prioritized_replay_eps':1e-6,
+				   'memmap_replay':False, # keep replay memories on disk in the results dir
+				   'in_graph_optimizer':False, # single process: Adam updates in the graph instead of MpiAdam
+				   'share_parameters':False, # one actor and critic for all agents
+				   # decoupled rollouts (0 - rollouts and training alternate in one process)
+				   'nb_rollout_workers':0,
+				   'publish_interval':50, # train steps between actor weight updates of the workers
 				   # policy network_kwargs
 				   'num_layers':4, 
 				   'num_hidden':256, 
@@ -127,5 +140,9 @@ ma_c_env_entry_point = 'gym_highway.multiagent_envs:MultiAgentEnvContinuous'
 
 # logging
 baselines_log_format = ['stdout','tensorboard']
+# seconds between flushes of the log files, written from a background thread (None: flush on every write)
+baselines_log_flush_interval = None
+# one monitor file per run, written by a VecMonitor in batches, instead of one Monitor file per env (the default)
+use_vec_monitor = False
 tensorboard_rootdir = 'gym_highway/tb/'
 tensorboard_save_graph = True
\ No newline at end of file
@@ -0,0 +1,277 @@
+'''
+Parallel evaluation of highway policies.
+
+evaluate() runs one seeded episode per (config, seed) task in a pool of worker
+processes, each of which builds its environments and its policy once, and
+returns one row per episode:
+
+    policy, config, seed, steps, run_time, return, collision, num_obs_collisions,
+    num_agent_collisions, mean_speed, lane_changes
+
+Rows are appended to a csv file as the episodes finish, and the tasks the same
+policy already ran in that file are skipped, so an interrupted sweep resumes
+where it stopped and several policies (or checkpoints) can share one file.
+summarize() aggregates the rows of every config into one table.
+
+A policy is any picklable object called as policy(obs, env) -> actions, with
+an optional reset(env) called at the start of every episode. It is pickled to
+the workers before any episode runs, so the models are loaded there lazily.
+'''
+import csv
+import multiprocessing
+import os
+import os.path as osp
+import random
+
+import numpy as np
+import pandas
+
+import models.config as Config
+
+EPISODE_COLUMNS = ['policy', 'config', 'seed', 'steps', 'run_time', 'return', 'collision', 'num_obs_collisions',
+                   'num_agent_collisions', 'mean_speed', 'lane_changes']
+
+
+def policy_id(kind, load_path=None):
+    '''Name of a policy in the results: its kind and the absolute path of its model'''
+    return kind if load_path is None else '{}:{}'.format(kind, osp.abspath(osp.expanduser(load_path)))
+
+
+def make_highway_env(world_config=None):
+    from gym_highway.envs import HighwayEnv
+    return HighwayEnv(**(world_config or Config.env_train_kwargs))
+
+
+def make_ma_env(num_agents=1, continuous=True, world_config=None):
+    from gym_highway.multiagent_envs import highway_env, highway_ma_c_env
+    env_class = highway_ma_c_env.MultiAgentEnvContinuous if continuous else highway_env.MultiAgentEnv
+    return env_class(world_config=world_config or Config.env_train_kwargs, num_agents=num_agents)
+
+
+def simulator(env):
+    '''HighwaySimulator of a single agent (gym_highway.envs) or multi-agent env'''
+    env = env.unwrapped
+    return env.world if hasattr(env, 'world') else env.env
+
+
+def policy_vehicles(sim):
+    # the single agent simulator keeps its controlled cars in all_agents
+    return sim.all_agents if hasattr(sim, 'all_agents') else sim.agents
+
+
+class ActorPolicy(object):
+    def __init__(self, path):
+        '''DDPG/MADDPG actor exported with export_actor.py, evaluated with NumPy only'''
+        self.path = path
+        self.actor = None
+
+    def __call__(self, obs, env):
+        if self.actor is None:
+            from baselines.ddpg.numpy_actor import NumpyActor
+            self.actor = NumpyActor.load(self.path)
+        if isinstance(obs, list):
+            return list(self.actor(np.stack(obs)))
+        return self.actor(obs)
+
+
+class PPOPolicy(object):
+    def __init__(self, load_path, network='mlp', stochastic=False, **network_kwargs):
+        '''ppo2 model of the single agent env, loaded from a checkpoint written by model.save'''
+        self.load_path = load_path
+        self.network = network
+        self.stochastic = stochastic
+        self.network_kwargs = network_kwargs
+        self.model = None
+
+    def __call__(self, obs, env):
+        if self.model is None:
+            import tensorflow as tf
+            from baselines.common.policies import build_policy
+            from baselines.common.tf_util import get_session, load_variables
+            sess = get_session()
+            policy = build_policy(env, self.network, **self.network_kwargs)
+            # same scope as baselines.ppo2.model.Model, so that the checkpoint variables match
+            with tf.variable_scope('ppo2_model', reuse=tf.AUTO_REUSE):
+                self.model = policy(nbatch=1, nsteps=1, sess=sess)
+            load_variables(osp.expanduser(self.load_path), sess=sess)
+        obs = np.asarray(obs)[None]
+        if self.stochastic:
+            actions = self.model.step(obs)[0]
+        else:
+            actions = self.model._evaluate(self.model.pd.mode(), obs)
+        return int(actions[0])
+
+
+class StackelbergPolicy(object):
+    '''
+    The Stackelberg controller of HighwaySimulator.run. It reads the vehicles
+    from the simulator instead of the observations, leaders act and the other
+    agents maintain their speed.
+    '''
+    def __init__(self):
+        self.controller = None
+
+    def reset(self, env):
+        from gym_highway.envs.stackelbergPlayer import StackelbergPlayer
+        from gym_highway.envs.multi_lane_sim import Constants
+        # lane count of the road the env was configured with
+        self.controller = StackelbergPlayer(Constants.CAR_WIDTH, len(simulator(env).lane_max_obs))
+
+    def __call__(self, obs, env):
+        from gym_highway.envs.stackelbergPlayer import Action
+        sim = simulator(env)
+        agents = policy_vehicles(sim)
+        selected = {}
+        for leader in self.controller.pickLeadersAndFollowers(agents, sim.all_obstacles):
+            selected[leader.id] = self.controller.selectAction(leader, sim.all_obstacles)
+        # the envs have no decelerate action
+        names = ['LEFT', 'RIGHT', 'ACCELERATE', 'MAINTAIN']
+        def action_index(car_id):
+            action = selected.get(car_id, Action.MAINTAIN)
+            return names.index(action.name if action.name in names else 'MAINTAIN')
+
+        if not isinstance(obs, list):
+            return action_index(next(iter(agents)).id)
+        actions = np.zeros((len(obs), len(names)), dtype=np.float32)
+        for i, car in enumerate(agents):
+            actions[i, action_index(car.id)] = 1.0
+        return list(actions)
+
+
+def run_episode(env, policy, seed, max_steps=None):
+    '''Run one episode of policy in env and return its row of statistics'''
+    random.seed(seed)
+    np.random.seed(seed)
+    env.seed(seed)
+    obs = env.reset()
+    if hasattr(policy, 'reset'):
+        policy.reset(env)
+    sim = simulator(env)
+    lanes = {car.id: car.lane_id for car in policy_vehicles(sim)}
+    steps, total_reward, speed, lane_changes = 0, 0.0, 0.0, 0
+    done = False
+    while not done and (max_steps is None or steps < max_steps):
+        obs, rew, done, _ = env.step(policy(obs, env))
+        steps += 1
+        total_reward += float(np.sum(rew))
+        done = any(done) if isinstance(done, list) else bool(done)
+        cars = policy_vehicles(sim)
+        speed += np.mean([car.velocity.x for car in cars])
+        for car in cars:
+            lane_changes += car.lane_id != lanes[car.id]
+            lanes[car.id] = car.lane_id
+    return {'seed': seed, 'steps': steps, 'run_time': round(sim.run_time, 6), 'return': total_reward,
+            'collision': int(sim.num_obs_collisions + sim.num_agent_collisions > 0),
+            'num_obs_collisions': sim.num_obs_collisions, 'num_agent_collisions': sim.num_agent_collisions,
+            'mean_speed': speed / max(steps, 1), 'lane_changes': lane_changes}
+
+
+# state of a worker process, set by _init_worker
+_worker = {}
+
+def _init_worker(env_fn, configs, policy_fn, max_steps):
+    _worker.update(env_fn=env_fn, configs=configs, policy=policy_fn(), max_steps=max_steps, envs={})
+
+def _run_task(task):
+    config, seed = task
+    envs = _worker['envs']
+    if config not in envs:
+        envs[config] = _worker['env_fn'](**_worker['configs'][config])
+    row = run_episode(envs[config], _worker['policy'], seed, _worker['max_steps'])
+    row['config'] = config
+    return row
+
+
+def evaluate(env_fn, policy_fn, seeds, configs=None, results_path=None, num_workers=None, max_steps=None,
+             policy_name=''):
+    '''
+    Run one episode for every config and seed in a pool of worker processes.
+
+    Parameters
+    ----------
+    env_fn: function
+        picklable function building an env from the kwargs of a config, e.g. make_ma_env
+    policy_fn: function
+        picklable function returning the policy, called once in every worker
+    seeds: list
+        seeds of the episodes of every config
+    configs: dict or None
+        config name -> kwargs of env_fn, e.g. {'agents_%d' % n: {'num_agents': n} for n in range(1, 6)}.
+        By default a single config '' without kwargs.
+    results_path: str or None
+        csv file the episode rows are appended to, the tasks already in it are not run again
+    num_workers: int or None
+        size of the pool, by default Config.num_workers. With 0 the episodes run in this process.
+    max_steps: int or None
+        limit on the steps of an episode, by default until the env is done
+    policy_name: str
+        name of the policy in the policy column, e.g. policy_id('actor', path). Only the episodes
+        of this policy in results_path are skipped.
+
+    Returns
+    -------
+    pandas.DataFrame with the rows of all the episodes of the policy, including the ones loaded
+    from results_path
+    '''
+    configs = configs if configs is not None else {'': {}}
+    num_workers = Config.num_workers if num_workers is None else num_workers
+    rows = []
+    has_header = results_path is not None and osp.exists(results_path) and osp.getsize(results_path) > 0
+    if has_header:
+        previous = pandas.read_csv(results_path, keep_default_na=False, dtype={'policy': str, 'config': str})
+        if list(previous.columns) != EPISODE_COLUMNS:
+            raise ValueError("{} has the columns {}, expected {}".format(
+                results_path, list(previous.columns), EPISODE_COLUMNS))
+        rows = [row for row in previous.to_dict('records') if row['policy'] == policy_name]
+    finished = {(row['config'], int(row['seed'])) for row in rows}
+    tasks = [(config, seed) for config in configs for seed in seeds if (config, seed) not in finished]
+
+    pool, writer = None, None
+    if results_path is not None:
+        if osp.dirname(results_path):
+            os.makedirs(osp.dirname(results_path), exist_ok=True)
+        f = open(results_path, 'a', newline='')
+        writer = csv.DictWriter(f, fieldnames=EPISODE_COLUMNS)
+        if not has_header:
+            writer.writeheader()
+    try:
+        if num_workers == 0:
+            _init_worker(env_fn, configs, policy_fn, max_steps)
+            results = map(_run_task, tasks)
+        else:
+            # spawn, so that workers do not inherit tensorflow or pygame state
+            pool = multiprocessing.get_context('spawn').Pool(
+                min(num_workers, max(len(tasks), 1)), initializer=_init_worker,
+                initargs=(env_fn, configs, policy_fn, max_steps))
+            results = pool.imap_unordered(_run_task, tasks)
+        for row in results:
+            row['policy'] = policy_name
+            rows.append(row)
+            if writer is not None:
+                writer.writerow(row)
+                f.flush()
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if writer is not None:
+            f.close()
+    return pandas.DataFrame(rows, columns=EPISODE_COLUMNS)
+
+
+def summarize(results):
+    '''One row per config: episodes, collision rate and the means of the episode statistics'''
+    grouped = results.groupby('config', sort=False)
+    return pandas.DataFrame({
+        'episodes': grouped['seed'].count(),
+        'collision_rate': grouped['collision'].mean(),
+        'mean_speed': grouped['mean_speed'].mean(),
+        'lane_changes': grouped['lane_changes'].mean(),
+        'episode_length': grouped['steps'].mean(),
+        'run_time': grouped['run_time'].mean(),
+        'return': grouped['return'].mean(),
+    })
+
+
+def agent_count_configs(agent_counts, continuous=True):
+    '''Configs of make_ma_env for the agent counts of HighwaySimulator.run'''
+    return {'agents_%d' % n: {'num_agents': n, 'continuous': continuous} for n in agent_counts}
@@ -38,6 +38,7 @@ class Model(object):
         self.unsup = unsupType is not None
         predictor = None
         self.numaction = ac_space.n
+        self.one_hot_actions = np.eye(self.numaction, dtype=np.float32)
         designHead = 'universe'
 
         with tf.variable_scope('ppo2_model', reuse=tf.AUTO_REUSE):
@@ -208,9 +209,7 @@ class Model(object):
             td_map[self.local_ap_network.s2] = obs[1:]
 
             # convert to one hot coding
-            one_hot_actions = np.eye(self.numaction)[actions]
-            actions = np.array(one_hot_actions, dtype=np.float32)
-            td_map[self.local_ap_network.asample] = actions[:-1]
+            td_map[self.local_ap_network.asample] = self.one_hot_actions[actions[:-1]]
 
         if states is not None:
             td_map[self.train_model.S] = states
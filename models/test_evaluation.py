@@ -0,0 +1,63 @@
+from types import SimpleNamespace
+
+import pandas
+
+from models import evaluation
+
+
+class StubEnv(object):
+    # episodes of 3 steps, the reward of a step is the action of the policy
+    def __init__(self, speed=1.0):
+        car = SimpleNamespace(id=0, lane_id=1, velocity=SimpleNamespace(x=speed))
+        self.world = SimpleNamespace(agents=[car], run_time=0.0, num_obs_collisions=0, num_agent_collisions=0)
+        self.unwrapped = self
+
+    def seed(self, seed):
+        self.t = 0
+
+    def reset(self):
+        return 0.0
+
+    def step(self, action):
+        self.t += 1
+        return 0.0, action, self.t == 3, {}
+
+
+class ConstantPolicy(object):
+    calls = 0
+
+    def __init__(self, action):
+        self.action = action
+
+    def __call__(self, obs, env):
+        ConstantPolicy.calls += 1
+        return self.action
+
+
+def run(results_path, action, seeds):
+    return evaluation.evaluate(StubEnv, lambda: ConstantPolicy(action), seeds, configs={'slow': {'speed': 1.0}},
+                               results_path=results_path, num_workers=0,
+                               policy_name=evaluation.policy_id('stub', 'policy_%d' % action))
+
+
+def test_resume_per_policy(tmpdir):
+    path = str(tmpdir.join('evaluation.csv'))
+    results = run(path, 1, [0, 1])
+    assert results['return'].tolist() == [3.0, 3.0] and results['mean_speed'].tolist() == [1.0, 1.0]
+
+    # only the missing seed of the same policy runs again
+    ConstantPolicy.calls = 0
+    results = run(path, 1, [0, 1, 2])
+    assert ConstantPolicy.calls == 3
+    assert sorted(results['seed']) == [0, 1, 2]
+
+    # another policy writing to the same file runs all its episodes, and gets only its own rows
+    ConstantPolicy.calls = 0
+    results = run(path, 2, [0, 1])
+    assert ConstantPolicy.calls == 6
+    assert results['return'].tolist() == [6.0, 6.0]
+    assert set(results['policy']) == {evaluation.policy_id('stub', 'policy_2')}
+
+    saved = pandas.read_csv(path, keep_default_na=False)
+    assert list(saved.columns) == evaluation.EPISODE_COLUMNS
+    assert saved.groupby('policy')['seed'].count().tolist() == [3, 2]